@@ -0,0 +1,132 @@
+"""
+Offline benchmark of the graph building pipeline.
+
+Record inventory responses once against a live inventory:
+    python -m benchmarks.build_benchmark record --tmo-id <tmo id> \
+        --path inventory.json.gz
+
+Replay them against a local Arango as many times as needed
+(--tmo-id initialises the graph from the recording on an empty Arango):
+    python -m benchmarks.build_benchmark replay --key <graph key> \
+        --path inventory.json.gz --latency 0.005 --scale 4 --repeat 3
+"""
+
+import argparse
+import statistics
+import time
+
+from config import ArangoConfig, GraphDBConfig, InventoryGRPCConfig
+from services.graph import GraphService
+from services.inventory import Inventory, InventoryInterface
+from services.inventory_replay import RecordingInventory, ReplayInventory
+from task.building_tasks import RunBuildingTask
+from task.initialisation_tasks import InitGraphTask
+from task.models.incoming_data import InitialRecordCreate
+
+
+def get_graph_db() -> GraphService:
+    config = ArangoConfig()
+    return GraphService(
+        url=config.url,
+        username=config.username,
+        password=config.password,
+        sys_database_name=GraphDBConfig().sys_database_name,
+    )
+
+
+def init_graph(
+    graph_db: GraphService, inventory: InventoryInterface, tmo_id: int
+) -> str:
+    data = InitialRecordCreate(name=f"benchmark_{tmo_id}", tmo_id=tmo_id)
+    task = InitGraphTask(
+        graph_data=data, graph_db=graph_db, inventory=inventory
+    )
+    task.check()
+    task.execute()
+    main_collection = graph_db.get_collection(
+        db=graph_db.sys_db, name=GraphDBConfig().main_graph_collection_name
+    )
+    return next(main_collection.find(filters={"tmo_id": tmo_id}, limit=1))[
+        "_key"
+    ]
+
+
+def run_build(
+    graph_db: GraphService, inventory: InventoryInterface, key: str
+) -> float:
+    task = RunBuildingTask(graph_db=graph_db, inventory=inventory, key=key)
+    task.check()
+    start_time = time.perf_counter()
+    task.execute()
+    return time.perf_counter() - start_time
+
+
+def record(args: argparse.Namespace):
+    graph_db = get_graph_db()
+    inventory = RecordingInventory(
+        inventory=Inventory(InventoryGRPCConfig().url), path=args.path
+    )
+    if args.tmo_id:
+        args.key = init_graph(
+            graph_db=graph_db, inventory=inventory, tmo_id=args.tmo_id
+        )
+    elapsed = run_build(graph_db=graph_db, inventory=inventory, key=args.key)
+    inventory.save()
+    print(f"Recorded build {args.key} in {elapsed:.2f}s to {args.path}")
+
+
+def replay(args: argparse.Namespace):
+    graph_db = get_graph_db()
+    inventory = ReplayInventory(
+        path=args.path, latency=args.latency, scale=args.scale
+    )
+    if args.tmo_id:
+        args.key = init_graph(
+            graph_db=graph_db, inventory=inventory, tmo_id=args.tmo_id
+        )
+    timings = []
+    for attempt in range(args.repeat):
+        elapsed = run_build(
+            graph_db=graph_db, inventory=inventory, key=args.key
+        )
+        timings.append(elapsed)
+        print(f"Attempt {attempt + 1}: {elapsed:.2f}s")
+    print(
+        f"Build {args.key} (scale={args.scale}, latency={args.latency}s): "
+        f"min={min(timings):.2f}s "
+        f"median={statistics.median(timings):.2f}s "
+        f"max={max(timings):.2f}s"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    subparsers = parser.add_subparsers(required=True)
+
+    record_parser = subparsers.add_parser("record")
+    record_parser.set_defaults(handler=record)
+
+    replay_parser = subparsers.add_parser("replay")
+    replay_parser.add_argument("--latency", type=float, default=0.0)
+    replay_parser.add_argument("--scale", type=int, default=1)
+    replay_parser.add_argument("--repeat", type=int, default=1)
+    replay_parser.set_defaults(handler=replay)
+
+    for sub_parser in (record_parser, replay_parser):
+        sub_parser.add_argument("--key")
+        sub_parser.add_argument("--path", required=True)
+        sub_parser.add_argument(
+            "--tmo-id",
+            type=int,
+            default=None,
+            help="Initialise a new graph for this TMO before building",
+        )
+
+    args = parser.parse_args()
+    if not args.key and not args.tmo_id:
+        parser.error("--key or --tmo-id is required")
+    args.handler(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""
+Benchmark of the children links lookup of expand on a synthetic graph.
+
+Compares the former filter over the whole edge collection with the
+edge index lookup from the children of the expanded node:
+    python -m benchmarks.children_links_benchmark --edges 10000000 \
+        --nodes 1000000 --children 1000 --neighbours 1000 --repeat 5
+
+The graph is generated once into the --database database and reused by
+the next runs with the same sizes. --drop removes it afterwards
+"""
+
+import argparse
+import random
+import statistics
+import time
+
+from arango.database import StandardDatabase
+
+from benchmarks.build_benchmark import get_graph_db
+from config import GraphDBConfig
+from services.graph import IfNotExistType
+from task.analysis_tasks import get_children_links_binds
+from task.queries import CHILDREN_LINKS
+
+FULL_SCAN_CHILDREN_LINKS = """
+    FOR doc IN @@mainEdge
+        FILTER (doc._from IN @first AND doc._to IN @second)
+            OR (doc._from IN @second AND doc._to IN @first)
+        RETURN doc
+"""
+PARENT_KEY = "parent"
+BATCH_SIZE = 50_000
+
+
+def get_database(name: str) -> StandardDatabase:
+    return get_graph_db().get_database(
+        name=name, if_not_exist=IfNotExistType.CREATE
+    )
+
+
+def generate_graph(
+    db: StandardDatabase,
+    nodes: int,
+    edges: int,
+    children: int,
+    seed: int,
+):
+    """
+    Nodes 0..nodes-1 with random links between them. Nodes 0..children-1
+    are the children of the expanded node. Skipped if the sizes match
+    """
+    config = GraphDBConfig()
+    main_name = config.graph_data_collection_name
+    edge_name = config.graph_data_edge_name
+    if db.has_collection(main_name) and db.has_collection(edge_name):
+        main, edge = db.collection(main_name), db.collection(edge_name)
+        if main.count() == nodes + 1 and edge.count() == edges + children:
+            print(f"Reusing {nodes} nodes and {edges} links")
+            return
+        db.delete_collection(main_name)
+        db.delete_collection(edge_name)
+    main = db.create_collection(main_name)
+    edge = db.create_collection(edge_name, edge=True)
+
+    start_time = time.perf_counter()
+    main.insert({"_key": PARENT_KEY})
+    for start in range(0, nodes, BATCH_SIZE):
+        main.import_bulk(
+            [
+                {"_key": str(i)}
+                for i in range(start, min(start + BATCH_SIZE, nodes))
+            ]
+        )
+    parent_id = config.get_node_key(PARENT_KEY)
+    edge.import_bulk(
+        [
+            {
+                "_from": config.get_node_key(i),
+                "_to": parent_id,
+                "connection_type": "p_id",
+            }
+            for i in range(children)
+        ]
+    )
+    rnd = random.Random(seed)
+    for start in range(0, edges, BATCH_SIZE):
+        edge.import_bulk(
+            [
+                {
+                    "_from": config.get_node_key(rnd.randrange(nodes)),
+                    "_to": config.get_node_key(rnd.randrange(nodes)),
+                    "connection_type": "mo_link",
+                }
+                for _ in range(min(BATCH_SIZE, edges - start))
+            ]
+        )
+    print(
+        f"Generated {nodes} nodes and {edges} links "
+        f"in {time.perf_counter() - start_time:.1f}s"
+    )
+
+
+def time_query(
+    db: StandardDatabase, query: str, binds: dict, repeat: int
+) -> tuple[list[float], set[str]]:
+    timings = []
+    keys = set()
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        keys = {i["_key"] for i in db.aql.execute(query=query, bind_vars=binds)}
+        timings.append(time.perf_counter() - start_time)
+    return timings, keys
+
+
+def report(label: str, timings: list[float], links: int):
+    print(
+        f"{label:<24} links={links} "
+        f"min={min(timings) * 1000:.1f}ms "
+        f"median={statistics.median(timings) * 1000:.1f}ms "
+        f"max={max(timings) * 1000:.1f}ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--database", default="benchmark_children_links")
+    parser.add_argument("--nodes", type=int, default=1_000_000)
+    parser.add_argument("--edges", type=int, default=10_000_000)
+    parser.add_argument("--children", type=int, default=1000)
+    parser.add_argument("--neighbours", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--drop", action="store_true")
+    args = parser.parse_args()
+    if args.children + args.neighbours > args.nodes:
+        parser.error("--children and --neighbours exceed --nodes")
+
+    db = get_database(args.database)
+    generate_graph(
+        db=db,
+        nodes=args.nodes,
+        edges=args.edges,
+        children=args.children,
+        seed=args.seed,
+    )
+    binds = get_children_links_binds(
+        config=GraphDBConfig(),
+        children_nodes=[str(i) for i in range(args.children)],
+        neighbour_nodes=[
+            str(i)
+            for i in range(args.children, args.children + args.neighbours)
+        ],
+    )
+    full_scan, full_scan_keys = time_query(
+        db, query=FULL_SCAN_CHILDREN_LINKS, binds=binds, repeat=args.repeat
+    )
+    report("full scan", full_scan, len(full_scan_keys))
+    lookup, lookup_keys = time_query(
+        db, query=CHILDREN_LINKS.query, binds=binds, repeat=args.repeat
+    )
+    report("edge index lookup", lookup, len(lookup_keys))
+    if lookup_keys != full_scan_keys:
+        raise RuntimeError("The queries returned different links")
+
+    if args.drop:
+        get_graph_db().sys_db.delete_database(args.database)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""
+Benchmark of parent/child lookups on the highest-degree nodes of a graph.
+
+Compares graph traversals filtered by connection_type after reading every
+adjacent edge with direct edge lookups served by the vertex-centric
+[_from, connection_type] and [_to, connection_type] indexes:
+    python -m benchmarks.edge_index_benchmark --key <graph key> \
+        --nodes 10 --repeat 5
+
+--compare-indexes drops the vertex-centric indexes first to time both
+query shapes without them, then recreates the indexes and times again
+"""
+
+import argparse
+import statistics
+import time
+
+from arango.database import StandardDatabase
+
+from benchmarks.build_benchmark import get_graph_db
+from config import GraphDBConfig
+from services.graph import GraphService
+from task.index_tasks import ensure_indexes
+
+VERTEX_CENTRIC_INDEXES = {"idx_edge_from_type", "idx_edge_to_type"}
+
+TRAVERSAL_CHILDREN = """
+    FOR v, e IN 1..1 INBOUND @nodeId GRAPH @mainGraph
+        FILTER e.connection_type == "p_id"
+        RETURN v
+"""
+LOOKUP_CHILDREN = """
+    FOR e IN @@mainEdgeCollection
+        FILTER e._to == @nodeId
+        FILTER e.connection_type == "p_id"
+        FOR v IN @@mainCollection
+            FILTER v._id == e._from
+            RETURN v
+"""
+TRAVERSAL_PARENT = """
+    FOR v, e IN 1..1 OUTBOUND @nodeId GRAPH @mainGraph
+        FILTER e.connection_type == "p_id"
+        LIMIT 1
+        RETURN v
+"""
+LOOKUP_PARENT = """
+    FOR e IN @@mainEdgeCollection
+        FILTER e._from == @nodeId
+        FILTER e.connection_type == "p_id"
+        LIMIT 1
+        FOR v IN @@mainCollection
+            FILTER v._id == e._to
+            RETURN v
+"""
+
+
+def get_database(graph_db: GraphService, key: str) -> StandardDatabase:
+    main_collection = graph_db.get_collection(
+        db=graph_db.sys_db, name=GraphDBConfig().main_graph_collection_name
+    )
+    document = main_collection.get(key)
+    if document is None:
+        raise ValueError(f"Graph with key {key} not found")
+    return graph_db.get_database(name=document["database"])
+
+
+def get_high_degree_nodes(db: StandardDatabase, limit: int) -> list[str]:
+    query = """
+        FOR e IN @@mainEdgeCollection
+            COLLECT node = e._to WITH COUNT INTO degree
+            SORT degree DESC
+            LIMIT @limit
+            RETURN node
+    """
+    binds = {
+        "@mainEdgeCollection": GraphDBConfig().graph_data_edge_name,
+        "limit": limit,
+    }
+    return list(db.aql.execute(query=query, bind_vars=binds))
+
+
+def drop_vertex_centric_indexes(db: StandardDatabase):
+    collection = db.collection(GraphDBConfig().graph_data_edge_name)
+    for index in collection.indexes():
+        if index.get("name") in VERTEX_CENTRIC_INDEXES:
+            collection.delete_index(index["id"])
+
+
+def time_query(
+    db: StandardDatabase, query: str, nodes: list[str], repeat: int
+) -> list[float]:
+    config = GraphDBConfig()
+    binds = {
+        "mainGraph": config.graph_data_graph_name,
+        "@mainCollection": config.graph_data_collection_name,
+        "@mainEdgeCollection": config.graph_data_edge_name,
+    }
+    # Unused bind parameters are rejected by Arango
+    binds = {k: v for k, v in binds.items() if f"@{k}" in query}
+    timings = []
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        for node in nodes:
+            list(
+                db.aql.execute(query=query, bind_vars={**binds, "nodeId": node})
+            )
+        timings.append(time.perf_counter() - start_time)
+    return timings
+
+
+def report(label: str, timings: list[float]):
+    print(
+        f"{label:<28} "
+        f"min={min(timings) * 1000:.1f}ms "
+        f"median={statistics.median(timings) * 1000:.1f}ms "
+        f"max={max(timings) * 1000:.1f}ms"
+    )
+
+
+def run(db: StandardDatabase, nodes: list[str], repeat: int, title: str):
+    print(title)
+    for label, query in (
+        ("children (traversal)", TRAVERSAL_CHILDREN),
+        ("children (edge lookup)", LOOKUP_CHILDREN),
+        ("parent (traversal)", TRAVERSAL_PARENT),
+        ("parent (edge lookup)", LOOKUP_PARENT),
+    ):
+        report(label, time_query(db, query=query, nodes=nodes, repeat=repeat))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--key", required=True)
+    parser.add_argument("--nodes", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument(
+        "--compare-indexes",
+        action="store_true",
+        help="Time without the vertex-centric indexes before creating them",
+    )
+    args = parser.parse_args()
+
+    graph_db = get_graph_db()
+    db = get_database(graph_db=graph_db, key=args.key)
+    nodes = get_high_degree_nodes(db=db, limit=args.nodes)
+    print(f"Graph {args.key}: {len(nodes)} highest-degree nodes")
+
+    if args.compare_indexes:
+        drop_vertex_centric_indexes(db)
+        run(db, nodes=nodes, repeat=args.repeat, title="Without indexes")
+    created, _ = ensure_indexes(graph_db=graph_db, db=db)
+    if created:
+        print(f"Created indexes: {', '.join(created)}")
+    run(db, nodes=nodes, repeat=args.repeat, title="With indexes")
+
+
+if __name__ == "__main__":
+    main()
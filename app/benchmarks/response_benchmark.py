@@ -0,0 +1,169 @@
+"""
+Micro-benchmark of building and serializing a neighbors response.
+
+Compares the validated path (DB models, dumped and validated again into
+response models, then dumped and validated by FastAPI once more) with the
+trusted path (DB models constructed without validation, response models
+validated once from the documents and serialized by pydantic-core):
+    python -m benchmarks.response_benchmark --nodes 10000 --params 20 \
+        --repeat 5
+
+No database is needed, the documents are generated
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response as fastapi_serialize_response
+from fastapi.utils import create_model_field
+
+from services.response_cache import serialize_response
+from task.helpers.trusted_documents import TrustedDocuments
+from task.models.dto import DbMoEdge, DbMoNode
+from task.models.outgoing_data import (
+    MoEdgeResponse,
+    MoNodeResponse,
+    NodeEdgeCommutationResponse,
+)
+
+
+def generate_documents(
+    nodes: int, params: int
+) -> tuple[list[dict], list[dict]]:
+    node_documents = []
+    edge_documents = []
+    for i in range(1, nodes + 1):
+        node_documents.append(
+            {
+                "_id": f"main/{i}",
+                "_key": str(i),
+                "_rev": "_rev",
+                "name": f"Node {i}",
+                "label": None,
+                "tmo": 1,
+                "mo_ids": [i],
+                "is_trace": False,
+                "grouped_by_tprm": None,
+                "breadcrumbs": "/",
+                "data": {
+                    "tmo_id": 1,
+                    "p_id": None,
+                    "id": i,
+                    "name": f"Node {i}",
+                    "active": True,
+                    "version": 1,
+                    "latitude": 50.0,
+                    "longitude": 30.0,
+                    "params": [
+                        {
+                            "tprm_id": j,
+                            "mo_id": i,
+                            "id": i * params + j,
+                            "version": 1,
+                            "value": str(j),
+                            "parsed_value": {
+                                "raw_value": str(j),
+                                "value": j,
+                                "triggers": {"mos": [], "prms": []},
+                            },
+                        }
+                        for j in range(1, params + 1)
+                    ],
+                },
+            }
+        )
+        edge_documents.append(
+            {
+                "_id": f"edges/{i}",
+                "_key": str(i),
+                "_rev": "_rev",
+                "_from": f"main/{i}",
+                "_to": f"main/{i % nodes + 1}",
+                "connection_type": "mo_link",
+                "prm": [i],
+                "tprm": 1,
+                "is_trace": False,
+                "virtual": False,
+            }
+        )
+    return node_documents, edge_documents
+
+
+def validated_path(nodes: list[dict], edges: list[dict]) -> bytes:
+    db_nodes = [DbMoNode.model_validate(i) for i in nodes]
+    db_edges = [DbMoEdge.model_validate(i) for i in edges]
+    response = NodeEdgeCommutationResponse(
+        nodes=[
+            MoNodeResponse.model_validate(i.model_dump(by_alias=True))
+            for i in db_nodes
+        ],
+        edges=[
+            MoEdgeResponse.model_validate(i.model_dump(by_alias=True))
+            for i in db_edges
+        ],
+        tmo=[],
+    )
+    field = create_model_field(
+        name="response", type_=NodeEdgeCommutationResponse, mode="serialization"
+    )
+    content = asyncio.run(
+        fastapi_serialize_response(
+            field=field, response_content=response, by_alias=False
+        )
+    )
+    return JSONResponse(content).body
+
+
+def trusted_path(nodes: list[dict], edges: list[dict]) -> bytes:
+    documents = TrustedDocuments()
+    db_nodes = documents.construct_all(DbMoNode, nodes)
+    db_edges = documents.construct_all(DbMoEdge, edges)
+    response = NodeEdgeCommutationResponse.model_construct(
+        nodes=documents.node_responses(db_nodes),
+        edges=documents.edge_responses(db_edges),
+        tmo=[],
+    )
+    return serialize_response(response, NodeEdgeCommutationResponse)
+
+
+def time_path(path, nodes: list[dict], edges: list[dict], repeat: int):
+    timings = []
+    for _ in range(repeat):
+        start_time = time.process_time()
+        path(nodes, edges)
+        timings.append(time.process_time() - start_time)
+    return timings
+
+
+def report(label: str, timings: list[float], per: float):
+    print(
+        f"{label:<10} "
+        f"min={min(timings) * 1000:.1f}ms "
+        f"median={statistics.median(timings) * 1000:.1f}ms "
+        f"per 10k nodes={statistics.median(timings) * per * 1000:.1f}ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--nodes", type=int, default=10_000)
+    parser.add_argument("--params", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    nodes, edges = generate_documents(nodes=args.nodes, params=args.params)
+    per = 10_000 / args.nodes
+    print(f"{args.nodes} nodes, {args.params} PRMs each, CPU time")
+    validated = time_path(validated_path, nodes, edges, repeat=args.repeat)
+    trusted = time_path(trusted_path, nodes, edges, repeat=args.repeat)
+    report("validated", validated, per=per)
+    report("trusted", trusted, per=per)
+    saved = statistics.median(validated) - statistics.median(trusted)
+    print(f"saved per 10k nodes={saved * per * 1000:.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
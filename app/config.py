@@ -38,6 +38,78 @@ class ArangoConfig(BaseSettings):
     model_config = SettingsConfigDict(env_prefix="arango_")
 
 
+class ArangoPoolConfig(BaseSettings):
+    request_timeout: int = Field(60 * 10, gt=0)
+    # Number of hosts with a cached connection pool
+    pool_connections: int = Field(10, gt=0)
+    # Connections kept open per host. Matches the Starlette threadpool size
+    pool_maxsize: int = Field(40, gt=0)
+    # Seconds to wait for a free connection. None opens an extra connection
+    pool_timeout: float | None = Field(None, gt=0)
+    retry_attempts: int = Field(3, ge=0)
+    backoff_factor: float = Field(1.0, ge=0)
+    request_compression: bool = False
+    request_compression_threshold: int = Field(1024, ge=0)
+    request_compression_level: int = Field(6, ge=-1, le=9)
+    response_compression: Literal["deflate", "gzip"] | None = None
+
+    model_config = SettingsConfigDict(env_prefix="arango_pool_")
+
+
+class AqlConfig(BaseSettings):
+    # Documents per cursor round trip
+    batch_size: int = Field(5000, gt=0)
+    # Seconds a server side cursor is kept between two fetches
+    ttl: int = Field(600, gt=0)
+    # ttl of the cursors which build phases consume while they write.
+    # A gap between two fetches includes the writes of a whole batch
+    build_ttl: int = Field(6 * 60 * 60, gt=0)
+    # Seconds after which a query is killed. 0 means no limit
+    max_runtime: float = Field(0, ge=0)
+    # Seconds after which a query goes to the slow query log. 0 disables it
+    slow_query_threshold: float = Field(1.0, ge=0)
+    # Re-run slow read-only queries with profiling for the slow query log
+    slow_query_profile: bool = Field(False)
+    # Entries kept in the slow query log of each worker process
+    slow_query_log_size: int = Field(100, gt=0)
+
+    model_config = SettingsConfigDict(env_prefix="aql_")
+
+
+class ResponseCacheConfig(BaseSettings):
+    enabled: bool = True
+    # Responses kept in the memory of each worker process
+    max_entries: int = Field(256, gt=0)
+    # Total size of the responses kept in memory, bytes
+    max_bytes: int = Field(256 * 1024 * 1024, gt=0)
+    # Share responses between workers through a collection of the system
+    # database. The memory cache is checked first
+    shared: bool = False
+    shared_collection_name: str = Field("response_cache", min_length=1)
+    # Seconds after which a shared entry is removed by Arango
+    shared_ttl: int = Field(60 * 60, gt=0)
+
+    model_config = SettingsConfigDict(env_prefix="response_cache_")
+
+
+class MetricsConfig(BaseSettings):
+    # Serve GET /metrics and the side port of the updater
+    enabled: bool = True
+    # Port of the metrics server of the updater process
+    updater_port: int = Field(9100, gt=0, lt=65_536)
+
+    model_config = SettingsConfigDict(env_prefix="metrics_")
+
+
+class TracingConfig(BaseSettings):
+    # Record spans of tasks, their checks, queries and inventory calls
+    enabled: bool = True
+    # Return the timings of a request in the Server-Timing header
+    server_timing: bool = True
+
+    model_config = SettingsConfigDict(env_prefix="tracing_")
+
+
 class GraphDBConfig(BaseSettings):
     sys_database_name: str = Field("_system")
     main_graph_collection_name: str = Field("main_graphs")
@@ -57,6 +129,7 @@ class GraphDBConfig(BaseSettings):
     search_index_name: str = Field("inv-idx-name")
     search_index_indexed: str = Field("inv-idx-indexed")
     search_view: str = Field("search-view")
+    ensure_indexes_on_start: bool = Field(True)
 
     def get_db_name(self, tmo_id: int) -> str:
         return f"{self.db_name_prefix}_{tmo_id}"
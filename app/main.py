@@ -1,7 +1,10 @@
 from starlette.middleware.cors import CORSMiddleware
 
-from config import AppConfig
+from config import AppConfig, MetricsConfig, TracingConfig
 from init_app import create_app
+from routers.helpers.metrics import MetricsMiddleware, get_metrics
+from routers.helpers.server_timing import ServerTimingMiddleware
+from services.async_graph import async_arango_clients
 from v1 import app_v1
 
 app = create_app(root_path=AppConfig().prefix)
@@ -16,3 +19,12 @@ app.add_middleware(
 )
 
 app.mount("/v1", app_v1)
+# Connections of the async clients are closed while the loop still runs
+app.add_event_handler("shutdown", async_arango_clients.aclose)
+
+if TracingConfig().enabled and TracingConfig().server_timing:
+    app.add_middleware(ServerTimingMiddleware)
+
+if MetricsConfig().enabled:
+    app.add_middleware(MetricsMiddleware)
+    app.add_route("/metrics", get_metrics, include_in_schema=False)
@@ -2,26 +2,47 @@ from typing import Annotated
 
 from fastapi import APIRouter, Body, Depends
 
-from routers.helpers.try_catch_task_exception import try_catch_task_exception
+from routers.helpers.graph_etag import graph_etag
+from routers.helpers.try_catch_task_exception import (
+    try_catch_cached_task_exception,
+    try_catch_cached_task_exception_async,
+    try_catch_task_stream,
+    try_catch_task_stream_async,
+    try_catch_trusted_task_exception,
+    try_catch_trusted_task_exception_async,
+)
 from services.instances import graph_db
 from services.security.security_data_models import UserData
 from services.security.security_factory import security
 from task.analysis_tasks import (
+    AsyncExpandNodesTask,
+    AsyncGetNeighborsTask,
     CollapseNodesTask,
     ExpandEdgesTask,
-    ExpandNodesTask,
     GetNeighborsTask,
     GetTopLevelAnalysisTask,
 )
+from task.batch_analysis_task import MAX_BATCH_OPERATIONS, BatchAnalysisTask
 from task.edges_between_nodes_task import FindEdgesBetweenNodesTask
+from task.models.enums import ChildrenSort
+from task.models.incoming_data import BatchOperation
 from task.models.outgoing_data import (
+    BatchAnalysisResponse,
     CollapseNodeResponse,
     NodeEdgeCommutationResponse,
     NodeEdgeTmoTprmResponse,
+    SubtreeCountResponse,
 )
+from task.subtree_task import SubtreeTask
 
 router = APIRouter(prefix="/analysis", tags=["analysis"])
 
+TMO_IDS_DESCRIPTION = "Only the nodes of these TMOs. All nodes when not set"
+FIELDS_DESCRIPTION = (
+    "Attributes of the node data to return, e.g. params or latitude. "
+    "The whole node data when not set"
+)
+
 
 @router.post(
     "/top_level/{key}",
@@ -33,12 +54,36 @@ def get_top_level(
     max_size: Annotated[
         int, Body(description="Maximum number of nodes", embed=True, ge=0)
     ] = 0,
+    return_children_count: Annotated[
+        bool,
+        Body(description="Set children_count of every node", embed=True),
+    ] = False,
+    fields: Annotated[
+        list[str] | None,
+        Body(description=FIELDS_DESCRIPTION, embed=True),
+    ] = None,
     user_data: UserData = Depends(security),
+    etag_headers: dict[str, str] = Depends(graph_etag),
 ):
     task = GetTopLevelAnalysisTask(
-        graph_db=graph_db, key=key, max_size=max_size
+        graph_db=graph_db,
+        key=key,
+        max_size=max_size,
+        return_children_count=return_children_count,
+        fields=fields,
+    )
+    params = {
+        "max_size": max_size,
+        "return_children_count": return_children_count,
+        "fields": fields,
+    }
+    return try_catch_cached_task_exception(
+        task,
+        endpoint="top_level",
+        params=params,
+        response_model=NodeEdgeCommutationResponse,
+        headers=etag_headers,
     )
-    return try_catch_task_exception(task)
 
 
 @router.post(
@@ -46,7 +91,7 @@ def get_top_level(
     response_model=NodeEdgeCommutationResponse,
     response_model_by_alias=False,
 )
-def expand(
+async def expand(
     key: str,
     node_key: Annotated[str, Body()],
     neighboring_node_keys: Annotated[list[str], Body()],
@@ -55,9 +100,26 @@ def expand(
     ] = 0,
     return_commutation_label: Annotated[bool, Body()] = False,
     expand_edges: Annotated[bool, Body()] = False,
+    return_children_count: Annotated[
+        bool, Body(description="Set children_count of every node")
+    ] = False,
+    page_size: Annotated[
+        int, Body(description="Children per page, 0 returns all", ge=0)
+    ] = 0,
+    sort_by: Annotated[
+        ChildrenSort, Body(description="Order of the children pages")
+    ] = ChildrenSort.KEY,
+    page_token: Annotated[
+        str | None, Body(description="next_page_token of the previous page")
+    ] = None,
+    fields: Annotated[
+        list[str] | None,
+        Body(description=FIELDS_DESCRIPTION),
+    ] = None,
     user_data: UserData = Depends(security),
+    etag_headers: dict[str, str] = Depends(graph_etag),
 ):
-    task = ExpandNodesTask(
+    task = AsyncExpandNodesTask(
         graph_db=graph_db,
         key=key,
         node_key=node_key,
@@ -65,8 +127,31 @@ def expand(
         max_size=max_size,
         return_commutation_label=return_commutation_label,
         expand_edges=expand_edges,
+        return_children_count=return_children_count,
+        page_size=page_size,
+        sort_by=sort_by,
+        page_token=page_token,
+        fields=fields,
+    )
+    params = {
+        "node_key": node_key,
+        "neighboring_node_keys": sorted(set(neighboring_node_keys)),
+        "max_size": max_size,
+        "return_commutation_label": return_commutation_label,
+        "expand_edges": expand_edges,
+        "return_children_count": return_children_count,
+        "page_size": page_size,
+        "sort_by": sort_by,
+        "page_token": page_token,
+        "fields": fields,
+    }
+    return await try_catch_cached_task_exception_async(
+        task,
+        endpoint="expand",
+        params=params,
+        response_model=NodeEdgeCommutationResponse,
+        headers=etag_headers,
     )
-    return try_catch_task_exception(task)
 
 
 @router.post(
@@ -78,9 +163,16 @@ def collapse(
     key: str,
     node_key: Annotated[str, Body(embed=True)],
     user_data: UserData = Depends(security),
+    etag_headers: dict[str, str] = Depends(graph_etag),
 ):
     task = CollapseNodesTask(graph_db=graph_db, key=key, node_key=node_key)
-    return try_catch_task_exception(task)
+    return try_catch_cached_task_exception(
+        task,
+        endpoint="collapse",
+        params={"node_key": node_key},
+        response_model=CollapseNodeResponse,
+        headers=etag_headers,
+    )
 
 
 @router.post(
@@ -97,7 +189,9 @@ def expand_edge(
     task = ExpandEdgesTask(
         graph_db=graph_db, key=key, node_key_a=node_key_a, node_key_b=node_key_b
     )
-    return try_catch_task_exception(task)
+    return try_catch_trusted_task_exception(
+        task, response_model=NodeEdgeTmoTprmResponse
+    )
 
 
 @router.post(
@@ -105,21 +199,91 @@ def expand_edge(
     response_model=NodeEdgeCommutationResponse,
     response_model_by_alias=False,
 )
-def get_neighbors(
+async def get_neighbors(
     key: str,
     node_key: Annotated[str, Body(embed=True)],
     n: Annotated[int, Body(embed=True, ge=1)],
     with_all_edges: Annotated[bool, Body(embed=True)] = False,
+    fields: Annotated[
+        list[str] | None,
+        Body(description=FIELDS_DESCRIPTION, embed=True),
+    ] = None,
     user_data: UserData = Depends(security),
+    etag_headers: dict[str, str] = Depends(graph_etag),
 ):
-    task = GetNeighborsTask(
+    task = AsyncGetNeighborsTask(
         graph_db=graph_db,
         key=key,
         node_key=node_key,
         n=n,
         with_all_edges=with_all_edges,
+        fields=fields,
+    )
+    return await try_catch_trusted_task_exception_async(
+        task,
+        response_model=NodeEdgeCommutationResponse,
+        headers=etag_headers,
+    )
+
+
+@router.post(
+    "/batch/{key}",
+    response_model=BatchAnalysisResponse,
+    response_model_by_alias=False,
+)
+async def batch(
+    key: str,
+    operations: Annotated[
+        list[BatchOperation],
+        Body(
+            description=(
+                "Operations, run concurrently. "
+                "The results are returned in the order of the operations"
+            ),
+            min_length=1,
+            max_length=MAX_BATCH_OPERATIONS,
+        ),
+    ],
+    max_size: Annotated[
+        int, Body(description="Maximum number of nodes", ge=0)
+    ] = 0,
+    return_commutation_label: Annotated[bool, Body()] = False,
+    expand_edges: Annotated[bool, Body()] = False,
+    return_children_count: Annotated[
+        bool, Body(description="Set children_count of expanded nodes")
+    ] = False,
+    fields: Annotated[
+        list[str] | None,
+        Body(description=FIELDS_DESCRIPTION),
+    ] = None,
+    user_data: UserData = Depends(security),
+    etag_headers: dict[str, str] = Depends(graph_etag),
+):
+    task = BatchAnalysisTask(
+        graph_db=graph_db,
+        key=key,
+        operations=operations,
+        max_size=max_size,
+        return_commutation_label=return_commutation_label,
+        expand_edges=expand_edges,
+        return_children_count=return_children_count,
+        fields=fields,
+    )
+    params = {
+        "operations": [i.model_dump(mode="json") for i in operations],
+        "max_size": max_size,
+        "return_commutation_label": return_commutation_label,
+        "expand_edges": expand_edges,
+        "return_children_count": return_children_count,
+        "fields": fields,
+    }
+    return await try_catch_cached_task_exception_async(
+        task,
+        endpoint="batch",
+        params=params,
+        response_model=BatchAnalysisResponse,
+        headers=etag_headers,
     )
-    return try_catch_task_exception(task)
 
 
 @router.post(
@@ -131,8 +295,132 @@ def edges_between_nodes(
     key: str,
     node_keys: Annotated[list[str], Body()],
     user_data: UserData = Depends(security),
+    etag_headers: dict[str, str] = Depends(graph_etag),
 ):
     task = FindEdgesBetweenNodesTask(
         graph_db=graph_db, key=key, node_keys=node_keys
     )
-    return try_catch_task_exception(task=task)
+    return try_catch_trusted_task_exception(
+        task,
+        response_model=NodeEdgeTmoTprmResponse,
+        headers=etag_headers,
+    )
+
+
+@router.post("/top_level/{key}/stream")
+def get_top_level_stream(
+    key: str,
+    fields: Annotated[
+        list[str] | None,
+        Body(description=FIELDS_DESCRIPTION, embed=True),
+    ] = None,
+    user_data: UserData = Depends(security),
+    etag_headers: dict[str, str] = Depends(graph_etag),
+):
+    """
+    Top level as NDJSON without a size limit. Every line has one item:
+    {"node": ...}, {"edge": ...} or {"tmo": ...}
+    """
+    task = GetTopLevelAnalysisTask(graph_db=graph_db, key=key, fields=fields)
+    return try_catch_task_stream(task, headers=etag_headers)
+
+
+@router.post("/expand/{key}/stream")
+async def expand_stream(
+    key: str,
+    node_key: Annotated[str, Body()],
+    neighboring_node_keys: Annotated[list[str], Body()],
+    return_commutation_label: Annotated[bool, Body()] = False,
+    expand_edges: Annotated[bool, Body()] = False,
+    user_data: UserData = Depends(security),
+    etag_headers: dict[str, str] = Depends(graph_etag),
+):
+    """
+    Children of the node as NDJSON without a size limit. Every line has
+    one item: {"node": ...}, {"commutation": ...}, {"edge": ...} or {"tmo": ...}
+    """
+    task = AsyncExpandNodesTask(
+        graph_db=graph_db,
+        key=key,
+        node_key=node_key,
+        neighboring_node_keys=neighboring_node_keys,
+        return_commutation_label=return_commutation_label,
+        expand_edges=expand_edges,
+    )
+    return await try_catch_task_stream_async(task, headers=etag_headers)
+
+
+@router.post("/neighbors/{key}/stream")
+def get_neighbors_stream(
+    key: str,
+    node_key: Annotated[str, Body(embed=True)],
+    n: Annotated[int, Body(embed=True, ge=1)],
+    with_all_edges: Annotated[bool, Body(embed=True)] = False,
+    user_data: UserData = Depends(security),
+    etag_headers: dict[str, str] = Depends(graph_etag),
+):
+    """
+    Neighbors of the node as NDJSON. Every line has one item:
+    {"node": ...}, {"edge": ...} or {"tmo": ...}
+    """
+    task = GetNeighborsTask(
+        graph_db=graph_db,
+        key=key,
+        node_key=node_key,
+        n=n,
+        with_all_edges=with_all_edges,
+    )
+    return try_catch_task_stream(task, headers=etag_headers)
+
+
+@router.post("/subtree/{key}/count", response_model=SubtreeCountResponse)
+def get_subtree_count(
+    key: str,
+    node_key: Annotated[str, Body(embed=True)],
+    tmo_ids: Annotated[
+        list[int] | None,
+        Body(description=TMO_IDS_DESCRIPTION, embed=True),
+    ] = None,
+    user_data: UserData = Depends(security),
+    etag_headers: dict[str, str] = Depends(graph_etag),
+):
+    """Number of the nodes below the node, at any depth"""
+    task = SubtreeTask(
+        graph_db=graph_db, key=key, node_key=node_key, tmo_ids=tmo_ids
+    )
+    return try_catch_cached_task_exception(
+        task,
+        endpoint="subtree_count",
+        params={"node_key": node_key, "tmo_ids": tmo_ids},
+        response_model=SubtreeCountResponse,
+        headers=etag_headers,
+    )
+
+
+@router.post("/subtree/{key}/stream")
+def get_subtree_stream(
+    key: str,
+    node_key: Annotated[str, Body(embed=True)],
+    tmo_ids: Annotated[
+        list[int] | None,
+        Body(description=TMO_IDS_DESCRIPTION, embed=True),
+    ] = None,
+    fields: Annotated[
+        list[str] | None,
+        Body(description=FIELDS_DESCRIPTION, embed=True),
+    ] = None,
+    user_data: UserData = Depends(security),
+    etag_headers: dict[str, str] = Depends(graph_etag),
+):
+    """
+    Nodes below the node, at any depth, as NDJSON without a size limit.
+    Every line has one item: {"node": ...}
+    """
+    task = SubtreeTask(
+        graph_db=graph_db,
+        key=key,
+        node_key=node_key,
+        tmo_ids=tmo_ids,
+        fields=fields,
+    )
+    return try_catch_task_stream(task, headers=etag_headers)
@@ -3,11 +3,7 @@ import traceback
 
 from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status
 
-from services.instances import (
-    build_graph_in_new_process,
-    create_db_connection_instance,
-    inventory,
-)
+from services.instances import build_graph_in_new_process, graph_db, inventory
 from services.security.security_data_models import UserData
 from services.security.security_factory import security
 from task.building_tasks import RunBuildingTask
@@ -22,7 +18,6 @@ def build(
     background: BackgroundTasks,
     user_data: UserData = Depends(security),
 ):
-    graph_db = create_db_connection_instance()
     task = RunBuildingTask(graph_db=graph_db, inventory=inventory, key=key)
     try:
         task.check()
@@ -0,0 +1,86 @@
+from fastapi import APIRouter, Depends
+
+from routers.helpers.check_admin import admin_security
+from routers.helpers.try_catch_task_exception import try_catch_task_exception
+from services.aql import query_stats, slow_query_log
+from services.graph import arango_clients
+from services.instances import graph_db
+from services.response_cache import response_cache
+from services.security.security_data_models import UserData
+from task.index_tasks import EnsureIndexesTask, IndexUsageTask
+from task.models.outgoing_data import (
+    ConnectionPoolStatsResponse,
+    HotQueryIndexesResponse,
+    IndexMigrationResponse,
+    QueryStatsResponse,
+    ResponseCacheStatsResponse,
+    SlowQueryResponse,
+)
+
+router = APIRouter(prefix="/diagnostics", tags=["diagnostics"])
+
+
+@router.get("/pool", response_model=list[ConnectionPoolStatsResponse])
+def get_connection_pool_stats(user_data: UserData = Depends(admin_security)):
+    """
+    Usage of the ArangoDB connection pools of the worker process
+    which handled the request
+    """
+    return arango_clients.pool_stats()
+
+
+@router.post("/indexes", response_model=list[IndexMigrationResponse])
+def ensure_indexes(
+    key: str | None = None, user_data: UserData = Depends(admin_security)
+):
+    """
+    Creates missing registry indexes in the database of the graph
+    or of every graph if the key is not set
+    """
+    task = EnsureIndexesTask(graph_db=graph_db, key=key)
+    return try_catch_task_exception(task)
+
+
+@router.get("/indexes/{key}", response_model=list[HotQueryIndexesResponse])
+def get_index_usage(key: str, user_data: UserData = Depends(admin_security)):
+    """Indexes chosen by the optimizer for each hot query of the graph"""
+    task = IndexUsageTask(graph_db=graph_db, key=key)
+    return try_catch_task_exception(task)
+
+
+@router.get("/queries", response_model=list[QueryStatsResponse])
+def get_query_stats(user_data: UserData = Depends(admin_security)):
+    """
+    Latency, rows and warnings of AQL queries executed by the worker process
+    which handled the request, the most expensive first. Registered queries
+    are reported by name, other queries by the function which ran them
+    """
+    return query_stats.as_list()
+
+
+@router.delete("/queries")
+def reset_query_stats(user_data: UserData = Depends(admin_security)):
+    """Resets query statistics and the slow query log of the worker process"""
+    query_stats.reset()
+    slow_query_log.clear()
+
+
+@router.get("/queries/slow", response_model=list[SlowQueryResponse])
+def get_slow_queries(user_data: UserData = Depends(admin_security)):
+    """
+    Queries of the worker process which took longer than
+    AQL_SLOW_QUERY_THRESHOLD, the latest first, with their execution plans
+    """
+    return slow_query_log.as_list()
+
+
+@router.get("/response_cache", response_model=ResponseCacheStatsResponse)
+def get_response_cache_stats(user_data: UserData = Depends(admin_security)):
+    """Usage of the response cache of the worker process"""
+    return response_cache.stats()
+
+
+@router.delete("/response_cache")
+def clear_response_cache(user_data: UserData = Depends(admin_security)):
+    """Drops the responses kept in memory by the worker process"""
+    response_cache.clear()
@@ -0,0 +1,17 @@
+from fastapi import Depends, HTTPException
+from starlette.status import HTTP_403_FORBIDDEN
+
+from services.security.security_data_models import (
+    UserData,
+    UserPermissionBuilder,
+)
+from services.security.security_factory import security
+
+
+def admin_security(user_data: UserData = Depends(security)) -> UserData:
+    permissions = UserPermissionBuilder(user_data).get_user_permissions()
+    if not permissions.is_admin:
+        raise HTTPException(
+            status_code=HTTP_403_FORBIDDEN, detail="Admin role required"
+        )
+    return user_data
@@ -0,0 +1,64 @@
+import json
+
+from fastapi import Depends, HTTPException, Request, Response
+from starlette.status import HTTP_304_NOT_MODIFIED
+
+from services.instances import graph_db
+from services.response_cache import get_cache_key
+from services.security.security_data_models import UserData
+from services.security.security_factory import security
+from task.helpers.graph_snapshot import get_graph_revision_async
+
+
+def _etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    for value in if_none_match.split(","):
+        value = value.strip()
+        if value == "*" or value.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+async def _get_request_params(request: Request) -> dict:
+    """Query and body of the request, which select the representation"""
+    body = await request.body()
+    try:
+        body = json.loads(body) if body else None
+    except ValueError:
+        body = body.decode(errors="replace")
+    return {"query": sorted(request.query_params.multi_items()), "body": body}
+
+
+async def graph_etag(
+    key: str,
+    request: Request,
+    response: Response,
+    user_data: UserData = Depends(security),
+) -> dict[str, str]:
+    """
+    Answers with 304 if the client has the response for the current
+    revision of the graph and the same request parameters. Otherwise
+    returns the headers of the response, which are already set for routes
+    returning data
+    """
+    revision = await get_graph_revision_async(
+        sys_db=graph_db.async_sys_db, key=key
+    )
+    if revision is None:
+        # The task reports the missing graph
+        return {}
+    # Responses of POST routes depend on the body: the tag of another
+    # node, page or projection must not match
+    params_hash = get_cache_key(
+        key=key,
+        endpoint=request.url.path,
+        params=await _get_request_params(request),
+        revision=revision,
+    )
+    etag = f'"{key}-{revision}-{params_hash[:16]}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if _etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+        raise HTTPException(status_code=HTTP_304_NOT_MODIFIED, headers=headers)
+    response.headers.update(headers)
+    return headers
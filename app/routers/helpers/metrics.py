@@ -0,0 +1,75 @@
+import time
+
+from anyio import to_thread
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from services.metrics import (
+    CONTENT_TYPE,
+    HTTP_REQUEST_DURATION,
+    HTTP_REQUESTS_IN_PROGRESS,
+    THREADPOOL_BORROWED_TOKENS,
+    THREADPOOL_TOKENS,
+    THREADPOOL_WAITING_TASKS,
+    metrics,
+)
+
+UNMATCHED_ROUTE = "unmatched"
+
+
+def _get_route(scope: Scope) -> str:
+    """
+    Route template, e.g. /v1/analysis/expand/{key}, so that the labels
+    do not grow with every key. The mount prefix is kept
+    """
+    route = scope.get("route")
+    if route is None:
+        return UNMATCHED_ROUTE
+    mount_path = scope.get("root_path", "")[
+        len(scope.get("app_root_path", "")) :
+    ]
+    return f"{mount_path}{route.path}"
+
+
+class MetricsMiddleware:
+    """Latency and number of HTTP requests being handled"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        method = scope["method"]
+        status_code = 500
+
+        async def send_wrapper(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        start_time = time.perf_counter()
+        try:
+            with HTTP_REQUESTS_IN_PROGRESS.track_in_progress(method=method):
+                await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_REQUEST_DURATION.observe(
+                time.perf_counter() - start_time,
+                method=method,
+                route=_get_route(scope),
+                status=status_code,
+            )
+
+
+async def get_metrics(request: Request) -> Response:
+    """Metrics of the worker process in the Prometheus text format"""
+    # Read in the event loop, the limiter belongs to it
+    limiter = to_thread.current_default_thread_limiter()
+    statistics = limiter.statistics()
+    THREADPOOL_TOKENS.set(statistics.total_tokens)
+    THREADPOOL_BORROWED_TOKENS.set(statistics.borrowed_tokens)
+    THREADPOOL_WAITING_TASKS.set(statistics.tasks_waiting)
+    return Response(content=metrics.render(), media_type=CONTENT_TYPE)
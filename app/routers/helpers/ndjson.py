@@ -0,0 +1,62 @@
+import json
+from sys import stderr
+import traceback
+from typing import AsyncIterable, AsyncIterator, Iterable, Iterator
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+# Lines are sent in chunks of about this size, bytes
+NDJSON_CHUNK_SIZE = 64 * 1024
+
+
+def _encode_line(line: dict) -> bytes:
+    return (
+        json.dumps(line, ensure_ascii=False, separators=(",", ":")).encode()
+        + b"\n"
+    )
+
+
+def _encode_error(e: Exception) -> bytes:
+    # The status code is already sent, the client gets the error as a line
+    print(traceback.format_exc(), file=stderr)
+    return json.dumps({"error": str(e)}, separators=(",", ":")).encode() + b"\n"
+
+
+def encode_ndjson(
+    lines: Iterable[dict], chunk_size: int = NDJSON_CHUNK_SIZE
+) -> Iterator[bytes]:
+    """
+    Encodes lines as newline delimited JSON. The first line is sent
+    immediately, the following ones are grouped into chunks
+    """
+    chunk = bytearray()
+    first = True
+    try:
+        for line in lines:
+            chunk += _encode_line(line)
+            if first or len(chunk) >= chunk_size:
+                first = False
+                yield bytes(chunk)
+                chunk.clear()
+    except Exception as e:
+        chunk += _encode_error(e)
+    if chunk:
+        yield bytes(chunk)
+
+
+async def encode_ndjson_async(
+    lines: AsyncIterable[dict], chunk_size: int = NDJSON_CHUNK_SIZE
+) -> AsyncIterator[bytes]:
+    """encode_ndjson for lines of async tasks"""
+    chunk = bytearray()
+    first = True
+    try:
+        async for line in lines:
+            chunk += _encode_line(line)
+            if first or len(chunk) >= chunk_size:
+                first = False
+                yield bytes(chunk)
+                chunk.clear()
+    except Exception as e:
+        chunk += _encode_error(e)
+    if chunk:
+        yield bytes(chunk)
@@ -0,0 +1,26 @@
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from services.tracing import format_server_timing, tracer
+
+
+class ServerTimingMiddleware:
+    """Adds the spans of the tasks run by the request as Server-Timing"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        with tracer.collect_request_spans() as spans:
+
+            async def send_wrapper(message: Message):
+                # A streamed response starts before its task is finished
+                if message["type"] == "http.response.start" and spans:
+                    headers = MutableHeaders(scope=message)
+                    headers.append("Server-Timing", format_server_timing(spans))
+                await send(message)
+
+            await self.app(scope, receive, send_wrapper)
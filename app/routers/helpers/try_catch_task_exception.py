@@ -1,20 +1,33 @@
+from contextlib import contextmanager
 from sys import stderr
 import traceback
 
-from fastapi import HTTPException
+from arango.exceptions import ArangoServerError
+from fastapi import HTTPException, Response
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
 from starlette.status import (
     HTTP_404_NOT_FOUND,
     HTTP_408_REQUEST_TIMEOUT,
     HTTP_409_CONFLICT,
 )
 
+from routers.helpers.ndjson import (
+    NDJSON_MEDIA_TYPE,
+    encode_ndjson,
+    encode_ndjson_async,
+)
+from services.graph import HANDLE_NOT_FOUND_ERROR_CODES, handle_cache
+from services.metrics import task_scope
+from services.response_cache import response_cache, serialize_response
+from services.tracing import tracer
 from task.models.errors import NotFound, TimeOutError, ValidationError
 
 
-def try_catch_task_exception(task):
+@contextmanager
+def _map_task_exceptions():
     try:
-        task.check()
-        return task.execute()
+        yield
     except NotFound as e:
         print(traceback.format_exc(), file=stderr)
         raise HTTPException(status_code=HTTP_404_NOT_FOUND, detail=str(e))
@@ -24,3 +37,139 @@ def try_catch_task_exception(task):
     except ValidationError as e:
         print(traceback.format_exc(), file=stderr)
         raise HTTPException(status_code=HTTP_409_CONFLICT, detail=str(e))
+    except ArangoServerError as e:
+        if e.error_code not in HANDLE_NOT_FOUND_ERROR_CODES:
+            raise
+        # A cached database or collection was dropped outside of this process
+        print(traceback.format_exc(), file=stderr)
+        handle_cache.invalidate()
+        raise HTTPException(status_code=HTTP_404_NOT_FOUND, detail=str(e))
+
+
+@contextmanager
+def _observe_task(task):
+    """Labels the queries of the task in metrics and opens its root span"""
+    with task_scope(task), tracer.root_span(type(task).__name__):
+        yield
+
+
+def try_catch_task_exception(task):
+    with _map_task_exceptions(), _observe_task(task):
+        task.check()
+        return task.execute()
+
+
+async def try_catch_task_exception_async(task):
+    with _map_task_exceptions(), _observe_task(task):
+        await task.load()
+        await task.check()
+        return await task.execute()
+
+
+def try_catch_trusted_task_exception(
+    task,
+    response_model: type[BaseModel],
+    headers: dict[str, str] | None = None,
+):
+    """
+    Serializes the task result in one pass. FastAPI would dump it and
+    validate it against the response model once more before serializing
+    """
+    with _map_task_exceptions(), _observe_task(task):
+        task.check()
+        body = serialize_response(task.execute(), response_model)
+    return Response(
+        content=body, media_type="application/json", headers=headers
+    )
+
+
+async def try_catch_trusted_task_exception_async(
+    task,
+    response_model: type[BaseModel],
+    headers: dict[str, str] | None = None,
+):
+    with _map_task_exceptions(), _observe_task(task):
+        await task.load()
+        await task.check()
+        body = serialize_response(await task.execute(), response_model)
+    return Response(
+        content=body, media_type="application/json", headers=headers
+    )
+
+
+def try_catch_cached_task_exception(
+    task,
+    endpoint: str,
+    params: dict,
+    response_model: type[BaseModel],
+    headers: dict[str, str] | None = None,
+):
+    """
+    Returns the cached response for the current revision of the graph,
+    otherwise runs the task and caches its serialized result
+    """
+    if not response_cache.enabled:
+        return try_catch_task_exception(task)
+    with _map_task_exceptions(), _observe_task(task):
+        revision = task.document.revision
+        cache_params = dict(key=task.key, endpoint=endpoint, params=params)
+        body = response_cache.get(revision=revision, **cache_params)
+        if body is None:
+            task.check()
+            body = serialize_response(task.execute(), response_model)
+            response_cache.set(revision=revision, body=body, **cache_params)
+    return Response(
+        content=body, media_type="application/json", headers=headers
+    )
+
+
+async def try_catch_cached_task_exception_async(
+    task,
+    endpoint: str,
+    params: dict,
+    response_model: type[BaseModel],
+    headers: dict[str, str] | None = None,
+):
+    if not response_cache.enabled:
+        return await try_catch_task_exception_async(task)
+    with _map_task_exceptions(), _observe_task(task):
+        await task.load()
+        revision = task.document.revision
+        cache_params = dict(key=task.key, endpoint=endpoint, params=params)
+        body = response_cache.get(revision=revision, **cache_params)
+        if body is None:
+            await task.check()
+            body = serialize_response(await task.execute(), response_model)
+            response_cache.set(revision=revision, body=body, **cache_params)
+    return Response(
+        content=body, media_type="application/json", headers=headers
+    )
+
+
+def try_catch_task_stream(
+    task, headers: dict[str, str] | None = None
+) -> StreamingResponse:
+    """
+    Checks the task and streams the lines of task.stream() as NDJSON.
+    Errors after the first chunk are sent as an {"error": ...} line
+    """
+    with _map_task_exceptions(), _observe_task(task):
+        task.check()
+    return StreamingResponse(
+        encode_ndjson(task.stream()),
+        media_type=NDJSON_MEDIA_TYPE,
+        headers=headers,
+    )
+
+
+async def try_catch_task_stream_async(
+    task, headers: dict[str, str] | None = None
+) -> StreamingResponse:
+    with _map_task_exceptions(), _observe_task(task):
+        await task.load()
+        await task.check()
+    return StreamingResponse(
+        encode_ndjson_async(task.stream()),
+        media_type=NDJSON_MEDIA_TYPE,
+        headers=headers,
+    )
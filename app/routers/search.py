@@ -2,14 +2,18 @@ from typing import Annotated
 
 from fastapi import APIRouter, Depends, Query
 
-from routers.helpers.try_catch_task_exception import try_catch_task_exception
+from routers.helpers.graph_etag import graph_etag
+from routers.helpers.try_catch_task_exception import (
+    try_catch_task_exception,
+    try_catch_task_exception_async,
+)
 from services.instances import graph_db, inventory
 from services.security.security_data_models import UserData
 from services.security.security_factory import security
 from task.find_nodes_by_mo_id import FindNodesByMoId
 from task.models.outgoing_data import MoNodeResponse, NodeTmoResponse
 from task.models.trace_models import NodesByMoIdResponseItem
-from task.search_tasks import FindInGraphTask, GetBreadcrumbsTask
+from task.search_tasks import AsyncFindInGraphTask, GetBreadcrumbsTask
 
 router = APIRouter(prefix="/search", tags=["search"])
 
@@ -23,6 +27,7 @@ def get_hierarchy(
     key: str,
     node_key: Annotated[str, Query()],
     user_data: UserData = Depends(security),
+    etag_headers: dict[str, str] = Depends(graph_etag),
 ) -> list[MoNodeResponse]:
     task = GetBreadcrumbsTask(graph_db=graph_db, key=key, node_key=node_key)
     return try_catch_task_exception(task)
@@ -33,13 +38,14 @@ def get_hierarchy(
     response_model=NodeTmoResponse,
     response_model_by_alias=False,
 )
-def search_by_value(
+async def search_by_value(
     key: str,
     query: Annotated[str, Query(min_length=3, max_length=36)],
     user_data: UserData = Depends(security),
+    etag_headers: dict[str, str] = Depends(graph_etag),
 ) -> NodeTmoResponse:
-    task = FindInGraphTask(graph_db=graph_db, key=key, find_value=query)
-    return try_catch_task_exception(task)
+    task = AsyncFindInGraphTask(graph_db=graph_db, key=key, find_value=query)
+    return await try_catch_task_exception_async(task)
 
 
 @router.get(
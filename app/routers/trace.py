@@ -2,7 +2,12 @@ from typing import Annotated
 
 from fastapi import APIRouter, Body, Depends
 
-from routers.helpers.try_catch_task_exception import try_catch_task_exception
+from routers.helpers.graph_etag import graph_etag
+from routers.helpers.try_catch_task_exception import (
+    try_catch_task_exception,
+    try_catch_task_exception_async,
+    try_catch_task_stream,
+)
 from services.instances import graph_db, inventory
 from services.security.security_data_models import UserData
 from services.security.security_factory import security
@@ -18,7 +23,12 @@ from task.models.outgoing_data import (
 )
 from task.models.trace_models import NodesByMoIdResponseItem
 from task.trace_levels_task import TrackingType
-from task.trace_tasks import FindCommonPath, GetAllPathsForNodeTask, GetPathTask
+from task.trace_tasks import (
+    AsyncGetPathTask,
+    FindCommonPath,
+    GetAllPathsForNodeTask,
+    GetPathTask,
+)
 
 router = APIRouter(prefix="/trace", tags=["trace"])
 
@@ -32,6 +42,7 @@ def get_all_paths_for_node(
     key: str,
     node_key: Annotated[str, Body(embed=True)],
     user_data: UserData = Depends(security),
+    etag_headers: dict[str, str] = Depends(graph_etag),
 ):
     task = GetAllPathsForNodeTask(key=key, node_key=node_key, graph_db=graph_db)
     return try_catch_task_exception(task)
@@ -42,19 +53,50 @@ def get_all_paths_for_node(
     response_model=NodeEdgeResponse,
     response_model_by_alias=False,
 )
-def get_path(
+async def get_path(
     key: str,
     trace_node_key: Annotated[str, Body(embed=True)],
     squash_level: Annotated[TrackingType, Body(embed=True)],
+    fields: Annotated[
+        list[str] | None,
+        Body(
+            description="Attributes of the node data to return, "
+            "the whole node data when not set",
+            embed=True,
+        ),
+    ] = None,
     user_data: UserData = Depends(security),
+    etag_headers: dict[str, str] = Depends(graph_etag),
 ):
+    task = AsyncGetPathTask(
+        graph_db=graph_db,
+        key=key,
+        trace_node_key=trace_node_key,
+        level=squash_level,
+        fields=fields,
+    )
+    return await try_catch_task_exception_async(task)
+
+
+@router.post("/path/{key}/stream")
+def get_path_stream(
+    key: str,
+    trace_node_key: Annotated[str, Body(embed=True)],
+    squash_level: Annotated[TrackingType, Body(embed=True)],
+    user_data: UserData = Depends(security),
+    etag_headers: dict[str, str] = Depends(graph_etag),
+):
+    """
+    Path as NDJSON. Every line has one item:
+    {"node": ...}, {"edge": ...} or {"tmo": ...}
+    """
     task = GetPathTask(
         graph_db=graph_db,
         key=key,
         trace_node_key=trace_node_key,
         level=squash_level,
     )
-    return try_catch_task_exception(task)
+    return try_catch_task_stream(task, headers=etag_headers)
 
 
 @router.post(
@@ -98,6 +140,7 @@ def get_path_between_nodes(
         TrackingType, Body(embed=True)
     ] = TrackingType.LOCAL,
     user_data: UserData = Depends(security),
+    etag_headers: dict[str, str] = Depends(graph_etag),
 ):
     task = FindPathBetweenNodesTask(
         graph_db=graph_db,
@@ -120,6 +163,7 @@ def find_common_path(
     trace_node_b_key: Annotated[str, Body(embed=True)],
     squash_level: Annotated[TrackingType, Body(embed=True)],
     user_data: UserData = Depends(security),
+    etag_headers: dict[str, str] = Depends(graph_etag),
 ):
     task = FindCommonPath(
         graph_db=graph_db,
@@ -0,0 +1,640 @@
+from collections import deque
+from datetime import datetime, timezone
+import os
+import re
+import sys
+from threading import Lock
+import time
+from typing import Any, AsyncIterator, Coroutine, Iterator
+
+from arango.cursor import Cursor
+from arango.database import StandardDatabase, TransactionDatabase
+from arango.exceptions import ArangoError
+from pydantic import BaseModel, model_validator
+
+from config import AqlConfig
+from services.async_graph import AsyncDatabase
+from services.metrics import current_task, observe_query
+from services.tracing import Span, get_bind_var_sizes, tracer
+
+BIND_VAR_PATTERN = re.compile(r"@@?([A-Za-z_][A-Za-z0-9_]*)")
+# Queries with these operations are never re-executed for profiling
+WRITE_OPERATION_PATTERN = re.compile(
+    r"\b(INSERT|UPDATE|REPLACE|REMOVE|UPSERT)\b", re.IGNORECASE
+)
+
+
+def get_bind_var_names(query: str) -> frozenset[str]:
+    """Names of bind parameters as they are passed in bind_vars"""
+    return frozenset(
+        match.group(0)[1:] for match in BIND_VAR_PATTERN.finditer(query)
+    )
+
+
+class NamedQuery(BaseModel, frozen=True):
+    """
+    AQL query with a stable name and the bind parameters it expects.
+    bind_vars is derived from the query text if it is not set
+    """
+
+    name: str
+    query: str
+    bind_vars: frozenset[str] | None = None
+
+    @model_validator(mode="after")
+    def check_bind_vars(self):
+        found = get_bind_var_names(self.query)
+        if self.bind_vars is None:
+            object.__setattr__(self, "bind_vars", found)
+        elif self.bind_vars != found:
+            raise ValueError(
+                f"Bind parameters of query {self.name} do not match its text: "
+                f"declared {sorted(self.bind_vars)}, found {sorted(found)}"
+            )
+        return self
+
+    @property
+    def read_only(self) -> bool:
+        return WRITE_OPERATION_PATTERN.search(self.query) is None
+
+    def check_binds(self, bind_vars: dict | None):
+        passed = set(bind_vars or {})
+        if passed != self.bind_vars:
+            missing = sorted(self.bind_vars - passed)
+            unexpected = sorted(passed - self.bind_vars)
+            raise ValueError(
+                f"Incorrect bind parameters of query {self.name}: "
+                f"{missing=}, {unexpected=}"
+            )
+
+
+class QueryRegistry:
+    """All named queries of the service"""
+
+    def __init__(self):
+        self._lock = Lock()
+        self._queries: dict[str, NamedQuery] = {}
+
+    def register(self, name: str, query: str) -> NamedQuery:
+        named_query = NamedQuery(name=name, query=query)
+        with self._lock:
+            registered = self._queries.get(name)
+            if registered is not None and registered.query != query:
+                raise ValueError(f"Query {name} is already registered")
+            self._queries[name] = named_query
+        return named_query
+
+    def get(self, name: str) -> NamedQuery | None:
+        with self._lock:
+            return self._queries.get(name)
+
+    def all(self) -> list[NamedQuery]:
+        with self._lock:
+            return list(self._queries.values())
+
+
+query_registry = QueryRegistry()
+
+
+def register_query(name: str, query: str) -> NamedQuery:
+    return query_registry.register(name=name, query=query)
+
+
+class QueryStats:
+    def __init__(self, name: str):
+        self.name = name
+        self.calls = 0
+        self.errors = 0
+        self.rows = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+        self.slow_calls = 0
+        self.warnings = 0
+        self.last_warnings: list[dict] = []
+
+    def as_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "registered": query_registry.get(self.name) is not None,
+            "calls": self.calls,
+            "errors": self.errors,
+            "rows": self.rows,
+            "total_time": self.total_time,
+            "avg_time": self.total_time / self.calls if self.calls else 0.0,
+            "max_time": self.max_time,
+            "slow_calls": self.slow_calls,
+            "warnings": self.warnings,
+            "last_warnings": self.last_warnings,
+        }
+
+
+class QueryStatsRegistry:
+    """Per query name latency, rows and warnings of the worker process"""
+
+    def __init__(self):
+        self._lock = Lock()
+        self._stats: dict[str, QueryStats] = {}
+        self._pid = os.getpid()
+
+    def _get(self, name: str) -> QueryStats:
+        # Counters inherited from the parent process are not ours
+        if self._pid != os.getpid():
+            self._stats.clear()
+            self._pid = os.getpid()
+        if name not in self._stats:
+            self._stats[name] = QueryStats(name)
+        return self._stats[name]
+
+    def record(
+        self,
+        name: str,
+        elapsed: float,
+        rows: int,
+        warnings: list[dict] | None = None,
+        slow: bool = False,
+    ):
+        with self._lock:
+            stats = self._get(name)
+            stats.calls += 1
+            stats.rows += rows
+            stats.total_time += elapsed
+            stats.max_time = max(stats.max_time, elapsed)
+            if slow:
+                stats.slow_calls += 1
+            if warnings:
+                stats.warnings += len(warnings)
+                stats.last_warnings = list(warnings)
+
+    def record_error(self, name: str):
+        with self._lock:
+            self._get(name).errors += 1
+
+    def as_list(self) -> list[dict]:
+        with self._lock:
+            for named_query in query_registry.all():
+                self._get(named_query.name)
+            stats = sorted(
+                self._stats.values(), key=lambda i: i.total_time, reverse=True
+            )
+            return [i.as_dict() for i in stats]
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+
+query_stats = QueryStatsRegistry()
+
+
+class SlowQueryLog:
+    """Last slow queries of the worker process with their plans"""
+
+    def __init__(self):
+        self._lock = Lock()
+        self._entries: deque[dict] = deque(
+            maxlen=AqlConfig().slow_query_log_size
+        )
+
+    def add(self, entry: dict):
+        with self._lock:
+            self._entries.append(entry)
+
+    def as_list(self) -> list[dict]:
+        with self._lock:
+            return list(reversed(self._entries))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+slow_query_log = SlowQueryLog()
+
+
+def _get_caller_name() -> str:
+    # Two frames up: the caller of execute_query
+    frame = sys._getframe(2)
+    return f"{frame.f_globals.get('__name__')}.{frame.f_code.co_qualname}"
+
+
+def _is_slow(elapsed: float) -> bool:
+    threshold = AqlConfig().slow_query_threshold
+    return 0 < threshold <= elapsed
+
+
+def _create_slow_query_entry(
+    name: str,
+    query: str,
+    bind_vars: dict | None,
+    elapsed: float,
+    rows: int,
+    warnings: list[dict] | None,
+) -> dict:
+    return {
+        "name": name,
+        "query": query,
+        "bind_vars": bind_vars or {},
+        "elapsed": elapsed,
+        "rows": rows,
+        "warnings": list(warnings or []),
+        "timestamp": datetime.now(timezone.utc),
+        "plan": None,
+        "profile": None,
+        "error": None,
+    }
+
+
+def _should_profile(query: str) -> bool:
+    return (
+        AqlConfig().slow_query_profile
+        and WRITE_OPERATION_PATTERN.search(query) is None
+    )
+
+
+def _capture_slow_query(
+    database: StandardDatabase | TransactionDatabase,
+    name: str,
+    query: str,
+    bind_vars: dict | None,
+    elapsed: float,
+    rows: int,
+    warnings: list[dict] | None,
+):
+    entry = _create_slow_query_entry(
+        name=name,
+        query=query,
+        bind_vars=bind_vars,
+        elapsed=elapsed,
+        rows=rows,
+        warnings=warnings,
+    )
+    try:
+        entry["plan"] = database.aql.explain(query=query, bind_vars=bind_vars)
+        if _should_profile(query):
+            cursor = database.aql.execute(
+                query=query, bind_vars=bind_vars, profile=2
+            )
+            entry["profile"] = {
+                "profile": cursor.profile(),
+                "statistics": cursor.statistics(),
+            }
+            cursor.close(ignore_missing=True)
+    except Exception as e:
+        # Diagnostics must never fail the query which is being measured
+        entry["error"] = str(e)
+    slow_query_log.add(entry)
+
+
+def _iterate(
+    cursor: Cursor,
+    database: StandardDatabase | TransactionDatabase,
+    name: str,
+    query: str,
+    bind_vars: dict | None,
+    elapsed: float,
+    task: str,
+    span: Span | None,
+) -> Iterator[Any]:
+    """
+    elapsed: seconds of the first batch. Only batch fetches are added,
+    the time the consumer spends between items is not a part of the query.
+    Statistics are recorded as soon as the last item is taken
+    """
+    rows = 0
+    finished = False
+
+    def finish(error: ArangoError | None = None):
+        nonlocal finished
+        finished = True
+        # The consumer stopped early, release the server side cursor
+        if cursor.has_more():
+            cursor.close(ignore_missing=True)
+        warnings = cursor.warnings()
+        slow = _is_slow(elapsed)
+        query_stats.record(
+            name=name, elapsed=elapsed, rows=rows, warnings=warnings, slow=slow
+        )
+        observe_query(task=task, name=name, elapsed=None if error else elapsed)
+        if span is not None:
+            span.finish(error=error, duration=elapsed, rows=rows)
+        if slow:
+            _capture_slow_query(
+                database=database,
+                name=name,
+                query=query,
+                bind_vars=bind_vars,
+                elapsed=elapsed,
+                rows=rows,
+                warnings=warnings,
+            )
+
+    try:
+        while True:
+            if cursor.empty():
+                if not cursor.has_more():
+                    break
+                fetch_start = time.perf_counter()
+                cursor.fetch()
+                elapsed += time.perf_counter() - fetch_start
+                continue
+            item = cursor.pop()
+            rows += 1
+            if cursor.empty() and not cursor.has_more():
+                finish()
+            yield item
+    except ArangoError as e:
+        query_stats.record_error(name)
+        if not finished:
+            finish(error=e)
+        raise
+    finally:
+        if not finished:
+            finish()
+
+
+def execute_query(
+    database: StandardDatabase | TransactionDatabase,
+    query: str | NamedQuery,
+    bind_vars: dict | None = None,
+    stream: bool = False,
+    batch_size: int | None = None,
+    ttl: int | None = None,
+    max_runtime: float | None = None,
+) -> Iterator[Any]:
+    """
+    Executes the query immediately and yields documents lazily, fetching
+    them from the server batch by batch.
+
+    query: a registered NamedQuery or a query text. Statistics of a query
+        text are collected under the name of the calling function
+    stream: the server produces results on demand instead of computing the
+        whole result before the first batch. Not suitable for queries which
+        have to see a consistent state while the consumer writes
+    batch_size, ttl, max_runtime: default to AqlConfig
+    """
+    if isinstance(query, NamedQuery):
+        query.check_binds(bind_vars)
+        name, query = query.name, query.query
+    else:
+        name = _get_caller_name()
+    # The generator may be consumed outside of the task scope
+    task = current_task.get()
+    span = tracer.start_span(
+        f"aql.{name}", query=name, bind_sizes=get_bind_var_sizes(bind_vars)
+    )
+    config = AqlConfig()
+    max_runtime = config.max_runtime if max_runtime is None else max_runtime
+    start_time = time.perf_counter()
+    try:
+        cursor = database.aql.execute(
+            query=query,
+            bind_vars=bind_vars,
+            stream=stream,
+            batch_size=batch_size or config.batch_size,
+            ttl=ttl or config.ttl,
+            max_runtime=max_runtime or None,
+        )
+    except ArangoError as e:
+        query_stats.record_error(name)
+        observe_query(task=task, name=name, elapsed=None)
+        if span is not None:
+            span.finish(error=e)
+        raise
+    return _iterate(
+        cursor=cursor,
+        database=database,
+        name=name,
+        query=query,
+        bind_vars=bind_vars,
+        elapsed=time.perf_counter() - start_time,
+        task=task,
+        span=span,
+    )
+
+
+async def _capture_slow_query_async(
+    database: AsyncDatabase,
+    name: str,
+    query: str,
+    bind_vars: dict | None,
+    elapsed: float,
+    rows: int,
+    warnings: list[dict] | None,
+):
+    entry = _create_slow_query_entry(
+        name=name,
+        query=query,
+        bind_vars=bind_vars,
+        elapsed=elapsed,
+        rows=rows,
+        warnings=warnings,
+    )
+    try:
+        entry["plan"] = await database.explain(query=query, bind_vars=bind_vars)
+        if _should_profile(query):
+            _, extra = await database.execute(
+                query=query, bind_vars=bind_vars, profile=2
+            )
+            entry["profile"] = {
+                "profile": extra.get("profile"),
+                "statistics": extra.get("stats"),
+            }
+    except Exception as e:
+        # Diagnostics must never fail the query which is being measured
+        entry["error"] = str(e)
+    slow_query_log.add(entry)
+
+
+async def _execute_query_async(
+    database: AsyncDatabase,
+    name: str,
+    query: str,
+    bind_vars: dict | None,
+    stream: bool,
+    batch_size: int | None,
+    ttl: int | None,
+    max_runtime: float | None,
+) -> list[Any]:
+    config = AqlConfig()
+    max_runtime = config.max_runtime if max_runtime is None else max_runtime
+    start_time = time.perf_counter()
+    span_attributes = dict(query=name, bind_sizes=get_bind_var_sizes(bind_vars))
+    with tracer.span(f"aql.{name}", **span_attributes) as span:
+        try:
+            rows, extra = await database.execute(
+                query=query,
+                bind_vars=bind_vars,
+                stream=stream,
+                batch_size=batch_size or config.batch_size,
+                ttl=ttl or config.ttl,
+                max_runtime=max_runtime or None,
+            )
+        except ArangoError:
+            query_stats.record_error(name)
+            observe_query(task=current_task.get(), name=name, elapsed=None)
+            raise
+        if span is not None:
+            span.attributes["rows"] = len(rows)
+    elapsed = time.perf_counter() - start_time
+    warnings = extra.get("warnings")
+    slow = _is_slow(elapsed)
+    query_stats.record(
+        name=name, elapsed=elapsed, rows=len(rows), warnings=warnings, slow=slow
+    )
+    observe_query(task=current_task.get(), name=name, elapsed=elapsed)
+    if slow:
+        await _capture_slow_query_async(
+            database=database,
+            name=name,
+            query=query,
+            bind_vars=bind_vars,
+            elapsed=elapsed,
+            rows=len(rows),
+            warnings=warnings,
+        )
+    return rows
+
+
+def execute_query_async(
+    database: AsyncDatabase,
+    query: str | NamedQuery,
+    bind_vars: dict | None = None,
+    stream: bool = False,
+    batch_size: int | None = None,
+    ttl: int | None = None,
+    max_runtime: float | None = None,
+) -> Coroutine[Any, Any, list[Any]]:
+    """
+    Non-blocking counterpart of execute_query for async routes.
+    Returns a coroutine with all documents of the query, so independent
+    queries can run concurrently with asyncio.gather
+    """
+    # Resolved here and not in the coroutine: a gathered coroutine
+    # is started by the event loop, not by its caller
+    if isinstance(query, NamedQuery):
+        query.check_binds(bind_vars)
+        name, query = query.name, query.query
+    else:
+        name = _get_caller_name()
+    return _execute_query_async(
+        database=database,
+        name=name,
+        query=query,
+        bind_vars=bind_vars,
+        stream=stream,
+        batch_size=batch_size,
+        ttl=ttl,
+        max_runtime=max_runtime,
+    )
+
+
+async def _iterate_async(
+    database: AsyncDatabase,
+    name: str,
+    query: str,
+    bind_vars: dict | None,
+    stream: bool,
+    batch_size: int | None,
+    ttl: int | None,
+    max_runtime: float | None,
+    task: str,
+    span: Span | None,
+) -> AsyncIterator[Any]:
+    """
+    Only batch requests are timed, as in _iterate. Statistics are recorded
+    when the iterator ends
+    """
+    config = AqlConfig()
+    max_runtime = config.max_runtime if max_runtime is None else max_runtime
+    batches = database.iterate(
+        query=query,
+        bind_vars=bind_vars,
+        stream=stream,
+        batch_size=batch_size or config.batch_size,
+        ttl=ttl or config.ttl,
+        max_runtime=max_runtime or None,
+    )
+    elapsed = 0.0
+    rows = 0
+    warnings = None
+    error = None
+    try:
+        while True:
+            fetch_start = time.perf_counter()
+            try:
+                batch, extra = await anext(batches)
+            except StopAsyncIteration:
+                break
+            finally:
+                elapsed += time.perf_counter() - fetch_start
+            warnings = extra.get("warnings") or warnings
+            for item in batch:
+                rows += 1
+                yield item
+    except ArangoError as e:
+        query_stats.record_error(name)
+        error = e
+        raise
+    finally:
+        # The consumer stopped early, release the server side cursor
+        await batches.aclose()
+        slow = error is None and _is_slow(elapsed)
+        if error is None:
+            query_stats.record(
+                name=name,
+                elapsed=elapsed,
+                rows=rows,
+                warnings=warnings,
+                slow=slow,
+            )
+        observe_query(task=task, name=name, elapsed=None if error else elapsed)
+        if span is not None:
+            span.finish(error=error, duration=elapsed, rows=rows)
+        if slow:
+            await _capture_slow_query_async(
+                database=database,
+                name=name,
+                query=query,
+                bind_vars=bind_vars,
+                elapsed=elapsed,
+                rows=rows,
+                warnings=warnings,
+            )
+
+
+def iterate_query_async(
+    database: AsyncDatabase,
+    query: str | NamedQuery,
+    bind_vars: dict | None = None,
+    stream: bool = False,
+    batch_size: int | None = None,
+    ttl: int | None = None,
+    max_runtime: float | None = None,
+) -> AsyncIterator[Any]:
+    """
+    Lazy counterpart of execute_query_async. Yields documents while the
+    batches are fetched one by one, so a consumer writing them out keeps
+    only one batch in memory. The query is sent on the first iteration.
+    A consumer stopping early has to aclose the iterator
+    """
+    if isinstance(query, NamedQuery):
+        query.check_binds(bind_vars)
+        name, query = query.name, query.query
+    else:
+        name = _get_caller_name()
+    # The iterator may be consumed outside of the task scope
+    span = tracer.start_span(
+        f"aql.{name}", query=name, bind_sizes=get_bind_var_sizes(bind_vars)
+    )
+    return _iterate_async(
+        database=database,
+        name=name,
+        query=query,
+        bind_vars=bind_vars,
+        stream=stream,
+        batch_size=batch_size,
+        ttl=ttl,
+        max_runtime=max_runtime,
+        task=current_task.get(),
+        span=span,
+    )
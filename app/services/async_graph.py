@@ -0,0 +1,265 @@
+import asyncio
+from contextlib import aclosing
+import json
+import os
+from threading import Lock
+from typing import Any, AsyncIterator
+
+from arango.exceptions import (
+    AQLQueryExecuteError,
+    AQLQueryExplainError,
+    ArangoServerError,
+    CursorCloseError,
+    CursorNextError,
+    DocumentGetError,
+    ViewGetError,
+)
+from arango.request import Request
+from arango.response import Response
+import httpx
+
+from config import ArangoPoolConfig
+
+
+def _raise_for_error(
+    response: httpx.Response,
+    error: type[ArangoServerError],
+    method: str,
+    endpoint: str,
+):
+    """Raises the same exceptions as python-arango for failed requests"""
+    arango_response = Response(
+        method=method,
+        url=str(response.url),
+        headers=response.headers,
+        status_code=response.status_code,
+        status_text=response.reason_phrase,
+        raw_body=response.text,
+    )
+    try:
+        arango_response.body = response.json()
+    except ValueError:
+        arango_response.body = response.text
+    if isinstance(arango_response.body, dict):
+        arango_response.error_code = arango_response.body.get("errorNum")
+        arango_response.error_message = arango_response.body.get("errorMessage")
+    arango_response.is_success = False
+    raise error(arango_response, Request(method=method, endpoint=endpoint))
+
+
+class AsyncDatabase:
+    """
+    Minimal non-blocking counterpart of StandardDatabase for read paths.
+    Errors are raised as the matching python-arango exceptions
+    """
+
+    def __init__(
+        self, client: httpx.AsyncClient, name: str, auth: tuple[str, str]
+    ):
+        self._client = client
+        self._auth = auth
+        self.db_name = name
+
+    def _url(self, endpoint: str) -> str:
+        return f"/_db/{self.db_name}{endpoint}"
+
+    async def _request(
+        self,
+        method: str,
+        endpoint: str,
+        error: type[ArangoServerError],
+        data: dict | None = None,
+    ) -> httpx.Response:
+        response = await self._client.request(
+            method,
+            self._url(endpoint),
+            auth=self._auth,
+            content=json.dumps(data) if data is not None else None,
+        )
+        if not response.is_success:
+            _raise_for_error(
+                response=response, error=error, method=method, endpoint=endpoint
+            )
+        return response
+
+    async def execute(
+        self,
+        query: str,
+        bind_vars: dict | None = None,
+        batch_size: int | None = None,
+        ttl: int | None = None,
+        max_runtime: float | None = None,
+        stream: bool = False,
+        profile: int | None = None,
+    ) -> tuple[list[Any], dict]:
+        """
+        Executes the query and fetches all batches.
+        Returns the documents and the "extra" part of the last batch
+        """
+        rows = []
+        extra = {}
+        async with aclosing(
+            self.iterate(
+                query=query,
+                bind_vars=bind_vars,
+                batch_size=batch_size,
+                ttl=ttl,
+                max_runtime=max_runtime,
+                stream=stream,
+                profile=profile,
+            )
+        ) as batches:
+            async for batch, extra in batches:
+                rows.extend(batch)
+        return rows, extra
+
+    async def iterate(
+        self,
+        query: str,
+        bind_vars: dict | None = None,
+        batch_size: int | None = None,
+        ttl: int | None = None,
+        max_runtime: float | None = None,
+        stream: bool = False,
+        profile: int | None = None,
+    ) -> AsyncIterator[tuple[list[Any], dict]]:
+        """
+        Executes the query and yields the documents and the "extra" part of
+        every batch. The next batch is fetched when the consumer asks for it.
+        Close the generator with aclose when it is not consumed to the end
+        """
+        options = {"stream": stream}
+        if max_runtime:
+            options["maxRuntime"] = max_runtime
+        if profile is not None:
+            options["profile"] = profile
+        data = {"query": query, "bindVars": bind_vars or {}, "options": options}
+        if batch_size is not None:
+            data["batchSize"] = batch_size
+        if ttl is not None:
+            data["ttl"] = ttl
+        response = await self._request(
+            "POST", "/_api/cursor", AQLQueryExecuteError, data=data
+        )
+        body = response.json()
+        cursor_id = body.get("id")
+        try:
+            yield body.get("result", []), body.get("extra") or {}
+            while body.get("hasMore"):
+                response = await self._request(
+                    "POST", f"/_api/cursor/{cursor_id}", CursorNextError
+                )
+                body = response.json()
+                yield body.get("result", []), body.get("extra") or {}
+        finally:
+            # Stopped early, cancelled or failed, release the server side cursor
+            if cursor_id is not None and body.get("hasMore"):
+                await self._close_cursor(cursor_id)
+
+    async def _close_cursor(self, cursor_id: str):
+        try:
+            await asyncio.shield(
+                self._request(
+                    "DELETE", f"/_api/cursor/{cursor_id}", CursorCloseError
+                )
+            )
+        except (ArangoServerError, httpx.HTTPError):
+            pass
+
+    async def explain(self, query: str, bind_vars: dict | None = None) -> dict:
+        data = {"query": query, "bindVars": bind_vars or {}}
+        response = await self._request(
+            "POST", "/_api/explain", AQLQueryExplainError, data=data
+        )
+        return response.json().get("plan") or {}
+
+    async def get_document(self, collection: str, key: str) -> dict | None:
+        try:
+            response = await self._request(
+                "GET", f"/_api/document/{collection}/{key}", DocumentGetError
+            )
+        except DocumentGetError as e:
+            if e.http_code == 404:
+                return None
+            raise
+        return response.json()
+
+    async def has_view(self, name: str) -> bool:
+        try:
+            await self._request("GET", f"/_api/view/{name}", ViewGetError)
+        except ViewGetError as e:
+            if e.http_code == 404:
+                return False
+            raise
+        return True
+
+
+class AsyncArangoClientRegistry:
+    """
+    One httpx.AsyncClient per url, process and event loop.
+    A client can not be shared between event loops. The clients are scoped
+    to the lifespan of the application, aclose is called on its shutdown
+    while the loop is still running
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._pid = os.getpid()
+        self._clients: dict[
+            tuple[int, str], tuple[asyncio.AbstractEventLoop, httpx.AsyncClient]
+        ] = {}
+
+    def get(self, url: str) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self._pid != os.getpid():
+                self._clients.clear()
+                self._pid = os.getpid()
+            # A closed loop can not run aclose any more. Such clients are
+            # left only by loops stopped without the shutdown of the app
+            self._clients = {
+                k: v for k, v in self._clients.items() if not v[0].is_closed()
+            }
+            key = (id(loop), url)
+            if key not in self._clients:
+                self._clients[key] = (loop, self._create(url))
+            return self._clients[key][1]
+
+    async def aclose(self):
+        """Closes the clients of the running loop and their connections"""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            clients = [v[1] for v in self._clients.values() if v[0] is loop]
+            self._clients = {
+                k: v for k, v in self._clients.items() if v[0] is not loop
+            }
+        for client in clients:
+            await client.aclose()
+
+    @staticmethod
+    def _create(url: str) -> httpx.AsyncClient:
+        config = ArangoPoolConfig()
+        headers = {"content-type": "application/json"}
+        if config.response_compression:
+            headers["accept-encoding"] = config.response_compression
+        # Same semantics as the sync pool: without pool_timeout extra
+        # connections are opened instead of waiting for a free one
+        limits = httpx.Limits(
+            max_connections=config.pool_maxsize
+            if config.pool_timeout
+            else None,
+            max_keepalive_connections=config.pool_maxsize,
+        )
+        return httpx.AsyncClient(
+            base_url=url,
+            headers=headers,
+            timeout=httpx.Timeout(
+                config.request_timeout, pool=config.pool_timeout
+            ),
+            transport=httpx.AsyncHTTPTransport(
+                limits=limits, retries=config.retry_attempts
+            ),
+        )
+
+
+async_arango_clients = AsyncArangoClientRegistry()
@@ -1,5 +1,7 @@
 from enum import IntFlag, auto
+import os
 from sys import stderr
+from threading import RLock
 import traceback
 
 from arango import (
@@ -12,7 +14,15 @@ from arango import (
 )
 from arango.collection import StandardCollection
 from arango.database import StandardDatabase, TransactionDatabase
+from arango.errno import DATA_SOURCE_NOT_FOUND, DATABASE_NOT_FOUND
+from arango.http import DeflateRequestCompression
 import requests
+from requests import Session
+
+from config import ArangoPoolConfig
+from services.async_graph import AsyncDatabase, async_arango_clients
+
+HANDLE_NOT_FOUND_ERROR_CODES = {DATA_SOURCE_NOT_FOUND, DATABASE_NOT_FOUND}
 
 
 class IfNotExistType(IntFlag):
@@ -21,6 +31,206 @@ class IfNotExistType(IntFlag):
     RETURN_NONE = auto()
 
 
+class HandleCache:
+    """
+    Process-wide cache of verified database and collection handles.
+    Handles are bound to the connection (url and user) they were created with
+    """
+
+    def __init__(self):
+        self._lock = RLock()
+        self._pid = os.getpid()
+        self._databases: dict[tuple[str, str], StandardDatabase] = {}
+        self._collections: dict[tuple[str, str, str], StandardCollection] = {}
+
+    def _check_pid(self):
+        # Handles share HTTP sessions which must not be reused after fork
+        if self._pid != os.getpid():
+            self._databases.clear()
+            self._collections.clear()
+            self._pid = os.getpid()
+
+    def get_database(self, connection: str, name: str) -> StandardDatabase:
+        with self._lock:
+            self._check_pid()
+            return self._databases.get((connection, name))
+
+    def set_database(
+        self, connection: str, name: str, database: StandardDatabase
+    ) -> StandardDatabase:
+        with self._lock:
+            self._check_pid()
+            self._databases[(connection, name)] = database
+        return database
+
+    def get_collection(
+        self, connection: str, db_name: str, name: str
+    ) -> StandardCollection | None:
+        with self._lock:
+            self._check_pid()
+            return self._collections.get((connection, db_name, name))
+
+    def set_collection(
+        self,
+        connection: str,
+        db_name: str,
+        name: str,
+        collection: StandardCollection,
+    ) -> StandardCollection:
+        with self._lock:
+            self._check_pid()
+            self._collections[(connection, db_name, name)] = collection
+        return collection
+
+    def invalidate(
+        self,
+        connection: str | None = None,
+        db_name: str | None = None,
+        name: str | None = None,
+    ):
+        """
+        Drops handles matching all given arguments.
+        Without a collection name all collections of the database are dropped
+        together with the database handle
+        """
+
+        def match(key: tuple) -> bool:
+            if connection is not None and key[0] != connection:
+                return False
+            if db_name is not None and key[1] != db_name:
+                return False
+            return True
+
+        with self._lock:
+            self._check_pid()
+            for key in list(self._collections):
+                if match(key) and (name is None or key[2] == name):
+                    del self._collections[key]
+            if name is None:
+                for key in list(self._databases):
+                    if match(key):
+                        del self._databases[key]
+
+
+handle_cache = HandleCache()
+
+
+class PooledHTTPClient(DefaultHTTPClient):
+    """DefaultHTTPClient which keeps its sessions to report pool usage"""
+
+    def __init__(self, config: ArangoPoolConfig):
+        super().__init__(
+            request_timeout=config.request_timeout,
+            retry_attempts=config.retry_attempts,
+            backoff_factor=config.backoff_factor,
+            pool_connections=config.pool_connections,
+            pool_maxsize=config.pool_maxsize,
+            pool_timeout=config.pool_timeout,
+        )
+        self._sessions: dict[str, Session] = {}
+
+    def create_session(self, host: str) -> Session:
+        session = super().create_session(host)
+        self._sessions[host] = session
+        return session
+
+    @staticmethod
+    def _get_pool_stats(pool) -> dict | None:
+        """
+        The counters are attributes of urllib3 connection pools, they are
+        not a part of its documented API. A pool without them is skipped
+        instead of failing the whole report
+        """
+        try:
+            queue = list(pool.pool.queue)
+            return {
+                "host": f"{pool.scheme}://{pool.host}:{pool.port}",
+                "maxsize": pool.pool.maxsize,
+                # The queue is prefilled with None placeholders, so taken
+                # slots are connections which are in use right now
+                "in_use": pool.pool.maxsize - len(queue),
+                "idle": sum(1 for i in queue if i is not None),
+                "connections_created": pool.num_connections,
+                "requests": pool.num_requests,
+            }
+        except AttributeError:
+            return None
+
+    def pool_stats(self) -> list[dict]:
+        results = []
+        for host, session in self._sessions.items():
+            pool_manager = session.get_adapter(host).poolmanager
+            pools = getattr(pool_manager, "pools", None)
+            if pools is None:
+                continue
+            for pool_key in list(pools.keys()):
+                pool = pools.get(pool_key)
+                if pool is None:
+                    continue
+                stats = self._get_pool_stats(pool)
+                if stats is not None:
+                    results.append(stats)
+        return results
+
+
+class ArangoClientRegistry:
+    """
+    One ArangoClient (and so one connection pool) per url and process.
+    Credentials are sent with every request, so all GraphService instances
+    of a process share the same pool
+    """
+
+    def __init__(self):
+        self._lock = RLock()
+        self._pid = os.getpid()
+        self._clients: dict[str, tuple[ArangoClient, PooledHTTPClient]] = {}
+
+    def _check_pid(self):
+        # Sockets inherited from the parent process must not be reused
+        if self._pid != os.getpid():
+            self._clients.clear()
+            self._pid = os.getpid()
+
+    def get(self, url: str) -> ArangoClient:
+        with self._lock:
+            self._check_pid()
+            if url not in self._clients:
+                self._clients[url] = self._create(url)
+            return self._clients[url][0]
+
+    @staticmethod
+    def _create(url: str) -> tuple[ArangoClient, PooledHTTPClient]:
+        config = ArangoPoolConfig()
+        http_client = PooledHTTPClient(config=config)
+        request_compression = None
+        if config.request_compression:
+            request_compression = DeflateRequestCompression(
+                threshold=config.request_compression_threshold,
+                level=config.request_compression_level,
+            )
+        client = ArangoClient(
+            hosts=url,
+            http_client=http_client,
+            request_timeout=config.request_timeout,
+            request_compression=request_compression,
+            response_compression=config.response_compression,
+        )
+        return client, http_client
+
+    def pool_stats(self) -> list[dict]:
+        with self._lock:
+            self._check_pid()
+            clients = list(self._clients.items())
+        results = []
+        for url, (_, http_client) in clients:
+            for stats in http_client.pool_stats():
+                results.append({"url": url, "pid": self._pid, **stats})
+        return results
+
+
+arango_clients = ArangoClientRegistry()
+
+
 class GraphService:
     REQUEST_TIMEOUT = 60 * 10
 
@@ -31,21 +241,32 @@ class GraphService:
         password: str,
         sys_database_name: str = "_system",
     ):
+        self._url: str = url
         self._username: str = username
         self._password: str = password
-        self._client: ArangoClient = self._init_arango_db(url=url)
-        self.sys_db: StandardDatabase = self._init_sys_db(
+        self._sys_database_name: str = sys_database_name
+        self._connection: str = f"{username}@{url}"
+        self._pid: int = os.getpid()
+        self._sys_db: StandardDatabase = self._init_sys_db(
             sys_database_name=sys_database_name,
             username=username,
             password=password,
         )
 
-    def _init_arango_db(self, url: str) -> ArangoClient:
-        return ArangoClient(
-            hosts=url,
-            http_client=DefaultHTTPClient(request_timeout=self.REQUEST_TIMEOUT),
-            request_timeout=self.REQUEST_TIMEOUT,
-        )
+    @property
+    def _client(self) -> ArangoClient:
+        return arango_clients.get(self._url)
+
+    @property
+    def sys_db(self) -> StandardDatabase:
+        if self._pid != os.getpid():
+            self._sys_db = self._init_sys_db(
+                sys_database_name=self._sys_database_name,
+                username=self._username,
+                password=self._password,
+            )
+            self._pid = os.getpid()
+        return self._sys_db
 
     def _init_sys_db(
         self, sys_database_name: str, username: str, password: str
@@ -61,17 +282,42 @@ class GraphService:
             print(f"{self._client.hosts=}\n{sys_database_name=}\n{username=}")
             raise e
 
+    def get_async_database(self, name: str) -> AsyncDatabase:
+        """
+        Non-blocking handle for async routes. It must be used in the event
+        loop it was created in. Existence of the database is not checked,
+        queries against a missing one fail with DATABASE_NOT_FOUND
+        """
+        return AsyncDatabase(
+            client=async_arango_clients.get(self._url),
+            name=name,
+            auth=(self._username, self._password),
+        )
+
+    @property
+    def async_sys_db(self) -> AsyncDatabase:
+        return self.get_async_database(self._sys_database_name)
+
     def get_database(
         self, name, if_not_exist: IfNotExistType = IfNotExistType.RAISE_ERROR
     ) -> StandardDatabase | None:
+        # Only lookups which expect the database to exist are served from
+        # the cache. Existence checks always go to the server
+        if if_not_exist == IfNotExistType.RAISE_ERROR:
+            database = handle_cache.get_database(self._connection, name)
+            if database is not None:
+                return database
         try:
             if self.sys_db.has_database(name=name):
-                return self._client.db(
+                database = self._client.db(
                     name,
                     username=self._username,
                     password=self._password,
                     verify=True,
                 )
+                return handle_cache.set_database(
+                    self._connection, name, database
+                )
         except KeyError as ex:
             print(ex)
             print(name)
@@ -79,16 +325,22 @@ class GraphService:
             print(ex)
             print(f"Request details: {ex.request}")
             print(f"Response details: {ex.response}")
+        # The database does not exist, so handles left from its previous
+        # incarnation are stale
+        self.invalidate_handles(db_name=name)
         match if_not_exist:
             case IfNotExistType.CREATE:
                 if not self.sys_db.create_database(name):
                     raise ValueError("DB with name {} not created".format(name))
-                return self._client.db(
+                database = self._client.db(
                     name,
                     username=self._username,
                     password=self._password,
                     verify=True,
                 )
+                return handle_cache.set_database(
+                    self._connection, name, database
+                )
             case IfNotExistType.RAISE_ERROR:
                 raise ValueError("DB with name {} not exists".format(name))
             case IfNotExistType.RETURN_NONE:
@@ -97,6 +349,7 @@ class GraphService:
     def delete_database(self, name: str) -> bool:
         if name == self.sys_db.db_name:
             return False
+        self.invalidate_handles(db_name=name)
         try:
             self.sys_db.delete_database(name, ignore_missing=True)
         except DatabaseDeleteError:
@@ -104,6 +357,13 @@ class GraphService:
             return False
         return True
 
+    def invalidate_handles(
+        self, db_name: str | None = None, collection_name: str | None = None
+    ):
+        handle_cache.invalidate(
+            connection=self._connection, db_name=db_name, name=collection_name
+        )
+
     def get_collection(
         self,
         db: StandardDatabase | TransactionDatabase | str,
@@ -113,22 +373,38 @@ class GraphService:
     ) -> StandardCollection | None:
         if isinstance(db, str):
             db = self.get_database(name=db, **kwargs)
+        # Transactions have their own lifetime, their handles are not cached
+        cacheable = not isinstance(db, TransactionDatabase) and (
+            if_not_exist != IfNotExistType.RETURN_NONE
+        )
+        if cacheable:
+            collection = handle_cache.get_collection(
+                self._connection, db.db_name, name
+            )
+            if collection is not None:
+                return collection
         if db.has_collection(name=name):
-            return db.collection(name)
-        match if_not_exist:
-            case IfNotExistType.CREATE:
-                return db.create_collection(name, **kwargs)
-            case IfNotExistType.RAISE_ERROR:
-                raise ValueError(
-                    "Collection with name {} not exists".format(name)
-                )
-            case IfNotExistType.RETURN_NONE:
-                return None
+            collection = db.collection(name)
+        else:
+            match if_not_exist:
+                case IfNotExistType.CREATE:
+                    collection = db.create_collection(name, **kwargs)
+                case IfNotExistType.RAISE_ERROR:
+                    raise ValueError(
+                        "Collection with name {} not exists".format(name)
+                    )
+                case IfNotExistType.RETURN_NONE:
+                    return None
+        if not isinstance(db, TransactionDatabase):
+            handle_cache.set_collection(
+                self._connection, db.db_name, name, collection
+            )
+        return collection
 
-    @staticmethod
     def delete_collection(
-        db: StandardDatabase | TransactionDatabase, name: str
+        self, db: StandardDatabase | TransactionDatabase, name: str
     ) -> bool:
+        self.invalidate_handles(db_name=db.db_name, collection_name=name)
         try:
             db.delete_collection(name, ignore_missing=True)
         except CollectionDeleteError:
@@ -1,10 +1,19 @@
-from multiprocessing import Lock, Process
+from multiprocessing import Lock, Pipe, Process
+from multiprocessing.connection import Connection
 import time
 
-from config import ArangoConfig, GraphDBConfig, InventoryGRPCConfig
-from services.graph import GraphService
+from config import (
+    ArangoConfig,
+    GraphDBConfig,
+    InventoryGRPCConfig,
+    ResponseCacheConfig,
+)
+from services.graph import GraphService, IfNotExistType
 from services.inventory import Inventory
+from services.metrics import metrics
+from services.response_cache import ArangoResponseCacheBackend, response_cache
 from task.building_tasks import RunBuildingTask
+from task.index_tasks import EnsureIndexesTask
 from task.on_start import OnStartTask
 
 inventory = Inventory(InventoryGRPCConfig().url)
@@ -15,42 +24,59 @@ graph_db = GraphService(
     sys_database_name=GraphDBConfig().sys_database_name,
 )
 
+if ResponseCacheConfig().shared:
+    response_cache.backend = ArangoResponseCacheBackend(
+        get_collection=lambda: graph_db.get_collection(
+            db=GraphDBConfig().sys_database_name,
+            name=ResponseCacheConfig().shared_collection_name,
+            if_not_exist=IfNotExistType.CREATE,
+        )
+    )
+
 # Checking unfinished processes when starting the application
 OnStartTask(graphdb=graph_db).execute()
+# Databases created by older versions get the missing indexes
+if GraphDBConfig().ensure_indexes_on_start:
+    EnsureIndexesTask(graph_db=graph_db).execute()
 
 
-def run_building_in_new_process(key: str, lock: Lock):
+def run_building_in_new_process(
+    key: str, lock: Lock, metrics_sender: Connection | None = None
+):
+    # The connection pool is recreated on first use in the child process
     instance_graphdb = graph_db
     # instance_inventory = inventory
     instance_inventory = Inventory(InventoryGRPCConfig().url, lock=lock)
     instance = RunBuildingTask(
         graph_db=instance_graphdb, inventory=instance_inventory, key=key
     )
-    instance.execute()
+    try:
+        instance.execute()
+    finally:
+        # Build phases, queries and gRPC calls of the child process
+        if metrics_sender is not None:
+            metrics_sender.send(metrics.snapshot())
+            metrics_sender.close()
 
 
 def build_graph_in_new_process(key: str, daemon: bool = True):
     lock = Lock()
+    metrics_receiver, metrics_sender = Pipe(duplex=False)
     task = Process(
         target=run_building_in_new_process,
-        kwargs={"key": key, "lock": lock},
+        kwargs={"key": key, "lock": lock, "metrics_sender": metrics_sender},
         daemon=daemon,
     )
     start_time = time.perf_counter()
     task.start()
+    # Only the child writes, so a crashed child ends the receive with EOF
+    metrics_sender.close()
+    try:
+        metrics.merge(metrics_receiver.recv())
+    except EOFError:
+        pass
+    finally:
+        metrics_receiver.close()
     task.join()
     end_time = time.perf_counter()
     print(f"Elapsed time for build graph: {end_time - start_time:.2f}")
-
-
-def create_db_connection_instance():
-    graph_db_instance = GraphService(
-        url=ArangoConfig().url,
-        username=ArangoConfig().username,
-        password=ArangoConfig().password,
-        sys_database_name=GraphDBConfig().sys_database_name,
-    )
-    return graph_db_instance
-
-
-graph_db = create_db_connection_instance()
@@ -5,6 +5,7 @@ import json
 from multiprocessing import Lock
 import pickle
 from sys import stderr
+import time
 import traceback
 from typing import Iterator, Optional
 
@@ -29,6 +30,71 @@ from services.inventory_proto.graph_pb2 import (
     OutTprms,
 )
 from services.inventory_proto.graph_pb2_grpc import GraphInformerStub
+from services.metrics import GRPC_CALL_DURATION, GRPC_CALLS
+from services.tracing import traced
+
+
+def _get_method_name(client_call_details: grpc.ClientCallDetails) -> str:
+    return client_call_details.method.rsplit("/", 1)[-1]
+
+
+def _observe_call(method: str, code: grpc.StatusCode, start_time: float):
+    GRPC_CALLS.inc(method=method, code=code.name)
+    GRPC_CALL_DURATION.observe(time.perf_counter() - start_time, method=method)
+
+
+class _MeasuredStream:
+    """Response stream which is measured until it is exhausted"""
+
+    def __init__(self, call, method: str, start_time: float):
+        self._call = call
+        self._method = method
+        self._start_time = start_time
+        self._done = False
+
+    def __getattr__(self, item):
+        return getattr(self._call, item)
+
+    def __iter__(self):
+        return self
+
+    def _finish(self, code: grpc.StatusCode):
+        if not self._done:
+            self._done = True
+            _observe_call(self._method, code, self._start_time)
+
+    def __next__(self):
+        try:
+            return next(self._call)
+        except StopIteration:
+            self._finish(grpc.StatusCode.OK)
+            raise
+        except grpc.RpcError as e:
+            self._finish(e.code())
+            raise
+
+
+class MetricsClientInterceptor(
+    grpc.UnaryUnaryClientInterceptor, grpc.UnaryStreamClientInterceptor
+):
+    """Number and latency of the inventory calls by method and status"""
+
+    def intercept_unary_unary(self, continuation, client_call_details, request):
+        start_time = time.perf_counter()
+        outcome = continuation(client_call_details, request)
+        _observe_call(
+            _get_method_name(client_call_details), outcome.code(), start_time
+        )
+        return outcome
+
+    def intercept_unary_stream(
+        self, continuation, client_call_details, request
+    ):
+        start_time = time.perf_counter()
+        call = continuation(client_call_details, request)
+        return _MeasuredStream(
+            call, _get_method_name(client_call_details), start_time
+        )
 
 
 class MockLock:
@@ -54,6 +120,14 @@ class InventoryInterface(ABC):
         # "formula": str,
     }
 
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # Every call of an implementation gets a span of the request
+        for name in InventoryInterface.__abstractmethods__:
+            if name in cls.__dict__:
+                method = traced(f"inventory.{name}")(cls.__dict__[name])
+                setattr(cls, name, method)
+
     @abc.abstractmethod
     def get_tmo_tree(self, tmo_id: int | None) -> list[dict]:
         pass
@@ -124,8 +198,9 @@ class Inventory(InventoryInterface):
             }
         )
         channel_options.append(("grpc.service_config", service_config_json))
-        self.channel = grpc.insecure_channel(
-            target=grpc_url, options=channel_options
+        self.channel = grpc.intercept_channel(
+            grpc.insecure_channel(target=grpc_url, options=channel_options),
+            MetricsClientInterceptor(),
         )
         self.stub = GraphInformerStub(channel=self.channel)
         self.lock = lock or Lock()
@@ -215,7 +290,11 @@ class Inventory(InventoryInterface):
             # with self.lock:
 
             with grpc.insecure_channel(self.grpc_url) as channel:
-                stub = GraphInformerStub(channel=channel)
+                stub = GraphInformerStub(
+                    channel=grpc.intercept_channel(
+                        channel, MetricsClientInterceptor()
+                    )
+                )
                 for chunk in stub.GetMOsByTMOid(query):
                     chunk_converted = self._convert_mo(
                         mos=MessageToDict(
@@ -0,0 +1,310 @@
+import copy
+import gzip
+import json
+from pathlib import Path
+from threading import Lock
+import time
+from typing import Any, Iterator
+
+from services.inventory import InventoryInterface
+
+MO_LINK_VAL_TYPES = {"mo_link", "two-way link"}
+PRM_LINK_VAL_TYPES = {"prm_link"}
+
+
+def _call_key(**kwargs) -> str:
+    return json.dumps(kwargs, sort_keys=True, default=str)
+
+
+class RecordingInventory(InventoryInterface):
+    """
+    Decorator around a real inventory which stores every response.
+    The recording is saved as gzip-compressed JSON and can be served
+    later by ReplayInventory without access to the inventory service
+    """
+
+    def __init__(self, inventory: InventoryInterface, path: str | Path):
+        self.inventory = inventory
+        self.path = Path(path)
+        self._calls: dict[str, dict[str, Any]] = {}
+        self._lock = Lock()
+
+    def _record(self, method: str, key: str, value: Any) -> Any:
+        with self._lock:
+            self._calls.setdefault(method, {})[key] = value
+        return value
+
+    def save(self) -> Path:
+        with self._lock:
+            data = json.dumps(
+                {"version": 1, "calls": self._calls},
+                separators=(",", ":"),
+                default=str,
+            )
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with gzip.open(self.path, "wt", encoding="utf-8") as f:
+            f.write(data)
+        return self.path
+
+    def get_tmo_tree(self, tmo_id: int | None) -> list[dict]:
+        response = self.inventory.get_tmo_tree(tmo_id=tmo_id)
+        return self._record("get_tmo_tree", _call_key(tmo_id=tmo_id), response)
+
+    def get_tprms_by_tmo_id(self, tmo_ids: list[int]) -> list[dict]:
+        response = self.inventory.get_tprms_by_tmo_id(tmo_ids=tmo_ids)
+        key = _call_key(tmo_ids=sorted(tmo_ids))
+        return self._record("get_tprms_by_tmo_id", key, response)
+
+    def get_mos_by_tmo_id(
+        self,
+        tmo_id: int,
+        mo_filter_by: dict | None = None,
+        prm_filter_by: dict | None = None,
+        keep_mo_without_prm: bool = False,
+        chunk_size: int = 50,
+    ) -> Iterator[list[dict]]:
+        key = _call_key(
+            tmo_id=tmo_id,
+            mo_filter_by=mo_filter_by,
+            prm_filter_by=prm_filter_by,
+            keep_mo_without_prm=keep_mo_without_prm,
+        )
+        chunks = []
+        for chunk in self.inventory.get_mos_by_tmo_id(
+            tmo_id=tmo_id,
+            mo_filter_by=mo_filter_by,
+            prm_filter_by=prm_filter_by,
+            keep_mo_without_prm=keep_mo_without_prm,
+            chunk_size=chunk_size,
+        ):
+            chunks.append(chunk)
+            yield chunk
+        self._record("get_mos_by_tmo_id", key, chunks)
+
+    def get_tmo_by_mo_id(self, mo_id: int) -> int:
+        response = self.inventory.get_tmo_by_mo_id(mo_id=mo_id)
+        return self._record(
+            "get_tmo_by_mo_id", _call_key(mo_id=mo_id), response
+        )
+
+    def get_mos_by_mo_ids(self, mo_ids: list[int]) -> list[dict]:
+        response = self.inventory.get_mos_by_mo_ids(mo_ids=mo_ids)
+        key = _call_key(mo_ids=sorted(mo_ids))
+        return self._record("get_mos_by_mo_ids", key, response)
+
+    def get_prms_by_prm_ids(self, prm_ids: list[int]) -> list[dict]:
+        response = self.inventory.get_prms_by_prm_ids(prm_ids=prm_ids)
+        key = _call_key(prm_ids=sorted(prm_ids))
+        return self._record("get_prms_by_prm_ids", key, response)
+
+    def get_point_tmo_const(self, tmo_id: int) -> list[int]:
+        response = self.inventory.get_point_tmo_const(tmo_id=tmo_id)
+        key = _call_key(tmo_id=tmo_id)
+        return self._record("get_point_tmo_const", key, response)
+
+    def get_tprm_const(self, tprm_id: int) -> list[int]:
+        response = self.inventory.get_tprm_const(tprm_id=tprm_id)
+        key = _call_key(tprm_id=tprm_id)
+        return self._record("get_tprm_const", key, response)
+
+    def get_tprms_by_tprm_id(self, tprm_ids: list[int]) -> list[dict]:
+        response = self.inventory.get_tprms_by_tprm_id(tprm_ids=tprm_ids)
+        key = _call_key(tprm_ids=sorted(tprm_ids))
+        return self._record("get_tprms_by_tprm_id", key, response)
+
+
+class ReplayInventory(InventoryInterface):
+    """
+    Serves responses captured by RecordingInventory.
+
+    latency: synthetic delay in seconds added to every call and to every
+        streamed chunk of MOs
+    scale: how many copies of every recorded MO are returned. Copy N gets
+        all MO and PRM ids (and links between them) shifted by N * id_offset
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        latency: float = 0.0,
+        scale: int = 1,
+        id_offset: int = 100_000_000,
+    ):
+        if scale < 1:
+            raise ValueError(f"Incorrect value of {scale=}")
+        if id_offset <= 0:
+            raise ValueError(f"Incorrect value of {id_offset=}")
+        self.path = Path(path)
+        self.latency = latency
+        self.scale = scale
+        self.id_offset = id_offset
+        with gzip.open(self.path, "rt", encoding="utf-8") as f:
+            self._calls: dict[str, dict[str, Any]] = json.load(f)["calls"]
+
+        self._tprms: dict[int, dict] = {}
+        self._mos: dict[int, dict] = {}
+        self._prms: dict[int, dict] = {}
+        self._build_indexes()
+
+    def _build_indexes(self):
+        for calls in ("get_tprms_by_tmo_id", "get_tprms_by_tprm_id"):
+            for tprms in self._calls.get(calls, {}).values():
+                for tprm in tprms:
+                    self._tprms[tprm["id"]] = tprm
+        mos = [
+            mo
+            for chunks in self._calls.get("get_mos_by_tmo_id", {}).values()
+            for chunk in chunks
+            for mo in chunk
+        ]
+        for response in self._calls.get("get_mos_by_mo_ids", {}).values():
+            mos.extend(response)
+        for mo in mos:
+            self._mos[mo["id"]] = mo
+            for prm in mo.get("params", []):
+                self._prms[prm["id"]] = prm
+        for response in self._calls.get("get_prms_by_prm_ids", {}).values():
+            for prm in response:
+                self._prms[prm["id"]] = prm
+
+    def _sleep(self):
+        if self.latency > 0:
+            time.sleep(self.latency)
+
+    def _get(self, method: str, key: str) -> Any:
+        calls = self._calls.get(method, {})
+        if key not in calls:
+            raise ValueError(f"Response for {method}({key}) was not recorded")
+        return copy.deepcopy(calls[key])
+
+    def _split_id(self, item_id: int) -> tuple[int, int]:
+        """Returns (copy number, original id)"""
+        copy_number, original_id = divmod(item_id, self.id_offset)
+        if copy_number >= self.scale:
+            raise ValueError(f"Id {item_id} is out of the replay scale")
+        return copy_number, original_id
+
+    def _shift(self, item_id: int | None, copy_number: int) -> int | None:
+        if not item_id or not copy_number:
+            return item_id
+        return item_id + copy_number * self.id_offset
+
+    def _shift_value(self, value: Any, shift_ids) -> Any:
+        if isinstance(value, list):
+            return [self._shift_value(i, shift_ids) for i in value]
+        if isinstance(value, int) and not isinstance(value, bool):
+            return shift_ids(value)
+        return value
+
+    def _clone_prm(self, prm: dict, copy_number: int) -> dict:
+        prm = copy.deepcopy(prm)
+        if not copy_number:
+            return prm
+        prm["id"] = self._shift(prm["id"], copy_number)
+        prm["mo_id"] = self._shift(prm["mo_id"], copy_number)
+        tprm = self._tprms.get(prm["tprm_id"])
+        val_type = tprm["val_type"] if tprm else None
+        if val_type in MO_LINK_VAL_TYPES or val_type in PRM_LINK_VAL_TYPES:
+            prm["value"] = self._shift_value(
+                prm["value"], lambda x: self._shift(x, copy_number)
+            )
+        return prm
+
+    def _clone_mo(self, mo: dict, copy_number: int) -> dict:
+        if not copy_number:
+            return copy.deepcopy(mo)
+        params = mo.get("params", [])
+        mo = copy.deepcopy({k: v for k, v in mo.items() if k != "params"})
+        mo["id"] = self._shift(mo["id"], copy_number)
+        mo["name"] = f"{mo['name']} #{copy_number}"
+        for field in ("p_id", "point_a_id", "point_b_id"):
+            if field in mo:
+                mo[field] = self._shift(mo[field], copy_number)
+        mo["params"] = [self._clone_prm(i, copy_number) for i in params]
+        return mo
+
+    def get_tmo_tree(self, tmo_id: int | None) -> list[dict]:
+        self._sleep()
+        return self._get("get_tmo_tree", _call_key(tmo_id=tmo_id))
+
+    def get_tprms_by_tmo_id(self, tmo_ids: list[int]) -> list[dict]:
+        self._sleep()
+        key = _call_key(tmo_ids=sorted(tmo_ids))
+        if key in self._calls.get("get_tprms_by_tmo_id", {}):
+            return self._get("get_tprms_by_tmo_id", key)
+        tmo_ids = set(tmo_ids)
+        return [
+            copy.deepcopy(i)
+            for i in self._tprms.values()
+            if i["tmo_id"] in tmo_ids
+        ]
+
+    def get_mos_by_tmo_id(
+        self,
+        tmo_id: int,
+        mo_filter_by: dict | None = None,
+        prm_filter_by: dict | None = None,
+        keep_mo_without_prm: bool = False,
+        chunk_size: int = 50,
+    ) -> Iterator[list[dict]]:
+        key = _call_key(
+            tmo_id=tmo_id,
+            mo_filter_by=mo_filter_by,
+            prm_filter_by=prm_filter_by,
+            keep_mo_without_prm=keep_mo_without_prm,
+        )
+        chunks = self._calls.get("get_mos_by_tmo_id", {}).get(key)
+        if chunks is None:
+            raise ValueError(f"Response for get_mos_by_tmo_id({key}) not found")
+        mos = [mo for chunk in chunks for mo in chunk]
+        for copy_number in range(self.scale):
+            for start in range(0, len(mos), chunk_size):
+                self._sleep()
+                yield [
+                    self._clone_mo(mo, copy_number)
+                    for mo in mos[start : start + chunk_size]
+                ]
+
+    def get_tmo_by_mo_id(self, mo_id: int) -> int:
+        self._sleep()
+        _, original_id = self._split_id(mo_id)
+        mo = self._mos.get(original_id)
+        if mo is None:
+            return self._get("get_tmo_by_mo_id", _call_key(mo_id=original_id))
+        return mo["tmo_id"]
+
+    def get_mos_by_mo_ids(self, mo_ids: list[int]) -> list[dict]:
+        self._sleep()
+        results = []
+        for mo_id in mo_ids:
+            copy_number, original_id = self._split_id(mo_id)
+            mo = self._mos.get(original_id)
+            if mo is None:
+                continue
+            results.append(self._clone_mo(mo, copy_number))
+        return results
+
+    def get_prms_by_prm_ids(self, prm_ids: list[int]) -> list[dict]:
+        self._sleep()
+        results = []
+        for prm_id in prm_ids:
+            copy_number, original_id = self._split_id(prm_id)
+            prm = self._prms.get(original_id)
+            if prm is None:
+                continue
+            results.append(self._clone_prm(prm, copy_number))
+        return results
+
+    def get_point_tmo_const(self, tmo_id: int) -> list[int]:
+        self._sleep()
+        return self._get("get_point_tmo_const", _call_key(tmo_id=tmo_id))
+
+    def get_tprm_const(self, tprm_id: int) -> list[int]:
+        self._sleep()
+        return self._get("get_tprm_const", _call_key(tprm_id=tprm_id))
+
+    def get_tprms_by_tprm_id(self, tprm_ids: list[int]) -> list[dict]:
+        self._sleep()
+        return [
+            copy.deepcopy(self._tprms[i]) for i in tprm_ids if i in self._tprms
+        ]
@@ -0,0 +1,439 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import math
+import os
+from threading import Lock, Thread
+import time
+from typing import Callable, Iterator
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+# Seconds, the default buckets of the Prometheus client libraries
+DEFAULT_BUCKETS = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.075,
+    0.1,
+    0.25,
+    0.5,
+    0.75,
+    1.0,
+    2.5,
+    5.0,
+    7.5,
+    10.0,
+)
+# Seconds, a build phase takes from a moment to an hour
+BUILD_BUCKETS = (0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0, 900.0, 3600.0)
+NO_TASK = "none"
+
+current_task: ContextVar[str] = ContextVar("current_task", default=NO_TASK)
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: tuple[str, ...], values: tuple[str, ...]) -> str:
+    if not names:
+        return ""
+    labels = ",".join(
+        f'{name}="{_escape(value)}"' for name, value in zip(names, values)
+    )
+    return f"{{{labels}}}"
+
+
+class Metric:
+    """
+    Named family of samples with a fixed set of label names.
+    Values belong to the worker process, a forked process starts empty
+    """
+
+    type = "untyped"
+
+    def __init__(
+        self, name: str, documentation: str, labels: tuple[str, ...] = ()
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self._lock = Lock()
+        self._pid = os.getpid()
+        self._values: dict[tuple[str, ...], object] = {}
+
+    def _key(self, labels: dict) -> tuple[str, ...]:
+        if set(labels) != set(self.label_names):
+            raise ValueError(
+                f"Incorrect labels of metric {self.name}: "
+                f"expected {sorted(self.label_names)}, got {sorted(labels)}"
+            )
+        return tuple(str(labels[name]) for name in self.label_names)
+
+    def _get_values(self) -> dict[tuple[str, ...], object]:
+        # Values inherited from the parent process are not ours
+        if self._pid != os.getpid():
+            self._values.clear()
+            self._pid = os.getpid()
+        return self._values
+
+    def remove(self, **labels):
+        with self._lock:
+            self._get_values().pop(self._key(labels), None)
+
+    def clear(self):
+        with self._lock:
+            self._get_values().clear()
+
+    def snapshot(self) -> dict[tuple[str, ...], object]:
+        with self._lock:
+            return {k: self._copy(v) for k, v in self._get_values().items()}
+
+    def merge(self, values: dict[tuple[str, ...], object]):
+        raise NotImplementedError()
+
+    @staticmethod
+    def _copy(value: object) -> object:
+        return value
+
+    def samples(self) -> Iterator[tuple[str, tuple[str, ...], tuple, float]]:
+        """Suffix, label names, label values and value of every sample"""
+        for key, value in sorted(self.snapshot().items()):
+            yield "", self.label_names, key, value
+
+    def render(self) -> list[str]:
+        lines = [
+            f"# HELP {self.name} {_escape(self.documentation)}",
+            f"# TYPE {self.name} {self.type}",
+        ]
+        for suffix, names, values, value in self.samples():
+            labels = _format_labels(names, values)
+            lines.append(f"{self.name}{suffix}{labels} {_format_value(value)}")
+        return lines
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def inc(self, amount: float = 1.0, **labels):
+        if amount < 0:
+            raise ValueError("Counters can only be increased")
+        key = self._key(labels)
+        with self._lock:
+            values = self._get_values()
+            values[key] = values.get(key, 0.0) + amount
+
+    def set_total(self, value: float, **labels):
+        """For totals counted outside of the registry, e.g. by a child process"""
+        key = self._key(labels)
+        with self._lock:
+            self._get_values()[key] = float(value)
+
+    def merge(self, values: dict[tuple[str, ...], float]):
+        with self._lock:
+            own = self._get_values()
+            for key, value in values.items():
+                own[key] = own.get(key, 0.0) + value
+
+
+class Gauge(Metric):
+    type = "gauge"
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._get_values()[key] = float(value)
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            values = self._get_values()
+            values[key] = values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels):
+        self.inc(-amount, **labels)
+
+    @contextmanager
+    def track_in_progress(self, **labels):
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+    def merge(self, values: dict[tuple[str, ...], float]):
+        # The state of another process is not the state of this one
+        pass
+
+
+class HistogramValue:
+    def __init__(self, buckets: int):
+        self.counts = [0] * buckets
+        self.sum = 0.0
+        self.count = 0
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name=name, documentation=documentation, labels=labels)
+        if "le" in self.label_names:
+            raise ValueError("Label le is reserved for histogram buckets")
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            values = self._get_values()
+            if key not in values:
+                values[key] = HistogramValue(len(self.buckets))
+            histogram = values[key]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    histogram.counts[i] += 1
+                    break
+            histogram.sum += value
+            histogram.count += 1
+
+    @contextmanager
+    def time(self, **labels):
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start_time, **labels)
+
+    @staticmethod
+    def _copy(value: HistogramValue) -> HistogramValue:
+        copy = HistogramValue(len(value.counts))
+        copy.counts = list(value.counts)
+        copy.sum = value.sum
+        copy.count = value.count
+        return copy
+
+    def merge(self, values: dict[tuple[str, ...], HistogramValue]):
+        with self._lock:
+            own = self._get_values()
+            for key, value in values.items():
+                if key not in own:
+                    own[key] = HistogramValue(len(self.buckets))
+                histogram = own[key]
+                for i, count in enumerate(value.counts):
+                    histogram.counts[i] += count
+                histogram.sum += value.sum
+                histogram.count += value.count
+
+    def samples(self):
+        names = self.label_names + ("le",)
+        for key, value in sorted(self.snapshot().items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, value.counts):
+                cumulative += count
+                yield (
+                    "_bucket",
+                    names,
+                    key + (_format_value(bound),),
+                    cumulative,
+                )
+            yield "_sum", self.label_names, key, value.sum
+            yield "_count", self.label_names, key, value.count
+
+
+class MetricsRegistry:
+    """
+    Metrics of the process in the Prometheus text format.
+    Collectors are called before every render to refresh values
+    which are read rather than counted, e.g. a pool usage
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._metrics: dict[str, Metric] = {}
+        self._collectors: list[Callable[[], None]] = []
+
+    def register(self, metric: Metric) -> Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} is already registered")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(
+        self, name: str, documentation: str, labels: tuple[str, ...] = ()
+    ) -> Counter:
+        return self.register(Counter(name, documentation, labels))
+
+    def gauge(
+        self, name: str, documentation: str, labels: tuple[str, ...] = ()
+    ) -> Gauge:
+        return self.register(Gauge(name, documentation, labels))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labels: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self.register(Histogram(name, documentation, labels, buckets))
+
+    def add_collector(self, collector: Callable[[], None]):
+        with self._lock:
+            self._collectors.append(collector)
+
+    def remove_collector(self, collector: Callable[[], None]):
+        with self._lock:
+            if collector in self._collectors:
+                self._collectors.remove(collector)
+
+    def _get_metrics(self) -> list[Metric]:
+        with self._lock:
+            return list(self._metrics.values())
+
+    def render(self) -> str:
+        with self._lock:
+            collectors = list(self._collectors)
+        for collector in collectors:
+            collector()
+        lines = []
+        for metric in self._get_metrics():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self) -> dict[str, dict]:
+        """Picklable values, to be merged into the registry of the parent"""
+        return {i.name: i.snapshot() for i in self._get_metrics()}
+
+    def merge(self, snapshot: dict[str, dict]):
+        """Adds counters and histograms of another process, gauges are skipped"""
+        with self._lock:
+            metrics = dict(self._metrics)
+        for name, values in snapshot.items():
+            if name in metrics:
+                metrics[name].merge(values)
+
+
+metrics = MetricsRegistry()
+
+HTTP_REQUEST_DURATION = metrics.histogram(
+    "http_request_duration_seconds",
+    "Latency of HTTP requests by route template",
+    labels=("method", "route", "status"),
+)
+HTTP_REQUESTS_IN_PROGRESS = metrics.gauge(
+    "http_requests_in_progress",
+    "HTTP requests being handled",
+    labels=("method",),
+)
+THREADPOOL_TOKENS = metrics.gauge(
+    "threadpool_tokens",
+    "Threads available to sync routes",
+)
+THREADPOOL_BORROWED_TOKENS = metrics.gauge(
+    "threadpool_borrowed_tokens",
+    "Threads busy with sync routes",
+)
+THREADPOOL_WAITING_TASKS = metrics.gauge(
+    "threadpool_waiting_tasks",
+    "Sync routes waiting for a free thread",
+)
+AQL_QUERIES = metrics.counter(
+    "aql_queries_total",
+    "AQL queries by the task which ran them",
+    labels=("task", "query", "status"),
+)
+AQL_QUERY_DURATION = metrics.histogram(
+    "aql_query_duration_seconds",
+    "Latency of AQL queries including the fetch of all batches",
+    labels=("task",),
+)
+GRPC_CALLS = metrics.counter(
+    "grpc_client_calls_total",
+    "Calls of the inventory gRPC service",
+    labels=("method", "code"),
+)
+GRPC_CALL_DURATION = metrics.histogram(
+    "grpc_client_call_duration_seconds",
+    "Latency of the inventory gRPC service including streamed responses",
+    labels=("method",),
+)
+GRAPH_BUILDS = metrics.counter(
+    "graph_builds_total",
+    "Finished graph builds",
+    labels=("status",),
+)
+BUILD_PHASE_DURATION = metrics.histogram(
+    "graph_build_phase_duration_seconds",
+    "Duration of every phase of a graph build",
+    labels=("phase",),
+    buckets=BUILD_BUCKETS,
+)
+UPDATER_MESSAGES = metrics.counter(
+    "updater_messages_total",
+    "Messages consumed by the updater of the graph",
+    labels=("graph",),
+)
+UPDATER_CONSUMER_LAG = metrics.gauge(
+    "updater_consumer_lag",
+    "Messages not consumed yet by the updater of the graph",
+    labels=("graph",),
+)
+
+
+@contextmanager
+def task_scope(task):
+    """Labels the AQL queries of the block with the class of the task"""
+    token = current_task.set(type(task).__name__)
+    try:
+        yield
+    finally:
+        current_task.reset(token)
+
+
+def observe_query(task: str, name: str, elapsed: float | None):
+    """elapsed is None for a failed query"""
+    status = "error" if elapsed is None else "ok"
+    AQL_QUERIES.inc(task=task, query=name, status=status)
+    if elapsed is not None:
+        AQL_QUERY_DURATION.observe(elapsed, task=task)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = metrics.render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Scrapes are not worth a line in the log
+        pass
+
+
+def start_metrics_server(
+    port: int,
+    host: str = "0.0.0.0",  # noqa: S104
+) -> ThreadingHTTPServer:
+    """Serves GET /metrics from a daemon thread, for processes without API"""
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    Thread(target=server.serve_forever, daemon=True).start()
+    return server
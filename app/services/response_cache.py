@@ -0,0 +1,194 @@
+from collections import OrderedDict
+from hashlib import sha1
+import json
+from sys import stderr
+from threading import Lock
+import time
+from typing import Any, Callable
+
+from arango.collection import StandardCollection
+from arango.exceptions import ArangoError
+from pydantic import BaseModel
+
+from config import ResponseCacheConfig
+
+
+def get_cache_key(key: str, endpoint: str, params: dict, revision: int) -> str:
+    params = json.dumps(params, sort_keys=True, default=str)
+    raw = f"{key}\n{endpoint}\n{revision}\n{params}"
+    return sha1(raw.encode()).hexdigest()
+
+
+class ArangoResponseCacheBackend:
+    """
+    Responses shared by all worker processes. Stored in a collection of
+    the system database, outdated entries are removed by a TTL index
+    """
+
+    def __init__(self, get_collection: Callable[[], StandardCollection]):
+        self._get_collection = get_collection
+        self._collection: StandardCollection | None = None
+        self._lock = Lock()
+
+    @property
+    def collection(self) -> StandardCollection:
+        with self._lock:
+            if self._collection is None:
+                collection = self._get_collection()
+                collection.add_index(
+                    {
+                        "type": "ttl",
+                        "fields": ["created"],
+                        "expireAfter": ResponseCacheConfig().shared_ttl,
+                        "name": "idx_response_cache_ttl",
+                    }
+                )
+                self._collection = collection
+            return self._collection
+
+    def get(self, cache_key: str) -> bytes | None:
+        try:
+            document = self.collection.get(cache_key)
+        except ArangoError as e:
+            print(f"Response cache is not available: {e}", file=stderr)
+            return None
+        if not document:
+            return None
+        return document["body"].encode()
+
+    def set(self, cache_key: str, key: str, revision: int, body: bytes):
+        document = {
+            "_key": cache_key,
+            "key": key,
+            "revision": revision,
+            "created": time.time(),
+            "body": body.decode(),
+        }
+        try:
+            self.collection.insert(document, overwrite=True, silent=True)
+        except ArangoError as e:
+            print(f"Response cache is not available: {e}", file=stderr)
+
+
+class ResponseCache:
+    """
+    Serialized responses of read endpoints keyed by the graph key, endpoint,
+    parameters and graph revision. Any change of the graph bumps its revision,
+    so an entry is never outdated, it is only not requested anymore.
+    Entries of older revisions are dropped as soon as a newer one is seen
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._entries: OrderedDict[str, tuple[str, int, bytes]] = OrderedDict()
+        self._revisions: dict[str, int] = {}
+        self._size = 0
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.backend: ArangoResponseCacheBackend | None = None
+
+    @property
+    def enabled(self) -> bool:
+        return ResponseCacheConfig().enabled
+
+    def _pop(self, cache_key: str):
+        _, _, body = self._entries.pop(cache_key)
+        self._size -= len(body)
+
+    def _check_revision(self, key: str, revision: int):
+        if self._revisions.get(key, -1) >= revision:
+            return
+        self._revisions[key] = revision
+        for cache_key, (entry_key, entry_revision, _) in list(
+            self._entries.items()
+        ):
+            if entry_key == key and entry_revision < revision:
+                self._pop(cache_key)
+
+    def _put(self, cache_key: str, key: str, revision: int, body: bytes):
+        config = ResponseCacheConfig()
+        if len(body) > config.max_bytes:
+            return
+        with self._lock:
+            self._check_revision(key=key, revision=revision)
+            if cache_key in self._entries:
+                self._pop(cache_key)
+            self._entries[cache_key] = (key, revision, body)
+            self._size += len(body)
+            while (
+                len(self._entries) > config.max_entries
+                or self._size > config.max_bytes
+            ):
+                self._pop(next(iter(self._entries)))
+
+    def get(
+        self, key: str, endpoint: str, params: dict, revision: int
+    ) -> bytes | None:
+        cache_key = get_cache_key(
+            key=key, endpoint=endpoint, params=params, revision=revision
+        )
+        with self._lock:
+            self._check_revision(key=key, revision=revision)
+            entry = self._entries.get(cache_key)
+            if entry is not None:
+                self._entries.move_to_end(cache_key)
+                self.hits += 1
+                return entry[2]
+        body = self.backend.get(cache_key) if self.backend else None
+        if body is None:
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.shared_hits += 1
+        self._put(cache_key=cache_key, key=key, revision=revision, body=body)
+        return body
+
+    def set(
+        self,
+        key: str,
+        endpoint: str,
+        params: dict,
+        revision: int,
+        body: bytes,
+    ):
+        cache_key = get_cache_key(
+            key=key, endpoint=endpoint, params=params, revision=revision
+        )
+        self._put(cache_key=cache_key, key=key, revision=revision, body=body)
+        if self.backend:
+            self.backend.set(
+                cache_key=cache_key, key=key, revision=revision, body=body
+            )
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._revisions.clear()
+            self._size = 0
+            self.hits = 0
+            self.shared_hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "shared": self.backend is not None,
+                "entries": len(self._entries),
+                "size": self._size,
+                "hits": self.hits,
+                "shared_hits": self.shared_hits,
+                "misses": self.misses,
+            }
+
+
+def serialize_response(response: Any, response_model: type[BaseModel]) -> bytes:
+    """Serializes the task result the way FastAPI does with by_alias=False"""
+    if not isinstance(response, response_model):
+        response = response_model.model_validate(response, from_attributes=True)
+    return response.model_dump_json(by_alias=False).encode()
+
+
+response_cache = ResponseCache()
@@ -0,0 +1,268 @@
+from abc import ABC, abstractmethod
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+import inspect
+import re
+from threading import Lock
+import time
+from typing import Any, Callable, Iterator
+
+from config import TracingConfig
+
+SERVER_TIMING_TOKEN_PATTERN = re.compile(r"[^A-Za-z0-9!#$%&'*+\-.^_`|~]")
+
+
+class Span:
+    """Timed step of a request. Spans started under another one are its children"""
+
+    def __init__(self, name: str, attributes: dict[str, Any] | None = None):
+        self.name = name
+        self.attributes = dict(attributes or {})
+        self.children: list[Span] = []
+        self.error: str | None = None
+        self._start_time = time.perf_counter()
+        self.duration: float | None = None
+
+    def finish(
+        self,
+        error: BaseException | None = None,
+        duration: float | None = None,
+        **attributes,
+    ):
+        """duration: measured by the caller instead of the wall time"""
+        if self.duration is not None:
+            return
+        if duration is None:
+            duration = time.perf_counter() - self._start_time
+        self.duration = duration
+        self.attributes.update(attributes)
+        if error is not None:
+            self.error = repr(error)
+
+    def walk(self) -> Iterator["Span"]:
+        yield self
+        for child in list(self.children):
+            yield from child.walk()
+
+    def as_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "duration": self.duration,
+            "attributes": self.attributes,
+            "error": self.error,
+            "children": [i.as_dict() for i in list(self.children)],
+        }
+
+
+class SpanExporter(ABC):
+    @abstractmethod
+    def export(self, span: Span):
+        """Receives every finished root span with its children"""
+        raise NotImplementedError()
+
+
+class InMemorySpanExporter(SpanExporter):
+    """Keeps the last root spans, for tests and debugging"""
+
+    def __init__(self, max_spans: int = 100):
+        self._lock = Lock()
+        self._spans: deque[Span] = deque(maxlen=max_spans)
+
+    def export(self, span: Span):
+        with self._lock:
+            self._spans.append(span)
+
+    @property
+    def spans(self) -> list[Span]:
+        with self._lock:
+            return list(self._spans)
+
+    def clear(self):
+        with self._lock:
+            self._spans.clear()
+
+
+_current_span: ContextVar[Span | None] = ContextVar(
+    "current_span", default=None
+)
+# Root spans of the HTTP request, for the Server-Timing header
+_request_spans: ContextVar[list[Span] | None] = ContextVar(
+    "request_spans", default=None
+)
+
+
+class Tracer:
+    """
+    Spans are recorded only under a root span, so code outside of
+    a task pays for a context variable lookup only
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._exporters: list[SpanExporter] = []
+
+    def add_exporter(self, exporter: SpanExporter):
+        with self._lock:
+            self._exporters.append(exporter)
+
+    def remove_exporter(self, exporter: SpanExporter):
+        with self._lock:
+            if exporter in self._exporters:
+                self._exporters.remove(exporter)
+
+    def _export(self, span: Span):
+        with self._lock:
+            exporters = list(self._exporters)
+        for exporter in exporters:
+            exporter.export(span)
+
+    @contextmanager
+    def root_span(self, name: str, **attributes) -> Iterator[Span | None]:
+        if not TracingConfig().enabled:
+            yield None
+            return
+        span = Span(name=name, attributes=attributes)
+        parent = _current_span.get()
+        if parent is not None:
+            # A task run by another task is a step of it
+            parent.children.append(span)
+        token = _current_span.set(span)
+        error = None
+        try:
+            yield span
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            _current_span.reset(token)
+            span.finish(error=error)
+            if parent is None:
+                request_spans = _request_spans.get()
+                if request_spans is not None:
+                    request_spans.append(span)
+                self._export(span)
+
+    def start_span(self, name: str, **attributes) -> Span | None:
+        """
+        Child of the current span which does not become current itself,
+        for work which ends in another context, e.g. a lazy cursor.
+        Has to be finished by the caller
+        """
+        parent = _current_span.get()
+        if parent is None:
+            return None
+        span = Span(name=name, attributes=attributes)
+        parent.children.append(span)
+        return span
+
+    @contextmanager
+    def span(self, name: str, **attributes) -> Iterator[Span | None]:
+        span = self.start_span(name, **attributes)
+        if span is None:
+            yield None
+            return
+        token = _current_span.set(span)
+        error = None
+        try:
+            yield span
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            _current_span.reset(token)
+            span.finish(error=error)
+
+    @contextmanager
+    def collect_request_spans(self) -> Iterator[list[Span]]:
+        spans = []
+        token = _request_spans.set(spans)
+        try:
+            yield spans
+        finally:
+            _request_spans.reset(token)
+
+
+tracer = Tracer()
+
+
+def traced(name: str | None = None) -> Callable:
+    """
+    Records a span for every call of the function.
+    The span of a generator lasts until it is exhausted or closed
+    """
+
+    def decorator(func: Callable) -> Callable:
+        span_name = name or func.__name__
+
+        if inspect.iscoroutinefunction(func):
+
+            @wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with tracer.span(span_name):
+                    return await func(*args, **kwargs)
+
+            return async_wrapper
+
+        if inspect.isgeneratorfunction(func):
+
+            @wraps(func)
+            def generator_wrapper(*args, **kwargs):
+                span = tracer.start_span(span_name)
+                error = None
+                try:
+                    yield from func(*args, **kwargs)
+                except BaseException as e:
+                    error = e
+                    raise
+                finally:
+                    if span is not None:
+                        span.finish(error=error)
+
+            return generator_wrapper
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with tracer.span(span_name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def get_bind_var_sizes(bind_vars: dict | None) -> dict[str, int]:
+    """Lengths of the collection bind parameters, values are not recorded"""
+    return {
+        k: len(v)
+        for k, v in (bind_vars or {}).items()
+        if isinstance(v, (list, tuple, set, frozenset, dict))
+    }
+
+
+def _server_timing_name(name: str) -> str:
+    return SERVER_TIMING_TOKEN_PATTERN.sub("_", name)
+
+
+def format_server_timing(spans: list[Span]) -> str:
+    """
+    Server-Timing header value. Root spans are listed one by one,
+    their descendants are summed up by name in the order of appearance
+    """
+    entries = []
+    steps: dict[str, list[float]] = {}
+    for root in spans:
+        entries.append(
+            f"{_server_timing_name(root.name)};dur={(root.duration or 0) * 1000:.1f}"
+        )
+        for span in root.walk():
+            if span is root or span.duration is None:
+                continue
+            steps.setdefault(span.name, []).append(span.duration)
+    for name, durations in steps.items():
+        entry = f"{_server_timing_name(name)};dur={sum(durations) * 1000:.1f}"
+        if len(durations) > 1:
+            entry = f'{entry};desc="{len(durations)} calls"'
+        entries.append(entry)
+    return ", ".join(entries)
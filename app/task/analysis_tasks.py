@@ -1,21 +1,172 @@
+import asyncio
 from collections import defaultdict
+from contextlib import aclosing
+import json
+from typing import AsyncIterator, Iterable, Iterator
 
+from config import GraphDBConfig
+from services.aql import (
+    execute_query,
+    execute_query_async,
+    iterate_query_async,
+)
 from services.graph import GraphService
+from services.response_cache import response_cache
+from services.tracing import traced
+from task.helpers.ancestors import get_ancestors, get_ancestors_async
 from task.helpers.convert_geometry_line import convert_geometry_line
-from task.models.dto import DbMoEdge, DbMoNode
-from task.models.enums import ConnectionType, Status
-from task.models.errors import NotFound
+from task.helpers.node_projection import (
+    get_node_model,
+    project_node,
+    project_nodes,
+)
+from task.helpers.page_token import SORT_ATTRIBUTES, PageToken
+from task.helpers.response_lines import iter_response_lines, to_line
+from task.helpers.top_level_view import get_top_level_view_binds
+from task.helpers.trusted_documents import TrustedDocuments
+from task.models.dto import DbMoEdge, DbMoNode, DbTmoNode
+from task.models.enums import ChildrenSort, Status
+from task.models.errors import NotFound, ValidationError
 from task.models.outgoing_data import (
     CollapseNodeResponse,
     CommutationResponse,
     MoEdgeResponse,
     MoNodeResponse,
+    MoNodeSlimResponse,
     NodeEdgeCommutationResponse,
     NodeEdgeTmoTprmResponse,
     TmoResponse,
     TPRMResponse,
 )
-from task.task_abstract import TaskAbstract, TaskChecks, TaskWithMaxSize
+from task.queries import (
+    CHILD_NODES,
+    CHILD_NODES_PAGE,
+    CHILD_SLIM_NODES,
+    CHILDREN_COUNT,
+    CHILDREN_COUNT_BY_TMO,
+    CHILDREN_COUNTS,
+    CHILDREN_LINKS,
+    CHILDREN_WITHIN,
+    COMMUTATION_TABLE,
+    EDGES_WITHIN,
+    LINE_POINT_EDGES,
+    NODES_BY_IDS,
+    PARENT_NODE,
+    TABLE_CHILD_TMOS,
+    TOP_LEVEL_COUNT,
+    TOP_LEVEL_NODES,
+    TOP_LEVEL_VIEW,
+    TOP_LEVEL_VIEW_COUNT,
+    project_node_on_request,
+)
+from task.task_abstract import (
+    AsyncTaskAbstract,
+    AsyncTaskChecks,
+    TaskAbstract,
+    TaskChecks,
+    TaskWithMaxSize,
+)
+
+
+def get_children_links_binds(
+    config: GraphDBConfig,
+    children_nodes: list[str],
+    neighbour_nodes: list[str],
+) -> dict:
+    children_nodes = [config.get_node_key(i) for i in children_nodes]
+    neighbour_nodes = [config.get_node_key(i) for i in neighbour_nodes]
+    neighbour_nodes.extend(children_nodes)
+    return {
+        "first": children_nodes,
+        "second": neighbour_nodes,
+        "@mainEdge": config.graph_data_edge_name,
+    }
+
+
+def get_commutation_table_binds(
+    config: GraphDBConfig, nodes: list[dict], tmo: dict, commutation_label: str
+) -> dict:
+    return {
+        "@mainEdge": config.graph_data_edge_name,
+        "nodeIds": [i["_id"] for i in nodes],
+        "busyParameterGroups": tmo.get("busy_parameter_groups") or [None],
+        "commutationLabel": commutation_label,
+    }
+
+
+def get_cached_commutation_table(
+    key: str, revision: int, binds: dict
+) -> dict[str, list[list]] | None:
+    """A commutation table is kept until the next revision of the graph"""
+    if not response_cache.enabled:
+        return None
+    body = response_cache.get(
+        key=key,
+        endpoint=COMMUTATION_TABLE.name,
+        params=binds,
+        revision=revision,
+    )
+    return json.loads(body) if body is not None else None
+
+
+def cache_commutation_table(
+    key: str, revision: int, binds: dict, table: dict[str, list[list]]
+):
+    if response_cache.enabled:
+        response_cache.set(
+            key=key,
+            endpoint=COMMUTATION_TABLE.name,
+            params=binds,
+            revision=revision,
+            body=json.dumps(table).encode(),
+        )
+
+
+def set_connected_with(
+    nodes: list[dict], table: dict[str, list[list]]
+) -> list[dict]:
+    """Adds a list of linked names per busy parameter group to every node"""
+    for node in nodes:
+        if not node.get("connected_with", None):
+            node["connected_with"] = []
+        node["connected_with"].extend(table.get(node["_id"], []))
+    return nodes
+
+
+def get_expand_size(counts_by_tmo: list[dict], table_tmo_ids: set[int]) -> int:
+    """Size of an expand response, nodes of a table TMO are one commutation"""
+    return sum(
+        1 if i["tmo"] in table_tmo_ids else i["count"] for i in counts_by_tmo
+    )
+
+
+def set_children_counts(
+    nodes: list[dict], counts: Iterable[dict]
+) -> list[dict]:
+    counts = {i["nodeId"]: i["count"] for i in counts}
+    for node in nodes:
+        node["children_count"] = counts.get(node["_id"], 0)
+    return nodes
+
+
+def split_geometry_lines(
+    config: GraphDBConfig, edges: list[MoEdgeResponse]
+) -> tuple[list[MoEdgeResponse], set[str], set[str]]:
+    """
+    Returns edges which are not geometry lines, ids of the line nodes and
+    ids of the nodes the lines connect
+    """
+    other_edges = []
+    geometry_line_sources = set()
+    geometry_line_to = set()
+    for edge in edges:
+        if not (edge.connection_type == "geometry_line" and edge.source_object):
+            other_edges.append(edge)
+            continue
+        geometry_line_sources.add(config.get_node_key(edge.source_object))
+        geometry_line_to.add(config.get_node_key(edge.target))
+        geometry_line_to.add(config.get_node_key(edge.source))
+    return other_edges, geometry_line_sources, geometry_line_to
 
 
 class GetTopLevelAnalysisTask(TaskAbstract, TaskWithMaxSize, TaskChecks):
@@ -24,9 +175,14 @@ class GetTopLevelAnalysisTask(TaskAbstract, TaskWithMaxSize, TaskChecks):
         graph_db: GraphService,
         key: str,
         max_size: int = 0,
+        return_children_count: bool = False,
+        fields: list[str] | None = None,
     ):
         TaskAbstract.__init__(self, graph_db=graph_db, key=key)
         TaskWithMaxSize.__init__(self, response_length=max_size)
+        self.return_children_count = return_children_count
+        # Attributes of the node data to return, None returns all
+        self.fields = fields
 
     def check(self):
         self.check_status(
@@ -36,21 +192,28 @@ class GetTopLevelAnalysisTask(TaskAbstract, TaskWithMaxSize, TaskChecks):
             document=self.document, tmo_collection=self.tmo_collection
         )
 
-    def _get_nodes_edges(self) -> NodeEdgeCommutationResponse:
-        start_from = self.config_collection.get({"_key": "start_from"})
-        tmo_id = (
-            start_from.get("tmo_id", self.document.tmo_id)
-            if start_from
-            else self.document.tmo_id
-        )
-        tmo_data = self._get_tmos_data(tmo_ids=[tmo_id])
-        tprm_id = start_from.get("tprm_id", None) if start_from else None
-        query = """
+    def _read_top_level_view(self) -> dict | None:
+        """The materialised top level, None when it was not stored"""
+        binds = {
+            **get_top_level_view_binds(task=self),
+            "mainCollection": self.config.graph_data_collection_name,
+            "mainEdge": self.config.graph_data_edge_name,
+            "fields": self.fields,
+        }
+        return next(
+            execute_query(
+                database=self.database, query=TOP_LEVEL_VIEW, bind_vars=binds
+            ),
+            None,
+        )
+
+    def _read_top_level(self) -> dict:
+        query = f"""
             LET nodes = (
                 FOR doc IN @@mainCollection
                     FILTER doc.tmo == @tmoId
                     FILTER doc.grouped_by_tprm == @tprmId
-                    RETURN doc
+                    RETURN {project_node_on_request("doc")}
                 )
 
             LET nodeIds = (
@@ -65,320 +228,115 @@ class GetTopLevelAnalysisTask(TaskAbstract, TaskWithMaxSize, TaskChecks):
                     RETURN edge
                 )
 
-            RETURN {"nodes": nodes, "edges": edges}
+            RETURN {{"nodes": nodes, "edges": edges}}
         """
         binds = {
-            "tmoId": tmo_id,
-            "tprmId": tprm_id,
+            "tmoId": self.start_from_tmo,
+            "tprmId": self.start_from_tprm,
+            "fields": self.fields,
             "@mainCollection": self.main_collection.name,
             "@edgeCollection": self.main_edge_collection.name,
         }
-        response = next(self.database.aql.execute(query=query, bind_vars=binds))
+        return next(
+            execute_query(database=self.database, query=query, bind_vars=binds)
+        )
+
+    def _get_nodes_edges(self) -> NodeEdgeCommutationResponse:
+        tmo_data = self._get_tmos_data(tmo_ids=[self.start_from_tmo])
+        response = self._read_top_level_view()
+        if response is None:
+            response = self._read_top_level()
+        if self.return_children_count:
+            self._set_children_counts(nodes=response["nodes"])
+        node_model = get_node_model(fields=self.fields)
+        response["nodes"] = [
+            node_model.model_validate(i) for i in response["nodes"]
+        ]
         response["tmo"] = [
             tmo.model_dump(by_alias=True, mode="json") for tmo in tmo_data
         ]
         response = NodeEdgeCommutationResponse.model_validate(response)
         return response
 
-    def execute(self):
-        response = self._get_nodes_edges()
-        response = self.check_response_length(response=response)
-        return response
-
-
-class ExpandNodesTask(TaskAbstract, TaskWithMaxSize, TaskChecks):
-    def __init__(
-        self,
-        graph_db: GraphService,
-        key: str,
-        node_key: str,
-        neighboring_node_keys: list[str],
-        expand_edges: bool,
-        max_size: int = 0,
-        return_commutation_label: bool = False,
-    ):
-        TaskAbstract.__init__(self, graph_db=graph_db, key=key)
-        TaskWithMaxSize.__init__(self, response_length=max_size)
-
-        self.node_key = node_key
-        self.commutation_label = "label" if return_commutation_label else "name"
-        self.neighboring_node_keys = list(
-            set(neighboring_node_keys).difference([node_key])
-        )
-        self.expand_edges = expand_edges
-
-    def check(self):
-        self.check_status(
-            document=self.document, possible_status=[Status.COMPLETE]
-        )
-        self.check_collection(
-            document=self.document, tmo_collection=self.tmo_collection
-        )
-        self.check_nodes(
-            keys=[*self.neighboring_node_keys, self.node_key],
-            database=self.database,
-            main_collection_name=self.main_collection.name,
+    @traced()
+    def check_nodes_count(self):
+        if not self._response_length:
+            return
+        count = next(
+            execute_query(
+                database=self.database,
+                query=TOP_LEVEL_VIEW_COUNT,
+                bind_vars=get_top_level_view_binds(task=self),
+            ),
+            None,
         )
+        if count is None:
+            binds = {
+                "tmoId": self.start_from_tmo,
+                "tprmId": self.start_from_tprm,
+                "@mainCollection": self.config.graph_data_collection_name,
+            }
+            count = next(
+                execute_query(
+                    database=self.database,
+                    query=TOP_LEVEL_COUNT,
+                    bind_vars=binds,
+                )
+            )
+        self.check_size(size=count)
 
-    def _get_child_nodes(self, node_key: str):
-        query = """
-            FOR v,e,p IN 1..1 INBOUND @nodeKey GRAPH @mainGraph
-                FILTER e.connection_type == "p_id"
-                RETURN v
-        """
+    def _set_children_counts(self, nodes: list[dict]):
         binds = {
-            "nodeKey": node_key,
-            "mainGraph": self.config.graph_data_graph_name,
+            "nodeIds": [i["_id"] for i in nodes],
+            "@mainEdgeCollection": self.config.graph_data_edge_name,
         }
-        response = list(self.database.aql.execute(query=query, bind_vars=binds))
-        return response
+        counts = execute_query(
+            database=self.database, query=CHILDREN_COUNTS, bind_vars=binds
+        )
+        set_children_counts(nodes=nodes, counts=counts)
 
-    def _get_children_links(
-        self, children_nodes: list[str], neighbour_nodes: list[str]
-    ) -> list[dict]:
-        query = """
-            FOR doc IN @@mainEdge
-                FILTER (doc._from IN @first AND doc._to IN @second) OR (doc._from IN @second AND doc._to IN @first)
-                RETURN doc
-                """
-        children_nodes = [self.config.get_node_key(i) for i in children_nodes]
-        neighbour_nodes = [self.config.get_node_key(i) for i in neighbour_nodes]
-        neighbour_nodes.extend(children_nodes)
-        binds = {
-            "first": children_nodes,
-            "second": neighbour_nodes,
-            "@mainEdge": self.config.graph_data_edge_name,
-        }
-        results = list(self.database.aql.execute(query=query, bind_vars=binds))
-        return results
+    def execute(self):
+        # Oversized requests fail before any node is fetched
+        self.check_nodes_count()
+        response = self._get_nodes_edges()
+        response = self.check_response_length(response=response)
+        return response
 
-    def group_as_params(
-        self,
-    ) -> list[dict]:
-        results = []
-        node = self.main_collection.get(document={"_key": self.node_key})
-        tmo_item = self.tmo_collection.get(document={"_key": str(node["tmo"])})
-        if not tmo_item["global_uniqueness"]:
-            return results
-        query = """
-            FOR v, e, p IN 1 INBOUND @nodeId GRAPH @tmoGraph
-                FILTER e.link_type == "p_id"
-                FILTER v.global_uniqueness == false
-                FILTER v.show_as_a_table != false
-                RETURN v
+    def stream(self) -> Iterator[dict]:
         """
-        binds = {
-            "nodeId": tmo_item["_id"],
-            "tmoGraph": self.config.tmo_graph_name,
-        }
-        results = list(self.database.aql.execute(query=query, bind_vars=binds))
-        return results
-
-    def replace_with_expanded_edges(
-        self, response: NodeEdgeCommutationResponse
-    ) -> NodeEdgeCommutationResponse:
-        if not response or not response.edges:
-            return response
-        edges = []
-        geometry_line_sources = set()
-        geometry_line_to = set()
-        for edge in response.edges:
-            if not (
-                edge.connection_type == "geometry_line" and edge.source_object
-            ):
-                edges.append(edge)
-                continue
-            geometry_line_sources.add(
-                self.config.get_node_key(edge.source_object)
-            )
-            geometry_line_to.add(self.config.get_node_key(edge.target))
-            geometry_line_to.add(self.config.get_node_key(edge.source))
-        if not geometry_line_sources:
-            return response
-
-        # nodes
-        nodes_query = """
-            FOR node IN @@mainCollection
-                FILTER node._id IN @nodeIds
-                RETURN node
+        Lines of the response written straight from the cursors,
+        without the max_size limit
         """
         binds = {
-            "nodeIds": list(geometry_line_sources),
-            "@mainCollection": self.main_collection.name,
+            "tmoId": self.start_from_tmo,
+            "tprmId": self.start_from_tprm,
+            "fields": self.fields,
+            "@mainCollection": self.config.graph_data_collection_name,
         }
-        new_nodes = []
-        for node in self.database.aql.execute(nodes_query, bind_vars=binds):
-            new_nodes.append(MoNodeResponse.model_validate(node))
-        response.nodes.extend(new_nodes)
-
-        # edges
-        edges_query = """
-            FOR edge IN @@edgeCollection
-                FILTER edge._from IN @fromNodes
-                FILTER edge._to IN @toNodes
-                FILTER edge.source_id IN @fromNodes
-                FILTER edge.connection_type IN ["point_a", "point_b"]
-                RETURN edge
-        """
+        node_model = get_node_model(fields=self.fields)
+        node_ids = []
+        for node in execute_query(
+            database=self.database,
+            query=TOP_LEVEL_NODES,
+            bind_vars=binds,
+            stream=True,
+        ):
+            node_ids.append(node["_id"])
+            yield to_line("node", node_model.model_validate(node))
         binds = {
-            "fromNodes": list(geometry_line_sources),
-            "toNodes": list(geometry_line_to),
-            "@edgeCollection": self.main_edge_collection.name,
+            "@edgeCollection": self.config.graph_data_edge_name,
+            "ids": node_ids,
         }
-        for edge in self.database.aql.execute(edges_query, bind_vars=binds):
-            edges.append(MoEdgeResponse.model_validate(edge))
-        response.edges = edges
-
-        # tmos
-        exclude_tmo_ids = {i.tmo_id for i in response.tmo}
-        tmo_ids = {i.tmo for i in new_nodes if i.tmo not in exclude_tmo_ids}
-        if tmo_ids:
-            tmo_data = [
-                TmoResponse.model_validate(
-                    tmo.model_dump(mode="json", by_alias=True)
-                )
-                for tmo in self._get_tmos_data(tmo_ids=list(tmo_ids))
-            ]
-            response.tmo.extend(tmo_data)
-        return response
-
-    def execute(self):
-        node_key = f"{self.main_collection.name}/{self.node_key}"
-        as_param_tmos = self.group_as_params()
-        if not as_param_tmos:
-            response = self.get_one_level(node_key=node_key)
-        else:
-            response = self.get_level_and_table(
-                node_key=node_key, as_param_tmos=as_param_tmos
-            )
-        if self.expand_edges:
-            self.replace_with_expanded_edges(response=response)
-        response = self.check_response_length(response=response)
-        return response
-
-    def get_one_level(self, node_key: str) -> NodeEdgeCommutationResponse:
-        children = self._get_child_nodes(node_key=node_key)
-        if not children:
-            raise NotFound("Children not found")
-
-        tmos = set()
-        children_keys = []
-        for node in children:
-            children_keys.append(node["_key"])
-            tmos.add(node["tmo"])
-        links = self._get_children_links(
-            children_nodes=children_keys,
-            neighbour_nodes=self.neighboring_node_keys,
-        )
-        tmo_data = [
-            tmo.model_dump(mode="json", by_alias=True)
-            for tmo in self._get_tmos_data(tmo_ids=list(tmos))
-        ]
-        return NodeEdgeCommutationResponse(
-            nodes=children, edges=links, tmo=tmo_data
-        )
-
-    def get_level_and_table(
-        self, node_key: str, as_param_tmos: list[dict]
-    ) -> NodeEdgeCommutationResponse:
-        def set_linked_commutations(_nodes: list[dict], _tmo: dict):
-            if not _nodes:
-                return
-            busy_parameter_groups = _tmo.get("busy_parameter_groups", [])
-            if not busy_parameter_groups:
-                busy_parameter_groups = [None]
-            for group in busy_parameter_groups:
-                tprms_filter = "FILTER doc.tprm IN @tprmIds" if group else ""
-                query = f"""
-                    FOR nodeId IN @nodeIds
-                        LET _to = (FOR doc IN @@mainEdge
-                            FILTER doc._from == nodeId
-                            FILTER doc.virtual == False
-                            FILTER doc.connection_type
-                                IN ["{ConnectionType.MO_LINK.value}", "{ConnectionType.TWO_WAY_MO_LINK.value}"]
-                            {tprms_filter}
-                            RETURN doc._to)
-                        LET connected_with = (FOR doc IN @@mainCollection
-                            FILTER doc._id IN _to
-                            RETURN DISTINCT doc.{self.commutation_label})
-                        RETURN {{"nodeId": nodeId, "connectedWith": connected_with}}
-                """
-                node_ids = []
-                nodes_by_ids = {}
-                for i in _nodes:
-                    node_ids.append(i["_id"])
-                    nodes_by_ids[i["_id"]] = i
-                binds = {
-                    "@mainEdge": self.main_edge_collection.name,
-                    "@mainCollection": self.main_collection.name,
-                    "nodeIds": node_ids,
-                }
-                if group:
-                    binds["tprmIds"] = group
-                if isinstance(group, list) and len(group) == 0:
-                    response_dict = {}
-                else:
-                    response_dict = {}
-                    for item in self.database.aql.execute(
-                        query=query, bind_vars=binds
-                    ):
-                        response_dict[item["nodeId"]] = item["connectedWith"]
-                for node_id, _node in nodes_by_ids.items():
-                    if not _node.get("connected_with", None):
-                        _node["connected_with"] = []
-                    busy_group_data = response_dict.get(node_id, [])
-                    _node["connected_with"].append(busy_group_data)
-            return _nodes
-
-        children = self._get_child_nodes(node_key=node_key)
-        if not children:
-            raise NotFound("Children not found")
-
-        as_param_tmo_ids = set([i["id"] for i in as_param_tmos])
-
-        parent_node = self.main_collection.get(node_key)
-        parent_node_name = parent_node["name"]
-        parent_node_label = parent_node.get("label", None)
-
-        unique = []
-        not_unique = defaultdict(list)  # tmo_id: list[dict]
-        tmos = set()
-        for node in children:
-            tmos.add(node["tmo"])
-            if node["tmo"] not in as_param_tmo_ids:
-                unique.append(node)
-            else:
-                not_unique[node["tmo"]].append(node)
-        tmo_data = [
-            tmo.model_dump(by_alias=True, mode="json")
-            for tmo in self._get_tmos_data(tmo_ids=list(tmos))
-        ]
-
-        commutations = []
-        for tmo in as_param_tmos:
-            tmo_id = tmo["id"]
-            if tmo_id not in not_unique:
-                continue
-            nodes = set_linked_commutations(_nodes=not_unique[tmo_id], _tmo=tmo)
-
-            commutation = CommutationResponse(
-                tmo_id=tmo_id,
-                tmo_name=tmo["name"],
-                parent_name=parent_node_name,
-                parent_label=parent_node_label,
-                nodes=nodes,
-            )
-
-            commutations.append(commutation)
-
-        children_keys = [i["_key"] for i in children]
-        links = self._get_children_links(
-            children_nodes=children_keys,
-            neighbour_nodes=self.neighboring_node_keys,
-        )
-        return NodeEdgeCommutationResponse(
-            nodes=unique, edges=links, commutation=commutations, tmo=tmo_data
-        )
+        for edge in execute_query(
+            database=self.database,
+            query=EDGES_WITHIN,
+            bind_vars=binds,
+            stream=True,
+        ):
+            yield to_line("edge", MoEdgeResponse.model_validate(edge))
+        for tmo in self._get_tmos_data(tmo_ids=[self.start_from_tmo]):
+            tmo = tmo.model_dump(by_alias=True, mode="json")
+            yield to_line("tmo", TmoResponse.model_validate(tmo))
 
 
 class CollapseNodesTask(TaskAbstract, TaskChecks):
@@ -401,31 +359,34 @@ class CollapseNodesTask(TaskAbstract, TaskChecks):
         )
 
     def _get_parent_node(self, node_id: str):
-        query = """
-            FOR v, e IN 1..1 OUTBOUND @nodeId GRAPH @mainGraph
-                FILTER e.connection_type == "p_id"
-                RETURN v
-        """
         binds = {
             "nodeId": node_id,
-            "mainGraph": self.config.graph_data_graph_name,
+            "@mainCollection": self.config.graph_data_collection_name,
+            "@mainEdgeCollection": self.config.graph_data_edge_name,
         }
-        response = list(self.database.aql.execute(query=query, bind_vars=binds))
+        response = list(
+            execute_query(
+                database=self.database, query=PARENT_NODE, bind_vars=binds
+            )
+        )
         if len(response) == 0:
             return None
         return response[0]
 
     def _get_child_nodes(self, node_id: str):
-        query = """
-                FOR v, e IN 1..1 INBOUND @nodeId GRAPH @mainGraph
-                    FILTER e.connection_type == "p_id"
-                    RETURN v
-                """
         binds = {
             "nodeId": node_id,
-            "mainGraph": self.config.graph_data_graph_name,
+            "@mainCollection": self.config.graph_data_collection_name,
+            "@mainEdgeCollection": self.config.graph_data_edge_name,
         }
-        response = list(self.database.aql.execute(query=query, bind_vars=binds))
+        response = list(
+            execute_query(
+                database=self.database,
+                query=CHILD_NODES,
+                bind_vars=binds,
+                stream=True,
+            )
+        )
         return response
 
     def execute(self):
@@ -469,21 +430,10 @@ class ExpandEdgesTask(TaskAbstract, TaskChecks):
 
     def get_tprms(self, edges: list[DbMoEdge]) -> list[TPRMResponse]:
         tprm_ids = [i.tprm for i in edges if i.tprm]
-        query = """
-            FOR doc IN @@tmoCollection
-                FOR param in doc.params
-                    FILTER param.id IN @tprmIds
-                    RETURN param
-        """
-        binds = {
-            "@tmoCollection": self.tmo_collection.name,
-            "tprmIds": tprm_ids,
-        }
-        result = [
+        return [
             TPRMResponse.model_validate(i)
-            for i in self.database.aql.execute(query=query, bind_vars=binds)
+            for i in self.tmo_index.get_tprms(tprm_ids)
         ]
-        return result
 
     def execute(self):
         query = """
@@ -501,67 +451,46 @@ class ExpandEdgesTask(TaskAbstract, TaskChecks):
             "@mainEdgeCollection": self.config.graph_data_edge_name,
             "nodeIds": node_ids,
         }
-        response = self.database.aql.execute(query=query, bind_vars=binds)
-        edges = [DbMoEdge.model_validate(i) for i in response]
+        response = execute_query(
+            database=self.database, query=query, bind_vars=binds
+        )
+        documents = TrustedDocuments()
+        edges = documents.construct_all(DbMoEdge, response)
         nodes, edges = convert_geometry_line(
             edges=edges,
             main_edge_collection=self.main_edge_collection.name,
             main_collection=self.main_collection.name,
             database=self.database,
+            documents=documents,
         )
         tmos = [
             tmo.model_dump(mode="json", by_alias=True)
             for tmo in self._get_tmos_data(tmo_ids=[i.tmo for i in nodes])
         ]
         tprms = self.get_tprms(edges=edges)
-        nodes = [
-            MoNodeResponse.model_validate(i.model_dump(by_alias=True))
-            for i in nodes
-        ]
-        edges = [
-            MoEdgeResponse.model_validate(i.model_dump(by_alias=True))
-            for i in edges
-        ]
         return NodeEdgeTmoTprmResponse(
-            nodes=nodes, edges=edges, tmo=tmos, tprm=tprms
+            nodes=documents.node_responses(nodes),
+            edges=documents.edge_responses(edges),
+            tmo=tmos,
+            tprm=tprms,
         )
 
 
-class GetNeighborsTask(TaskAbstract, TaskChecks):
-    def __init__(
-        self,
-        graph_db: GraphService,
-        key: str,
-        node_key: str,
-        n: int,
-        with_all_edges: bool,
-    ) -> None:
-        TaskAbstract.__init__(self, graph_db=graph_db, key=key)
-
-        self.n = n
-        self.node_key = node_key
-        self.with_all_edges = with_all_edges
+class NeighborsProcessing:
+    """Part of GetNeighborsTask which does not touch the database"""
 
-    def check(self):
-        self.check_status(
-            document=self.document, possible_status=[Status.COMPLETE]
-        )
-        self.check_collection(
-            document=self.document, tmo_collection=self.tmo_collection
-        )
-        self.check_nodes(
-            keys=[self.node_key],
-            database=self.database,
-            main_collection_name=self.main_collection.name,
-        )
+    config: GraphDBConfig
+    node_key: str
+    n: int
+    trace_tmo_id: int | None
+    documents: TrustedDocuments
 
-    def get_neighbors(
-        self, node: DbMoNode
-    ) -> tuple[list[DbMoNode], [list[DbMoEdge]]]:
+    @staticmethod
+    def _get_neighbors_query(node: DbMoNode) -> str:
         filter_by_real_only = ""
         if not node.grouped_by_tprm:
             filter_by_real_only = "FILTER IS_NULL(v.grouped_by_tprm)"
-        query = f"""
+        return f"""
             FOR v, e, p IN 1..@n ANY @nodeId GRAPH @mainGraph
                 OPTIONS {{uniqueVertices: "global", bfs: true}}
                 FILTER p.edges[*].connection_type ALL != "p_id"
@@ -569,112 +498,48 @@ class GetNeighborsTask(TaskAbstract, TaskChecks):
                 {filter_by_real_only}
                 RETURN {{"node": v, "edge": e}}
                 """
-        binds = {
+
+    def _get_neighbors_binds(self, node: DbMoNode) -> dict:
+        return {
             "nodeId": node.id,
             "mainGraph": self.config.graph_data_graph_name,
             "traceId": self.trace_tmo_id,
             "n": self.n,
         }
+
+    def _parse_neighbors(
+        self, response: Iterable[dict]
+    ) -> tuple[list[DbMoNode], list[DbMoEdge]]:
         nodes: list[DbMoNode] = []
         edges: list[DbMoEdge] = []
-        for item in self.database.aql.execute(query=query, bind_vars=binds):
-            result_node = DbMoNode.model_validate(item["node"])
-            nodes.append(result_node)
-            result_edge = DbMoEdge.model_validate(item["edge"])
-            edges.append(result_edge)
+        for item in response:
+            nodes.append(self.documents.construct(DbMoNode, item["node"]))
+            edges.append(self.documents.construct(DbMoEdge, item["edge"]))
         return nodes, edges
 
-    def drop_parents(
-        self, nodes: list[DbMoNode], edges: list[DbMoEdge]
-    ) -> tuple[list[DbMoNode], list[DbMoEdge]]:
-        if len(nodes) == 0:
-            return nodes, edges
-        current_node_id: str | None = self.config.get_node_key(self.node_key)
-        query = """
-            FOR edge in @@mainEdgeCollection
-                FILTER edge.connection_type == "p_id"
-                FILTER edge._from == @currentNodeId
-                LIMIT 1
-                RETURN edge._to
-        """
-        binds = {"@mainEdgeCollection": self.main_edge_collection.name}
-        parents = set()
-        while current_node_id:
-            binds["currentNodeId"] = current_node_id
-            response = list(
-                self.database.aql.execute(query=query, bind_vars=binds)
-            )
-            if not response:
-                break
-            parent = response[0]
-            parents.add(parent)
-            current_node_id = parent
+    def _get_within_binds(self, nodes: list[DbMoNode]) -> dict:
+        ids = [i.id for i in nodes]
+        ids.append(self.config.get_node_key(self.node_key))
+        return {"@edgeCollection": self.config.graph_data_edge_name, "ids": ids}
 
-        if not parents:
+    @staticmethod
+    def _drop_nodes(
+        nodes: list[DbMoNode], edges: list[DbMoEdge], node_ids: set[str]
+    ) -> tuple[list[DbMoNode], list[DbMoEdge]]:
+        """Drops the nodes and every edge connected to them"""
+        if not node_ids:
             return nodes, edges
-
-        nodes = [node for node in nodes if node.id not in parents]
+        nodes = [node for node in nodes if node.id not in node_ids]
         edges = [
             edge
             for edge in edges
-            if edge.from_ not in parents and edge.to_ not in parents
+            if edge.from_ not in node_ids and edge.to_ not in node_ids
         ]
         return nodes, edges
 
-    def drop_children_nodes(
-        self, nodes: list[DbMoNode], edges: list[DbMoEdge]
-    ) -> tuple[list[DbMoNode], [list[DbMoEdge]]]:
-        if len(nodes) == 0:
-            return nodes, edges
-        query = """
-            FOR doc IN @@edgeCollection
-                FILTER doc._from IN @ids
-                FILTER doc._to IN @ids
-                FILTER doc.connection_type == "p_id"
-                RETURN doc._from
-        """
-        ids = [i.id for i in nodes]
-        ids.append(self.config.get_node_key(self.node_key))
-        binds = {"@edgeCollection": self.main_edge_collection.name, "ids": ids}
-        response = set(self.database.aql.execute(query=query, bind_vars=binds))
-        if response:
-            cleared_nodes = []
-            for node in nodes:
-                if node.id in response:
-                    continue
-                cleared_nodes.append(node)
-            nodes = cleared_nodes
-
-            cleared_edges = []
-            for edge in edges:
-                if edge.from_ in response:
-                    continue
-                if edge.to_ in response:
-                    continue
-                cleared_edges.append(edge)
-            edges = cleared_edges
-        return nodes, edges
-
-    def find_all_edges(
-        self, nodes: list[DbMoNode], edges: list[DbMoEdge]
-    ) -> tuple[list[DbMoNode], [list[DbMoEdge]]]:
-        query = """
-            FOR edge in @@edgeCollection
-                FILTER edge._from IN @ids
-                FILTER edge._to IN @ids
-                RETURN edge
-        """
-        ids = [i.id for i in nodes]
-        current_node_id: str | None = self.config.get_node_key(self.node_key)
-        ids.append(current_node_id)
-        binds = {"@edgeCollection": self.main_edge_collection.name, "ids": ids}
-        response = self.database.aql.execute(query=query, bind_vars=binds)
-        edges = [DbMoEdge.model_validate(i) for i in response]
-        return nodes, edges
-
-    @staticmethod
-    def drop_geometry_type_line_nodes(
-        nodes: list[DbMoNode], edges: list[DbMoEdge]
+    @staticmethod
+    def drop_geometry_type_line_nodes(
+        nodes: list[DbMoNode], edges: list[DbMoEdge]
     ) -> tuple[list[DbMoNode], [list[DbMoEdge]]]:
         source_ids = {edge.source_id for edge in edges if edge.source_id}
         if not source_ids:
@@ -702,6 +567,102 @@ class GetNeighborsTask(TaskAbstract, TaskChecks):
         ]
         return nodes, edges
 
+    def _create_response(
+        self,
+        nodes: list[DbMoNode],
+        edges: list[DbMoEdge],
+        tmos: list[DbTmoNode],
+    ) -> NodeEdgeCommutationResponse:
+        return NodeEdgeCommutationResponse.model_construct(
+            nodes=self.documents.node_responses(nodes),
+            edges=self.documents.edge_responses(edges),
+            tmo=[
+                TmoResponse.model_validate(tmo.model_dump(by_alias=True))
+                for tmo in tmos
+            ],
+        )
+
+
+class GetNeighborsTask(NeighborsProcessing, TaskAbstract, TaskChecks):
+    def __init__(
+        self,
+        graph_db: GraphService,
+        key: str,
+        node_key: str,
+        n: int,
+        with_all_edges: bool,
+    ) -> None:
+        TaskAbstract.__init__(self, graph_db=graph_db, key=key)
+
+        self.n = n
+        self.node_key = node_key
+        self.with_all_edges = with_all_edges
+        self.documents = TrustedDocuments()
+
+    def check(self):
+        self.check_status(
+            document=self.document, possible_status=[Status.COMPLETE]
+        )
+        self.check_collection(
+            document=self.document, tmo_collection=self.tmo_collection
+        )
+        self.check_nodes(
+            keys=[self.node_key],
+            database=self.database,
+            main_collection_name=self.main_collection.name,
+        )
+
+    def get_neighbors(
+        self, node: DbMoNode
+    ) -> tuple[list[DbMoNode], [list[DbMoEdge]]]:
+        response = execute_query(
+            database=self.database,
+            query=self._get_neighbors_query(node=node),
+            bind_vars=self._get_neighbors_binds(node=node),
+            stream=True,
+        )
+        return self._parse_neighbors(response)
+
+    def drop_parents(
+        self, nodes: list[DbMoNode], edges: list[DbMoEdge]
+    ) -> tuple[list[DbMoNode], list[DbMoEdge]]:
+        if len(nodes) == 0:
+            return nodes, edges
+        ancestors = get_ancestors(
+            database=self.database,
+            config=self.config,
+            node_id=self.config.get_node_key(self.node_key),
+        )
+        parents = {i["_id"] for i in ancestors}
+        return self._drop_nodes(nodes=nodes, edges=edges, node_ids=parents)
+
+    def drop_children_nodes(
+        self, nodes: list[DbMoNode], edges: list[DbMoEdge]
+    ) -> tuple[list[DbMoNode], [list[DbMoEdge]]]:
+        if len(nodes) == 0:
+            return nodes, edges
+        response = set(
+            execute_query(
+                database=self.database,
+                query=CHILDREN_WITHIN,
+                bind_vars=self._get_within_binds(nodes=nodes),
+                stream=True,
+            )
+        )
+        return self._drop_nodes(nodes=nodes, edges=edges, node_ids=response)
+
+    def find_all_edges(
+        self, nodes: list[DbMoNode], edges: list[DbMoEdge]
+    ) -> tuple[list[DbMoNode], [list[DbMoEdge]]]:
+        response = execute_query(
+            database=self.database,
+            query=EDGES_WITHIN,
+            bind_vars=self._get_within_binds(nodes=nodes),
+            stream=True,
+        )
+        edges = self.documents.construct_all(DbMoEdge, response)
+        return nodes, edges
+
     def execute(self):
         node = DbMoNode.model_validate(
             self.main_collection.get({"_key": self.node_key})
@@ -718,19 +679,624 @@ class GetNeighborsTask(TaskAbstract, TaskChecks):
             nodes, edges = self.drop_geometry_type_line_nodes(
                 nodes=nodes, edges=edges
             )
-        tmos = [
-            tmo.model_dump(mode="json", by_alias=True)
-            for tmo in self._get_tmos_data(tmo_ids=[i.tmo for i in nodes])
-        ]
-        response = NodeEdgeCommutationResponse(
-            nodes=[
-                MoNodeResponse.model_validate(i.model_dump(by_alias=True))
-                for i in nodes
+        tmos = self._get_tmos_data(tmo_ids=[i.tmo for i in nodes])
+        return self._create_response(nodes=nodes, edges=edges, tmos=tmos)
+
+    def stream(self) -> Iterator[dict]:
+        yield from iter_response_lines(self.execute())
+
+
+class AsyncExpandNodesTask(AsyncTaskAbstract, TaskWithMaxSize, AsyncTaskChecks):
+    """Children of a node. Independent queries run concurrently"""
+
+    def __init__(
+        self,
+        graph_db: GraphService,
+        key: str,
+        node_key: str,
+        neighboring_node_keys: list[str],
+        expand_edges: bool,
+        max_size: int = 0,
+        return_commutation_label: bool = False,
+        return_children_count: bool = False,
+        page_size: int = 0,
+        sort_by: ChildrenSort = ChildrenSort.KEY,
+        page_token: str | None = None,
+        fields: list[str] | None = None,
+    ):
+        AsyncTaskAbstract.__init__(self, graph_db=graph_db, key=key)
+        TaskWithMaxSize.__init__(self, response_length=max_size)
+
+        self.node_key = node_key
+        self.commutation_label = "label" if return_commutation_label else "name"
+        self.neighboring_node_keys = list(
+            set(neighboring_node_keys).difference([node_key])
+        )
+        self.expand_edges = expand_edges
+        self.return_children_count = return_children_count
+        # 0 returns all children at once
+        self.page_size = page_size
+        self.sort_by = sort_by
+        self.page_token = page_token
+        self.next_page_token: str | None = None
+        # Attributes of the node data to return, None returns all
+        self.fields = fields
+
+    @traced()
+    def check_page_token(self) -> PageToken | None:
+        if not self.page_token:
+            return None
+        if not self.page_size:
+            raise ValidationError("page_token requires page_size")
+        token = PageToken.decode(self.page_token)
+        if token.node_key != self.node_key or token.sort_by != self.sort_by:
+            raise ValidationError(
+                "The page token belongs to another node or sort order"
+            )
+        return token
+
+    async def check(self):
+        self.check_status(
+            document=self.document, possible_status=[Status.COMPLETE]
+        )
+        self.check_page_token()
+        await asyncio.gather(
+            self.check_collection_async(
+                database=self.database, document=self.document
+            ),
+            self.check_nodes_async(
+                keys=[*self.neighboring_node_keys, self.node_key],
+                database=self.database,
+                main_collection_name=self.config.graph_data_collection_name,
+            ),
+        )
+
+    async def _get_children_page(self, binds: dict) -> list[dict]:
+        token = self.check_page_token()
+        binds.update(
+            {
+                "sortBy": SORT_ATTRIBUTES[self.sort_by],
+                "afterValue": token.value if token else None,
+                "afterKey": token.key if token else None,
+                "fields": self.fields,
+                # One more node tells that there is a next page
+                "limit": self.page_size + 1,
+            }
+        )
+        children = await execute_query_async(
+            database=self.database, query=CHILD_NODES_PAGE, bind_vars=binds
+        )
+        if len(children) > self.page_size:
+            children = children[: self.page_size]
+            self.next_page_token = PageToken.after(
+                node_key=self.node_key, sort_by=self.sort_by, node=children[-1]
+            ).encode()
+        return children
+
+    async def _get_child_nodes(self, node_id: str) -> list[dict]:
+        binds = {
+            "nodeId": node_id,
+            "@mainCollection": self.config.graph_data_collection_name,
+            "@mainEdgeCollection": self.config.graph_data_edge_name,
+        }
+        if self.page_size:
+            children = await self._get_children_page(binds=binds)
+        elif self.fields is not None:
+            binds["fields"] = self.fields
+            children = await execute_query_async(
+                database=self.database, query=CHILD_SLIM_NODES, bind_vars=binds
+            )
+        else:
+            children = await execute_query_async(
+                database=self.database, query=CHILD_NODES, bind_vars=binds
+            )
+        if self.return_children_count and children:
+            binds = {
+                "nodeIds": [i["_id"] for i in children],
+                "@mainEdgeCollection": self.config.graph_data_edge_name,
+            }
+            counts = await execute_query_async(
+                database=self.database, query=CHILDREN_COUNTS, bind_vars=binds
+            )
+            set_children_counts(nodes=children, counts=counts)
+        return children
+
+    async def _get_children_count(self) -> int | None:
+        if not self._response_length:
+            return None
+        binds = {
+            "nodeId": self.config.get_node_key(self.node_key),
+            "@mainEdgeCollection": self.config.graph_data_edge_name,
+        }
+        response = await execute_query_async(
+            database=self.database, query=CHILDREN_COUNT, bind_vars=binds
+        )
+        return response[0]
+
+    @traced()
+    async def check_children_count(
+        self, count: int | None, as_param_tmos: list[dict]
+    ):
+        if count is None:
+            return
+        if self.page_size:
+            # Only one page of children is fetched
+            count = min(count, self.page_size)
+        if count > self._response_length and as_param_tmos:
+            # Nodes of table TMOs are collapsed into commutations
+            binds = {
+                "nodeId": self.config.get_node_key(self.node_key),
+                "@mainCollection": self.config.graph_data_collection_name,
+                "@mainEdgeCollection": self.config.graph_data_edge_name,
+            }
+            counts_by_tmo = await execute_query_async(
+                database=self.database,
+                query=CHILDREN_COUNT_BY_TMO,
+                bind_vars=binds,
+            )
+            count = get_expand_size(
+                counts_by_tmo=counts_by_tmo,
+                table_tmo_ids={i["id"] for i in as_param_tmos},
+            )
+            if self.page_size:
+                count = min(count, self.page_size)
+        self.check_size(size=count)
+
+    async def _get_children_links(
+        self, children_nodes: list[str], neighbour_nodes: list[str]
+    ) -> list[dict]:
+        binds = get_children_links_binds(
+            config=self.config,
+            children_nodes=children_nodes,
+            neighbour_nodes=neighbour_nodes,
+        )
+        return await execute_query_async(
+            database=self.database, query=CHILDREN_LINKS, bind_vars=binds
+        )
+
+    async def group_as_params(self) -> list[dict]:
+        node = await self.database.get_document(
+            collection=self.config.graph_data_collection_name,
+            key=self.node_key,
+        )
+        tmo_item = await self.database.get_document(
+            collection=self.config.tmo_collection_name, key=str(node["tmo"])
+        )
+        if not tmo_item["global_uniqueness"]:
+            return []
+        binds = {
+            "nodeId": tmo_item["_id"],
+            "tmoGraph": self.config.tmo_graph_name,
+        }
+        return await execute_query_async(
+            database=self.database, query=TABLE_CHILD_TMOS, bind_vars=binds
+        )
+
+    async def _set_linked_commutations(
+        self, nodes: list[dict], tmo: dict
+    ) -> list[dict]:
+        binds = get_commutation_table_binds(
+            config=self.config,
+            nodes=nodes,
+            tmo=tmo,
+            commutation_label=self.commutation_label,
+        )
+        revision = self.document.revision
+        table = get_cached_commutation_table(
+            key=self.key, revision=revision, binds=binds
+        )
+        if table is None:
+            response = await execute_query_async(
+                database=self.database, query=COMMUTATION_TABLE, bind_vars=binds
+            )
+            table = response[0]
+            cache_commutation_table(
+                key=self.key, revision=revision, binds=binds, table=table
+            )
+        return set_connected_with(nodes=nodes, table=table)
+
+    def _validate_nodes(
+        self, nodes: list[dict]
+    ) -> list[MoNodeResponse] | list[MoNodeSlimResponse]:
+        node_model = get_node_model(fields=self.fields)
+        return [node_model.model_validate(i) for i in nodes]
+
+    async def get_one_level(
+        self, children: list[dict]
+    ) -> NodeEdgeCommutationResponse:
+        tmos = {node["tmo"] for node in children}
+        links, tmo_data = await asyncio.gather(
+            self._get_children_links(
+                children_nodes=[node["_key"] for node in children],
+                neighbour_nodes=self.neighboring_node_keys,
+            ),
+            self._get_tmos_data(tmo_ids=list(tmos)),
+        )
+        return NodeEdgeCommutationResponse(
+            nodes=self._validate_nodes(children),
+            edges=links,
+            tmo=[
+                tmo.model_dump(mode="json", by_alias=True) for tmo in tmo_data
             ],
-            edges=[
-                MoEdgeResponse.model_validate(i.model_dump(by_alias=True))
-                for i in edges
+        )
+
+    async def get_level_and_table(
+        self, children: list[dict], as_param_tmos: list[dict]
+    ) -> NodeEdgeCommutationResponse:
+        as_param_tmo_ids = set([i["id"] for i in as_param_tmos])
+        unique = []
+        not_unique = defaultdict(list)  # tmo_id: list[dict]
+        tmos = set()
+        for node in children:
+            tmos.add(node["tmo"])
+            if node["tmo"] not in as_param_tmo_ids:
+                unique.append(node)
+            else:
+                not_unique[node["tmo"]].append(node)
+        linked_tmos = [i for i in as_param_tmos if i["id"] in not_unique]
+
+        parent_node, tmo_data, links, *linked_nodes = await asyncio.gather(
+            self.database.get_document(
+                collection=self.config.graph_data_collection_name,
+                key=self.node_key,
+            ),
+            self._get_tmos_data(tmo_ids=list(tmos)),
+            self._get_children_links(
+                children_nodes=[i["_key"] for i in children],
+                neighbour_nodes=self.neighboring_node_keys,
+            ),
+            *(
+                self._set_linked_commutations(nodes=not_unique[i["id"]], tmo=i)
+                for i in linked_tmos
+            ),
+        )
+        commutations = [
+            CommutationResponse(
+                tmo_id=tmo["id"],
+                tmo_name=tmo["name"],
+                parent_name=parent_node["name"],
+                parent_label=parent_node.get("label", None),
+                nodes=self._validate_nodes(nodes),
+            )
+            for tmo, nodes in zip(linked_tmos, linked_nodes)
+        ]
+        return NodeEdgeCommutationResponse(
+            nodes=self._validate_nodes(unique),
+            edges=links,
+            commutation=commutations,
+            tmo=[
+                tmo.model_dump(by_alias=True, mode="json") for tmo in tmo_data
             ],
-            tmo=tmos,
         )
+
+    async def replace_with_expanded_edges(
+        self, response: NodeEdgeCommutationResponse
+    ) -> NodeEdgeCommutationResponse:
+        if not response or not response.edges:
+            return response
+        edges, geometry_line_sources, geometry_line_to = split_geometry_lines(
+            config=self.config, edges=response.edges
+        )
+        if not geometry_line_sources:
+            return response
+
+        nodes_binds = {
+            "nodeIds": list(geometry_line_sources),
+            "@mainCollection": self.config.graph_data_collection_name,
+        }
+        edges_binds = {
+            "fromNodes": list(geometry_line_sources),
+            "toNodes": list(geometry_line_to),
+            "@edgeCollection": self.config.graph_data_edge_name,
+        }
+        new_nodes, new_edges = await asyncio.gather(
+            execute_query_async(
+                database=self.database,
+                query=NODES_BY_IDS,
+                bind_vars=nodes_binds,
+            ),
+            execute_query_async(
+                database=self.database,
+                query=LINE_POINT_EDGES,
+                bind_vars=edges_binds,
+            ),
+        )
+        if self.fields is not None:
+            new_nodes = [project_node(i, fields=self.fields) for i in new_nodes]
+        node_model = get_node_model(fields=self.fields)
+        new_nodes = [node_model.model_validate(i) for i in new_nodes]
+        response.nodes.extend(new_nodes)
+        edges.extend(MoEdgeResponse.model_validate(i) for i in new_edges)
+        response.edges = edges
+
+        exclude_tmo_ids = {i.tmo_id for i in response.tmo}
+        tmo_ids = {i.tmo for i in new_nodes if i.tmo not in exclude_tmo_ids}
+        if tmo_ids:
+            response.tmo.extend(
+                TmoResponse.model_validate(
+                    tmo.model_dump(mode="json", by_alias=True)
+                )
+                for tmo in await self._get_tmos_data(tmo_ids=list(tmo_ids))
+            )
         return response
+
+    async def execute(self):
+        # Oversized requests fail before any child is fetched
+        as_param_tmos, count = await asyncio.gather(
+            self.group_as_params(), self._get_children_count()
+        )
+        await self.check_children_count(
+            count=count, as_param_tmos=as_param_tmos
+        )
+        children = await self._get_child_nodes(
+            node_id=self.config.get_node_key(self.node_key)
+        )
+        if not children:
+            raise NotFound("Children not found")
+        if not as_param_tmos:
+            response = await self.get_one_level(children=children)
+        else:
+            response = await self.get_level_and_table(
+                children=children, as_param_tmos=as_param_tmos
+            )
+        if self.expand_edges:
+            response = await self.replace_with_expanded_edges(response=response)
+        response.next_page_token = self.next_page_token
+        return self.check_response_length(response=response)
+
+    async def stream(self) -> AsyncIterator[dict]:
+        """
+        Lines of the response written straight from the cursors,
+        without the max_size limit. Nodes shown as a table are sent
+        as commutations after the other nodes
+        """
+        as_param_tmos = {i["id"]: i for i in await self.group_as_params()}
+        binds = {
+            "nodeId": self.config.get_node_key(self.node_key),
+            "@mainCollection": self.config.graph_data_collection_name,
+            "@mainEdgeCollection": self.config.graph_data_edge_name,
+        }
+        children_keys = []
+        tmos = set()
+        table_nodes = defaultdict(list)  # tmo_id: list[dict]
+        async with aclosing(
+            iterate_query_async(
+                database=self.database,
+                query=CHILD_NODES,
+                bind_vars=binds,
+                stream=True,
+            )
+        ) as nodes:
+            async for node in nodes:
+                children_keys.append(node["_key"])
+                tmos.add(node["tmo"])
+                if node["tmo"] in as_param_tmos:
+                    table_nodes[node["tmo"]].append(node)
+                else:
+                    yield to_line("node", MoNodeResponse.model_validate(node))
+        if not children_keys:
+            raise NotFound("Children not found")
+
+        if table_nodes:
+            parent_node = await self.database.get_document(
+                collection=self.config.graph_data_collection_name,
+                key=self.node_key,
+            )
+            for tmo_id, nodes in table_nodes.items():
+                tmo = as_param_tmos[tmo_id]
+                nodes = await self._set_linked_commutations(
+                    nodes=nodes, tmo=tmo
+                )
+                commutation = CommutationResponse(
+                    tmo_id=tmo_id,
+                    tmo_name=tmo["name"],
+                    parent_name=parent_node["name"],
+                    parent_label=parent_node.get("label", None),
+                    nodes=self._validate_nodes(nodes),
+                )
+                yield to_line("commutation", commutation)
+
+        binds = get_children_links_binds(
+            config=self.config,
+            children_nodes=children_keys,
+            neighbour_nodes=self.neighboring_node_keys,
+        )
+        geometry_lines = []
+        async with aclosing(
+            iterate_query_async(
+                database=self.database,
+                query=CHILDREN_LINKS,
+                bind_vars=binds,
+                stream=True,
+            )
+        ) as edges:
+            async for edge in edges:
+                edge = MoEdgeResponse.model_validate(edge)
+                if (
+                    self.expand_edges
+                    and edge.connection_type == "geometry_line"
+                    and edge.source_object
+                ):
+                    geometry_lines.append(edge)
+                else:
+                    yield to_line("edge", edge)
+
+        if geometry_lines:
+            expanded = await self.replace_with_expanded_edges(
+                response=NodeEdgeCommutationResponse(
+                    nodes=[], edges=geometry_lines, tmo=[]
+                )
+            )
+            for node in expanded.nodes:
+                tmos.add(node.tmo)
+                yield to_line("node", node)
+            for edge in expanded.edges:
+                yield to_line("edge", edge)
+
+        for tmo in await self._get_tmos_data(tmo_ids=list(tmos)):
+            tmo = tmo.model_dump(by_alias=True, mode="json")
+            yield to_line("tmo", TmoResponse.model_validate(tmo))
+
+
+class AsyncGetNeighborsTask(
+    NeighborsProcessing, AsyncTaskAbstract, AsyncTaskChecks
+):
+    """GetNeighborsTask for async routes, independent queries run concurrently"""
+
+    def __init__(
+        self,
+        graph_db: GraphService,
+        key: str,
+        node_key: str,
+        n: int,
+        with_all_edges: bool,
+        fields: list[str] | None = None,
+    ) -> None:
+        AsyncTaskAbstract.__init__(self, graph_db=graph_db, key=key)
+
+        self.n = n
+        self.node_key = node_key
+        self.with_all_edges = with_all_edges
+        self.documents = TrustedDocuments()
+        # Attributes of the node data to return, None returns all
+        self.fields = fields
+
+    async def check(self):
+        self.check_status(
+            document=self.document, possible_status=[Status.COMPLETE]
+        )
+        await asyncio.gather(
+            self.check_collection_async(
+                database=self.database, document=self.document
+            ),
+            self.check_nodes_async(
+                keys=[self.node_key],
+                database=self.database,
+                main_collection_name=self.config.graph_data_collection_name,
+            ),
+        )
+
+    async def get_neighbors(
+        self, node: DbMoNode
+    ) -> tuple[list[DbMoNode], list[DbMoEdge]]:
+        response = await execute_query_async(
+            database=self.database,
+            query=self._get_neighbors_query(node=node),
+            bind_vars=self._get_neighbors_binds(node=node),
+        )
+        return self._parse_neighbors(response)
+
+    async def get_parents(self) -> set[str]:
+        ancestors = await get_ancestors_async(
+            database=self.database,
+            config=self.config,
+            node_id=self.config.get_node_key(self.node_key),
+        )
+        return {i["_id"] for i in ancestors}
+
+    async def drop_children_nodes(
+        self, nodes: list[DbMoNode], edges: list[DbMoEdge]
+    ) -> tuple[list[DbMoNode], list[DbMoEdge]]:
+        if len(nodes) == 0:
+            return nodes, edges
+        response = await execute_query_async(
+            database=self.database,
+            query=CHILDREN_WITHIN,
+            bind_vars=self._get_within_binds(nodes=nodes),
+        )
+        return self._drop_nodes(
+            nodes=nodes, edges=edges, node_ids=set(response)
+        )
+
+    async def find_all_edges(
+        self, nodes: list[DbMoNode], edges: list[DbMoEdge]
+    ) -> tuple[list[DbMoNode], list[DbMoEdge]]:
+        response = await execute_query_async(
+            database=self.database,
+            query=EDGES_WITHIN,
+            bind_vars=self._get_within_binds(nodes=nodes),
+        )
+        edges = self.documents.construct_all(DbMoEdge, response)
+        return nodes, edges
+
+    async def execute(self):
+        node = DbMoNode.model_validate(
+            await self.database.get_document(
+                collection=self.config.graph_data_collection_name,
+                key=self.node_key,
+            )
+        )
+        # The parents chain does not depend on the neighbors
+        (nodes, edges), parents = await asyncio.gather(
+            self.get_neighbors(node=node), self.get_parents()
+        )
+        nodes, edges = self._drop_nodes(
+            nodes=nodes, edges=edges, node_ids=parents
+        )
+        nodes, edges = await self.drop_children_nodes(nodes=nodes, edges=edges)
+        if self.with_all_edges:
+            nodes, edges = await self.find_all_edges(nodes=nodes, edges=edges)
+            nodes, edges = self.drop_geometry_type_line_edges(
+                nodes=nodes, edges=edges
+            )
+        else:
+            nodes, edges = self.drop_geometry_type_line_nodes(
+                nodes=nodes, edges=edges
+            )
+        tmos = await self._get_tmos_data(tmo_ids=[i.tmo for i in nodes])
+        response = self._create_response(nodes=nodes, edges=edges, tmos=tmos)
+        if self.fields is not None:
+            # The traversal needs whole nodes, they are projected here
+            response.nodes = project_nodes(response.nodes, fields=self.fields)
+        return response
+
+
+class AsyncCollapseNodesTask(AsyncTaskAbstract, AsyncTaskChecks):
+    """CollapseNodesTask for async routes"""
+
+    def __init__(self, graph_db: GraphService, key: str, node_key: str):
+        AsyncTaskAbstract.__init__(self, graph_db=graph_db, key=key)
+
+        self.node_key = node_key
+
+    async def check(self):
+        self.check_status(
+            document=self.document, possible_status=[Status.COMPLETE]
+        )
+        await asyncio.gather(
+            self.check_collection_async(
+                database=self.database, document=self.document
+            ),
+            self.check_nodes_async(
+                keys=[self.node_key],
+                database=self.database,
+                main_collection_name=self.config.graph_data_collection_name,
+            ),
+        )
+
+    async def execute(self):
+        binds = {
+            "nodeId": self.config.get_node_key(self.node_key),
+            "@mainCollection": self.config.graph_data_collection_name,
+            "@mainEdgeCollection": self.config.graph_data_edge_name,
+        }
+        response = await execute_query_async(
+            database=self.database, query=PARENT_NODE, bind_vars=binds
+        )
+        if not response:
+            raise NotFound("Parent node not found")
+        collapse_to = response[0]
+        binds["nodeId"] = collapse_to["_id"]
+        tmo_data, collapse_from = await asyncio.gather(
+            self._get_tmos_data(tmo_ids=[collapse_to["tmo"]]),
+            execute_query_async(
+                database=self.database, query=CHILD_NODES, bind_vars=binds
+            ),
+        )
+        return CollapseNodeResponse(
+            collapse_from=collapse_from,
+            collapse_to=collapse_to,
+            tmo=[
+                tmo.model_dump(mode="json", by_alias=True) for tmo in tmo_data
+            ],
+        )
@@ -0,0 +1,173 @@
+import asyncio
+
+from services.graph import GraphService
+from task.analysis_tasks import (
+    AsyncCollapseNodesTask,
+    AsyncExpandNodesTask,
+    AsyncGetNeighborsTask,
+)
+from task.helpers.node_projection import project_nodes
+from task.models.enums import BatchOperationType, Status
+from task.models.errors import NotFound
+from task.models.incoming_data import BatchOperation
+from task.models.outgoing_data import (
+    BatchAnalysisResponse,
+    BatchOperationResult,
+    CollapseNodeResponse,
+    MoEdgeResponse,
+    MoNodeResponse,
+    MoNodeSlimResponse,
+    NodeEdgeCommutationResponse,
+    TmoResponse,
+)
+from task.task_abstract import (
+    AsyncTaskAbstract,
+    AsyncTaskChecks,
+    TaskWithMaxSize,
+)
+
+# Every operation runs several queries at once on the shared async client
+MAX_BATCH_OPERATIONS = 20
+
+
+class BatchAnalysisTask(AsyncTaskAbstract, TaskWithMaxSize, AsyncTaskChecks):
+    """
+    Expand, collapse and neighbors operations of one graph in one request.
+    The graph record, the checks and the TMO lookups are shared by all
+    operations, which run concurrently
+    """
+
+    def __init__(
+        self,
+        graph_db: GraphService,
+        key: str,
+        operations: list[BatchOperation],
+        max_size: int = 0,
+        return_commutation_label: bool = False,
+        expand_edges: bool = False,
+        return_children_count: bool = False,
+        fields: list[str] | None = None,
+    ):
+        AsyncTaskAbstract.__init__(self, graph_db=graph_db, key=key)
+        TaskWithMaxSize.__init__(self, response_length=max_size)
+
+        self.operations = operations
+        self.return_commutation_label = return_commutation_label
+        self.expand_edges = expand_edges
+        self.return_children_count = return_children_count
+        self.fields = fields
+        self.tasks = [self._create_task(i) for i in operations]
+
+    def _create_task(self, operation: BatchOperation) -> AsyncTaskAbstract:
+        match operation.operation:
+            case BatchOperationType.EXPAND:
+                return AsyncExpandNodesTask(
+                    graph_db=self.graph_db,
+                    key=self.key,
+                    node_key=operation.node_key,
+                    neighboring_node_keys=operation.neighboring_node_keys,
+                    expand_edges=self.expand_edges,
+                    max_size=self._response_length,
+                    return_commutation_label=self.return_commutation_label,
+                    return_children_count=self.return_children_count,
+                    fields=self.fields,
+                )
+            case BatchOperationType.COLLAPSE:
+                return AsyncCollapseNodesTask(
+                    graph_db=self.graph_db,
+                    key=self.key,
+                    node_key=operation.node_key,
+                )
+            case BatchOperationType.NEIGHBORS:
+                return AsyncGetNeighborsTask(
+                    graph_db=self.graph_db,
+                    key=self.key,
+                    node_key=operation.node_key,
+                    n=operation.n,
+                    with_all_edges=operation.with_all_edges,
+                    fields=self.fields,
+                )
+
+    async def load(self):
+        await AsyncTaskAbstract.load(self)
+        for task in self.tasks:
+            task.load_from(self)
+
+    async def check(self):
+        self.check_status(
+            document=self.document, possible_status=[Status.COMPLETE]
+        )
+        keys = set()
+        for operation in self.operations:
+            keys.add(operation.node_key)
+            keys.update(operation.neighboring_node_keys)
+        await asyncio.gather(
+            self.check_collection_async(
+                database=self.database, document=self.document
+            ),
+            self.check_nodes_async(
+                keys=list(keys),
+                database=self.database,
+                main_collection_name=self.config.graph_data_collection_name,
+            ),
+        )
+
+    @staticmethod
+    async def _execute(
+        task: AsyncTaskAbstract,
+    ) -> NodeEdgeCommutationResponse | CollapseNodeResponse | NotFound:
+        # One operation without result does not fail the others
+        try:
+            return await task.execute()
+        except NotFound as e:
+            return e
+
+    def _project(
+        self, nodes: list[MoNodeResponse]
+    ) -> list[MoNodeResponse] | list[MoNodeSlimResponse]:
+        if self.fields is None:
+            return nodes
+        return project_nodes(nodes, fields=self.fields)
+
+    async def execute(self):
+        responses = await asyncio.gather(
+            *(self._execute(task) for task in self.tasks)
+        )
+        nodes: dict[str, MoNodeResponse | MoNodeSlimResponse] = {}
+        edges: dict[str, MoEdgeResponse] = {}
+        tmos: dict[int, TmoResponse] = {}
+        results = []
+        for operation, response in zip(self.operations, responses):
+            result = BatchOperationResult(
+                operation=operation.operation, node_key=operation.node_key
+            )
+            results.append(result)
+            if isinstance(response, NotFound):
+                result.error = str(response)
+                continue
+            if isinstance(response, CollapseNodeResponse):
+                collapse_to, *operation_nodes = self._project(
+                    [response.collapse_to, *response.collapse_from]
+                )
+                result.collapse_to = collapse_to.key
+                nodes.setdefault(collapse_to.key, collapse_to)
+                operation_edges = []
+            else:
+                result.commutation = response.commutation
+                operation_nodes = response.nodes
+                operation_edges = response.edges
+            for node in operation_nodes:
+                nodes.setdefault(node.key, node)
+                result.nodes.append(node.key)
+            for edge in operation_edges:
+                edges.setdefault(edge.key, edge)
+                result.edges.append(edge.key)
+            for tmo in response.tmo:
+                tmos.setdefault(tmo.tmo_id, tmo)
+        response = BatchAnalysisResponse(
+            nodes=list(nodes.values()),
+            edges=list(edges.values()),
+            tmo=list(tmos.values()),
+            operations=results,
+        )
+        return self.check_response_length(response=response)
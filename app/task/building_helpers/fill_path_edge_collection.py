@@ -3,6 +3,7 @@ from __future__ import annotations
 from arango import DocumentInsertError
 from pydantic import BaseModel, Field
 
+from services.aql import execute_query
 from task.models.errors import GraphBuildingError
 from task.task_abstract import TaskAbstract
 
@@ -29,7 +30,9 @@ def get_unique_connections(task: TaskAbstract) -> set[UniqueFromToEdge]:
             RETURN DISTINCT {"_from": edge._from, "_to": edge._to}
     """
     binds = {"@mainEdgeCollection": task.main_edge_collection.name}
-    response = task.database.aql.execute(query=query, bind_vars=binds)
+    response = execute_query(
+        database=task.database, query=query, bind_vars=binds, stream=True
+    )
     unique_connections = set()
     for item in response:
         edge = UniqueFromToEdge.model_validate(item)
@@ -3,6 +3,8 @@ from itertools import groupby
 import json
 from typing import Iterator
 
+from config import AqlConfig
+from services.aql import execute_query
 from services.inventory import InventoryInterface
 from task.building_helpers.build_from_tmo import save_edges, save_mo_nodes_chunk
 from task.building_helpers.get_tprm_data import get_tprm_data
@@ -127,6 +129,7 @@ def get_nodes_by_tprm(
                     LIMIT 1
                     RETURN edge)
 
+            SORT edges[0]._to, param.value
             RETURN {"id": doc._id, "mo_ids": doc.mo_ids, "tmo_id": doc.tmo, "param": param, "p_edges": edges,
                     "p_id": doc.data.p_id}
         """
@@ -135,12 +138,22 @@ def get_nodes_by_tprm(
         "@mainEdgeCollection": task.config.graph_data_edge_name,
         "tprmId": tprm_id,
     }
-    response = list(task.database.aql.execute(query=query, bind_vars=binds))
-    response = sorted(response, key=sort_by_parent)
+    # Records come sorted by parent and value, so groups are consumed
+    # straight from the cursor without loading the whole result. Unlike
+    # the async read paths, which materialise small responses, this runs
+    # over every node of the graph and must stay lazy. The cursor is not
+    # a stream one: the caller changes p_id edges the query reads. Every
+    # group is written before the next fetch, hence the build ttl
+    response = execute_query(
+        database=task.database,
+        query=query,
+        bind_vars=binds,
+        ttl=AqlConfig().build_ttl,
+    )
     for p_edge_id, p_id_records in groupby(response, sort_by_parent):
         if p_edge_id == "":
             p_edge_id = None
-        p_id_records = sorted(p_id_records, key=lambda x: x["param"]["value"])
+        p_id_records = list(p_id_records)
         p_id = p_id_records[0]["p_id"]
         for param_value, param_records in groupby(
             p_id_records, lambda x: x["param"]["value"]
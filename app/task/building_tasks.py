@@ -1,9 +1,12 @@
 from datetime import datetime
+from functools import partial
+from typing import Callable
 
 from arango.exceptions import AQLQueryExecuteError
 
 from services.graph import GraphService, IfNotExistType
 from services.inventory import InventoryInterface
+from services.metrics import BUILD_PHASE_DURATION, GRAPH_BUILDS
 from task.building_helpers.add_breadcrumbs import add_breadcrumbs
 from task.building_helpers.build_from_tmo import build_from_tmo
 from task.building_helpers.build_links_from_tmo import build_links_from_tmo
@@ -21,6 +24,10 @@ from task.building_helpers.forward_service_connections_by_mo_links import (
 )
 from task.building_helpers.group_nodes import group_nodes
 from task.building_helpers.spread_connections import spread_connections
+from task.helpers.top_level_view import (
+    TOP_LEVEL_VIEW_KEY,
+    refresh_top_level_view,
+)
 from task.models.building import HierarchicalDbTmo
 from task.models.dto import DbTmoNode
 from task.models.enums import Status
@@ -107,13 +114,8 @@ class DeleteOrhanBranchesSubtask(TaskAbstract, TaskChecks):
     def find_unrelated_tmos(
         self, tree: list[HierarchicalDbTmo]
     ) -> list[HierarchicalDbTmo]:
-        start_tmo = self.document.tmo_id
         # replace if installed another
-        start_from = self.config_collection.get({"_key": "start_from"})
-        if start_from:
-            start_from = start_from.get("tmo_id")
-            if start_from:
-                start_tmo = start_from
+        start_tmo = self.start_from_tmo or self.document.tmo_id
         # find start node
         start_node = None
         for i in tree:
@@ -215,9 +217,11 @@ class RunBuildingTask(TaskAbstract, TaskChecks):
         self.system_main_collection.insert(
             self.document.model_dump(mode="json", by_alias=True),
             overwrite=True,
-            overwrite_mode="replace",
+            overwrite_mode="update",
             keep_none=True,
         )
+        # The graph data has been changed or is about to be changed
+        self.bump_revision()
         # Let's reset. To request the document again at the next step
         self._document = None
 
@@ -260,6 +264,12 @@ class RunBuildingTask(TaskAbstract, TaskChecks):
         start_from_tmo = DbTmoNode.model_validate(start_from_tmo)
         build_links_from_tmo(tmo=start_from_tmo, task=self)
 
+    @staticmethod
+    def run_phase(phase: Callable[[], None]):
+        func = phase.func if isinstance(phase, partial) else phase
+        with BUILD_PHASE_DURATION.time(phase=func.__qualname__):
+            phase()
+
     def execute(self):
         print(f"Process {self.key} started")
         # COLLECTIONS CREATION
@@ -272,6 +282,7 @@ class RunBuildingTask(TaskAbstract, TaskChecks):
             if_exist=IfNotExistType.RETURN_NONE,
         )
         # Clearing the previous state
+        self.config_collection.delete(TOP_LEVEL_VIEW_KEY, ignore_missing=True)
         self.main_collection.truncate()
         self.main_edge_collection.truncate()
         self.main_path_collection.truncate()
@@ -282,22 +293,27 @@ class RunBuildingTask(TaskAbstract, TaskChecks):
             self.update_document()
 
             # Main code. Attention: The order of execution is very important
-            self.build_as_in_inventory()
-            self.build_trace_as_in_inventory()
-            self.create_links()
-            fill_path_edge_collection(task=self)
-            forward_service_connections_by_mo_links(task=self)
-            group_nodes(task=self, inventory=self.inventory)
-            forward_line_connections(task=self)
-            spread_connections(task=self)
-            connect_service_by_lines(task=self)
-            add_breadcrumbs(task=self)
-
+            phases = [
+                self.build_as_in_inventory,
+                self.build_trace_as_in_inventory,
+                self.create_links,
+                partial(fill_path_edge_collection, task=self),
+                partial(forward_service_connections_by_mo_links, task=self),
+                partial(group_nodes, task=self, inventory=self.inventory),
+                partial(forward_line_connections, task=self),
+                partial(spread_connections, task=self),
+                partial(connect_service_by_lines, task=self),
+                partial(add_breadcrumbs, task=self),
+            ]
             if self.delete_orphan_branches_status:
                 delete_task = DeleteOrhanBranchesSubtask(
                     graph_db=self.graph_db, key=self.key
                 )
-                delete_task.execute()
+                phases.append(delete_task.execute)
+            # Reads the final top level, so it always runs last
+            phases.append(partial(refresh_top_level_view, task=self))
+            for phase in phases:
+                self.run_phase(phase)
 
             # Status after
             self.document.status = Status.COMPLETE
@@ -308,9 +324,11 @@ class RunBuildingTask(TaskAbstract, TaskChecks):
             self.document.status = Status.ERROR
             self.document.error_description = str(e)
             self.update_document()
+            GRAPH_BUILDS.inc(status=Status.ERROR.value)
 
             raise GraphBuildingError(
                 f"Error when building a graph with key {self.key}"
             ) from e
         else:
+            GRAPH_BUILDS.inc(status=Status.COMPLETE.value)
             print(f"{datetime.now()} Process {self.key} finished")
@@ -54,5 +54,6 @@ class SetBusyParametersTask(TaskAbstract, TaskChecks):
         except DocumentRevisionError | DocumentUpdateError:
             raise ValidationError("Cannot update commutation tprms")
         else:
+            self.bump_revision()
             updated_tmo = TmoNodeResponse.model_validate(response["new"])
             return updated_tmo
@@ -46,5 +46,6 @@ class SetCommutationTprmsTask(TaskAbstract, TaskChecks):
         except DocumentRevisionError | DocumentUpdateError:
             raise ValidationError("Cannot update commutation tprms")
         else:
+            self.bump_revision()
             updated_tmo = TmoNodeResponse.model_validate(response["new"])
             return updated_tmo
@@ -1,13 +1,14 @@
+from services.aql import execute_query
 from services.graph import GraphService
 from task.helpers.convert_geometry_line import convert_geometry_line
+from task.helpers.trusted_documents import TrustedDocuments
 from task.models.dto import DbMoEdge
 from task.models.enums import Status
 from task.models.outgoing_data import (
-    MoEdgeResponse,
-    MoNodeResponse,
     NodeEdgeTmoTprmResponse,
     TPRMResponse,
 )
+from task.queries import EDGES_WITHIN
 from task.task_abstract import TaskAbstract, TaskChecks
 
 
@@ -35,55 +36,39 @@ class FindEdgesBetweenNodesTask(TaskAbstract, TaskChecks):
         )
 
     def find(self):
-        query = """
-            FOR edge IN @@mainEdgeCollection
-                FILTER edge._from IN @nodeIds
-                FILTER edge._to IN @nodeIds
-                RETURN edge
-        """
         binds = {
-            "@mainEdgeCollection": self.main_edge_collection.name,
-            "nodeIds": [self.config.get_node_key(i) for i in self.node_keys],
+            "@edgeCollection": self.main_edge_collection.name,
+            "ids": [self.config.get_node_key(i) for i in self.node_keys],
         }
-        response = list(self.database.aql.execute(query=query, bind_vars=binds))
+        response = list(
+            execute_query(
+                database=self.database, query=EDGES_WITHIN, bind_vars=binds
+            )
+        )
         return response
 
     def get_tprms(self, edges: list[DbMoEdge]) -> list[TPRMResponse]:
         tprm_ids = [i.tprm for i in edges if i.tprm]
-        query = """
-            FOR doc IN @@tmoCollection
-                FOR param in doc.params
-                    FILTER param.id IN @tprmIds
-                    RETURN param
-        """
-        binds = {
-            "@tmoCollection": self.tmo_collection.name,
-            "tprmIds": tprm_ids,
-        }
-        result = [
+        return [
             TPRMResponse.model_validate(i)
-            for i in self.database.aql.execute(query=query, bind_vars=binds)
+            for i in self.tmo_index.get_tprms(tprm_ids)
         ]
-        return result
 
     def execute(self):
-        edges = [DbMoEdge.model_validate(i) for i in self.find()]
+        documents = TrustedDocuments()
+        edges = documents.construct_all(DbMoEdge, self.find())
         nodes, edges = convert_geometry_line(
             edges=edges,
             main_edge_collection=self.main_edge_collection.name,
             main_collection=self.main_collection.name,
             database=self.database,
+            documents=documents,
         )
         tmos = []
         tprms = self.get_tprms(edges=edges)
-        edges = [
-            MoEdgeResponse.model_validate(i.model_dump(by_alias=True))
-            for i in edges
-        ]
-        nodes = [
-            MoNodeResponse.model_validate(i.model_dump(by_alias=True))
-            for i in nodes
-        ]
         return NodeEdgeTmoTprmResponse(
-            nodes=nodes, edges=edges, tmo=tmos, tprm=tprms
+            nodes=documents.node_responses(nodes),
+            edges=documents.edge_responses(edges),
+            tmo=tmos,
+            tprm=tprms,
         )
@@ -1,10 +1,12 @@
 from arango.collection import StandardCollection
 
 from config import GraphDBConfig
+from services.aql import execute_query
 from services.graph import GraphService
 from services.inventory import InventoryInterface
 from task.models.enums import Status
 from task.models.errors import NotFound
+from task.queries import GRAPHS_WITH_TMO, NODES_BY_MO_ID
 
 
 class FindNodesByMoId:
@@ -38,12 +40,6 @@ class FindNodesByMoId:
             raise NotFound("TMO not found")
 
     def get_graphs_with_tmo_id(self):
-        query = """
-            FOR doc IN @@mainCollection
-                FILTER doc.status == @status
-                FILTER @tmoId IN doc.active_tmo_ids
-                RETURN doc
-        """
         tmo_id = self.tmo_id()
         binds = {
             "@mainCollection": self.config.main_graph_collection_name,
@@ -51,25 +47,27 @@ class FindNodesByMoId:
             "status": Status.COMPLETE.value,
         }
         response = list(
-            self.graph_db.sys_db.aql.execute(query=query, bind_vars=binds)
+            execute_query(
+                database=self.graph_db.sys_db,
+                query=GRAPHS_WITH_TMO,
+                bind_vars=binds,
+            )
         )
         return response
 
     def find_mo_id_in_graphs(self, graphs: list[dict]):
         results = {}  # {db_key: list[doc]}
-        query = """
-            FOR doc IN @@mainCollection
-                FILTER doc.data.id == @moId
-                RETURN doc
-
-        """
         binds = {
             "@mainCollection": self.config.graph_data_collection_name,
             "moId": self.mo_id,
         }
         for graph in graphs:
             db = self.graph_db.get_database(name=graph["database"])
-            docs = list(db.aql.execute(query=query, bind_vars=binds))
+            docs = list(
+                execute_query(
+                    database=db, query=NODES_BY_MO_ID, bind_vars=binds
+                )
+            )
             if not docs:
                 continue
             results[graph["_key"]] = docs
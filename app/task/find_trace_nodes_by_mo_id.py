@@ -2,10 +2,19 @@ from arango.collection import StandardCollection
 import deprecation
 
 from config import GraphDBConfig
+from services.aql import execute_query
 from services.graph import GraphService
 from services.inventory import InventoryInterface
-from task.models.enums import ConnectionType, Status
+from task.models.enums import Status
 from task.models.errors import NotFound
+from task.queries import (
+    GRAPHS_WITH_TMO,
+    GRAPHS_WITH_TMOS,
+    TRACE_NODE_BY_MO_ID,
+    TRACE_NODES_BY_MO_IDS,
+    TRACED_NODE_BY_MO_ID,
+    TRACED_NODES_BY_MO_IDS,
+)
 
 
 @deprecation.deprecated(details="Use FindTraceNodesByMoIds")
@@ -40,12 +49,6 @@ class FindTraceNodesByMoId:
             raise NotFound("TMO not found")
 
     def get_graphs_with_tmo_id(self):
-        query = """
-            FOR doc IN @@mainCollection
-                FILTER doc.status == @status
-                FILTER @tmoId IN doc.active_tmo_ids
-                RETURN doc
-        """
         tmo_id = self.tmo_id()
         binds = {
             "@mainCollection": self.config.main_graph_collection_name,
@@ -53,32 +56,16 @@ class FindTraceNodesByMoId:
             "status": Status.COMPLETE.value,
         }
         response = list(
-            self.graph_db.sys_db.aql.execute(query=query, bind_vars=binds)
+            execute_query(
+                database=self.graph_db.sys_db,
+                query=GRAPHS_WITH_TMO,
+                bind_vars=binds,
+            )
         )
         return response
 
     def find_mo_id_in_graphs(self, graphs: list[dict]):
         results = {}  # {db_key: list[doc]}
-        query_is_trace_item = f"""
-            FOR doc in @@mainCollection
-                FILTER doc.tmo == @traceTmoId
-                FILTER doc.data.id == @moId
-                FOR v, e IN 1..1 INBOUND doc._id GRAPH @mainGraph
-                    FILTER e.connection_type
-                        IN ["{ConnectionType.MO_LINK.value}", "{ConnectionType.TWO_WAY_MO_LINK.value}"]
-                    LIMIT 1
-                    RETURN DISTINCT doc
-        """
-        query = f"""
-            FOR doc IN @@mainCollection
-                FILTER doc.data.id == @moId
-                FOR v, e IN 1..1 OUTBOUND doc._id GRAPH @mainGraph
-                    FILTER e.connection_type
-                    IN ["{ConnectionType.MO_LINK.value}", "{ConnectionType.TWO_WAY_MO_LINK.value}"]
-                    FILTER v.tmo == @traceTmoId
-                    LIMIT 1
-                    RETURN DISTINCT doc
-        """
         binds = {
             "@mainCollection": self.config.graph_data_collection_name,
             "moId": self.mo_id,
@@ -94,10 +81,16 @@ class FindTraceNodesByMoId:
             trace_tmo_id = trace["tmo_id"]
             binds["traceTmoId"] = trace_tmo_id
             docs = list(
-                db.aql.execute(query=query_is_trace_item, bind_vars=binds)
+                execute_query(
+                    database=db, query=TRACE_NODE_BY_MO_ID, bind_vars=binds
+                )
             )
             if not docs:
-                docs = list(db.aql.execute(query=query, bind_vars=binds))
+                docs = list(
+                    execute_query(
+                        database=db, query=TRACED_NODE_BY_MO_ID, bind_vars=binds
+                    )
+                )
             if not docs:
                 continue
             results[graph["_key"]] = docs
@@ -153,12 +146,6 @@ class FindTraceNodesByMoIds:
             raise NotFound("TMO not found")
 
     def get_graphs_with_tmo_ids(self):
-        query = """
-            FOR doc IN @@mainCollection
-                FILTER doc.status == @status
-                FILTER @tmoIds ANY IN doc.active_tmo_ids
-                RETURN doc
-        """
         tmo_ids = self.tmo_ids()
         binds = {
             "@mainCollection": self.config.main_graph_collection_name,
@@ -166,30 +153,16 @@ class FindTraceNodesByMoIds:
             "status": Status.COMPLETE.value,
         }
         response = list(
-            self.graph_db.sys_db.aql.execute(query=query, bind_vars=binds)
+            execute_query(
+                database=self.graph_db.sys_db,
+                query=GRAPHS_WITH_TMOS,
+                bind_vars=binds,
+            )
         )
         return response
 
     def find_mo_ids_in_graphs(self, graphs: list[dict]):
         results = {}  # {db_key: list[doc]}
-        query_is_trace_item = f"""
-            FOR doc in @@mainCollection
-                FILTER doc.tmo == @traceTmoId
-                FILTER doc.data.id IN @moIds
-                FOR v, e IN 1..1 INBOUND doc._id GRAPH @mainGraph
-                    FILTER e.connection_type
-                        IN ["{ConnectionType.MO_LINK.value}", "{ConnectionType.TWO_WAY_MO_LINK.value}"]
-                    RETURN DISTINCT doc
-        """
-        query = f"""
-            FOR doc IN @@mainCollection
-                FILTER doc.data.id IN @moIds
-                FOR v, e IN 1..1 OUTBOUND doc._id GRAPH @mainGraph
-                    FILTER e.connection_type
-                    IN ["{ConnectionType.MO_LINK.value}", "{ConnectionType.TWO_WAY_MO_LINK.value}"]
-                    FILTER v.tmo == @traceTmoId
-                    RETURN DISTINCT doc
-        """
         binds = {
             "@mainCollection": self.config.graph_data_collection_name,
             "moIds": self.mo_ids,
@@ -205,10 +178,18 @@ class FindTraceNodesByMoIds:
             trace_tmo_id = trace["tmo_id"]
             binds["traceTmoId"] = trace_tmo_id
             docs = list(
-                db.aql.execute(query=query_is_trace_item, bind_vars=binds)
+                execute_query(
+                    database=db, query=TRACE_NODES_BY_MO_IDS, bind_vars=binds
+                )
             )
             if not docs:
-                docs = list(db.aql.execute(query=query, bind_vars=binds))
+                docs = list(
+                    execute_query(
+                        database=db,
+                        query=TRACED_NODES_BY_MO_IDS,
+                        bind_vars=binds,
+                    )
+                )
             if not docs:
                 continue
             results[graph["_key"]] = docs
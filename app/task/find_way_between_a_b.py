@@ -4,11 +4,13 @@ from arango import AQLQueryExecuteError
 from pydantic import BaseModel, Field, computed_field
 
 from config import PathFinderConfig
+from services.aql import execute_query
 from services.graph import GraphService
 from task.models.dto import DbMoEdge, DbMoNode, DbTmoNode, Path
 from task.models.enums import ConnectionType, Status, TrackingType
 from task.models.errors import TimeOutError
 from task.models.outgoing_data import PathResponse
+from task.queries import K_SHORTEST_PATHS, PATH_EDGES_WITHIN, PATH_REAL_EDGES
 from task.task_abstract import TaskAbstract, TaskChecks
 from task.trace_levels_task import Tracker
 from task.trace_tasks import _get_straight_way
@@ -63,18 +65,6 @@ class FindPathBetweenNodesTask(TaskAbstract, TaskChecks):
         self.check_view_exists(database=self.database)
 
     def replace_with_real_edges(self, raw_data: list[dict]):
-        query = """
-            FOR connection in @connections
-                LET connectionEdge = (FOR edge IN @@mainEdgeCollection
-                        FILTER edge.virtual == false
-                        FILTER edge.is_trace == false
-                        FILTER (edge._from == connection._from AND edge._to == connection._to)
-                            OR (edge._to == connection._from AND edge._from == connection._to)
-                        SORT edge.connection_type DESC
-                        LIMIT 1
-                        RETURN edge)
-                RETURN FIRST(connectionEdge)
-        """
         binds = {"@mainEdgeCollection": self.main_edge_collection.name}
         for shortest_path in raw_data:
             path_edges = shortest_path["edges"]
@@ -82,17 +72,15 @@ class FindPathBetweenNodesTask(TaskAbstract, TaskChecks):
                 continue
             binds["connections"] = path_edges
             response = list(
-                self.database.aql.execute(query=query, bind_vars=binds)
+                execute_query(
+                    database=self.database,
+                    query=PATH_REAL_EDGES,
+                    bind_vars=binds,
+                )
             )
             shortest_path["edges"] = response
 
     def find(self) -> list[Path]:
-        query = """
-            FOR p IN ANY K_SHORTEST_PATHS @point_a TO @point_b
-                GRAPH @pathGraph
-                LIMIT @limit
-                RETURN p
-        """
         binds = {
             "point_a": self.config.get_node_key(self.node_key_a),
             "point_b": self.config.get_node_key(self.node_key_b),
@@ -100,12 +88,16 @@ class FindPathBetweenNodesTask(TaskAbstract, TaskChecks):
             "limit": self.search_limit,
         }
         try:
-            response = self.database.aql.execute(query=query, bind_vars=binds)
+            response = execute_query(
+                database=self.database, query=K_SHORTEST_PATHS, bind_vars=binds
+            )
         except AQLQueryExecuteError:
             try:
                 binds["limit"] = 1
-                response = self.database.aql.execute(
-                    query=query, bind_vars=binds
+                response = execute_query(
+                    database=self.database,
+                    query=K_SHORTEST_PATHS,
+                    bind_vars=binds,
                 )
             except AQLQueryExecuteError:
                 raise TimeOutError(
@@ -164,18 +156,13 @@ class FindPathBetweenNodesTask(TaskAbstract, TaskChecks):
         if not nodes:
             return []
         node_ids = [i.id for i in nodes]
-        query = """
-            FOR edge in @@mainEdgeCollection
-                FILTER edge._from IN @nodeIds
-                FILTER edge._to IN @nodeIds
-                FILTER edge.connection_type != "geometry_line"
-                RETURN edge
-        """
         binds = {
             "nodeIds": node_ids,
             "@mainEdgeCollection": self.main_edge_collection.name,
         }
-        response = self.database.aql.execute(query=query, bind_vars=binds)
+        response = execute_query(
+            database=self.database, query=PATH_EDGES_WITHIN, bind_vars=binds
+        )
         edges = [DbMoEdge.model_validate(i) for i in response]
         return edges
 
@@ -0,0 +1,76 @@
+from arango.database import StandardDatabase
+
+from config import GraphDBConfig
+from services.aql import execute_query, execute_query_async
+from services.async_graph import AsyncDatabase
+from task.queries import ANCESTORS_BY_BREADCRUMBS, ANCESTORS_BY_TRAVERSAL
+
+
+def _get_breadcrumbs_binds(config: GraphDBConfig, node_id: str) -> dict:
+    return {
+        "nodeId": node_id,
+        "mainCollection": config.graph_data_collection_name,
+        "@mainEdgeCollection": config.graph_data_edge_name,
+    }
+
+
+def _get_traversal_binds(config: GraphDBConfig, node_id: str) -> dict:
+    return {
+        "nodeId": node_id,
+        "@mainEdgeCollection": config.graph_data_edge_name,
+    }
+
+
+def _parse_breadcrumbs(response: list[dict]) -> list[dict] | None:
+    """Ancestors from the breadcrumbs, None if they are stale"""
+    if not response or not response[0]["valid"]:
+        return None
+    return response[0]["ancestors"]
+
+
+def get_ancestors(
+    database: StandardDatabase, config: GraphDBConfig, node_id: str
+) -> list[dict]:
+    """
+    Ancestor nodes, root first, resolved from the breadcrumbs of the node
+    in one query. Stale breadcrumbs fall back to the p_id edges traversal
+    """
+    ancestors = _parse_breadcrumbs(
+        list(
+            execute_query(
+                database=database,
+                query=ANCESTORS_BY_BREADCRUMBS,
+                bind_vars=_get_breadcrumbs_binds(
+                    config=config, node_id=node_id
+                ),
+            )
+        )
+    )
+    if ancestors is not None:
+        return ancestors
+    response = execute_query(
+        database=database,
+        query=ANCESTORS_BY_TRAVERSAL,
+        bind_vars=_get_traversal_binds(config=config, node_id=node_id),
+    )
+    return list(reversed(list(response)))
+
+
+async def get_ancestors_async(
+    database: AsyncDatabase, config: GraphDBConfig, node_id: str
+) -> list[dict]:
+    ancestors = _parse_breadcrumbs(
+        await execute_query_async(
+            database=database,
+            query=ANCESTORS_BY_BREADCRUMBS,
+            bind_vars=_get_breadcrumbs_binds(config=config, node_id=node_id),
+        )
+    )
+    if ancestors is not None:
+        return ancestors
+    response = await execute_query_async(
+        database=database,
+        query=ANCESTORS_BY_TRAVERSAL,
+        bind_vars=_get_traversal_binds(config=config, node_id=node_id),
+    )
+    return list(reversed(response))
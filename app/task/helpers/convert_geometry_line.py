@@ -1,7 +1,10 @@
 from arango.database import StandardDatabase, TransactionDatabase
 
+from services.aql import execute_query
+from task.helpers.trusted_documents import TrustedDocuments
 from task.models.dto import DbMoEdge, DbMoNode
 from task.models.enums import ConnectionType
+from task.queries import GEOMETRY_LINE_POINTS
 
 
 def convert_geometry_line(
@@ -9,21 +12,10 @@ def convert_geometry_line(
     main_collection: str,
     main_edge_collection: str,
     database: TransactionDatabase | StandardDatabase,
+    documents: TrustedDocuments,
 ) -> tuple[list[DbMoNode], list[DbMoEdge]]:
     line_edges = []
     new_edges = []
-    query = """
-        FOR doc IN @@mainCollection
-            FILTER doc._id IN @nodeIds
-            LET edges = (
-                FOR edge IN @@mainEdgeCollection
-                    FILTER edge._from == doc._id
-                    FILTER edge._to IN @toNodeIds
-                    FILTER edge.connection_type IN ["point_a", "point_b"]
-                    RETURN edge
-            )
-            RETURN {"node": doc, "edges": edges}
-    """
     for edge in edges:
         if edge.connection_type == ConnectionType.GEOMETRY_LINE.value:
             line_edges.append(edge)
@@ -44,10 +36,11 @@ def convert_geometry_line(
         "toNodeIds": to_node_ids,
     }
     new_nodes = []
-    for response_item in database.aql.execute(query=query, bind_vars=binds):
-        new_node = DbMoNode.model_validate(response_item["node"])
-        new_nodes.append(new_node)
-        for edge_response_item in response_item["edges"]:
-            new_edge = DbMoEdge.model_validate(edge_response_item)
-            new_edges.append(new_edge)
+    for response_item in execute_query(
+        database=database, query=GEOMETRY_LINE_POINTS, bind_vars=binds
+    ):
+        new_nodes.append(documents.construct(DbMoNode, response_item["node"]))
+        new_edges.extend(
+            documents.construct_all(DbMoEdge, response_item["edges"])
+        )
     return new_nodes, new_edges
@@ -0,0 +1,154 @@
+from threading import Lock
+
+from arango.database import StandardDatabase
+
+from config import GraphDBConfig
+from services.aql import execute_query, execute_query_async
+from services.async_graph import AsyncDatabase
+from task.helpers.tmo_index import tmo_index_cache
+from task.models.dto import DbMainRecord, GraphSnapshot
+from task.queries import GRAPH_REVISION, GRAPH_SNAPSHOT
+
+CONFIG_KEYS = [
+    "trace_tmo_id",
+    "trace_tprm_id",
+    "group_by",
+    "start_from",
+    "delete_orphan_branches",
+]
+
+
+def _get_snapshot_binds() -> dict:
+    return {
+        "@configCollection": GraphDBConfig().config_collection_name,
+        "keys": CONFIG_KEYS,
+    }
+
+
+def _create_snapshot(
+    config_docs: list[dict], document: DbMainRecord
+) -> GraphSnapshot:
+    docs = {i["_key"]: i for i in config_docs}
+    trace_tmo = docs.get("trace_tmo_id") or {}
+    trace_tprm = docs.get("trace_tprm_id") or {}
+    group_by = docs.get("group_by") or {}
+    start_from = docs.get("start_from") or {}
+    delete_orphan_branches = docs.get("delete_orphan_branches") or {}
+    group_by_tprm_ids = group_by.get("tprms")
+    return GraphSnapshot(
+        key=document.key,
+        revision=document.revision,
+        trace_tmo_id=trace_tmo.get("tmo_id"),
+        trace_tprm_id=trace_tprm.get("tprm_id"),
+        group_by_tprm_ids=tuple(group_by_tprm_ids)
+        if group_by_tprm_ids is not None
+        else None,
+        start_from_tmo=start_from.get("tmo_id", document.tmo_id),
+        start_from_tprm=start_from.get("tprm_id"),
+        delete_orphan_branches=delete_orphan_branches.get(
+            "delete_orphan_branches", False
+        ),
+    )
+
+
+def load_graph_snapshot(
+    database: StandardDatabase, document: DbMainRecord
+) -> GraphSnapshot:
+    """Reads the whole graph configuration with a single query"""
+    config_docs = execute_query(
+        database=database, query=GRAPH_SNAPSHOT, bind_vars=_get_snapshot_binds()
+    )
+    return _create_snapshot(config_docs=list(config_docs), document=document)
+
+
+async def load_graph_snapshot_async(
+    database: AsyncDatabase, document: DbMainRecord
+) -> GraphSnapshot:
+    config_docs = await execute_query_async(
+        database=database, query=GRAPH_SNAPSHOT, bind_vars=_get_snapshot_binds()
+    )
+    return _create_snapshot(config_docs=config_docs, document=document)
+
+
+def bump_graph_revision(sys_db: StandardDatabase, key: str) -> int | None:
+    """
+    Atomically increments the revision of the graph record.
+    Returns the new revision or None if the record does not exist
+    """
+    query = """
+        FOR doc IN @@mainCollection
+            FILTER doc._key == @key
+            UPDATE doc WITH {revision: (doc.revision || 0) + 1}
+                IN @@mainCollection
+            RETURN NEW.revision
+    """
+    binds = {
+        "@mainCollection": GraphDBConfig().main_graph_collection_name,
+        "key": key,
+    }
+    response = list(sys_db.aql.execute(query=query, bind_vars=binds))
+    graph_snapshot_cache.invalidate(key)
+    tmo_index_cache.invalidate(key)
+    return response[0] if response else None
+
+
+async def get_graph_revision_async(
+    sys_db: AsyncDatabase, key: str
+) -> int | None:
+    """Reads only the revision of the graph record"""
+    binds = {
+        "@mainCollection": GraphDBConfig().main_graph_collection_name,
+        "key": key,
+    }
+    response = await execute_query_async(
+        database=sys_db, query=GRAPH_REVISION, bind_vars=binds
+    )
+    return response[0] if response else None
+
+
+class GraphSnapshotCache:
+    """
+    Process-wide cache of graph configurations.
+    An entry is valid only for the revision it was loaded with, so a change
+    made by any process is picked up on the next read of the graph record
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._snapshots: dict[str, GraphSnapshot] = {}
+
+    def get(
+        self, database: StandardDatabase, document: DbMainRecord
+    ) -> GraphSnapshot:
+        with self._lock:
+            snapshot = self._snapshots.get(document.key)
+        if snapshot is not None and snapshot.revision == document.revision:
+            return snapshot
+        snapshot = load_graph_snapshot(database=database, document=document)
+        with self._lock:
+            self._snapshots[document.key] = snapshot
+        return snapshot
+
+    async def get_async(
+        self, database: AsyncDatabase, document: DbMainRecord
+    ) -> GraphSnapshot:
+        with self._lock:
+            snapshot = self._snapshots.get(document.key)
+        if snapshot is not None and snapshot.revision == document.revision:
+            return snapshot
+        snapshot = await load_graph_snapshot_async(
+            database=database, document=document
+        )
+        with self._lock:
+            self._snapshots[document.key] = snapshot
+        return snapshot
+
+    def invalidate(self, key: str | None = None):
+        with self._lock:
+            if key is None:
+                self._snapshots.clear()
+            else:
+                self._snapshots.pop(key, None)
+
+
+graph_snapshot_cache = GraphSnapshotCache()
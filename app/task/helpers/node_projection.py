@@ -0,0 +1,31 @@
+from typing import Iterable
+
+from task.models.outgoing_data import MoNodeResponse, MoNodeSlimResponse
+
+
+def project_node(node: dict, fields: list[str]) -> dict:
+    """Python counterpart of queries.project_node for nodes read whole"""
+    data = node.get("data")
+    node = {k: v for k, v in node.items() if k not in ("data", "indexed")}
+    if isinstance(data, dict):
+        node["data"] = {k: data[k] for k in fields if k in data}
+    else:
+        node["data"] = None
+    return node
+
+
+def project_nodes(
+    nodes: Iterable[MoNodeResponse], fields: list[str]
+) -> list[MoNodeSlimResponse]:
+    return [
+        MoNodeSlimResponse.model_validate(
+            project_node(node=node.model_dump(by_alias=True), fields=fields)
+        )
+        for node in nodes
+    ]
+
+
+def get_node_model(
+    fields: list[str] | None,
+) -> type[MoNodeResponse] | type[MoNodeSlimResponse]:
+    return MoNodeResponse if fields is None else MoNodeSlimResponse
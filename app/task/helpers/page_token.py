@@ -0,0 +1,43 @@
+import base64
+import binascii
+from typing import Any
+
+from pydantic import BaseModel
+
+from task.models.enums import ChildrenSort
+from task.models.errors import ValidationError
+
+# Node attribute used for each sort order
+SORT_ATTRIBUTES = {ChildrenSort.KEY: "_key", ChildrenSort.NAME: "name"}
+
+
+class PageToken(BaseModel):
+    """Position after the last node of a page, opaque for clients"""
+
+    node_key: str
+    sort_by: ChildrenSort
+    value: Any
+    key: str
+
+    @classmethod
+    def after(
+        cls, node_key: str, sort_by: ChildrenSort, node: dict
+    ) -> "PageToken":
+        return cls(
+            node_key=node_key,
+            sort_by=sort_by,
+            value=node.get(SORT_ATTRIBUTES[sort_by]),
+            key=node["_key"],
+        )
+
+    def encode(self) -> str:
+        return base64.urlsafe_b64encode(
+            self.model_dump_json().encode()
+        ).decode()
+
+    @classmethod
+    def decode(cls, token: str) -> "PageToken":
+        try:
+            return cls.model_validate_json(base64.urlsafe_b64decode(token))
+        except (binascii.Error, ValueError):
+            raise ValidationError("Invalid page token")
@@ -0,0 +1,25 @@
+from typing import Iterator
+
+from pydantic import BaseModel
+
+# Field of the response model: key of its items in the lines
+RESPONSE_LINE_KEYS = {
+    "nodes": "node",
+    "edges": "edge",
+    "commutation": "commutation",
+    "tmo": "tmo",
+}
+
+
+def to_line(line_key: str, item: BaseModel) -> dict:
+    return {line_key: item.model_dump(mode="json")}
+
+
+def iter_response_lines(response: BaseModel) -> Iterator[dict]:
+    """
+    Splits a response with nodes, edges and TMOs into lines
+    with a single item each, e.g. {"node": {...}}
+    """
+    for field, line_key in RESPONSE_LINE_KEYS.items():
+        for item in getattr(response, field, None) or []:
+            yield to_line(line_key, item)
@@ -0,0 +1,60 @@
+from typing import Iterator
+
+from arango.database import StandardDatabase
+
+from config import GraphDBConfig
+from services.aql import execute_query
+from task.queries import SUBTREE_COUNT, SUBTREE_NODES
+
+
+def get_subtree_prefix(node_key: str, breadcrumbs: str | None) -> str:
+    """Breadcrumbs of the children of the node, the start of every descendant"""
+    return f"{breadcrumbs or '/'}{node_key}/"
+
+
+def get_subtree_binds(
+    config: GraphDBConfig, prefix: str, tmo_ids: list[int] | None = None
+) -> dict:
+    # "0" follows "/", so [prefix, upper) holds every string with the prefix
+    return {
+        "@mainCollection": config.graph_data_collection_name,
+        "prefix": prefix,
+        "upper": f"{prefix[:-1]}0",
+        "tmoIds": tmo_ids,
+    }
+
+
+def iter_subtree(
+    database: StandardDatabase,
+    config: GraphDBConfig,
+    prefix: str,
+    tmo_ids: list[int] | None = None,
+    fields: list[str] | None = None,
+    batch_size: int | None = None,
+) -> Iterator[dict]:
+    """Descendant nodes of any depth from one cursor, in no particular order"""
+    binds = get_subtree_binds(config=config, prefix=prefix, tmo_ids=tmo_ids)
+    binds["fields"] = fields
+    yield from execute_query(
+        database=database,
+        query=SUBTREE_NODES,
+        bind_vars=binds,
+        stream=True,
+        batch_size=batch_size,
+    )
+
+
+def count_subtree(
+    database: StandardDatabase,
+    config: GraphDBConfig,
+    prefix: str,
+    tmo_ids: list[int] | None = None,
+) -> int:
+    response = execute_query(
+        database=database,
+        query=SUBTREE_COUNT,
+        bind_vars=get_subtree_binds(
+            config=config, prefix=prefix, tmo_ids=tmo_ids
+        ),
+    )
+    return next(iter(response), 0)
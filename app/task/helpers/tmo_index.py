@@ -0,0 +1,105 @@
+from threading import Lock
+
+from arango.database import StandardDatabase
+
+from config import GraphDBConfig
+from services.aql import execute_query, execute_query_async
+from services.async_graph import AsyncDatabase
+from task.models.dto import DbMainRecord, DbTmoNode
+from task.queries import ALL_TMOS
+
+
+class TmoIndex:
+    """
+    TMOs of a graph by id and their TPRMs by id, for one revision.
+    Shared between tasks, the models must not be modified
+    """
+
+    def __init__(self, revision: int, documents: list[dict]):
+        self.revision = revision
+        self.documents = documents
+        self.tmos: dict[int, DbTmoNode] = {}
+        self.tprms: dict[int, dict] = {}
+        for document in documents:
+            tmo = DbTmoNode.model_validate(document)
+            self.tmos[tmo.tmo_id] = tmo
+            for tprm in document.get("params") or []:
+                self.tprms[tprm["id"]] = tprm
+
+    def get_tmos(self, tmo_ids: list[int]) -> list[DbTmoNode]:
+        """TMOs in the order of the ids, without duplicates and missing ones"""
+        return [self.tmos[i] for i in dict.fromkeys(tmo_ids) if i in self.tmos]
+
+    def get_tprms(self, tprm_ids: list[int]) -> list[dict]:
+        return [
+            self.tprms[i] for i in dict.fromkeys(tprm_ids) if i in self.tprms
+        ]
+
+
+def _get_index_binds() -> dict:
+    return {"@tmoCollection": GraphDBConfig().tmo_collection_name}
+
+
+class TmoIndexCache:
+    """
+    Process-wide cache of the TMO collections of the graphs. The collection
+    is small and is changed only by the TMO and TPRM updaters and the TMO
+    configuration routes, which bump the revision of the graph.
+    An entry is valid only for the revision it was loaded with
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._indexes: dict[str, TmoIndex] = {}
+
+    def _get_valid(self, document: DbMainRecord) -> TmoIndex | None:
+        with self._lock:
+            index = self._indexes.get(document.key)
+        if index is not None and index.revision == document.revision:
+            return index
+        return None
+
+    def _set(self, key: str, index: TmoIndex):
+        with self._lock:
+            current = self._indexes.get(key)
+            # A slower load of an older revision does not replace a newer one
+            if current is None or current.revision <= index.revision:
+                self._indexes[key] = index
+
+    def get(
+        self, database: StandardDatabase, document: DbMainRecord
+    ) -> TmoIndex:
+        index = self._get_valid(document)
+        if index is not None:
+            return index
+        documents = list(
+            execute_query(
+                database=database, query=ALL_TMOS, bind_vars=_get_index_binds()
+            )
+        )
+        index = TmoIndex(revision=document.revision, documents=documents)
+        self._set(key=document.key, index=index)
+        return index
+
+    async def get_async(
+        self, database: AsyncDatabase, document: DbMainRecord
+    ) -> TmoIndex:
+        index = self._get_valid(document)
+        if index is not None:
+            return index
+        documents = await execute_query_async(
+            database=database, query=ALL_TMOS, bind_vars=_get_index_binds()
+        )
+        index = TmoIndex(revision=document.revision, documents=documents)
+        self._set(key=document.key, index=index)
+        return index
+
+    def invalidate(self, key: str | None = None):
+        with self._lock:
+            if key is None:
+                self._indexes.clear()
+            else:
+                self._indexes.pop(key, None)
+
+
+tmo_index_cache = TmoIndexCache()
@@ -0,0 +1,37 @@
+from services.aql import execute_query
+from task.queries import TOP_LEVEL_VIEW_REFRESH
+from task.task_abstract import TaskAbstract
+
+# Key of the materialised top level in the config collection
+TOP_LEVEL_VIEW_KEY = "top_level"
+
+
+def get_top_level_view_binds(task: TaskAbstract) -> dict:
+    """Binds to read the stored view, it is used only for the start TMO"""
+    return {
+        "configCollection": task.config.config_collection_name,
+        "viewKey": TOP_LEVEL_VIEW_KEY,
+        "tmoId": task.start_from_tmo,
+        "tprmId": task.start_from_tprm,
+    }
+
+
+def refresh_top_level_view(task: TaskAbstract):
+    """
+    Stores the keys of the top level nodes and edges, so the top level is
+    read by key instead of filtering the edge collection on every request
+    """
+    list(
+        execute_query(
+            database=task.database,
+            query=TOP_LEVEL_VIEW_REFRESH,
+            bind_vars={
+                "@configCollection": task.config.config_collection_name,
+                "@mainCollection": task.config.graph_data_collection_name,
+                "@mainEdge": task.config.graph_data_edge_name,
+                "viewKey": TOP_LEVEL_VIEW_KEY,
+                "tmoId": task.start_from_tmo,
+                "tprmId": task.start_from_tprm,
+            },
+        )
+    )
@@ -0,0 +1,42 @@
+from typing import Iterable, TypeVar
+
+from pydantic import BaseModel, TypeAdapter
+
+from task.models.dto import DbMoEdge, DbMoNode
+from task.models.outgoing_data import MoEdgeResponse, MoNodeResponse
+
+Model = TypeVar("Model", bound=BaseModel)
+
+_node_responses = TypeAdapter(list[MoNodeResponse])
+_edge_responses = TypeAdapter(list[MoEdgeResponse])
+
+
+class TrustedDocuments:
+    """
+    Documents read from the graph were validated when they were written.
+    Models for the task logic are constructed without validation, response
+    models are validated once from the original documents instead of
+    dumping the task models again
+    """
+
+    def __init__(self):
+        self._documents: dict[str, dict] = {}
+
+    def construct(self, model: type[Model], document: dict) -> Model:
+        self._documents[document["_id"]] = document
+        return model.model_construct(**document)
+
+    def construct_all(
+        self, model: type[Model], documents: Iterable[dict]
+    ) -> list[Model]:
+        return [self.construct(model, document) for document in documents]
+
+    def node_responses(self, nodes: Iterable[DbMoNode]) -> list[MoNodeResponse]:
+        return _node_responses.validate_python(
+            [self._documents[node.id] for node in nodes]
+        )
+
+    def edge_responses(self, edges: Iterable[DbMoEdge]) -> list[MoEdgeResponse]:
+        return _edge_responses.validate_python(
+            [self._documents[edge.id] for edge in edges]
+        )
@@ -0,0 +1,243 @@
+from pydantic import BaseModel, Field
+
+from config import GraphDBConfig
+from task.queries import CHILDREN_LINKS, SUBTREE_NODES
+
+# Hash and skiplist are aliases of the persistent index in RocksDB
+PERSISTENT_INDEX_TYPES = {"persistent", "hash", "skiplist"}
+
+
+class IndexDefinition(BaseModel, frozen=True):
+    collection: str
+    fields: tuple[str, ...]
+    unique: bool = False
+    sparse: bool = False
+    name: str | None = None
+
+    def matches(self, index: dict) -> bool:
+        return (
+            index.get("type") in PERSISTENT_INDEX_TYPES
+            and tuple(index.get("fields", [])) == self.fields
+            and bool(index.get("unique")) == self.unique
+            and bool(index.get("sparse")) == self.sparse
+        )
+
+
+class HotQuery(BaseModel, frozen=True):
+    name: str
+    description: str
+    query: str
+    bind_vars: dict = Field(default_factory=dict)
+
+
+def get_index_registry(config: GraphDBConfig) -> list[IndexDefinition]:
+    """Persistent indexes which every graph database must have"""
+    tmo = config.tmo_collection_name
+    main = config.graph_data_collection_name
+    main_edge = config.graph_data_edge_name
+    return [
+        IndexDefinition(
+            collection=tmo, fields=("name",), unique=True, sparse=True
+        ),
+        IndexDefinition(
+            collection=main, fields=("grouped_by_tprm",), sparse=True
+        ),
+        IndexDefinition(collection=main, fields=("name",), sparse=True),
+        IndexDefinition(collection=main, fields=("tmo",), sparse=True),
+        IndexDefinition(
+            collection=main, fields=("data.id",), sparse=True, name="idx_mo_id"
+        ),
+        IndexDefinition(
+            collection=main,
+            fields=("data.p_id",),
+            sparse=True,
+            name="idx_mo_p_id",
+        ),
+        # Not sparse: top level queries look for grouped_by_tprm == null
+        IndexDefinition(
+            collection=main,
+            fields=("tmo", "grouped_by_tprm"),
+            name="idx_tmo_grouped_by_tprm",
+        ),
+        # Prefix range scans of the materialised path, see SUBTREE_NODES
+        IndexDefinition(
+            collection=main,
+            fields=("breadcrumbs",),
+            sparse=True,
+            name="idx_breadcrumbs",
+        ),
+        IndexDefinition(
+            collection=main_edge, fields=("connection_type",), sparse=True
+        ),
+        IndexDefinition(collection=main_edge, fields=("virtual",), sparse=True),
+        IndexDefinition(
+            collection=main_edge,
+            fields=("is_trace",),
+            sparse=True,
+            name="idx_edge_is_trace",
+        ),
+        IndexDefinition(
+            collection=main_edge,
+            fields=("source_id",),
+            sparse=True,
+            name="idx_edge_source_id",
+        ),
+        IndexDefinition(
+            collection=main_edge,
+            fields=("prm[*]",),
+            sparse=True,
+            name="idx_edge_prm",
+        ),
+        # Vertex-centric indexes: parent/child lookups of a node read only
+        # the edges of the requested type instead of all edges of the node
+        IndexDefinition(
+            collection=main_edge,
+            fields=("_from", "connection_type"),
+            name="idx_edge_from_type",
+        ),
+        IndexDefinition(
+            collection=main_edge,
+            fields=("_to", "connection_type"),
+            name="idx_edge_to_type",
+        ),
+    ]
+
+
+def get_hot_queries(config: GraphDBConfig) -> list[HotQuery]:
+    """
+    Representative shapes of the most frequent filters.
+    They are only explained, so bind values do not have to exist
+    """
+    main = config.graph_data_collection_name
+    main_edge = config.graph_data_edge_name
+    return [
+        HotQuery(
+            name="node_by_mo_id",
+            description="find_node_by_mo_id, FindNodesByMoId, updater",
+            query="""
+                FOR node IN @@mainCollection
+                    FILTER node.data.id == @moId
+                    RETURN node
+            """,
+            bind_vars={"@mainCollection": main, "moId": 0},
+        ),
+        HotQuery(
+            name="nodes_by_p_id",
+            description="create_mo children lookup",
+            query="""
+                FOR node IN @@mainCollection
+                    FILTER node.data.p_id == @moId
+                    RETURN node
+            """,
+            bind_vars={"@mainCollection": main, "moId": 0},
+        ),
+        HotQuery(
+            name="top_level_nodes",
+            description="GetTopLevelAnalysisTask",
+            query="""
+                FOR doc IN @@mainCollection
+                    FILTER doc.tmo == @tmoId
+                    FILTER doc.grouped_by_tprm == @tprmId
+                    RETURN doc
+            """,
+            bind_vars={"@mainCollection": main, "tmoId": 0, "tprmId": None},
+        ),
+        HotQuery(
+            name="group_nodes_by_tprm",
+            description="find_group_node, delete_mo",
+            query="""
+                FOR node IN @@mainCollection
+                    FILTER node.grouped_by_tprm == @tprmId
+                    RETURN node
+            """,
+            bind_vars={"@mainCollection": main, "tprmId": 0},
+        ),
+        HotQuery(
+            name="trace_edges",
+            description="forward_service_connections_by_mo_links, "
+            "fill_path_edge_collection",
+            query="""
+                FOR edge IN @@mainEdgeCollection
+                    FILTER edge.is_trace == true
+                    RETURN edge
+            """,
+            bind_vars={"@mainEdgeCollection": main_edge},
+        ),
+        HotQuery(
+            name="edges_by_source_id",
+            description="update_mo, delete_mo, connect_service_by_lines",
+            query="""
+                FOR edge IN @@mainEdgeCollection
+                    FILTER edge.source_id IN @nodeIds
+                    RETURN edge
+            """,
+            bind_vars={"@mainEdgeCollection": main_edge, "nodeIds": []},
+        ),
+        HotQuery(
+            name="edges_by_prm",
+            description="update_prm",
+            query="""
+                FOR edge IN @@mainEdgeCollection
+                    FILTER @prmId IN edge.prm
+                    RETURN edge
+            """,
+            bind_vars={"@mainEdgeCollection": main_edge, "prmId": 0},
+        ),
+        HotQuery(
+            name="children_edges",
+            description="AsyncExpandNodesTask, CollapseNodesTask, "
+            "find_children_iterator, drop_tmo_from_mo_collection",
+            query="""
+                FOR edge IN @@mainEdgeCollection
+                    FILTER edge._to IN @nodeIds
+                    FILTER edge.connection_type == "p_id"
+                    RETURN edge
+            """,
+            bind_vars={"@mainEdgeCollection": main_edge, "nodeIds": []},
+        ),
+        HotQuery(
+            name="parent_edge",
+            description="CollapseNodesTask, GetBreadcrumbsTask",
+            query="""
+                FOR edge IN @@mainEdgeCollection
+                    FILTER edge._from == @nodeId
+                    FILTER edge.connection_type == "p_id"
+                    LIMIT 1
+                    RETURN edge
+            """,
+            bind_vars={"@mainEdgeCollection": main_edge, "nodeId": ""},
+        ),
+        HotQuery(
+            name="mo_link_edges",
+            description="GetPathTask, FindCommonPath",
+            query="""
+                FOR edge IN @@mainEdgeCollection
+                    FILTER edge._to == @nodeId
+                    FILTER edge.connection_type IN @connectionTypes
+                    RETURN edge
+            """,
+            bind_vars={
+                "@mainEdgeCollection": main_edge,
+                "nodeId": "",
+                "connectionTypes": ["mo_link", "two-way link"],
+            },
+        ),
+        HotQuery(
+            name="children_links",
+            description="AsyncExpandNodesTask, BatchAnalysisTask",
+            query=CHILDREN_LINKS.query,
+            bind_vars={"@mainEdge": main_edge, "first": [""], "second": [""]},
+        ),
+        HotQuery(
+            name="subtree_nodes",
+            description="SubtreeTask, update_mo",
+            query=SUBTREE_NODES.query,
+            bind_vars={
+                "@mainCollection": main,
+                "prefix": "/0/",
+                "upper": "/00",
+                "tmoIds": None,
+                "fields": None,
+            },
+        ),
+    ]
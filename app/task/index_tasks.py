@@ -0,0 +1,152 @@
+from sys import stderr
+import traceback
+
+from arango.database import StandardDatabase
+from arango.exceptions import ArangoServerError
+
+from config import GraphDBConfig
+from services.graph import GraphService, IfNotExistType
+from task.index_registry import (
+    IndexDefinition,
+    get_hot_queries,
+    get_index_registry,
+)
+from task.models.errors import DocumentNotFound
+from task.models.outgoing_data import (
+    HotQueryIndexesResponse,
+    IndexMigrationResponse,
+)
+from task.task_abstract import TaskAbstract, TaskChecks
+
+
+def _describe(index: IndexDefinition) -> str:
+    return f"{index.collection}[{', '.join(index.fields)}]"
+
+
+def ensure_indexes(
+    graph_db: GraphService, db: StandardDatabase
+) -> tuple[list[str], list[str]]:
+    """
+    Creates missing registry indexes in the graph database.
+    Returns descriptions of created and already existing indexes
+    """
+    created, existing = [], []
+    indexes_by_collection: dict[str, list[dict]] = {}
+    for index in get_index_registry(GraphDBConfig()):
+        collection = graph_db.get_collection(
+            db=db,
+            name=index.collection,
+            if_not_exist=IfNotExistType.RETURN_NONE,
+        )
+        if collection is None:
+            continue
+        if index.collection not in indexes_by_collection:
+            indexes_by_collection[index.collection] = collection.indexes()
+        if any(
+            index.matches(i) for i in indexes_by_collection[index.collection]
+        ):
+            existing.append(_describe(index))
+            continue
+        collection.add_persistent_index(
+            fields=list(index.fields),
+            unique=index.unique,
+            sparse=index.sparse,
+            name=index.name,
+            in_background=True,
+        )
+        created.append(_describe(index))
+    return created, existing
+
+
+class EnsureIndexesTask:
+    """Idempotent index migration for one or all graph databases"""
+
+    def __init__(self, graph_db: GraphService, key: str | None = None):
+        self.graph_db = graph_db
+        self.key = key
+        self.config = GraphDBConfig()
+
+    def _get_graphs(self) -> list[dict]:
+        main_collection = self.graph_db.get_collection(
+            db=self.graph_db.sys_db,
+            name=self.config.main_graph_collection_name,
+            if_not_exist=IfNotExistType.CREATE,
+        )
+        if self.key is not None:
+            graph = main_collection.get(self.key)
+            return [graph] if graph else []
+        return list(main_collection.all())
+
+    def check(self):
+        if self.key is not None and not self._get_graphs():
+            raise DocumentNotFound(f"Document with key {self.key} not found")
+
+    def execute(self) -> list[IndexMigrationResponse]:
+        results = []
+        for graph in self._get_graphs():
+            result = IndexMigrationResponse(
+                key=graph["_key"], database=graph.get("database") or ""
+            )
+            results.append(result)
+            db = self.graph_db.get_database(
+                name=result.database, if_not_exist=IfNotExistType.RETURN_NONE
+            )
+            if db is None:
+                result.error = "Database not found"
+                continue
+            try:
+                result.created, result.existing = ensure_indexes(
+                    graph_db=self.graph_db, db=db
+                )
+            except ArangoServerError as e:
+                print(traceback.format_exc(), file=stderr)
+                result.error = str(e)
+        return results
+
+
+def _collect_indexes(plan_node: dict) -> list[str]:
+    indexes = plan_node.get("indexes")
+    # Traversals report {"base": [...], "levels": {...}}
+    if isinstance(indexes, dict):
+        indexes = indexes.get("base", [])
+    if not indexes:
+        return []
+    return [
+        f"{i.get('name') or i.get('id')}[{', '.join(i.get('fields', []))}]"
+        for i in indexes
+    ]
+
+
+class IndexUsageTask(TaskAbstract, TaskChecks):
+    """Explains the hot queries and reports the indexes the optimizer picks"""
+
+    def __init__(self, graph_db: GraphService, key: str):
+        TaskAbstract.__init__(self, graph_db=graph_db, key=key)
+
+    def check(self):
+        self.check_collection(
+            document=self.document, tmo_collection=self.tmo_collection
+        )
+
+    def execute(self) -> list[HotQueryIndexesResponse]:
+        results = []
+        for hot_query in get_hot_queries(self.config):
+            plan = self.database.aql.explain(
+                query=hot_query.query, bind_vars=hot_query.bind_vars
+            )
+            indexes = []
+            full_scan = False
+            for node in plan.get("nodes", []):
+                indexes.extend(_collect_indexes(node))
+                if node.get("type") == "EnumerateCollectionNode":
+                    full_scan = True
+            results.append(
+                HotQueryIndexesResponse(
+                    name=hot_query.name,
+                    description=hot_query.description,
+                    indexes=indexes,
+                    full_scan=full_scan,
+                    estimated_cost=plan.get("estimatedCost"),
+                )
+            )
+        return results
@@ -6,6 +6,7 @@ from arango.database import StandardDatabase
 from config import GraphDBConfig
 from services.graph import GraphService, IfNotExistType
 from services.inventory import InventoryInterface
+from task.index_tasks import ensure_indexes
 from task.models.dto import InitialRecordCreating
 from task.models.enums import LinkType, Status
 from task.models.incoming_data import InitialRecordCreate, InitialRecordUpdate
@@ -115,14 +116,14 @@ class InitGraphTask:
                 if collection["system"]:
                     continue
                 db.delete_collection(collection)
+            self.graph.invalidate_handles(db_name=db.db_name)
         config = GraphDBConfig()
         # tmo
-        tmo_collection = self.graph.get_collection(
+        self.graph.get_collection(
             db=db,
             name=config.tmo_collection_name,
             if_not_exist=IfNotExistType.CREATE,
         )
-        tmo_collection.add_hash_index(fields=["name"], unique=True, sparse=True)
 
         self.graph.get_collection(
             db=db,
@@ -151,24 +152,14 @@ class InitGraphTask:
             name=config.graph_data_collection_name,
             if_not_exist=IfNotExistType.CREATE,
         )
-        mo_collection.add_hash_index(
-            fields=["grouped_by_tprm"], unique=False, sparse=True
-        )
-        mo_collection.add_hash_index(fields=["name"], unique=False, sparse=True)
-        mo_collection.add_hash_index(fields=["tmo"], unique=False, sparse=True)
 
-        edge_mo_collection = self.graph.get_collection(
+        self.graph.get_collection(
             db=db,
             name=config.graph_data_edge_name,
             if_not_exist=IfNotExistType.CREATE,
             edge=True,
         )
-        edge_mo_collection.add_hash_index(
-            fields=["connection_type"], unique=False, sparse=True
-        )
-        edge_mo_collection.add_hash_index(
-            fields=["virtual"], unique=False, sparse=True
-        )
+        ensure_indexes(graph_db=self.graph, db=db)
 
         self.graph.get_collection(
             db=db,
@@ -117,12 +117,25 @@ class MainRecord(BaseModel):
     error_description: str | None = None
     tmo_datetime: datetime | None = Field(default_factory=datetime.now)
     mo_datetime: datetime | None = Field(default_factory=datetime.now)
+    # Changed only by bump_graph_revision, never written back with the record
+    revision: int = Field(0, exclude=True)
 
 
 class DbMainRecord(ArangoBase, MainRecord):
     pass
 
 
+class GraphSnapshot(BaseModel, frozen=True):
+    key: str
+    revision: int
+    trace_tmo_id: int | None = None
+    trace_tprm_id: int | None = None
+    group_by_tprm_ids: tuple[int, ...] | None = None
+    start_from_tmo: int
+    start_from_tprm: int | None = None
+    delete_orphan_branches: bool = False
+
+
 class InitialRecordCreating(InitialRecordCreate):
     status: Status
     error_description: str | None = None
@@ -25,6 +25,17 @@ class ConnectionType(str, Enum):
     GEOMETRY_LINE = "geometry_line"
 
 
+class ChildrenSort(StrEnum):
+    KEY = "key"
+    NAME = "name"
+
+
+class BatchOperationType(StrEnum):
+    EXPAND = "expand"
+    COLLAPSE = "collapse"
+    NEIGHBORS = "neighbors"
+
+
 class TrackingType(Enum):
     FULL = "Full"
     LOCAL = "Local"
@@ -12,6 +12,8 @@ from pydantic import (
     model_validator,
 )
 
+from task.models.enums import BatchOperationType
+
 
 def convert_str_to_dict(inp: None | str | dict | list) -> dict | list | None:
     if inp is None or inp == "":
@@ -142,3 +144,13 @@ class InitialRecordCreate(BaseModel):
 
 class InitialRecordUpdate(BaseModel):
     name: str = Field(..., min_length=1)
+
+
+class BatchOperation(BaseModel):
+    operation: BatchOperationType
+    node_key: str = Field(..., min_length=1)
+    # expand
+    neighboring_node_keys: list[str] = Field(default_factory=list)
+    # neighbors
+    n: int = Field(1, ge=1)
+    with_all_edges: bool = False
@@ -1,3 +1,4 @@
+from datetime import datetime
 from typing import Annotated, Any
 
 from pydantic import (
@@ -6,12 +7,14 @@ from pydantic import (
     BaseModel,
     BeforeValidator,
     ConfigDict,
+    Discriminator,
     Field,
+    Tag,
     computed_field,
 )
 
 from task.models.dto import InitialRecordCreating
-from task.models.enums import Status
+from task.models.enums import BatchOperationType, Status
 from task.models.incoming_data import MO, PRM, InitialRecordCreate
 
 
@@ -131,6 +134,47 @@ class MoNodeResponse(BaseModel):
     data: MoDto | None = None
     breadcrumbs: str = Field(default="/", pattern=r"^\/(.+\/)*$")
     connected_with: list[list[str]] | None = None
+    # Only set on request, otherwise not serialized
+    children_count: int | None = Field(None, exclude_if=lambda v: v is None)
+
+
+class MoSlimDto(BaseModel):
+    """Only the MO attributes requested by fields"""
+
+    model_config = ConfigDict(extra="allow")
+
+    params: list[PrmResponse] | None = Field(
+        None, exclude_if=lambda v: v is None
+    )
+
+
+class MoNodeSlimResponse(BaseModel):
+    key: str = Field(..., alias="_key")
+    grouped_by_tprm: int | None
+    name: str
+    label: str | None = None
+    tmo: int
+    mo_ids: list[int]
+    data: MoSlimDto | None = None
+    breadcrumbs: str = Field(default="/", pattern=r"^\/(.+\/)*$")
+    connected_with: list[list[str]] | None = None
+    children_count: int | None = Field(None, exclude_if=lambda v: v is None)
+
+
+def get_node_response_tag(node: Any) -> str:
+    """
+    Data of a projected node can not be told from the whole one, so tasks
+    with fields pass MoNodeSlimResponse models. Everything else is a whole
+    node and fails if it is not valid
+    """
+    return "slim" if isinstance(node, MoNodeSlimResponse) else "full"
+
+
+NodeResponse = Annotated[
+    Annotated[MoNodeResponse, Tag("full")]
+    | Annotated[MoNodeSlimResponse, Tag("slim")],
+    Discriminator(get_node_response_tag),
+]
 
 
 class MoEdgeResponse(BaseModel):
@@ -153,7 +197,7 @@ class CommutationResponse(BaseModel):
     tmo_name: str
     parent_name: str
     parent_label: str | None = None
-    nodes: list[MoNodeResponse]
+    nodes: list[NodeResponse]
 
 
 class TmoResponse(BaseModel):
@@ -170,13 +214,15 @@ class NodeEdgeErrorResponse(BaseModel):
 
 
 class NodeEdgeResponse(BaseModel):
-    nodes: list[MoNodeResponse]
+    nodes: list[NodeResponse]
     edges: list[MoEdgeResponse]
     tmo: list[TmoResponse]
 
 
 class NodeEdgeCommutationResponse(NodeEdgeResponse):
     commutation: list[CommutationResponse] | None = None
+    # Set only for paginated responses with more pages
+    next_page_token: str | None = Field(None, exclude_if=lambda v: v is None)
 
     @computed_field
     @property
@@ -198,6 +244,35 @@ class CollapseNodeResponse(BaseModel):
     tmo: list[TmoResponse]
 
 
+class SubtreeCountResponse(BaseModel):
+    count: int
+
+
+class BatchOperationResult(BaseModel):
+    operation: BatchOperationType
+    node_key: str
+    # Keys of the nodes and edges of the batch response
+    nodes: list[str] = Field(default_factory=list)
+    edges: list[str] = Field(default_factory=list)
+    commutation: list[CommutationResponse] | None = None
+    collapse_to: str | None = Field(None, exclude_if=lambda v: v is None)
+    # Set when nothing was found for the operation, e.g. a leaf was expanded
+    error: str | None = Field(None, exclude_if=lambda v: v is None)
+
+
+class BatchAnalysisResponse(NodeEdgeResponse):
+    operations: list[BatchOperationResult]
+
+    @computed_field
+    @property
+    def size(self) -> int:
+        size = len(self.nodes)
+        for operation in self.operations:
+            if operation.commutation:
+                size += len(operation.commutation)
+        return size
+
+
 class TPRMResponse(BaseModel):
     name: str = Field(..., min_length=1)
     val_type: str = Field(..., min_length=1)
@@ -213,3 +288,67 @@ class PathResponse(NodeEdgeResponse):
     nodes: list[MoNodeResponse] = Field(default_factory=list)
     tmo: list[TmoResponse] = Field(default_factory=list)
     length: int = Field(..., validation_alias="weight")
+
+
+class ConnectionPoolStatsResponse(BaseModel):
+    url: str
+    pid: int
+    host: str
+    maxsize: int
+    in_use: int
+    idle: int
+    connections_created: int
+    requests: int
+
+
+class IndexMigrationResponse(BaseModel):
+    key: str
+    database: str
+    created: list[str] = Field(default_factory=list)
+    existing: list[str] = Field(default_factory=list)
+    error: str | None = None
+
+
+class HotQueryIndexesResponse(BaseModel):
+    name: str
+    description: str
+    indexes: list[str]
+    full_scan: bool
+    estimated_cost: float | None = None
+
+
+class QueryStatsResponse(BaseModel):
+    name: str
+    registered: bool
+    calls: int
+    errors: int
+    rows: int
+    total_time: float
+    avg_time: float
+    max_time: float
+    slow_calls: int
+    warnings: int
+    last_warnings: list[dict]
+
+
+class ResponseCacheStatsResponse(BaseModel):
+    enabled: bool
+    shared: bool
+    entries: int
+    size: int
+    hits: int
+    shared_hits: int
+    misses: int
+
+
+class SlowQueryResponse(BaseModel):
+    name: str
+    query: str
+    bind_vars: dict
+    elapsed: float
+    rows: int
+    warnings: list[dict]
+    timestamp: datetime
+    plan: dict | None = None
+    profile: dict | None = None
+    error: str | None = None
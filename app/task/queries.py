@@ -0,0 +1,678 @@
+from services.aql import register_query
+from task.models.enums import ConnectionType
+
+
+def project_node(node: str) -> str:
+    """
+    AQL expression of the node with only the @fields attributes of its
+    data, so the rest of the MO and its PRMs never leave the database
+    """
+    return (
+        f'MERGE(UNSET({node}, "data", "indexed"), {{"data": '
+        f"IS_OBJECT({node}.data) ? KEEP({node}.data, @fields) : null}})"
+    )
+
+
+def project_node_on_request(node: str) -> str:
+    """The whole node without @fields, otherwise the projected one"""
+    return f"@fields == null ? {node} : {project_node(node)}"
+
+
+# Both lookups go through the [_to, connection_type] and
+# [_from, connection_type] indexes of the edge collection
+CHILD_NODES = register_query(
+    name="child_nodes",
+    query="""
+        FOR e IN @@mainEdgeCollection
+            FILTER e._to == @nodeId
+            FILTER e.connection_type == "p_id"
+            FOR v IN @@mainCollection
+                FILTER v._id == e._from
+                RETURN v
+    """,
+)
+
+CHILD_SLIM_NODES = register_query(
+    name="child_slim_nodes",
+    query=f"""
+        FOR e IN @@mainEdgeCollection
+            FILTER e._to == @nodeId
+            FILTER e.connection_type == "p_id"
+            FOR v IN @@mainCollection
+                FILTER v._id == e._from
+                RETURN {project_node("v")}
+    """,
+)
+
+PARENT_NODE = register_query(
+    name="parent_node",
+    query="""
+        FOR e IN @@mainEdgeCollection
+            FILTER e._from == @nodeId
+            FILTER e.connection_type == "p_id"
+            LIMIT 1
+            FOR v IN @@mainCollection
+                FILTER v._id == e._to
+                LIMIT 1
+                RETURN v
+    """,
+)
+
+NODES_COUNT_BY_KEYS = register_query(
+    name="nodes_count_by_keys",
+    query="""
+        FOR doc IN @@mainCollection
+            FILTER doc._key IN @keys
+            COLLECT WITH COUNT INTO length
+            RETURN length
+    """,
+)
+
+# Edges between the children (@first) and the nodes of @second, which
+# contains the children. Every child is looked up in the edge index, so
+# the cost follows the degree of the children and not the collection size.
+# IN with an array bind is a binary search over the sorted values. Edges
+# between two children are returned by the outbound part only
+CHILDREN_LINKS = register_query(
+    name="children_links",
+    query="""
+        LET outbound = (
+            FOR child IN @first
+                FOR doc IN @@mainEdge
+                    FILTER doc._from == child
+                    FILTER doc._to IN @second
+                    RETURN doc
+        )
+        LET inbound = (
+            FOR child IN @first
+                FOR doc IN @@mainEdge
+                    FILTER doc._to == child
+                    FILTER doc._from IN @second
+                    FILTER doc._from NOT IN @first
+                    RETURN doc
+        )
+        FOR doc IN UNION(outbound, inbound)
+            RETURN doc
+    """,
+)
+
+TABLE_CHILD_TMOS = register_query(
+    name="table_child_tmos",
+    query="""
+        FOR v, e, p IN 1 INBOUND @nodeId GRAPH @tmoGraph
+            FILTER e.link_type == "p_id"
+            FILTER v.global_uniqueness == false
+            FILTER v.show_as_a_table != false
+            RETURN v
+    """,
+)
+
+NODES_BY_IDS = register_query(
+    name="nodes_by_ids",
+    query="""
+        FOR node IN @@mainCollection
+            FILTER node._id IN @nodeIds
+            RETURN node
+    """,
+)
+
+LINE_POINT_EDGES = register_query(
+    name="line_point_edges",
+    query="""
+        FOR edge IN @@edgeCollection
+            FILTER edge._from IN @fromNodes
+            FILTER edge._to IN @toNodes
+            FILTER edge.source_id IN @fromNodes
+            FILTER edge.connection_type IN ["point_a", "point_b"]
+            RETURN edge
+    """,
+)
+
+# Ancestors of the node from its breadcrumbs, root first. The path is
+# trusted only if every ancestor exists, the breadcrumbs of each one are
+# the prefix of the path before it and the last one is the parent by the
+# p_id edge. Otherwise valid is false and ANCESTORS_BY_TRAVERSAL is used
+ANCESTORS_BY_BREADCRUMBS = register_query(
+    name="ancestors_by_breadcrumbs",
+    query="""
+        LET node = DOCUMENT(@nodeId)
+        LET keys = IS_STRING(node.breadcrumbs)
+            ? REMOVE_VALUE(SPLIT(node.breadcrumbs, "/"), "")
+            : []
+        LET ancestors = DOCUMENT(@mainCollection, keys)
+        LET parentId = FIRST(
+            FOR edge IN @@mainEdgeCollection
+                FILTER edge._from == @nodeId
+                FILTER edge.connection_type == "p_id"
+                LIMIT 1
+                RETURN edge._to
+        )
+        LET stale = LENGTH(
+            FOR i IN 0..LENGTH(ancestors)
+                FILTER i < LENGTH(ancestors)
+                LET prefix = i == 0
+                    ? "/"
+                    : CONCAT("/", CONCAT_SEPARATOR("/", SLICE(keys, 0, i)), "/")
+                FILTER ancestors[i]._key != keys[i]
+                    OR ancestors[i].breadcrumbs != prefix
+                LIMIT 1
+                RETURN i
+        )
+        RETURN {
+            "valid": IS_STRING(node.breadcrumbs)
+                AND LENGTH(ancestors) == LENGTH(keys)
+                AND stale == 0
+                AND LAST(ancestors)._id == parentId,
+            "ancestors": ancestors
+        }
+    """,
+)
+
+# Parent chain followed edge by edge, the parent first
+ANCESTORS_BY_TRAVERSAL = register_query(
+    name="ancestors_by_traversal",
+    query="""
+        FOR v, e, p IN 1..1000 OUTBOUND @nodeId @@mainEdgeCollection
+            OPTIONS {uniqueVertices: "path"}
+            PRUNE e.connection_type != "p_id"
+            FILTER p.edges[*].connection_type ALL == "p_id"
+            RETURN v
+    """,
+)
+
+# Nodes of every depth below the node, followed down the p_id edges. The
+# updater does not keep the breadcrumbs in step, so it can't trust SUBTREE_NODES
+DESCENDANTS_BY_TRAVERSAL = register_query(
+    name="descendants_by_traversal",
+    query="""
+        FOR v, e, p IN 1..1000 INBOUND @nodeId @@mainEdgeCollection
+            OPTIONS {uniqueVertices: "path"}
+            PRUNE e.connection_type != "p_id"
+            FILTER p.edges[*].connection_type ALL == "p_id"
+            RETURN v
+    """,
+)
+
+# Descendants of a node: breadcrumbs starting with @prefix. The range is
+# scanned in the breadcrumbs index, STARTS_WITH keeps the result exact
+# whatever the string collation. @tmoIds null returns every TMO
+SUBTREE_NODES = register_query(
+    name="subtree_nodes",
+    query=f"""
+        FOR node IN @@mainCollection
+            FILTER node.breadcrumbs >= @prefix AND node.breadcrumbs < @upper
+            FILTER STARTS_WITH(node.breadcrumbs, @prefix)
+            FILTER @tmoIds == null OR node.tmo IN @tmoIds
+            RETURN {project_node_on_request("node")}
+    """,
+)
+
+SUBTREE_COUNT = register_query(
+    name="subtree_count",
+    query="""
+        FOR node IN @@mainCollection
+            FILTER node.breadcrumbs >= @prefix AND node.breadcrumbs < @upper
+            FILTER STARTS_WITH(node.breadcrumbs, @prefix)
+            FILTER @tmoIds == null OR node.tmo IN @tmoIds
+            COLLECT WITH COUNT INTO length
+            RETURN length
+    """,
+)
+
+CHILDREN_WITHIN = register_query(
+    name="children_within",
+    query="""
+        FOR doc IN @@edgeCollection
+            FILTER doc._from IN @ids
+            FILTER doc._to IN @ids
+            FILTER doc.connection_type == "p_id"
+            RETURN doc._from
+    """,
+)
+
+EDGES_WITHIN = register_query(
+    name="edges_within",
+    query="""
+        FOR edge in @@edgeCollection
+            FILTER edge._from IN @ids
+            FILTER edge._to IN @ids
+            RETURN edge
+    """,
+)
+
+SEARCH_PRIORITY = register_query(
+    name="search_priority",
+    query="""
+        FOR doc IN @@mainCollection
+            FILTER doc.name == @value OR doc.label == @value
+            FILTER doc.tmo_id != @traceTmoId
+            LIMIT @limit
+            RETURN doc
+    """,
+)
+
+SEARCH_VIEW = register_query(
+    name="search_view",
+    query="""
+        LET norm_value = CONCAT("%", TOKENS(SUBSTITUTE(@value, ["_", "%"], ["\\_", "\\%"]), "norm_en")[0], "%")
+        FOR doc IN @@searchView
+            SEARCH BOOST(LIKE(doc.name, norm_value), @coefficient)
+                OR LIKE(doc.label, norm_value)
+                OR LIKE(doc.indexed, norm_value)
+            FILTER doc.tmo_id != @traceTmoId
+            FILTER doc._id NOT IN @excludeIds
+            LIMIT @limit
+            SORT bm25(doc) DESC
+            RETURN doc
+    """,
+)
+
+TMOS_BY_IDS = register_query(
+    name="tmos_by_ids",
+    query="""
+        FOR doc IN @@tmoCollection
+            FILTER doc.id IN @tmos
+            RETURN doc
+    """,
+)
+
+PATH_DATA = register_query(
+    name="path_data",
+    query=f"""
+        LET nodes = (FOR e IN @@edgeCollection
+            FILTER e._to == @nodeId
+            FILTER e.connection_type IN ["{ConnectionType.MO_LINK.value}", "{ConnectionType.TWO_WAY_MO_LINK.value}"]
+            FOR v IN @@mainCollection
+                FILTER v._id == e._from
+                RETURN DISTINCT v)
+        LET node_ids = (
+            FOR node IN nodes
+                RETURN node._id)
+        LET edges = (
+            FOR edge IN @@edgeCollection
+                FILTER edge._to IN node_ids
+                FILTER edge._from IN node_ids
+                FILTER edge.connection_type != "geometry_line"
+                RETURN DISTINCT edge
+                )
+        FOR item IN UNION(
+            (FOR node IN nodes RETURN {{"node": node}}),
+            (FOR edge IN edges RETURN {{"edge": edge}})
+        )
+            RETURN item
+    """,
+)
+
+ALL_TMOS = register_query(
+    name="all_tmos",
+    query="FOR doc IN @@tmoCollection RETURN doc",
+)
+
+GRAPH_REVISION = register_query(
+    name="graph_revision",
+    query="""
+        FOR doc IN @@mainCollection
+            FILTER doc._key == @key
+            RETURN doc.revision || 0
+    """,
+)
+
+TOP_LEVEL_NODES = register_query(
+    name="top_level_nodes",
+    query=f"""
+        FOR doc IN @@mainCollection
+            FILTER doc.tmo == @tmoId
+            FILTER doc.grouped_by_tprm == @tprmId
+            RETURN {project_node_on_request("doc")}
+    """,
+)
+
+# Keys of the top level nodes and of the edges between them, written to
+# the config collection as the last build phase and after every updater
+# batch. Edges are looked up in the edge index from every top level node
+TOP_LEVEL_VIEW_REFRESH = register_query(
+    name="top_level_view_refresh",
+    query="""
+        LET nodeIds = (
+            FOR doc IN @@mainCollection
+                FILTER doc.tmo == @tmoId
+                FILTER doc.grouped_by_tprm == @tprmId
+                RETURN doc._id
+        )
+        LET edges = (
+            FOR nodeId IN nodeIds
+                FOR edge IN @@mainEdge
+                    FILTER edge._from == nodeId
+                    FILTER edge._to IN nodeIds
+                    RETURN edge._key
+        )
+        INSERT {
+            "_key": @viewKey,
+            "tmo_id": @tmoId,
+            "tprm_id": @tprmId,
+            "nodes": nodeIds[* RETURN PARSE_IDENTIFIER(CURRENT).key],
+            "edges": edges
+        } INTO @@configCollection OPTIONS {overwriteMode: "replace"}
+    """,
+)
+
+# Nothing is returned when the view was built for another start TMO
+TOP_LEVEL_VIEW = register_query(
+    name="top_level_view",
+    query=f"""
+        LET view = DOCUMENT(@configCollection, @viewKey)
+        FILTER view != null
+        FILTER view.tmo_id == @tmoId AND view.tprm_id == @tprmId
+        RETURN {{
+            "nodes": (
+                FOR doc IN DOCUMENT(@mainCollection, view.nodes)
+                    RETURN {project_node_on_request("doc")}
+            ),
+            "edges": DOCUMENT(@mainEdge, view.edges)
+        }}
+    """,
+)
+
+TOP_LEVEL_VIEW_COUNT = register_query(
+    name="top_level_view_count",
+    query="""
+        LET view = DOCUMENT(@configCollection, @viewKey)
+        FILTER view != null
+        FILTER view.tmo_id == @tmoId AND view.tprm_id == @tprmId
+        RETURN LENGTH(view.nodes)
+    """,
+)
+
+# Count steps run before any payload is fetched. Except for
+# children_count_by_tmo they read only indexes
+CHILDREN_COUNT = register_query(
+    name="children_count",
+    query="""
+        FOR e IN @@mainEdgeCollection
+            FILTER e._to == @nodeId
+            FILTER e.connection_type == "p_id"
+            COLLECT WITH COUNT INTO length
+            RETURN length
+    """,
+)
+
+CHILDREN_COUNT_BY_TMO = register_query(
+    name="children_count_by_tmo",
+    query="""
+        FOR e IN @@mainEdgeCollection
+            FILTER e._to == @nodeId
+            FILTER e.connection_type == "p_id"
+            FOR v IN @@mainCollection
+                FILTER v._id == e._from
+                COLLECT tmo = v.tmo WITH COUNT INTO length
+                RETURN {"tmo": tmo, "count": length}
+    """,
+)
+
+TOP_LEVEL_COUNT = register_query(
+    name="top_level_count",
+    query="""
+        FOR doc IN @@mainCollection
+            FILTER doc.tmo == @tmoId
+            FILTER doc.grouped_by_tprm == @tprmId
+            COLLECT WITH COUNT INTO length
+            RETURN length
+    """,
+)
+
+CHILDREN_COUNTS = register_query(
+    name="children_counts",
+    query="""
+        FOR nodeId IN @nodeIds
+            LET count = FIRST(
+                FOR e IN @@mainEdgeCollection
+                    FILTER e._to == nodeId
+                    FILTER e.connection_type == "p_id"
+                    COLLECT WITH COUNT INTO length
+                    RETURN length
+            )
+            RETURN {"nodeId": nodeId, "count": count}
+    """,
+)
+
+# Keyset pagination: the page starts after the (sortValue, _key) pair
+# of the last node of the previous page
+CHILD_NODES_PAGE = register_query(
+    name="child_nodes_page",
+    query=f"""
+        FOR e IN @@mainEdgeCollection
+            FILTER e._to == @nodeId
+            FILTER e.connection_type == "p_id"
+            FOR v IN @@mainCollection
+                FILTER v._id == e._from
+                LET sortValue = v[@sortBy]
+                FILTER @afterKey == null
+                    OR sortValue > @afterValue
+                    OR (sortValue == @afterValue AND v._key > @afterKey)
+                SORT sortValue, v._key
+                LIMIT @limit
+                RETURN {project_node_on_request("v")}
+    """,
+)
+
+# Commutation table of table TMO nodes in one statement: for every node
+# the @commutationLabel of the nodes it links to, one list per busy
+# parameter group. A null group takes links of any TPRM. The links are
+# read once per node from the [_from, connection_type] index
+COMMUTATION_TABLE = register_query(
+    name="commutation_table",
+    query=f"""
+        LET tables = (
+            FOR nodeId IN @nodeIds
+                LET links = (
+                    FOR e IN @@mainEdge
+                        FILTER e._from == nodeId
+                        FILTER e.connection_type IN [
+                            "{ConnectionType.MO_LINK.value}",
+                            "{ConnectionType.TWO_WAY_MO_LINK.value}"
+                        ]
+                        FILTER e.virtual == false
+                        RETURN {{"to": e._to, "tprm": e.tprm}}
+                )
+                RETURN (
+                    FOR tprmIds IN @busyParameterGroups
+                        RETURN UNIQUE(
+                            FOR link IN links
+                                FILTER tprmIds == null OR link.tprm IN tprmIds
+                                LET doc = DOCUMENT(link.to)
+                                FILTER doc != null
+                                RETURN doc[@commutationLabel]
+                        )
+                )
+        )
+        RETURN ZIP(@nodeIds, tables)
+    """,
+)
+
+GRAPH_SNAPSHOT = register_query(
+    name="graph_snapshot",
+    query="""
+        FOR doc IN @@configCollection
+            FILTER doc._key IN @keys
+            RETURN doc
+    """,
+)
+
+# Path between two nodes. Real edges replace the edges of the path graph,
+# a link of the two nodes in any direction, the non-virtual one preferred
+K_SHORTEST_PATHS = register_query(
+    name="k_shortest_paths",
+    query="""
+        FOR p IN ANY K_SHORTEST_PATHS @point_a TO @point_b
+            GRAPH @pathGraph
+            LIMIT @limit
+            RETURN p
+    """,
+)
+
+PATH_REAL_EDGES = register_query(
+    name="path_real_edges",
+    query="""
+        FOR connection in @connections
+            LET connectionEdge = (FOR edge IN @@mainEdgeCollection
+                    FILTER edge.virtual == false
+                    FILTER edge.is_trace == false
+                    FILTER (edge._from == connection._from AND edge._to == connection._to)
+                        OR (edge._to == connection._from AND edge._from == connection._to)
+                    SORT edge.connection_type DESC
+                    LIMIT 1
+                    RETURN edge)
+            RETURN FIRST(connectionEdge)
+    """,
+)
+
+PATH_EDGES_WITHIN = register_query(
+    name="path_edges_within",
+    query="""
+        FOR edge in @@mainEdgeCollection
+            FILTER edge._from IN @nodeIds
+            FILTER edge._to IN @nodeIds
+            FILTER edge.connection_type != "geometry_line"
+            RETURN edge
+    """,
+)
+
+# Source nodes of geometry lines with their point edges
+GEOMETRY_LINE_POINTS = register_query(
+    name="geometry_line_points",
+    query="""
+        FOR doc IN @@mainCollection
+            FILTER doc._id IN @nodeIds
+            LET edges = (
+                FOR edge IN @@mainEdgeCollection
+                    FILTER edge._from == doc._id
+                    FILTER edge._to IN @toNodeIds
+                    FILTER edge.connection_type IN ["point_a", "point_b"]
+                    RETURN edge
+            )
+            RETURN {"node": doc, "edges": edges}
+    """,
+)
+
+# Lookups by MO id over all graphs, the graph records are in the system
+# database
+GRAPHS_WITH_TMO = register_query(
+    name="graphs_with_tmo",
+    query="""
+        FOR doc IN @@mainCollection
+            FILTER doc.status == @status
+            FILTER @tmoId IN doc.active_tmo_ids
+            RETURN doc
+    """,
+)
+
+GRAPHS_WITH_TMOS = register_query(
+    name="graphs_with_tmos",
+    query="""
+        FOR doc IN @@mainCollection
+            FILTER doc.status == @status
+            FILTER @tmoIds ANY IN doc.active_tmo_ids
+            RETURN doc
+    """,
+)
+
+NODES_BY_MO_ID = register_query(
+    name="nodes_by_mo_id",
+    query="""
+        FOR doc IN @@mainCollection
+            FILTER doc.data.id == @moId
+            RETURN doc
+    """,
+)
+
+TRACE_NODE_BY_MO_ID = register_query(
+    name="trace_node_by_mo_id",
+    query=f"""
+        FOR doc in @@mainCollection
+            FILTER doc.tmo == @traceTmoId
+            FILTER doc.data.id == @moId
+            FOR v, e IN 1..1 INBOUND doc._id GRAPH @mainGraph
+                FILTER e.connection_type
+                    IN ["{ConnectionType.MO_LINK.value}", "{ConnectionType.TWO_WAY_MO_LINK.value}"]
+                LIMIT 1
+                RETURN DISTINCT doc
+    """,
+)
+
+TRACED_NODE_BY_MO_ID = register_query(
+    name="traced_node_by_mo_id",
+    query=f"""
+        FOR doc IN @@mainCollection
+            FILTER doc.data.id == @moId
+            FOR v, e IN 1..1 OUTBOUND doc._id GRAPH @mainGraph
+                FILTER e.connection_type
+                IN ["{ConnectionType.MO_LINK.value}", "{ConnectionType.TWO_WAY_MO_LINK.value}"]
+                FILTER v.tmo == @traceTmoId
+                LIMIT 1
+                RETURN DISTINCT doc
+    """,
+)
+
+TRACE_NODES_BY_MO_IDS = register_query(
+    name="trace_nodes_by_mo_ids",
+    query=f"""
+        FOR doc in @@mainCollection
+            FILTER doc.tmo == @traceTmoId
+            FILTER doc.data.id IN @moIds
+            FOR v, e IN 1..1 INBOUND doc._id GRAPH @mainGraph
+                FILTER e.connection_type
+                    IN ["{ConnectionType.MO_LINK.value}", "{ConnectionType.TWO_WAY_MO_LINK.value}"]
+                RETURN DISTINCT doc
+    """,
+)
+
+TRACED_NODES_BY_MO_IDS = register_query(
+    name="traced_nodes_by_mo_ids",
+    query=f"""
+        FOR doc IN @@mainCollection
+            FILTER doc.data.id IN @moIds
+            FOR v, e IN 1..1 OUTBOUND doc._id GRAPH @mainGraph
+                FILTER e.connection_type
+                IN ["{ConnectionType.MO_LINK.value}", "{ConnectionType.TWO_WAY_MO_LINK.value}"]
+                FILTER v.tmo == @traceTmoId
+                RETURN DISTINCT doc
+    """,
+)
+
+NODE_BY_MO_ID = register_query(
+    name="node_by_mo_id",
+    query="""
+        FOR doc IN @@mainCollection
+            FILTER doc.data.id == @moId
+            LIMIT 1
+            RETURN doc
+    """,
+)
+
+NODE_EDGES = register_query(
+    name="node_edges",
+    query="""
+        FOR edge IN @@mainEdgeCollection
+            FILTER edge._from == @nodeId OR edge._to == @nodeId
+            RETURN edge
+    """,
+)
+
+TMO_BY_ID = register_query(
+    name="tmo_by_id",
+    query="""
+        FOR doc IN @@tmoCollection
+            FILTER doc.id == @tmoId
+            LIMIT 1
+            RETURN doc
+    """,
+)
+
+TMO_EDGES = register_query(
+    name="tmo_edges",
+    query="""
+        FOR edge IN @@tmoEdgeCollection
+            FILTER edge._from == @tmoId OR edge._to == @tmoId
+            RETURN edge
+    """,
+)
@@ -1,108 +1,132 @@
+import asyncio
+
+from config import GraphDBConfig
+from services.aql import execute_query_async
 from services.graph import GraphService
-from task.models.dto import DbMoNode
+from task.helpers.ancestors import get_ancestors
+from task.models.dto import DbTmoNode
 from task.models.enums import Status
 from task.models.outgoing_data import (
     MoNodeResponse,
     NodeTmoResponse,
     TmoResponse,
 )
-from task.task_abstract import TaskAbstract, TaskChecks
+from task.queries import SEARCH_PRIORITY, SEARCH_VIEW, TMOS_BY_IDS
+from task.task_abstract import (
+    AsyncTaskAbstract,
+    AsyncTaskChecks,
+    TaskAbstract,
+    TaskChecks,
+)
+
+
+class FindInGraphProcessing:
+    """Binds and parsing of the search, without database access"""
+
+    config: GraphDBConfig
+    find_value: str
+    limit = 30
+    name_coefficient = 10
+
+    @staticmethod
+    def _get_trace_tmo_id(trace_tmo_data: DbTmoNode | None) -> int:
+        if trace_tmo_data and not trace_tmo_data.enabled:
+            return trace_tmo_data.tmo_id
+        return -1
+
+    def _get_priority_binds(self, trace_tmo_id: int) -> dict:
+        return {
+            "@mainCollection": self.config.graph_data_collection_name,
+            "value": self.find_value,
+            "traceTmoId": trace_tmo_id,
+            "limit": self.limit,
+        }
+
+    def _get_search_binds(
+        self, trace_tmo_id: int, limit: int, exclude_ids: list[str]
+    ) -> dict:
+        return {
+            "@searchView": self.config.search_view,
+            "value": self.find_value,
+            "coefficient": self.name_coefficient,
+            "limit": limit,
+            "traceTmoId": trace_tmo_id,
+            "excludeIds": exclude_ids,
+        }
 
+    def _get_tmos_binds(self, nodes: list[MoNodeResponse]) -> dict:
+        return {
+            "@tmoCollection": self.config.tmo_collection_name,
+            "tmos": list(set([i.tmo for i in nodes])),
+        }
+
+
+class AsyncFindInGraphTask(
+    FindInGraphProcessing, AsyncTaskAbstract, AsyncTaskChecks
+):
+    """Nodes whose name or data match the value, with their TMOs"""
 
-class FindInGraphTask(TaskAbstract, TaskChecks):
     def __init__(
         self,
         graph_db: GraphService,
         key: str,
         find_value: str,
     ):
-        TaskAbstract.__init__(self, graph_db=graph_db, key=key)
+        AsyncTaskAbstract.__init__(self, graph_db=graph_db, key=key)
         self.find_value = find_value
 
-        self.limit = 30
-        self.name_coefficient = 10
-
-    def check(self):
+    async def check(self):
         self.check_status(
             document=self.document, possible_status=[Status.COMPLETE]
         )
-        self.check_collection(
-            document=self.document, tmo_collection=self.tmo_collection
+        await asyncio.gather(
+            self.check_collection_async(
+                database=self.database, document=self.document
+            ),
+            self.check_view_exists_async(database=self.database),
         )
-        self.check_view_exists(database=self.database)
-
-    def find(self) -> list[MoNodeResponse]:
-        trace_tmo_id = -1
-        if self.trace_tmo_data and not self.trace_tmo_data.enabled:
-            trace_tmo_id = self.trace_tmo_data.tmo_id
-        priority_query = """
-            FOR doc IN @@mainCollection
-                FILTER doc.name == @value OR doc.label == @value
-                FILTER doc.tmo_id != @traceTmoId
-                LIMIT @limit
-                RETURN doc
-        """
-        priority_binds = {
-            "@mainCollection": self.main_collection.name,
-            "value": self.find_value,
-            "traceTmoId": trace_tmo_id,
-            "limit": self.limit,
-        }
-        results = []
-        exclude_ids = []
-        for raw_result in self.database.aql.execute(
-            query=priority_query, bind_vars=priority_binds
-        ):
-            result = MoNodeResponse.model_validate(raw_result)
-            results.append(result)
-            exclude_ids.append(raw_result["_id"])
-        query = """
-                LET norm_value = CONCAT("%", TOKENS(SUBSTITUTE(@value, ["_", "%"], ["\\_", "\\%"]), "norm_en")[0], "%")
-                FOR doc IN @@searchView
-                    SEARCH BOOST(LIKE(doc.name, norm_value), @coefficient)
-                        OR LIKE(doc.label, norm_value)
-                        OR LIKE(doc.indexed, norm_value)
-                    FILTER doc.tmo_id != @traceTmoId
-                    FILTER doc._id NOT IN @excludeIds
-                    LIMIT @limit
-                    SORT bm25(doc) DESC
-                    RETURN doc
-                """
+
+    async def get_trace_tmo_data(self) -> DbTmoNode | None:
+        if not self.trace_tmo_id:
+            return None
+        return (await self.get_tmo_index()).tmos.get(self.trace_tmo_id)
+
+    async def find(self) -> list[MoNodeResponse]:
+        trace_tmo_id = self._get_trace_tmo_id(await self.get_trace_tmo_data())
+        response = await execute_query_async(
+            database=self.database,
+            query=SEARCH_PRIORITY,
+            bind_vars=self._get_priority_binds(trace_tmo_id=trace_tmo_id),
+        )
+        results = [MoNodeResponse.model_validate(i) for i in response]
         limit = self.limit - len(results)
         if limit > 0:
-            binds = {
-                "@searchView": self.config.search_view,
-                "value": self.find_value,
-                "coefficient": self.name_coefficient,
-                "limit": limit,
-                "traceTmoId": trace_tmo_id,
-                "excludeIds": exclude_ids,
-            }
-            for raw_result in self.database.aql.execute(
-                query=query, bind_vars=binds
-            ):
-                result = MoNodeResponse.model_validate(raw_result)
-                results.append(result)
+            binds = self._get_search_binds(
+                trace_tmo_id=trace_tmo_id,
+                limit=limit,
+                exclude_ids=[i["_id"] for i in response],
+            )
+            response = await execute_query_async(
+                database=self.database, query=SEARCH_VIEW, bind_vars=binds
+            )
+            results.extend(MoNodeResponse.model_validate(i) for i in response)
         return results
 
-    def get_unique_tmo_data(
+    async def get_unique_tmo_data(
         self, nodes: list[MoNodeResponse]
     ) -> list[TmoResponse]:
         if not nodes:
             return []
-        unique_tmo = list(set([i.tmo for i in nodes]))
-        query = """
-                    FOR doc IN @@tmoCollection
-                        FILTER doc.id IN @tmos
-                        RETURN doc
-                """
-        binds = {"@tmoCollection": self.tmo_collection.name, "tmos": unique_tmo}
-        response = self.database.aql.execute(query=query, bind_vars=binds)
+        response = await execute_query_async(
+            database=self.database,
+            query=TMOS_BY_IDS,
+            bind_vars=self._get_tmos_binds(nodes=nodes),
+        )
         return [TmoResponse.model_validate(i) for i in response]
 
-    def execute(self) -> NodeTmoResponse:
-        nodes = self.find()
-        tmos = self.get_unique_tmo_data(nodes=nodes)
+    async def execute(self) -> NodeTmoResponse:
+        nodes = await self.find()
+        tmos = await self.get_unique_tmo_data(nodes=nodes)
 
         return NodeTmoResponse(nodes=nodes, tmo=tmos)
 
@@ -130,40 +154,12 @@ class GetBreadcrumbsTask(TaskAbstract, TaskChecks):
             main_collection_name=self.main_collection.name,
         )
 
-    def get_parent_node(self, node_key) -> DbMoNode | None:
-        query = """
-            FOR v, e IN 1..1 OUTBOUND @startNode GRAPH @mainGraph
-                FILTER e.connection_type == "p_id"
-                LIMIT 1
-                FOR doc IN @@mainCollection
-                    FILTER doc._id == e._to
-                    LIMIT 1
-                    RETURN doc
-        """
-        binds = {
-            "startNode": node_key,
-            "mainGraph": self.config.graph_data_graph_name,
-            "@mainCollection": self.main_collection.name,
-        }
-        response = list(self.database.aql.execute(query=query, bind_vars=binds))
-        if response:
-            return DbMoNode.model_validate(response[0])
-
     def execute(self) -> list[MoNodeResponse]:
-        result = []
-
         node = self.main_collection.get({"_key": self.node_key})
         if node is None:
-            return result
-        node = DbMoNode.model_validate(node)
-        result.append(
-            MoNodeResponse.model_validate(node.model_dump(by_alias=True))
+            return []
+        ancestors = get_ancestors(
+            database=self.database, config=self.config, node_id=node["_id"]
         )
-        node_id = node.id
-        while parent := self.get_parent_node(node_id):
-            result.append(
-                MoNodeResponse.model_validate(parent.model_dump(by_alias=True))
-            )
-            node_id = parent.id
-        result.reverse()
-        return result
+        ancestors.append(node)
+        return [MoNodeResponse.model_validate(i) for i in ancestors]
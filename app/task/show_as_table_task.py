@@ -41,5 +41,6 @@ class ShowAsATableTask(TaskAbstract, TaskChecks):
         result = self.tmo_collection.update(
             db_tmo_node.model_dump(mode="json", by_alias=True), return_new=True
         )
+        self.bump_revision()
         result = TmoNodeResponse.model_validate(result["new"])
         return result
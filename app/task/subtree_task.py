@@ -0,0 +1,69 @@
+from typing import Iterator
+
+from services.graph import GraphService
+from task.helpers.node_projection import get_node_model
+from task.helpers.response_lines import to_line
+from task.helpers.subtree import count_subtree, get_subtree_prefix, iter_subtree
+from task.models.enums import Status
+from task.models.outgoing_data import SubtreeCountResponse
+from task.task_abstract import TaskAbstract, TaskChecks
+
+
+class SubtreeTask(TaskAbstract, TaskChecks):
+    """
+    Every node below the node, at any depth. execute counts them,
+    stream returns them. Both read a range of the breadcrumbs index
+    """
+
+    def __init__(
+        self,
+        graph_db: GraphService,
+        key: str,
+        node_key: str,
+        tmo_ids: list[int] | None = None,
+        fields: list[str] | None = None,
+    ):
+        TaskAbstract.__init__(self, graph_db=graph_db, key=key)
+        self.node_key = node_key
+        self.tmo_ids = tmo_ids
+        # Attributes of the node data to return, None returns all
+        self.fields = fields
+
+    def check(self):
+        self.check_status(
+            document=self.document, possible_status=[Status.COMPLETE]
+        )
+        self.check_collection(
+            document=self.document, tmo_collection=self.tmo_collection
+        )
+        self.check_nodes(
+            keys=[self.node_key],
+            database=self.database,
+            main_collection_name=self.main_collection.name,
+        )
+
+    def get_prefix(self) -> str:
+        node = self.main_collection.get({"_key": self.node_key})
+        return get_subtree_prefix(
+            node_key=self.node_key, breadcrumbs=node["breadcrumbs"]
+        )
+
+    def execute(self) -> SubtreeCountResponse:
+        count = count_subtree(
+            database=self.database,
+            config=self.config,
+            prefix=self.get_prefix(),
+            tmo_ids=self.tmo_ids,
+        )
+        return SubtreeCountResponse(count=count)
+
+    def stream(self) -> Iterator[dict]:
+        node_model = get_node_model(fields=self.fields)
+        for node in iter_subtree(
+            database=self.database,
+            config=self.config,
+            prefix=self.get_prefix(),
+            tmo_ids=self.tmo_ids,
+            fields=self.fields,
+        ):
+            yield to_line("node", node_model.model_validate(node))
@@ -1,4 +1,5 @@
 from abc import ABC
+import asyncio
 
 from arango.collection import StandardCollection
 from arango.database import StandardDatabase
@@ -6,8 +7,16 @@ from fastapi import HTTPException
 from starlette.status import HTTP_510_NOT_EXTENDED
 
 from config import GraphDBConfig
+from services.aql import execute_query, execute_query_async
+from services.async_graph import AsyncDatabase
 from services.graph import GraphService, IfNotExistType
-from task.models.dto import DbMainRecord, DbTmoNode
+from services.tracing import traced
+from task.helpers.graph_snapshot import (
+    bump_graph_revision,
+    graph_snapshot_cache,
+)
+from task.helpers.tmo_index import TmoIndex, tmo_index_cache
+from task.models.dto import DbMainRecord, DbTmoNode, GraphSnapshot
 from task.models.enums import ConnectionType, Status
 from task.models.errors import (
     DocumentNotFound,
@@ -18,9 +27,43 @@ from task.models.errors import (
     ValidationError,
 )
 from task.models.outgoing_data import NodeEdgeErrorResponse, TmoUpdate
+from task.queries import NODES_COUNT_BY_KEYS
+
+
+class GraphSettings:
+    """Settings of the graph, read from the snapshot of the task"""
+
+    snapshot: GraphSnapshot
+
+    @property
+    def trace_tmo_id(self) -> int | None:
+        return self.snapshot.trace_tmo_id
+
+    @property
+    def trace_tprm_id(self) -> int | None:
+        return self.snapshot.trace_tprm_id
+
+    @property
+    def group_by_tprm_ids(self) -> list[int] | None:
+        group_by_tprm_ids = self.snapshot.group_by_tprm_ids
+        if group_by_tprm_ids is None:
+            return None
+        return list(group_by_tprm_ids)
 
+    @property
+    def delete_orphan_branches_status(self) -> bool:
+        return self.snapshot.delete_orphan_branches
 
-class TaskAbstract(ABC):
+    @property
+    def start_from_tmo(self) -> int | None:
+        return self.snapshot.start_from_tmo
+
+    @property
+    def start_from_tprm(self) -> int | None:
+        return self.snapshot.start_from_tprm
+
+
+class TaskAbstract(GraphSettings, ABC):
     def __init__(
         self,
         graph_db: GraphService,
@@ -39,13 +82,8 @@ class TaskAbstract(ABC):
         self._main_edge_collection: StandardCollection | None = None
         self._main_path_collection: StandardCollection | None = None
         self._config_collection: StandardCollection | None = None
-        self._trace_tmo_id: int | None = None
-        self._trace_tprm_id: int | None = None
-        self._group_by_tprm_ids: list[int] | None = None
-        self._delete_orphan_branches: bool | None = None
-        self._trace_tmo_data: DbTmoNode | None = None
-        self._start_from_tmo: int | None = None
-        self._start_from_tprm: int | None = None
+        self._snapshot: GraphSnapshot | None = None
+        self._tmo_index: TmoIndex | None = None
 
     @property
     def sys_db(self) -> StandardDatabase:
@@ -140,99 +178,129 @@ class TaskAbstract(ABC):
         return self._database
 
     @property
-    def trace_tmo_id(self) -> int | None:
-        if self._trace_tmo_id is None:
-            doc = self.config_collection.get("trace_tmo_id")
-            if doc:
-                self._trace_tmo_id = doc["tmo_id"]
-        return self._trace_tmo_id
+    def snapshot(self) -> GraphSnapshot:
+        if self._snapshot is None:
+            self._snapshot = graph_snapshot_cache.get(
+                database=self.database, document=self.document
+            )
+        return self._snapshot
+
+    def bump_revision(self) -> int | None:
+        revision = bump_graph_revision(sys_db=self.sys_db, key=self.key)
+        if revision is not None and self._document is not None:
+            self._document.revision = revision
+        self._snapshot = None
+        self._tmo_index = None
+        return revision
 
     @property
-    def trace_tprm_id(self) -> int | None:
-        if self._trace_tprm_id is None:
-            doc = self.config_collection.get("trace_tprm_id")
-            if doc:
-                self._trace_tprm_id = doc["tprm_id"]
-        return self._trace_tprm_id
+    def tmo_index(self) -> TmoIndex:
+        if self._tmo_index is None:
+            self._tmo_index = tmo_index_cache.get(
+                database=self.database, document=self.document
+            )
+        return self._tmo_index
 
     @property
-    def group_by_tprm_ids(self) -> list[int] | None:
-        if self._group_by_tprm_ids is None:
-            doc = self.config_collection.get("group_by")
-            if doc:
-                self._group_by_tprm_ids = doc["tprms"]
-        return self._group_by_tprm_ids
+    def trace_tmo_data(self) -> DbTmoNode | None:
+        if not self.trace_tmo_id:
+            return None
+        return self.tmo_index.tmos.get(self.trace_tmo_id)
+
+    def _get_tmos_data(self, tmo_ids: list[int]) -> list[DbTmoNode]:
+        if not tmo_ids:
+            return []
+        return self.tmo_index.get_tmos(tmo_ids)
+
+
+class AsyncTaskAbstract(GraphSettings, ABC):
+    """
+    Base of tasks served by async routes. Everything the task needs from
+    the graph record is read by load() without blocking the event loop
+    """
+
+    def __init__(self, graph_db: GraphService, key: str):
+        self.graph_db = graph_db
+        self.key = key
+        self.config = GraphDBConfig()
+
+        self._document: DbMainRecord | None = None
+        self._database: AsyncDatabase | None = None
+        self._snapshot: GraphSnapshot | None = None
+        # Pending or done lookup of the TMO index, shared by load_from
+        self._tmo_index: asyncio.Future | None = None
+
+    def load_from(self, task: "AsyncTaskAbstract"):
+        """
+        Takes the loaded graph record of another task of the same graph.
+        Both tasks share one lookup of the TMO index
+        """
+        self._document = task.document
+        self._database = task.database
+        self._snapshot = task.snapshot
+        self._tmo_index = task._get_tmo_index()
+
+    async def load(self):
+        response = await self.graph_db.async_sys_db.get_document(
+            collection=self.config.main_graph_collection_name, key=self.key
+        )
+        if not response:
+            raise DocumentNotFound(f"Document with key {self.key} not found")
+        self._document = DbMainRecord(**response)
+        self._database = self.graph_db.get_async_database(
+            self._document.database
+        )
+        self._snapshot = await graph_snapshot_cache.get_async(
+            database=self._database, document=self._document
+        )
 
     @property
-    def delete_orphan_branches_status(self) -> bool:
-        if self._delete_orphan_branches is None:
-            doc = self.config_collection.get("delete_orphan_branches")
-            if doc:
-                self._delete_orphan_branches = doc["delete_orphan_branches"]
-            else:
-                self._delete_orphan_branches = False
-        return self._delete_orphan_branches
+    def document(self) -> DbMainRecord:
+        if self._document is None:
+            raise RuntimeError("The task is not loaded")
+        return self._document
 
     @property
-    def trace_tmo_data(self) -> DbTmoNode | None:
-        if self._trace_tmo_data is None and self.trace_tmo_id:
-            raw = self.tmo_collection.get({"_key": str(self.trace_tmo_id)})
-            self._trace_tmo_data = DbTmoNode.model_validate(raw)
-        return self._trace_tmo_data
+    def database(self) -> AsyncDatabase:
+        if self._database is None:
+            raise RuntimeError("The task is not loaded")
+        return self._database
 
     @property
-    def start_from_tmo(self) -> int | None:
-        if not self._start_from_tmo:
-            start_from = self.config_collection.get({"_key": "start_from"})
-            tmo_id = (
-                start_from.get("tmo_id", self.document.tmo_id)
-                if start_from
-                else self.document.tmo_id
+    def snapshot(self) -> GraphSnapshot:
+        if self._snapshot is None:
+            raise RuntimeError("The task is not loaded")
+        return self._snapshot
+
+    def _get_tmo_index(self) -> asyncio.Future:
+        if self._tmo_index is None:
+            self._tmo_index = asyncio.ensure_future(
+                tmo_index_cache.get_async(
+                    database=self.database, document=self.document
+                )
             )
-            self._start_from_tmo = tmo_id
-        return self._start_from_tmo
+        return self._tmo_index
 
-    @property
-    def start_from_tprm(self) -> int | None:
-        if not self._start_from_tprm:
-            start_from = self.config_collection.get({"_key": "start_from"})
-            tprm_id = start_from.get("tprm_id", None) if start_from else None
-            self._start_from_tprm = tprm_id
-        return self._start_from_tprm
+    async def get_tmo_index(self) -> TmoIndex:
+        return await self._get_tmo_index()
 
-    def _get_tmos_data(self, tmo_ids: list[int]) -> list[DbTmoNode]:
+    async def _get_tmos_data(self, tmo_ids: list[int]) -> list[DbTmoNode]:
         if not tmo_ids:
             return []
-        query = """
-            FOR doc IN @@tmoCollection
-                FILTER doc._key IN @tmoIds
-                RETURN doc
-        """
-        binds = {
-            "@tmoCollection": self.config.tmo_collection_name,
-            "tmoIds": [str(i) for i in tmo_ids],
-        }
-        response = self.database.aql.execute(query=query, bind_vars=binds)
-        results = [DbTmoNode.model_validate(i) for i in response]
-        return results
+        return (await self.get_tmo_index()).get_tmos(tmo_ids)
 
 
 class TaskWithMaxSize(ABC):
     def __init__(self, response_length: int):
         self._response_length = response_length
 
-    def check_response_length(self, response):
-        try:
-            response_length = (
-                response.size if hasattr(response, "size") else len(response)
-            )
-        except TypeError:
-            response_length = 1
-        if 0 < self._response_length < response_length:
+    @traced()
+    def check_size(self, size: int):
+        if 0 < self._response_length < size:
             error_response = NodeEdgeErrorResponse(
                 description="Response size exceeded. Specify your request parameters",
                 params={
-                    "size": response_length,
+                    "size": size,
                     "max_size": self._response_length,
                 },
             )
@@ -240,11 +308,22 @@ class TaskWithMaxSize(ABC):
                 status_code=HTTP_510_NOT_EXTENDED,
                 detail=error_response.model_dump(mode="json"),
             )
+
+    @traced()
+    def check_response_length(self, response):
+        try:
+            response_length = (
+                response.size if hasattr(response, "size") else len(response)
+            )
+        except TypeError:
+            response_length = 1
+        self.check_size(size=response_length)
         return response
 
 
 class TaskChecks:
     @staticmethod
+    @traced()
     def check_collection(
         tmo_collection: StandardCollection, document: DbMainRecord
     ):
@@ -254,6 +333,7 @@ class TaskChecks:
             raise StartNodeNotFound("Start node not found")
 
     @staticmethod
+    @traced()
     def check_status(
         document: DbMainRecord,
         possible_status: list[Status] | None = None,
@@ -271,26 +351,26 @@ class TaskChecks:
             )
 
     @staticmethod
+    @traced()
     def check_nodes(
         keys: list[str], main_collection_name: str, database: StandardDatabase
     ):
         if not keys:
             return
-        query = """
-            FOR doc IN @@mainCollection
-                FILTER doc._key IN @keys
-                COLLECT WITH COUNT INTO length
-                RETURN length
-        """
         binds = {
             "@mainCollection": main_collection_name,
             "keys": keys,
         }
-        response = next(database.aql.execute(query=query, bind_vars=binds))
+        response = next(
+            execute_query(
+                database=database, query=NODES_COUNT_BY_KEYS, bind_vars=binds
+            )
+        )
         if response != len(keys):
             raise NotFound("Nodes not found in database")
 
     @staticmethod
+    @traced()
     def check_edges(
         keys: list[str],
         main_edge_collection_name: str,
@@ -308,22 +388,27 @@ class TaskChecks:
             "@mainEdgeCollection": main_edge_collection_name,
             "keys": keys,
         }
-        response = next(database.aql.execute(query=query, bind_vars=binds))
+        response = next(
+            execute_query(database=database, query=query, bind_vars=binds)
+        )
         if response != len(set(keys)):
             raise NotFound("Edges not found in database")
 
     @staticmethod
+    @traced()
     def check_view_exists(database: StandardDatabase):
         view = database.view("search-view")
         if not view:
             raise NotFound("Search indexes not found. Please rebuild the graph")
 
     @staticmethod
+    @traced()
     def check_trace_tmo_id(tmo_id: int | None):
         if not tmo_id:
             raise TraceNodeNotFound("The Trace TMO ID not set")
 
     @staticmethod
+    @traced()
     def check_group_by(
         data,
         start_from: int,
@@ -359,7 +444,9 @@ class TaskChecks:
             "tmoGraph": tmo_graph_name,
             "@tmoCollection": tmo_collection_name,
         }
-        response = list(database.aql.execute(query=query, bind_vars=binds))
+        response = list(
+            execute_query(database=database, query=query, bind_vars=binds)
+        )
         if len(response) != len(data.group_by_tprms):
             raise NotFound("Tprm not found")
         if not all(
@@ -368,10 +455,11 @@ class TaskChecks:
             raise ValidationError("The order of the tprms is out of order")
 
     @staticmethod
+    @traced()
     def check_start_from(
         data,
         database: StandardDatabase,
-        settings_collection: StandardCollection,
+        group_by_tprm_ids: list[int] | None,
         tmo_collection_name: str,
     ):
         if not data.start_from_tmo_id:
@@ -387,7 +475,9 @@ class TaskChecks:
             "@tmoCollection": tmo_collection_name,
             "tmoId": data.start_from_tmo_id,
         }
-        response = list(database.aql.execute(query=query, bind_vars=binds))
+        response = list(
+            execute_query(database=database, query=query, bind_vars=binds)
+        )
         if len(response) == 0:
             raise NotFound("TMO ID not found")
 
@@ -404,18 +494,15 @@ class TaskChecks:
                 "tprmId": data.start_from_tprm_id,
             }
 
-            response = list(database.aql.execute(query=query, bind_vars=binds))
+            response = list(
+                execute_query(database=database, query=query, bind_vars=binds)
+            )
             if len(response) == 0:
                 raise NotFound("TPRM ID not found or refers to another TMO")
 
             group_by_tprms = data.group_by_tprms
             if not group_by_tprms:
-                group_by_from_db = settings_collection.get("group_by")
-                if group_by_from_db:
-                    group_by_from_db = group_by_from_db.get("tprms", [])
-                else:
-                    group_by_from_db = []
-                group_by_tprms = group_by_from_db
+                group_by_tprms = group_by_tprm_ids or []
             group_by_tprms = set(group_by_tprms)
             if data.start_from_tprm_id not in group_by_tprms:
                 raise ValidationError(
@@ -423,6 +510,7 @@ class TaskChecks:
                 )
 
     @staticmethod
+    @traced()
     def check_trace(
         data: TmoUpdate,
         document: DbMainRecord,
@@ -446,6 +534,7 @@ class TaskChecks:
                 raise ValidationError("Trace TPRM ID not found")
 
     @staticmethod
+    @traced()
     def check_commutation_tprms(
         tmo_id: int,
         tprm_ids: list[int] | None,
@@ -472,11 +561,14 @@ class TaskChecks:
             "tprmIds": tprm_ids,
             "@tmoCollection": tmo_collection_name,
         }
-        response = list(database.aql.execute(query=query, bind_vars=binds))
+        response = list(
+            execute_query(database=database, query=query, bind_vars=binds)
+        )
         if len(set(tprm_ids)) != response[0]:
             raise ValidationError("Wrong TPRM ids")
 
     @staticmethod
+    @traced()
     def check_busy_param_uniqueness(busy_parameter_groups: list[list[int]]):
         passed = set()
         for group in busy_parameter_groups:
@@ -485,6 +577,7 @@ class TaskChecks:
             passed.update(group)
 
     @staticmethod
+    @traced()
     def check_global_uniqueness(
         tmo_collection: StandardCollection, node_key: str
     ):
@@ -494,3 +587,39 @@ class TaskChecks:
             raise ValidationError(
                 "The value can only be set for TMOs with non-global uniqueness"
             )
+
+
+class AsyncTaskChecks(TaskChecks):
+    """Checks of TaskChecks which read the database, for async tasks"""
+
+    @staticmethod
+    @traced()
+    async def check_collection_async(
+        database: AsyncDatabase, document: DbMainRecord
+    ):
+        start_node = await database.get_document(
+            collection=GraphDBConfig().tmo_collection_name,
+            key=str(document.tmo_id),
+        )
+        if not start_node:
+            raise StartNodeNotFound("Start node not found")
+
+    @staticmethod
+    @traced()
+    async def check_nodes_async(
+        keys: list[str], main_collection_name: str, database: AsyncDatabase
+    ):
+        if not keys:
+            return
+        binds = {"@mainCollection": main_collection_name, "keys": keys}
+        response = await execute_query_async(
+            database=database, query=NODES_COUNT_BY_KEYS, bind_vars=binds
+        )
+        if response[0] != len(keys):
+            raise NotFound("Nodes not found in database")
+
+    @staticmethod
+    @traced()
+    async def check_view_exists_async(database: AsyncDatabase):
+        if not await database.has_view("search-view"):
+            raise NotFound("Search indexes not found. Please rebuild the graph")
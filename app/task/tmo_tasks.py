@@ -1,7 +1,9 @@
 from arango import DocumentUpdateError
 
 from config import GraphDBConfig
+from services.aql import execute_query
 from services.graph import GraphService, IfNotExistType
+from task.helpers.top_level_view import TOP_LEVEL_VIEW_KEY
 from task.models.enums import Status
 from task.models.outgoing_data import (
     TmoConfigResponse,
@@ -21,12 +23,19 @@ class TmoTask(TaskAbstract, TaskChecks):
             document=self.document, tmo_collection=self.tmo_collection
         )
 
-    def execute(self) -> TmoConfigResponse:
-        nodes = list(self.tmo_collection.all())
-        [i.pop("_id") for i in nodes]
+    def _get_all_without_id(self, collection_name: str) -> list[dict]:
+        return list(
+            execute_query(
+                database=self.database,
+                query='FOR doc IN @@collection RETURN UNSET(doc, "_id")',
+                bind_vars={"@collection": collection_name},
+                stream=True,
+            )
+        )
 
-        edges = list(self.tmo_edge_collection.all())
-        [i.pop("_id") for i in edges]
+    def execute(self) -> TmoConfigResponse:
+        nodes = self._get_all_without_id(self.tmo_collection.name)
+        edges = self._get_all_without_id(self.tmo_edge_collection.name)
 
         start_node = self.config.get_tmo_collection_key(self.document.tmo_id)
 
@@ -34,7 +43,6 @@ class TmoTask(TaskAbstract, TaskChecks):
         if not group_by:
             group_by = []
 
-        start_from = self.config_collection.get({"_key": "start_from"})
         # Adding groups
         if group_by:
             group_by_dict: dict[int, dict | None] = {i: None for i in group_by}
@@ -129,12 +137,8 @@ class TmoTask(TaskAbstract, TaskChecks):
                 edges=edges,
                 start_node_key=start_node,
                 group_by_tprms=group_by,
-                start_from_tmo_id=start_from.get("tmo_id", self.document.tmo_id)
-                if start_from
-                else self.document.tmo_id,
-                start_from_tprm_id=start_from.get("tprm_id", None)
-                if start_from
-                else None,
+                start_from_tmo_id=self.start_from_tmo,
+                start_from_tprm_id=self.start_from_tprm,
                 trace_tmo_id=self.trace_tmo_id,
                 trace_tprm_id=self.trace_tprm_id,
                 delete_orphan_branches=self.delete_orphan_branches_status,
@@ -183,7 +187,7 @@ class TmoUpdateTask(TaskAbstract, TaskChecks):
             data=self.data,
             database=self.database,
             tmo_collection_name=self.tmo_collection.name,
-            settings_collection=self.config_collection,
+            group_by_tprm_ids=self.group_by_tprm_ids,
         )
         self.check_trace(
             data=self.data,
@@ -289,7 +293,7 @@ class TmoUpdateTask(TaskAbstract, TaskChecks):
             name=main_collection_name,
             if_not_exist=IfNotExistType.CREATE,
         )
-        main_collection.insert(doc, overwrite=True, overwrite_mode="replace")
+        main_collection.insert(doc, overwrite=True, overwrite_mode="update")
 
     def update_group_by(self, group_by: list[int] | None):
         data = {"_key": "group_by", "tprms": group_by}
@@ -320,6 +324,8 @@ class TmoUpdateTask(TaskAbstract, TaskChecks):
         self.config_collection.insert(
             data, overwrite=True, overwrite_mode="replace"
         )
+        # The stored top level was built for the previous start TMO
+        self.config_collection.delete(TOP_LEVEL_VIEW_KEY, ignore_missing=True)
 
     def delete_orphan_branches(self, delete_orphan_branches: bool):
         if delete_orphan_branches is None:
@@ -353,7 +359,7 @@ class TmoUpdateTask(TaskAbstract, TaskChecks):
             self.document.model_dump(mode="json", by_alias=True),
             return_new=True,
             overwrite=True,
-            overwrite_mode="replace",
+            overwrite_mode="update",
         )
         return response["new"]
 
@@ -388,6 +394,7 @@ class TmoUpdateTask(TaskAbstract, TaskChecks):
                 )
             )
             self.clean_next_step()
+            self.bump_revision()
 
             subtask = TmoTask(key=self.key, graph_db=self.graph_db)
             return subtask.execute()
@@ -404,6 +411,7 @@ class TmoUpdateTask(TaskAbstract, TaskChecks):
             main_collection.insert(
                 self.document.model_dump(mode="json", by_alias=True),
                 overwrite=True,
-                overwrite_mode="replace",
+                overwrite_mode="update",
             )
+            self.bump_revision()
             raise e
@@ -1,7 +1,15 @@
+from services.aql import execute_query
 from services.graph import GraphService
 from task.models.dto import DbMoEdge, DbMoNode, DbTmoEdge, DbTmoNode
 from task.models.enums import Status
 from task.models.errors import NotFound
+from task.queries import (
+    NODE_BY_MO_ID,
+    NODE_EDGES,
+    NODES_BY_IDS,
+    TMO_BY_ID,
+    TMO_EDGES,
+)
 from task.task_abstract import TaskAbstract, TaskChecks
 
 
@@ -26,30 +34,25 @@ class TmpGtMoInfoTask(TaskAbstract, TaskChecks):
         self.check_trace_tmo_id(tmo_id=self.trace_tmo_id)
 
     def find_node_by_mo_id(self, mo_id: int) -> DbMoNode:
-        query = """
-            FOR doc IN @@mainCollection
-                FILTER doc.data.id == @moId
-                LIMIT 1
-                RETURN doc
-        """
         binds = {"@mainCollection": self.main_collection.name, "moId": mo_id}
-        response = list(self.database.aql.execute(query=query, bind_vars=binds))
+        response = list(
+            execute_query(
+                database=self.database, query=NODE_BY_MO_ID, bind_vars=binds
+            )
+        )
         if not response:
             raise NotFound("Mo id not found")
         db_mo_node = DbMoNode.model_validate(response[0])
         return db_mo_node
 
     def find_edges(self, node: DbMoNode) -> list[DbMoEdge]:
-        query = """
-            FOR edge IN @@mainEdgeCollection
-                FILTER edge._from == @nodeId OR edge._to == @nodeId
-                RETURN edge
-        """
         binds = {
             "@mainEdgeCollection": self.main_edge_collection.name,
             "nodeId": node.id,
         }
-        response = self.database.aql.execute(query=query, bind_vars=binds)
+        response = execute_query(
+            database=self.database, query=NODE_EDGES, bind_vars=binds
+        )
         db_mo_edges = [DbMoEdge.model_validate(i) for i in response]
         return db_mo_edges
 
@@ -60,18 +63,15 @@ class TmpGtMoInfoTask(TaskAbstract, TaskChecks):
         for edge in edges:
             node_ids.add(edge.from_)
             node_ids.add(edge.to_)
-        query = """
-            FOR node IN @@mainCollection
-                FILTER node._id IN @nodeIds
-                RETURN DISTINCT node
-        """
         binds = {
             "@mainCollection": self.main_collection.name,
             "nodeIds": list(node_ids),
         }
         node_names = {
             i["_id"]: i["name"]
-            for i in self.database.aql.execute(query=query, bind_vars=binds)
+            for i in execute_query(
+                database=self.database, query=NODES_BY_IDS, bind_vars=binds
+            )
         }
         results = []
         for edge in edges:
@@ -84,30 +84,25 @@ class TmpGtMoInfoTask(TaskAbstract, TaskChecks):
         return results
 
     def find_tmo_data(self, node: DbMoNode) -> DbTmoNode:
-        query = """
-            FOR doc IN @@tmoCollection
-                FILTER doc.id == @tmoId
-                LIMIT 1
-                RETURN doc
-        """
         binds = {"@tmoCollection": self.tmo_collection.name, "tmoId": node.tmo}
-        response = list(self.database.aql.execute(query=query, bind_vars=binds))
+        response = list(
+            execute_query(
+                database=self.database, query=TMO_BY_ID, bind_vars=binds
+            )
+        )
         if not response:
             raise NotFound("Tmo id not found")
         db_tmo_node = DbTmoNode.model_validate(response[0])
         return db_tmo_node
 
     def find_tmo_edges(self, node: DbTmoNode) -> list[DbTmoEdge]:
-        query = """
-            FOR edge IN @@tmoEdgeCollection
-                FILTER edge._from == @tmoId OR edge._to == @tmoId
-                RETURN edge
-        """
         binds = {
             "@tmoEdgeCollection": self.tmo_edge_collection.name,
             "tmoId": node.id,
         }
-        response = self.database.aql.execute(query=query, bind_vars=binds)
+        response = execute_query(
+            database=self.database, query=TMO_EDGES, bind_vars=binds
+        )
         db_tmo_edges = [DbTmoEdge.model_validate(i) for i in response]
         return db_tmo_edges
 
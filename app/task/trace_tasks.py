@@ -1,14 +1,26 @@
+import asyncio
 from collections import Counter
 import json
-from typing import Iterator
+from typing import Iterable, Iterator
 
 from pydantic import BaseModel
+from starlette.concurrency import run_in_threadpool
 
+from config import GraphDBConfig
+from services.aql import execute_query, execute_query_async
 from services.graph import GraphService
+from task.helpers.node_projection import project_nodes
+from task.helpers.response_lines import iter_response_lines
 from task.models.dto import DbMoEdge, DbMoNode, DbTmoNode
-from task.models.enums import ConnectionType, Status
+from task.models.enums import Status
 from task.models.outgoing_data import MoNodeResponse, NodeEdgeResponse
-from task.task_abstract import TaskAbstract, TaskChecks
+from task.queries import PATH_DATA
+from task.task_abstract import (
+    AsyncTaskAbstract,
+    AsyncTaskChecks,
+    TaskAbstract,
+    TaskChecks,
+)
 from task.trace_levels_task import TraceResponse, Tracker, TrackingType
 from task.tracking_task import GetSortedGraph
 
@@ -96,7 +108,9 @@ class GetAllPathsForNodeTask(TaskAbstract, TaskChecks):
             "nodeId": self.config.get_node_key(self.node_key),
             "tmoId": self.trace_tmo_id,
         }
-        response = list(self.database.aql.execute(query=query, bind_vars=binds))
+        response = list(
+            execute_query(database=self.database, query=query, bind_vars=binds)
+        )
         if not response:
             # if not trace
             query = """
@@ -109,70 +123,72 @@ class GetAllPathsForNodeTask(TaskAbstract, TaskChecks):
                 "nodeId": self.config.get_node_key(self.node_key),
                 "tmoId": self.trace_tmo_id,
             }
-            response = self.database.aql.execute(query=query, bind_vars=binds)
+            response = execute_query(
+                database=self.database, query=query, bind_vars=binds
+            )
         result = [MoNodeResponse.model_validate(i) for i in response]
         if self.trace_tprm_id:
             self.rename_traces(traces=result)
         return result
 
 
-class GetPathTask(TaskAbstract, TaskChecks):
-    def __init__(
-        self,
-        graph_db: GraphService,
-        key: str,
-        trace_node_key: str,
-        level: TrackingType,
-    ):
-        TaskAbstract.__init__(self, graph_db=graph_db, key=key)
-        self.key = key
-        self.trace_node_key = trace_node_key
-        self.level = level
-        self.node_id = (
-            f"{self.config.graph_data_collection_name}/{self.trace_node_key}"
-        )
+class PathProcessing:
+    """Tracking shared by GetPathTask and AsyncGetPathTask"""
 
-    def check(self):
-        self.check_status(
-            document=self.document, possible_status=[Status.COMPLETE]
-        )
-        self.check_collection(
-            tmo_collection=self.tmo_collection, document=self.document
-        )
-        self.check_trace_tmo_id(tmo_id=self.trace_tmo_id)
+    config: GraphDBConfig
+    level: TrackingType
+    node_id: str
 
-    def get_data(self):
-        query = f"""
-            LET nodes = (FOR v, e IN 1 INBOUND @nodeId GRAPH @mainGraph
-                FILTER e.connection_type IN ["{ConnectionType.MO_LINK.value}", "{ConnectionType.TWO_WAY_MO_LINK.value}"]
-                RETURN DISTINCT v)
-            LET node_ids = (
-                FOR node IN nodes
-                    RETURN node._id)
-            LET edges = (
-                FOR edge IN @@edgeCollection
-                    FILTER edge._to IN node_ids
-                    FILTER edge._from IN node_ids
-                    FILTER edge.connection_type != "geometry_line"
-                    RETURN DISTINCT edge
-                    )
-            RETURN {{"nodes": nodes, "edges": edges}}
-        """
-        binds = {
+    def _get_data_binds(self) -> dict:
+        return {
             "nodeId": self.node_id,
-            "mainGraph": self.config.graph_data_graph_name,
+            "@mainCollection": self.config.graph_data_collection_name,
             "@edgeCollection": self.config.graph_data_edge_name,
         }
-        results = list(self.database.aql.execute(query=query, bind_vars=binds))
-        result = results[0]
-        nodes = result["nodes"]
-        edges = result["edges"]
 
-        tmos = list(self.tmo_collection.all())
+    @staticmethod
+    def _create_data(
+        items: Iterable[dict], tmos: list[dict]
+    ) -> DtoDataResponse:
+        nodes = []
+        edges = []
+        for item in items:
+            if "node" in item:
+                nodes.append(item["node"])
+            else:
+                edges.append(item["edge"])
         return DtoDataResponse.model_validate(
             dict(nodes=nodes, edges=edges, tmos=tmos)
         )
 
+    def _get_trace(self, data: DtoDataResponse) -> TraceResponse:
+        traker = Tracker(
+            nodes=data.nodes,
+            edges=data.edges,
+            tmos=data.tmos,
+            expand_lonely_node=True,
+        )
+        trace = traker.get_trace(tracking_type=self.level)
+
+        if self.level != TrackingType.GRAPH:
+            trace_builder = GetSortedGraph(trace=trace)
+            trace = trace_builder.execute()
+
+        if self.level == TrackingType.STRAIGHT:
+            trace = _get_straight_way(trace)
+        return trace
+
+    def _create_response(
+        self, trace: TraceResponse, tmos: list[DbTmoNode]
+    ) -> NodeEdgeResponse:
+        tmo = [i.model_dump(mode="json", by_alias=True) for i in tmos]
+        result_dict = {"tmo": tmo}
+        result_dict.update(trace.model_dump(by_alias=True))
+        result = NodeEdgeResponse.model_validate(result_dict)
+        if self.level != TrackingType.GRAPH:
+            result = self.delete_end_lines(trace=result)
+        return result
+
     def delete_end_lines(self, trace: NodeEdgeResponse) -> NodeEdgeResponse:
         if not trace.nodes:
             return trace
@@ -202,35 +218,103 @@ class GetPathTask(TaskAbstract, TaskChecks):
         trace.edges = new_edges
         return self.delete_end_lines(trace=trace)
 
-    def execute(self):
-        data = self.get_data()
-        traker = Tracker(
-            nodes=data.nodes,
-            edges=data.edges,
-            tmos=data.tmos,
-            expand_lonely_node=True,
+
+class GetPathTask(PathProcessing, TaskAbstract, TaskChecks):
+    def __init__(
+        self,
+        graph_db: GraphService,
+        key: str,
+        trace_node_key: str,
+        level: TrackingType,
+    ):
+        TaskAbstract.__init__(self, graph_db=graph_db, key=key)
+        self.key = key
+        self.trace_node_key = trace_node_key
+        self.level = level
+        self.node_id = (
+            f"{self.config.graph_data_collection_name}/{self.trace_node_key}"
         )
-        trace = traker.get_trace(tracking_type=self.level)
 
-        if self.level != TrackingType.GRAPH:
-            trace_builder = GetSortedGraph(trace=trace)
-            trace = trace_builder.execute()
+    def check(self):
+        self.check_status(
+            document=self.document, possible_status=[Status.COMPLETE]
+        )
+        self.check_collection(
+            tmo_collection=self.tmo_collection, document=self.document
+        )
+        self.check_trace_tmo_id(tmo_id=self.trace_tmo_id)
 
-        if self.level == TrackingType.STRAIGHT:
-            trace = _get_straight_way(trace)
+    def get_data(self) -> DtoDataResponse:
+        items = execute_query(
+            database=self.database,
+            query=PATH_DATA,
+            bind_vars=self._get_data_binds(),
+        )
+        return self._create_data(items=items, tmos=self.tmo_index.documents)
 
+    def execute(self):
+        trace = self._get_trace(data=self.get_data())
         unique_tmo = list(set([i.tmo for i in trace.nodes]))
-        tmo = [
-            tmo.model_dump(mode="json", by_alias=True)
-            for tmo in self._get_tmos_data(tmo_ids=unique_tmo)
-        ]
-        result_dict = {"tmo": tmo}
-        result_dict.update(trace.model_dump(by_alias=True))
-        result = NodeEdgeResponse.model_validate(result_dict)
-        if self.level != TrackingType.GRAPH:
-            result = self.delete_end_lines(trace=result)
+        tmos = self._get_tmos_data(tmo_ids=unique_tmo)
+        return self._create_response(trace=trace, tmos=tmos)
+
+    def stream(self) -> Iterator[dict]:
+        yield from iter_response_lines(self.execute())
 
-        return result
+
+class AsyncGetPathTask(PathProcessing, AsyncTaskAbstract, AsyncTaskChecks):
+    """
+    GetPathTask for async routes. Tracking is CPU bound and runs in the
+    thread pool to keep the event loop free
+    """
+
+    def __init__(
+        self,
+        graph_db: GraphService,
+        key: str,
+        trace_node_key: str,
+        level: TrackingType,
+        fields: list[str] | None = None,
+    ):
+        AsyncTaskAbstract.__init__(self, graph_db=graph_db, key=key)
+        self.trace_node_key = trace_node_key
+        self.level = level
+        # Attributes of the node data to return, None returns all
+        self.fields = fields
+        self.node_id = (
+            f"{self.config.graph_data_collection_name}/{self.trace_node_key}"
+        )
+
+    async def check(self):
+        self.check_status(
+            document=self.document, possible_status=[Status.COMPLETE]
+        )
+        self.check_trace_tmo_id(tmo_id=self.trace_tmo_id)
+        await self.check_collection_async(
+            database=self.database, document=self.document
+        )
+
+    async def get_data(self) -> DtoDataResponse:
+        items, tmo_index = await asyncio.gather(
+            execute_query_async(
+                database=self.database,
+                query=PATH_DATA,
+                bind_vars=self._get_data_binds(),
+            ),
+            self.get_tmo_index(),
+        )
+        return self._create_data(items=items, tmos=tmo_index.documents)
+
+    async def execute(self):
+        data = await self.get_data()
+        trace = await run_in_threadpool(self._get_trace, data=data)
+        unique_tmo = list(set([i.tmo for i in trace.nodes]))
+        tmos = await self._get_tmos_data(tmo_ids=unique_tmo)
+        response = self._create_response(trace=trace, tmos=tmos)
+        if self.fields is not None:
+            # Tracking needs whole nodes, they are projected here
+            response.nodes = project_nodes(response.nodes, fields=self.fields)
+        return response
 
 
 class FindCommonPath(TaskAbstract, TaskChecks):
@@ -270,15 +354,18 @@ class FindCommonPath(TaskAbstract, TaskChecks):
 
     def get_trace_nodes_ids(self, trace_node_key: str) -> list[str]:
         query = """
-             FOR v, e IN 1 INBOUND @nodeId GRAPH @mainGraph
+            FOR e IN @@edgeCollection
+                FILTER e._to == @nodeId
                 FILTER e.connection_type == "mo_link"
-                RETURN DISTINCT v._id
-         """
+                RETURN DISTINCT e._from
+        """
         binds = {
             "nodeId": self.config.get_node_key(trace_node_key),
-            "mainGraph": self.config.graph_data_graph_name,
+            "@edgeCollection": self.config.graph_data_edge_name,
         }
-        results = list(self.database.aql.execute(query=query, bind_vars=binds))
+        results = list(
+            execute_query(database=self.database, query=query, bind_vars=binds)
+        )
         return results
 
     def get_nodes_by_ids(self, node_ids: list[str]) -> list[DbMoNode]:
@@ -293,7 +380,9 @@ class FindCommonPath(TaskAbstract, TaskChecks):
         }
         results = [
             DbMoNode.model_validate(node)
-            for node in self.database.aql.execute(query=query, bind_vars=binds)
+            for node in execute_query(
+                database=self.database, query=query, bind_vars=binds
+            )
         ]
         return results
 
@@ -311,7 +400,9 @@ class FindCommonPath(TaskAbstract, TaskChecks):
         }
         results = [
             DbMoEdge.model_validate(edge)
-            for edge in self.database.aql.execute(query=query, bind_vars=binds)
+            for edge in execute_query(
+                database=self.database, query=query, bind_vars=binds
+            )
         ]
         return results
 
@@ -0,0 +1,31 @@
+from multiprocessing import Value
+
+from confluent_kafka import Consumer, TopicPartition, cimpl
+
+
+class ConsumerStats:
+    """
+    Consumed messages and lag of a graph listener. Written by the
+    listener process and read by the orchestrator process
+    """
+
+    def __init__(self):
+        self.messages = Value("Q", 0)
+        self.lag = Value("q", 0)
+        # Listener process only
+        self._partition_lag: dict[tuple[str, int], int] = {}
+
+    def record(self, consumer: Consumer, message: cimpl.Message):
+        with self.messages.get_lock():
+            self.messages.value += 1
+        partition = (message.topic(), message.partition())
+        # Cached watermarks come with the fetched messages, no broker call
+        watermarks = consumer.get_watermark_offsets(
+            TopicPartition(*partition), cached=True
+        )
+        if not watermarks or watermarks[1] < 0:
+            return
+        self._partition_lag[partition] = max(
+            watermarks[1] - message.offset() - 1, 0
+        )
+        self.lag.value = sum(self._partition_lag.values())
@@ -11,6 +11,7 @@ import sys
 
 from confluent_kafka import Consumer, cimpl
 
+from updater.consumer_stats import ConsumerStats
 from updater.converters.inventory.inventory_changes_topic import (
     ParsedMessage,
     TopicConverter,
@@ -23,10 +24,22 @@ class TopicSubscriber(ABC):
     def send_message(self, message: ParsedMessage):
         raise NotImplementedError()
 
+    def flush(self):
+        """Called once the messages received so far are all sent"""
+        pass
+
 
 class KafkaListener:
-    def __init__(self, group_postfix: str = ""):
+    def __init__(
+        self,
+        group_postfix: str = "",
+        stats: ConsumerStats | None = None,
+        flush_timeout_s: float = 1,
+    ):
         self.group_postfix = group_postfix
+        self.stats = stats
+        # Subscribers are flushed when no message comes within this time
+        self.flush_timeout_s = flush_timeout_s
         self._is_started: bool = False
         self._consumer: Consumer | None = None
         self._topic_converters: dict[str, TopicConverter] = {}
@@ -98,6 +111,11 @@ class KafkaListener:
         for subscriber in self._subscribers[topic]:
             subscriber.send_message(message=message)
 
+    def _flush(self):
+        for subscribers in self._subscribers.values():
+            for subscriber in subscribers:
+                subscriber.flush()
+
     def stop(self):
         self._is_started = False
 
@@ -123,10 +141,18 @@ class KafkaListener:
         if not topics:
             return
         self.consumer.subscribe(topics=topics)
+        pending = False
         while self._is_started:
-            msg = self.consumer.poll(timeout=60)
+            msg = self.consumer.poll(
+                timeout=self.flush_timeout_s if pending else 60
+            )
             if not msg:
+                if pending:
+                    self._flush()
+                    pending = False
                 continue
+            if self.stats is not None and not msg.error():
+                self.stats.record(consumer=self.consumer, message=msg)
             converted_msg: ParsedMessage | None = self.convert_message(
                 message=msg
             )
@@ -134,5 +160,6 @@ class KafkaListener:
                 continue
             self._send_message(msg.topic(), converted_msg)
             self.consumer.commit(msg)
+            pending = True
 
         self.consumer.unsubscribe()
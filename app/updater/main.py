@@ -6,14 +6,18 @@ from time import sleep
 from config import ArangoConfig, GraphDBConfig, InventoryGRPCConfig
 from services.graph import GraphService
 from services.inventory import Inventory, InventoryInterface
+from services.metrics import UPDATER_CONSUMER_LAG, UPDATER_MESSAGES, metrics
 from task.models.dto import DbMainRecord
 from task.models.enums import Status
+from updater.consumer_stats import ConsumerStats
 from updater.converters.inventory.inventory_changes_topic import TopicConverter
 from updater.kafka_listener import KafkaListener
 from updater.updater_config import KafkaTopicsConfig
 from updater.updater_parts.update_orchestrator import UpdateOrchestrator
 
-GraphState = namedtuple("GraphState", ["status", "worker", "status_index"])
+GraphState = namedtuple(
+    "GraphState", ["status", "worker", "status_index", "stats"]
+)
 GraphStateDiff = namedtuple("GraphStateDiff", ["updated", "created", "deleted"])
 
 
@@ -36,10 +40,15 @@ def get_new_inventory(
     return Inventory(config.url, lock=multiprocessing_lock)
 
 
-def new_worker(database: str, status: Value, multiprocessing_lock: Lock):
+def new_worker(
+    database: str,
+    status: Value,
+    multiprocessing_lock: Lock,
+    stats: ConsumerStats | None = None,
+):
     topic = KafkaTopicsConfig().inventory
     converter = TopicConverter(topic=topic)
-    listener = KafkaListener(group_postfix=database)
+    listener = KafkaListener(group_postfix=database, stats=stats)
     listener.add_topic_converter(converter=converter)
     graph_db_instance = get_new_graph_db()
     inventory_instance = get_new_inventory(
@@ -69,6 +78,17 @@ class MainUpdateOrchestrator:
         self.graph_state: dict[str, GraphState] = {}
         self.update_period_s = update_period_s
         self.next_update = datetime.datetime.now()
+        metrics.add_collector(self.collect_metrics)
+
+    def collect_metrics(self):
+        """Reads the counters of the listener processes at scrape time"""
+        UPDATER_MESSAGES.clear()
+        UPDATER_CONSUMER_LAG.clear()
+        for database, state in list(self.graph_state.items()):
+            UPDATER_MESSAGES.set_total(
+                state.stats.messages.value, graph=database
+            )
+            UPDATER_CONSUMER_LAG.set(state.stats.lag.value, graph=database)
 
     def get_state(self) -> dict[str, Status]:
         results = {}
@@ -100,15 +120,19 @@ class MainUpdateOrchestrator:
 
     def create_worker(self, database: str, status: Status) -> Value:
         status = Value("h", list(Status).index(status))
+        stats = ConsumerStats()
         proc = Process(
             target=new_worker,
             kwargs={
                 "database": database,
                 "status": status,
                 "multiprocessing_lock": self.multiprocessing_lock,
+                "stats": stats,
             },
         )
-        return GraphState(status=status, worker=proc, status_index=status)
+        return GraphState(
+            status=status, worker=proc, status_index=status, stats=stats
+        )
 
     def create_process(self, database: str, status: Status) -> GraphState:
         if database in self.graph_state.keys():
@@ -144,6 +168,7 @@ class MainUpdateOrchestrator:
                 status=state[db_id],
                 worker=graph_state.worker,
                 status_index=graph_state.status_index,
+                stats=graph_state.stats,
             )
             self.graph_state[db_id] = new_graph_state
             new_graph_state.status_index.value = list(Status).index(
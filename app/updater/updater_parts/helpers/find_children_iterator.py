@@ -1,6 +1,8 @@
 from typing import Iterator
 
+from services.aql import execute_query
 from task.models.dto import DbMoNode
+from task.queries import CHILD_NODES, DESCENDANTS_BY_TRAVERSAL
 from task.task_abstract import TaskAbstract
 
 
@@ -9,25 +11,35 @@ def find_children_iterator(
 ) -> Iterator[DbMoNode]:
     limit: int = 50
 
-    query = """
-        FOR v, e IN 1 INBOUND @nodeId
-        GRAPH @mainGraph
-            FILTER e.connection_type == "p_id"
-            LIMIT @offset, @limit
-            RETURN v
-    """
+    # One cursor instead of LIMIT offset pages, which re-read
+    # every previous page
     binds = {
         "nodeId": node.id,
-        "mainGraph": task.config.graph_data_graph_name,
-        "limit": limit,
+        "@mainCollection": task.config.graph_data_collection_name,
+        "@mainEdgeCollection": task.config.graph_data_edge_name,
     }
+    for item in execute_query(
+        database=task.database,
+        query=CHILD_NODES,
+        bind_vars=binds,
+        batch_size=limit,
+    ):
+        yield DbMoNode.model_validate(item)
 
-    offset = 0
-    last_response_size = limit
-    while limit <= last_response_size:
-        binds["offset"] = offset
-        chunk = list(task.database.aql.execute(query=query, bind_vars=binds))
-        last_response_size = len(chunk)
-        offset += last_response_size
-        for item in chunk:
-            yield DbMoNode.model_validate(item)
+
+def find_descendants_iterator(
+    task: TaskAbstract, node: DbMoNode
+) -> Iterator[DbMoNode]:
+    """Nodes of every depth below the node from one p_id edges traversal"""
+    binds = {
+        "nodeId": node.id,
+        "@mainEdgeCollection": task.config.graph_data_edge_name,
+    }
+    for item in execute_query(
+        database=task.database,
+        query=DESCENDANTS_BY_TRAVERSAL,
+        bind_vars=binds,
+        stream=True,
+        batch_size=50,
+    ):
+        yield DbMoNode.model_validate(item)
@@ -11,7 +11,7 @@ from task.models.errors import ValidationError
 from task.models.incoming_data import MO
 from task.task_abstract import TaskAbstract
 from updater.updater_parts.helpers.find_children_iterator import (
-    find_children_iterator,
+    find_descendants_iterator,
 )
 from updater.updater_parts.helpers.find_node_by_mo_id import find_node_by_mo_id
 from updater.updater_parts.helpers.get_line_tmo_ids import get_line_tmo_ids
@@ -31,17 +31,9 @@ def parent_changed(
     if main_tmo_id != item.tmo_id:
         if not parent_node:
             current_node_and_children = [db_item]
-            current_level = [db_item]
-            while current_level:
-                # collect all children
-                next_level = []
-                for current_item in current_level:
-                    for child in find_children_iterator(
-                        task=task, node=current_item
-                    ):
-                        next_level.append(child)
-                        current_node_and_children.append(child)
-                current_level = next_level
+            current_node_and_children.extend(
+                find_descendants_iterator(task=task, node=db_item)
+            )
 
             result.delete.extend(
                 [i.data for i in current_node_and_children if i.data]
@@ -64,7 +64,6 @@ class TmoSettingsUpdater(ItemUpdaterAbstract, UpdaterTaskAbstract):
             self.config_collection.delete(
                 {"_key": "trace_tprm_id"}, ignore_missing=True
             )
-            self._trace_tmo_id = None
 
     def __delete_from_start(self, tmo_ids: list[int]):
         start_from = self.config_collection.get({"_key": "start_from"})
@@ -116,6 +115,7 @@ class TmoSettingsUpdater(ItemUpdaterAbstract, UpdaterTaskAbstract):
         self.__delete_from_trace(tmo_ids=tmo_ids)
         self.__delete_from_start(tmo_ids=tmo_ids)
         self.__delete_group_by(tmo_ids=tmo_ids)
+        self.bump_revision()
 
     def _create(self, items: list[TMO]):
         pass
@@ -64,6 +64,7 @@ class TprmSettingUpdater(ItemUpdaterAbstract, UpdaterTaskAbstract):
         self.__delete_group_by(items_dict=items_dict)
         self.__delete_trace_tprm(items_dict=items_dict)
         self.__delete_start_tprm(items_dict=items_dict)
+        self.bump_revision()
 
     def _create(self, items: list[TPRM]):
         pass
@@ -4,6 +4,10 @@ from time import sleep
 
 from services.graph import GraphService
 from services.inventory import InventoryInterface
+from task.helpers.top_level_view import (
+    TOP_LEVEL_VIEW_KEY,
+    refresh_top_level_view,
+)
 from task.models.dto import DbTmoNode
 from task.models.enums import Status
 from updater.converters.inventory.inventory_changes_topic import ParsedMessage
@@ -142,6 +146,7 @@ class UpdateOrchestrator(TopicSubscriber, DatabaseTmoCache):
             ],
         }
         self.sep = ":"
+        self._top_level_view_outdated = False
 
     def send_message(self, message: ParsedMessage):
         status: Status = list(Status)[self.status.value]
@@ -162,9 +167,28 @@ class UpdateOrchestrator(TopicSubscriber, DatabaseTmoCache):
         if not filtered_message.value:
             return
 
+        if status == Status.COMPLETE and not self._top_level_view_outdated:
+            # Top level is filtered from the collection until the flush.
+            # The view is dropped before any change, so no revision of the
+            # changed graph is cached from it
+            self.config_collection.delete(
+                TOP_LEVEL_VIEW_KEY, ignore_missing=True
+            )
+            self._top_level_view_outdated = True
+
         updaters_list = self.updaters[obj_type]
         print(f"{operation=}\n{filtered_message.value=}\n{status=}")
         for updater in updaters_list:
             updater.update_data(
                 operation=operation, items=filtered_message.value, status=status
             )
+        # Cached responses and snapshots of the graph are outdated now
+        self.bump_revision()
+
+    def flush(self):
+        """Rebuilds the top level view once per batch of messages"""
+        if not self._top_level_view_outdated:
+            return
+        self._top_level_view_outdated = False
+        if list(Status)[self.status.value] == Status.COMPLETE:
+            refresh_top_level_view(task=self)
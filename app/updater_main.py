@@ -1,6 +1,10 @@
+from config import MetricsConfig
 from services.instances import graph_db
+from services.metrics import start_metrics_server
 from updater.main import MainUpdateOrchestrator
 
 if __name__ == "__main__":
+    if MetricsConfig().enabled:
+        start_metrics_server(port=MetricsConfig().updater_port)
     instance = MainUpdateOrchestrator(graph_db=graph_db)
     instance.start()
@@ -11,6 +11,7 @@ import pytest
 from testcontainers.arangodb import ArangoDbContainer
 
 from config import ArangoConfig, SecurityConfig
+from services.graph import handle_cache
 from services.inventory import Inventory as MainInventory
 from tests.test_config import (
     ARANGO_URL,
@@ -138,6 +139,15 @@ def main_mocker():
         yield
 
 
+@pytest.fixture(scope="function", autouse=True)
+def handle_cache_cleaner():
+    # Databases and collections are dropped directly below, bypassing
+    # GraphService, so cached handles have to be dropped as well
+    handle_cache.invalidate()
+    yield
+    handle_cache.invalidate()
+
+
 @pytest.fixture(scope="function", autouse=True)
 def databases_cleaner(get_sys_db):
     database_list = get_sys_db.databases()
@@ -1,7 +1,13 @@
+import json
 from unittest.mock import Mock
 
 import pytest
 
+from services.aql import execute_query
+from task.analysis_tasks import get_commutation_table_binds, set_connected_with
+from task.batch_analysis_task import MAX_BATCH_OPERATIONS
+from task.queries import COMMUTATION_TABLE
+
 
 def remove_keys_from_response(data: dict, key_to_delete: str, attrs: list[str]):
     """
@@ -630,6 +636,832 @@ def test_analysis_expand(client, create_default_graph, build_default_graph):
     assert expected_result == response_from_server
 
 
+def test_query_stats_after_expand(
+    client, create_default_graph, build_default_graph
+):
+    """
+    GET /api/graph/v1/diagnostics/queries
+
+        Expanding a node runs the registered "child_nodes" query,
+        which must be reported with its calls and returned rows
+    """
+    graphs = client.get(url="/api/graph/v1/initialisation/")
+    graph_key = graphs.json()[0]["key"]
+    response_get_to_lvl = client.post(
+        url=f"/api/graph/v1/analysis/top_level/{graph_key}",
+        json={"max_size": 0},
+    )
+    all_key_nodes = [
+        str(node["key"]) for node in response_get_to_lvl.json()["nodes"]
+    ]
+
+    res = client.delete(url="/api/graph/v1/diagnostics/queries")
+    assert res.status_code == 200
+    res = client.delete(url="/api/graph/v1/diagnostics/response_cache")
+    assert res.status_code == 200
+    res = client.post(
+        url=f"/api/graph/v1/analysis/expand/{graph_key}",
+        json={
+            "node_key": all_key_nodes[0],
+            "neighboring_node_keys": all_key_nodes[1:],
+            "max_size": 0,
+        },
+    )
+    assert res.status_code == 200
+
+    res = client.get(url="/api/graph/v1/diagnostics/queries")
+    assert res.status_code == 200
+    stats = {i["name"]: i for i in res.json()}
+    assert stats["child_nodes"]["registered"] is True
+    assert stats["child_nodes"]["calls"] == 1
+    assert stats["child_nodes"]["rows"] > 0
+    assert stats["parent_node"]["calls"] == 0
+
+
+def test_expand_served_from_response_cache(
+    client, create_default_graph, build_default_graph
+):
+    """
+    POST /api/graph/v1/analysis/expand/{key}
+
+        A repeated expand of the same graph revision is served from
+        the response cache without running the queries again
+    """
+    graphs = client.get(url="/api/graph/v1/initialisation/")
+    graph_key = graphs.json()[0]["key"]
+    response_get_to_lvl = client.post(
+        url=f"/api/graph/v1/analysis/top_level/{graph_key}",
+        json={"max_size": 0},
+    )
+    all_key_nodes = [
+        str(node["key"]) for node in response_get_to_lvl.json()["nodes"]
+    ]
+    request = {
+        "node_key": all_key_nodes[0],
+        "neighboring_node_keys": all_key_nodes[1:],
+        "max_size": 0,
+    }
+    client.delete(url="/api/graph/v1/diagnostics/response_cache")
+    first = client.post(
+        url=f"/api/graph/v1/analysis/expand/{graph_key}", json=request
+    )
+    assert first.status_code == 200
+
+    client.delete(url="/api/graph/v1/diagnostics/queries")
+    request["neighboring_node_keys"].reverse()
+    second = client.post(
+        url=f"/api/graph/v1/analysis/expand/{graph_key}", json=request
+    )
+    assert second.status_code == 200
+    assert second.json() == first.json()
+
+    stats = client.get(url="/api/graph/v1/diagnostics/queries").json()
+    stats = {i["name"]: i for i in stats}
+    assert stats["child_nodes"]["calls"] == 0
+    cache_stats = client.get(url="/api/graph/v1/diagnostics/response_cache")
+    assert cache_stats.json()["hits"] == 1
+
+
+def test_metrics_after_expand(
+    client, create_default_graph, build_default_graph
+):
+    """
+    GET /api/graph/metrics
+
+        An expand is reported by its route template and its queries
+        by the class of the task which ran them
+    """
+    graphs = client.get(url="/api/graph/v1/initialisation/")
+    graph_key = graphs.json()[0]["key"]
+    response_get_to_lvl = client.post(
+        url=f"/api/graph/v1/analysis/top_level/{graph_key}",
+        json={"max_size": 0},
+    )
+    all_key_nodes = [
+        str(node["key"]) for node in response_get_to_lvl.json()["nodes"]
+    ]
+    client.delete(url="/api/graph/v1/diagnostics/response_cache")
+    res = client.post(
+        url=f"/api/graph/v1/analysis/expand/{graph_key}",
+        json={"node_key": all_key_nodes[0], "max_size": 0},
+    )
+    assert res.status_code == 200
+
+    res = client.get(url="/api/graph/metrics")
+    assert res.status_code == 200
+    assert res.headers["content-type"].startswith("text/plain")
+    lines = res.text.splitlines()
+    assert any(
+        line.startswith("http_request_duration_seconds_count")
+        and 'route="/v1/analysis/expand/{key}"' in line
+        and 'status="200"' in line
+        for line in lines
+    )
+    assert any(
+        line.startswith("aql_queries_total")
+        and 'task="AsyncExpandNodesTask"' in line
+        and 'query="child_nodes"' in line
+        for line in lines
+    )
+    # The limit of the thread limiter is configurable, only its presence
+    # is checked
+    tokens = [i for i in lines if i.startswith("threadpool_tokens ")]
+    assert len(tokens) == 1
+    assert float(tokens[0].split()[1]) > 0
+
+
+def test_expand_spans(client, create_default_graph, build_default_graph):
+    """
+    POST /api/graph/v1/analysis/expand/{key}
+
+        The task, its checks and its queries are recorded as spans,
+        exported and summed up in the Server-Timing header
+    """
+    from services.tracing import InMemorySpanExporter, tracer
+
+    graphs = client.get(url="/api/graph/v1/initialisation/")
+    graph_key = graphs.json()[0]["key"]
+    response_get_to_lvl = client.post(
+        url=f"/api/graph/v1/analysis/top_level/{graph_key}",
+        json={"max_size": 0},
+    )
+    all_key_nodes = [
+        str(node["key"]) for node in response_get_to_lvl.json()["nodes"]
+    ]
+    client.delete(url="/api/graph/v1/diagnostics/response_cache")
+    exporter = InMemorySpanExporter()
+    tracer.add_exporter(exporter)
+    try:
+        res = client.post(
+            url=f"/api/graph/v1/analysis/expand/{graph_key}",
+            json={
+                "node_key": all_key_nodes[0],
+                "neighboring_node_keys": all_key_nodes[1:],
+                "max_size": 0,
+            },
+        )
+    finally:
+        tracer.remove_exporter(exporter)
+    assert res.status_code == 200
+    assert res.headers["server-timing"].startswith("AsyncExpandNodesTask;dur=")
+    assert "aql.child_nodes;dur=" in res.headers["server-timing"]
+
+    assert [i.name for i in exporter.spans] == ["AsyncExpandNodesTask"]
+    spans = {i.name: i for i in exporter.spans[0].walk()}
+    assert "check_nodes_async" in spans
+    assert spans["aql.nodes_count_by_keys"].attributes["bind_sizes"] == {
+        "keys": len(all_key_nodes)
+    }
+    assert spans["aql.child_nodes"].attributes["rows"] > 0
+    assert all(i.duration is not None for i in spans.values())
+
+
+def test_edges_between_nodes_spans(
+    client, create_default_graph, build_default_graph
+):
+    """
+    POST /api/graph/v1/analysis/edges_between_nodes/{key}
+
+        Queries of the sync read tasks are recorded as spans as well
+    """
+    from services.tracing import InMemorySpanExporter, tracer
+
+    graphs = client.get(url="/api/graph/v1/initialisation/")
+    graph_key = graphs.json()[0]["key"]
+    response_get_to_lvl = client.post(
+        url=f"/api/graph/v1/analysis/top_level/{graph_key}",
+        json={"max_size": 0},
+    )
+    all_key_nodes = [
+        str(node["key"]) for node in response_get_to_lvl.json()["nodes"]
+    ]
+    exporter = InMemorySpanExporter()
+    tracer.add_exporter(exporter)
+    try:
+        res = client.post(
+            url=f"/api/graph/v1/analysis/edges_between_nodes/{graph_key}",
+            json=all_key_nodes,
+        )
+    finally:
+        tracer.remove_exporter(exporter)
+    assert res.status_code == 200
+    assert "aql.edges_within;dur=" in res.headers["server-timing"]
+
+    assert [i.name for i in exporter.spans] == ["FindEdgesBetweenNodesTask"]
+    spans = {i.name: i for i in exporter.spans[0].walk()}
+    assert spans["aql.edges_within"].attributes["bind_sizes"] == {
+        "ids": len(all_key_nodes)
+    }
+    assert "rows" in spans["aql.edges_within"].attributes
+    assert all(i.duration is not None for i in spans.values())
+
+
+def test_expand_pages(client, create_default_graph, build_default_graph):
+    """
+    POST /api/graph/v1/analysis/expand/{key}
+
+        With page_size the children are returned page by page, following
+        next_page_token, until the last page without a token
+    """
+    graphs = client.get(url="/api/graph/v1/initialisation/")
+    graph_key = graphs.json()[0]["key"]
+    url = f"/api/graph/v1/analysis/expand/{graph_key}"
+    response_get_to_lvl = client.post(
+        url=f"/api/graph/v1/analysis/top_level/{graph_key}",
+        json={"max_size": 0},
+    )
+    all_key_nodes = [
+        str(node["key"]) for node in response_get_to_lvl.json()["nodes"]
+    ]
+    request = {
+        "node_key": all_key_nodes[0],
+        "neighboring_node_keys": all_key_nodes[1:],
+        "max_size": 0,
+    }
+    full = client.post(url=url, json=request)
+    assert full.status_code == 200
+    assert "next_page_token" not in full.json()
+
+    request.update({"page_size": 1, "sort_by": "name"})
+    keys = []
+    pages = 0
+    while True:
+        res = client.post(url=url, json=request)
+        assert res.status_code == 200
+        pages += 1
+        keys.extend(i["key"] for i in res.json()["nodes"])
+        token = res.json().get("next_page_token")
+        if token is None:
+            break
+        request["page_token"] = token
+    assert pages > 1
+    assert sorted(keys) == sorted(i["key"] for i in full.json()["nodes"])
+
+    request.update({"page_token": "invalid"})
+    res = client.post(url=url, json=request)
+    assert res.status_code == 409
+
+
+def test_batch_operations(client, create_default_graph, build_default_graph):
+    """
+    POST /api/graph/v1/analysis/batch/{key}
+
+        Runs several operations in one request. Nodes, edges and TMOs are
+        returned once, every operation lists the keys of its result
+    """
+    graphs = client.get(url="/api/graph/v1/initialisation/")
+    graph_key = graphs.json()[0]["key"]
+    response_get_to_lvl = client.post(
+        url=f"/api/graph/v1/analysis/top_level/{graph_key}",
+        json={"max_size": 0},
+    )
+    all_key_nodes = [
+        str(node["key"]) for node in response_get_to_lvl.json()["nodes"]
+    ]
+    expand = {
+        "node_key": all_key_nodes[0],
+        "neighboring_node_keys": all_key_nodes[1:],
+    }
+    single = client.post(
+        url=f"/api/graph/v1/analysis/expand/{graph_key}", json=expand
+    )
+    assert single.status_code == 200
+
+    res = client.post(
+        url=f"/api/graph/v1/analysis/batch/{graph_key}",
+        json={
+            "operations": [
+                {"operation": "expand", **expand},
+                {"operation": "neighbors", "node_key": all_key_nodes[0]},
+                {"operation": "expand", **expand},
+            ]
+        },
+    )
+    assert res.status_code == 200
+    data = res.json()
+    expand_result, _, repeated = data["operations"]
+    expected_keys = [i["key"] for i in single.json()["nodes"]]
+    assert expand_result["nodes"] == expected_keys
+    assert repeated["nodes"] == expected_keys
+    node_keys = [i["key"] for i in data["nodes"]]
+    assert len(node_keys) == len(set(node_keys))
+    assert set(expected_keys) <= set(node_keys)
+    tmo_ids = [i["tmo_id"] for i in data["tmo"]]
+    assert len(tmo_ids) == len(set(tmo_ids))
+
+    res = client.post(
+        url=f"/api/graph/v1/analysis/batch/{graph_key}",
+        json={"operations": [{"operation": "expand", "node_key": "missing"}]},
+    )
+    assert res.status_code == 404
+
+    res = client.post(
+        url=f"/api/graph/v1/analysis/batch/{graph_key}",
+        json={
+            "operations": [{"operation": "expand", **expand}]
+            * (MAX_BATCH_OPERATIONS + 1)
+        },
+    )
+    assert res.status_code == 422
+
+
+def test_top_level_fields(client, create_default_graph, build_default_graph):
+    """
+    POST /api/graph/v1/analysis/top_level/{key}
+
+        With fields only the listed attributes of the node data are
+        returned, the other node attributes stay the same
+    """
+    graphs = client.get(url="/api/graph/v1/initialisation/")
+    graph_key = graphs.json()[0]["key"]
+    url = f"/api/graph/v1/analysis/top_level/{graph_key}"
+
+    full = client.post(url=url, json={"max_size": 0})
+    assert full.status_code == 200
+    res = client.post(url=url, json={"max_size": 0, "fields": ["id"]})
+    assert res.status_code == 200
+    nodes = {i["key"]: i for i in res.json()["nodes"]}
+    for node in full.json()["nodes"]:
+        slim = nodes[node["key"]]
+        assert slim["data"] == {"id": node["data"]["id"]}
+        node.pop("data")
+        slim.pop("data")
+        assert slim == node
+
+
+def test_top_level_count_first(
+    client, create_default_graph, build_default_graph
+):
+    """
+    POST /api/graph/v1/analysis/top_level/{key}
+
+        An oversized request fails with 510 by the count step, without
+        fetching the nodes. Children counts are returned on request
+    """
+    graphs = client.get(url="/api/graph/v1/initialisation/")
+    graph_key = graphs.json()[0]["key"]
+    url = f"/api/graph/v1/analysis/top_level/{graph_key}"
+
+    client.delete(url="/api/graph/v1/diagnostics/queries")
+    res = client.post(url=url, json={"max_size": 1})
+    assert res.status_code == 510
+    assert res.json()["detail"]["params"] == {"size": 4, "max_size": 1}
+    stats = client.get(url="/api/graph/v1/diagnostics/queries").json()
+    stats = {i["name"]: i for i in stats}
+    assert stats["top_level_view_count"]["calls"] == 1
+    assert "_get_nodes_edges" not in stats
+
+    res = client.post(url=url, json={"max_size": 0})
+    assert all("children_count" not in i for i in res.json()["nodes"])
+    res = client.post(
+        url=url, json={"max_size": 0, "return_children_count": True}
+    )
+    assert res.status_code == 200
+    nodes = res.json()["nodes"]
+    assert all(isinstance(i["children_count"], int) for i in nodes)
+    assert any(i["children_count"] > 0 for i in nodes)
+
+
+def test_top_level_view(
+    client, arango_client, create_default_graph, build_default_graph
+):
+    """
+    POST /api/graph/v1/analysis/top_level/{key}
+
+        The top level is stored by the build and read by key. Without the
+        stored view the nodes are filtered from the collection again
+    """
+    graphs = client.get(url="/api/graph/v1/initialisation/")
+    graph_key = graphs.json()[0]["key"]
+    url = f"/api/graph/v1/analysis/top_level/{graph_key}"
+
+    config = arango_client.db(
+        name="tmoId_42588", username="root", password=""
+    ).collection("config")
+    view = config.get("top_level")
+    assert view is not None
+    stored = client.post(url=url, json={"max_size": 0}).json()
+    assert sorted(view["nodes"]) == sorted(i["key"] for i in stored["nodes"])
+    assert sorted(view["edges"]) == sorted(i["key"] for i in stored["edges"])
+
+    config.delete("top_level")
+    live = client.post(url=url, json={"max_size": 1000}).json()
+    assert sorted(i["key"] for i in live["nodes"]) == sorted(view["nodes"])
+    assert len(live["edges"]) == len(stored["edges"])
+
+
+def test_top_level_stream(client, create_default_graph, build_default_graph):
+    """
+    POST /api/graph/v1/analysis/top_level/{key}/stream
+
+        Streams the same nodes, edges and TMOs as the top level endpoint,
+        one item per NDJSON line
+    """
+    graphs = client.get(url="/api/graph/v1/initialisation/")
+    graph_key = graphs.json()[0]["key"]
+    expected = client.post(
+        url=f"/api/graph/v1/analysis/top_level/{graph_key}",
+        json={"max_size": 0},
+    ).json()
+
+    res = client.post(
+        url=f"/api/graph/v1/analysis/top_level/{graph_key}/stream"
+    )
+    assert res.status_code == 200
+    assert res.headers["content-type"] == "application/x-ndjson"
+    lines = [json.loads(i) for i in res.text.splitlines()]
+    nodes = [i["node"] for i in lines if "node" in i]
+    edges = [i["edge"] for i in lines if "edge" in i]
+    tmos = [i["tmo"] for i in lines if "tmo" in i]
+    assert sorted(i["key"] for i in nodes) == sorted(
+        i["key"] for i in expected["nodes"]
+    )
+    assert len(edges) == len(expected["edges"])
+    assert tmos == expected["tmo"]
+
+
+def test_expand_stream(client, create_default_graph, build_default_graph):
+    """
+    POST /api/graph/v1/analysis/expand/{key}/stream
+
+        Streams the same nodes, edges and TMOs as the expand endpoint,
+        one item per NDJSON line
+    """
+    graphs = client.get(url="/api/graph/v1/initialisation/")
+    graph_key = graphs.json()[0]["key"]
+    top_level = client.post(
+        url=f"/api/graph/v1/analysis/top_level/{graph_key}",
+        json={"max_size": 0},
+    ).json()
+    node_keys = [i["key"] for i in top_level["nodes"]]
+    request = {"node_key": node_keys[0], "neighboring_node_keys": node_keys}
+    expected = client.post(
+        url=f"/api/graph/v1/analysis/expand/{graph_key}", json=request
+    ).json()
+
+    res = client.post(
+        url=f"/api/graph/v1/analysis/expand/{graph_key}/stream", json=request
+    )
+    assert res.status_code == 200
+    assert res.headers["content-type"] == "application/x-ndjson"
+    lines = [json.loads(i) for i in res.text.splitlines()]
+    assert [i["node"] for i in lines if "node" in i] == expected["nodes"]
+    assert [i["edge"] for i in lines if "edge" in i] == expected["edges"]
+    assert [i["tmo"] for i in lines if "tmo" in i] == expected["tmo"]
+
+
+def test_expand_links_by_edge_type(
+    client, arango_client, create_default_graph, build_default_graph
+):
+    """
+    POST /api/graph/v1/analysis/expand/{key}
+
+        Links between the children and between the children and the
+        neighbours are returned once, whatever their type and direction.
+        p_id edges to the expanded node and links to other nodes are not
+    """
+    graphs = client.get(url="/api/graph/v1/initialisation/")
+    graph_key = graphs.json()[0]["key"]
+    top_level = client.post(
+        url=f"/api/graph/v1/analysis/top_level/{graph_key}",
+        json={"max_size": 0},
+    ).json()
+    parent, neighbour = top_level["nodes"][:2]
+
+    db = arango_client.db(name="tmoId_42588", username="root", password="")
+    main, main_edge = db.collection("main"), db.collection("mainEdge")
+    for key in ("mixed_child_1", "mixed_child_2", "mixed_other"):
+        main.insert(
+            {
+                "_key": key,
+                "name": key,
+                "tmo": parent["tmo"],
+                "mo_ids": [],
+                "grouped_by_tprm": None,
+                "data": None,
+                "breadcrumbs": f"{parent['breadcrumbs']}{parent['key']}/",
+                "is_trace": False,
+            }
+        )
+    edges = {
+        "mixed_p_id_1": ("mixed_child_1", parent["key"], "p_id"),
+        "mixed_p_id_2": ("mixed_child_2", parent["key"], "p_id"),
+        "mixed_between": ("mixed_child_1", "mixed_child_2", "mo_link"),
+        "mixed_geometry": ("mixed_child_2", neighbour["key"], "geometry"),
+        "mixed_inbound": (neighbour["key"], "mixed_child_1", "mo_link"),
+        "mixed_other": ("mixed_child_1", "mixed_other", "mo_link"),
+    }
+    for key, (from_, to_, connection_type) in edges.items():
+        main_edge.insert(
+            {
+                "_key": key,
+                "_from": f"main/{from_}",
+                "_to": f"main/{to_}",
+                "connection_type": connection_type,
+                "is_trace": False,
+                "virtual": False,
+            }
+        )
+
+    res = client.post(
+        url=f"/api/graph/v1/analysis/expand/{graph_key}",
+        json={
+            "node_key": parent["key"],
+            "neighboring_node_keys": [neighbour["key"]],
+        },
+    )
+    assert res.status_code == 200
+    response = res.json()
+    children = {i["key"] for i in response["nodes"]}
+    assert {"mixed_child_1", "mixed_child_2"} <= children
+    assert "mixed_other" not in children
+
+    links = [i["key"] for i in response["edges"]]
+    assert len(links) == len(set(links))
+    mixed_links = {i for i in links if i.startswith("mixed_")}
+    assert mixed_links == {"mixed_between", "mixed_geometry", "mixed_inbound"}
+
+    # Same links as a filter over the whole edge collection. Children
+    # shown as a table are linked as well
+    all_edges = [
+        (i["_key"], i["_from"].split("/")[1], i["_to"].split("/")[1], i)
+        for i in main_edge.all()
+    ]
+    children = {
+        from_
+        for _, from_, to_, edge in all_edges
+        if to_ == parent["key"] and edge["connection_type"] == "p_id"
+    }
+    second = children | {neighbour["key"]}
+    expected = {
+        key
+        for key, from_, to_, _ in all_edges
+        if (from_ in children and to_ in second)
+        or (to_ in children and from_ in second)
+    }
+    assert set(links) == expected
+
+
+def get_commutation_table_per_group(
+    db, node_ids: list[str], busy_parameter_groups: list, label: str
+) -> dict[str, list[list]]:
+    """
+    Commutation table as it was resolved before COMMUTATION_TABLE:
+    one query per busy parameter group, an empty group links nothing
+    """
+    table = {i: [] for i in node_ids}
+    for group in busy_parameter_groups or [None]:
+        by_node = {}
+        if not (isinstance(group, list) and len(group) == 0):
+            tprms_filter = "FILTER doc.tprm IN @tprmIds" if group else ""
+            query = f"""
+                FOR nodeId IN @nodeIds
+                    LET _to = (FOR doc IN mainEdge
+                        FILTER doc._from == nodeId
+                        FILTER doc.virtual == False
+                        FILTER doc.connection_type IN ["mo_link", "two-way link"]
+                        {tprms_filter}
+                        RETURN doc._to)
+                    LET connected_with = (FOR doc IN main
+                        FILTER doc._id IN _to
+                        RETURN DISTINCT doc.{label})
+                    RETURN {{"nodeId": nodeId, "connectedWith": connected_with}}
+            """
+            binds = {"nodeIds": node_ids}
+            if group:
+                binds["tprmIds"] = group
+            for item in db.aql.execute(query=query, bind_vars=binds):
+                by_node[item["nodeId"]] = item["connectedWith"]
+        for node_id in node_ids:
+            table[node_id].append(by_node.get(node_id, []))
+    return table
+
+
+@pytest.mark.parametrize("label", ["name", "label"])
+def test_commutation_table(
+    arango_client, create_default_graph, build_default_graph, label
+):
+    """
+    The commutation table of one query equals the table of one query per
+    busy parameter group: with several groups, an empty group, links to
+    missing nodes and nodes without commutation
+    """
+    db = arango_client.db(name="tmoId_42588", username="root", password="")
+    main, main_edge = db.collection("main"), db.collection("mainEdge")
+    for key in (
+        "commutation_port_1",
+        "commutation_port_2",
+        "commutation_free",
+        "commutation_cable_1",
+        "commutation_cable_2",
+        "commutation_cable_3",
+    ):
+        main.insert(
+            {
+                "_key": key,
+                "name": key,
+                "label": f"{key} label",
+                "tmo": 1,
+                "mo_ids": [],
+                "grouped_by_tprm": None,
+                "data": None,
+                "breadcrumbs": "/",
+                "is_trace": False,
+            }
+        )
+    edges = [
+        ("commutation_port_1", "commutation_cable_1", "mo_link", 10, False),
+        (
+            "commutation_port_1",
+            "commutation_cable_2",
+            "two-way link",
+            11,
+            False,
+        ),
+        ("commutation_port_1", "commutation_cable_3", "mo_link", 12, False),
+        ("commutation_port_1", "commutation_missing", "mo_link", 10, False),
+        ("commutation_port_1", "commutation_cable_3", "mo_link", 10, True),
+        ("commutation_port_1", "commutation_cable_2", "geometry", 10, False),
+        ("commutation_port_2", "commutation_cable_1", "mo_link", 11, False),
+        ("commutation_port_2", "commutation_cable_1", "mo_link", 12, False),
+        ("commutation_port_2", "commutation_missing", "mo_link", 12, False),
+        ("commutation_cable_1", "commutation_free", "p_id", None, False),
+    ]
+    for from_, to_, connection_type, tprm, virtual in edges:
+        main_edge.insert(
+            {
+                "_from": f"main/{from_}",
+                "_to": f"main/{to_}",
+                "connection_type": connection_type,
+                "tprm": tprm,
+                "is_trace": False,
+                "virtual": virtual,
+            }
+        )
+
+    config = Mock(graph_data_edge_name="mainEdge")
+    node_ids = [
+        "main/commutation_port_1",
+        "main/commutation_port_2",
+        "main/commutation_free",
+        "main/commutation_missing",
+    ]
+    for busy_parameter_groups in (
+        None,
+        [],
+        [[10]],
+        [[10], [11, 12], [], [13]],
+    ):
+        nodes = [{"_id": i} for i in node_ids]
+        binds = get_commutation_table_binds(
+            config=config,
+            nodes=nodes,
+            tmo={"busy_parameter_groups": busy_parameter_groups},
+            commutation_label=label,
+        )
+        table = next(
+            execute_query(database=db, query=COMMUTATION_TABLE, bind_vars=binds)
+        )
+        expected = get_commutation_table_per_group(
+            db=db,
+            node_ids=node_ids,
+            busy_parameter_groups=busy_parameter_groups,
+            label=label,
+        )
+        nodes = set_connected_with(nodes=nodes, table=table)
+        assert {
+            i["_id"]: [sorted(group) for group in i["connected_with"]]
+            for i in nodes
+        } == {
+            node_id: [sorted(group) for group in groups]
+            for node_id, groups in expected.items()
+        }
+
+    # Last table: groups [10], [11, 12], [] and [13]
+    suffix = " label" if label == "label" else ""
+    assert [sorted(i) for i in table["main/commutation_port_1"]] == [
+        [f"commutation_cable_1{suffix}"],
+        [f"commutation_cable_2{suffix}", f"commutation_cable_3{suffix}"],
+        [],
+        [],
+    ]
+    assert table["main/commutation_port_2"] == [
+        [],
+        [f"commutation_cable_1{suffix}"],
+        [],
+        [],
+    ]
+    assert table["main/commutation_free"] == [[], [], [], []]
+
+
+def test_subtree(client, create_default_graph, build_default_graph):
+    """
+    POST /api/graph/v1/analysis/subtree/{key}/count
+    POST /api/graph/v1/analysis/subtree/{key}/stream
+
+        Count and stream every node below a top level node
+    """
+    graphs = client.get(url="/api/graph/v1/initialisation/")
+    graph_key = graphs.json()[0]["key"]
+    top_level = client.post(
+        url=f"/api/graph/v1/analysis/top_level/{graph_key}",
+        json={"return_children_count": True},
+    ).json()
+    node = next(i for i in top_level["nodes"] if i["children_count"])
+
+    res = client.post(
+        url=f"/api/graph/v1/analysis/subtree/{graph_key}/count",
+        json={"node_key": node["key"]},
+    )
+    assert res.status_code == 200
+    count = res.json()["count"]
+    assert count >= node["children_count"]
+
+    res = client.post(
+        url=f"/api/graph/v1/analysis/subtree/{graph_key}/stream",
+        json={"node_key": node["key"], "fields": []},
+    )
+    assert res.status_code == 200
+    nodes = [json.loads(i)["node"] for i in res.text.splitlines()]
+    assert len(nodes) == count
+    prefix = f"{node['breadcrumbs']}{node['key']}/"
+    assert all(i["breadcrumbs"].startswith(prefix) for i in nodes)
+
+    tmo_id = nodes[0]["tmo"]
+    res = client.post(
+        url=f"/api/graph/v1/analysis/subtree/{graph_key}/count",
+        json={"node_key": node["key"], "tmo_ids": [tmo_id]},
+    )
+    assert res.json()["count"] == len([i for i in nodes if i["tmo"] == tmo_id])
+
+
+def test_top_level_not_modified(
+    client, create_default_graph, build_default_graph
+):
+    """
+    POST /api/graph/v1/analysis/top_level/{key}
+
+        The response has the revision of the graph as ETag.
+        A request with this ETag in If-None-Match is answered with 304
+    """
+    graphs = client.get(url="/api/graph/v1/initialisation/")
+    graph_key = graphs.json()[0]["key"]
+    url = f"/api/graph/v1/analysis/top_level/{graph_key}"
+    res = client.post(url=url, json={"max_size": 0})
+    assert res.status_code == 200
+    etag = res.headers["etag"]
+
+    res = client.post(
+        url=url, json={"max_size": 0}, headers={"If-None-Match": etag}
+    )
+    assert res.status_code == 304
+    assert res.headers["etag"] == etag
+    assert not res.content
+
+    res = client.post(
+        url=url, json={"max_size": 0}, headers={"If-None-Match": '"other"'}
+    )
+    assert res.status_code == 200
+
+
+def test_not_modified_depends_on_body(
+    client, create_default_graph, build_default_graph
+):
+    """
+    POST /api/graph/v1/analysis/top_level/{key}
+    POST /api/graph/v1/analysis/expand/{key}
+
+        Requests with other bodies on the same revision get other ETags,
+        the ETag of one body is not answered with 304 for another one
+    """
+    graphs = client.get(url="/api/graph/v1/initialisation/")
+    graph_key = graphs.json()[0]["key"]
+    url = f"/api/graph/v1/analysis/top_level/{graph_key}"
+    full = client.post(url=url, json={"max_size": 0})
+    slim = client.post(url=url, json={"max_size": 0, "fields": ["name"]})
+    assert full.headers["etag"] != slim.headers["etag"]
+
+    res = client.post(
+        url=url,
+        json={"max_size": 0, "fields": ["name"]},
+        headers={"If-None-Match": full.headers["etag"]},
+    )
+    assert res.status_code == 200
+    assert res.json() == slim.json()
+
+    node_keys = [i["key"] for i in full.json()["nodes"]]
+    url = f"/api/graph/v1/analysis/expand/{graph_key}"
+    first = client.post(
+        url=url, json={"node_key": node_keys[0], "neighboring_node_keys": []}
+    )
+    res = client.post(
+        url=url,
+        json={"node_key": node_keys[1], "neighboring_node_keys": []},
+        headers={"If-None-Match": first.headers["etag"]},
+    )
+    assert res.status_code != 304
+
+
 @pytest.mark.skip(reason="Not implemented")
 def test_analysis_collapse(
     client, arango_client, create_default_graph, build_default_graph
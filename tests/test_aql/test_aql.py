@@ -0,0 +1,181 @@
+import asyncio
+from collections import deque
+import time
+from types import SimpleNamespace
+
+import httpx
+
+from services.aql import (
+    NamedQuery,
+    execute_query,
+    iterate_query_async,
+    query_stats,
+)
+from services.async_graph import AsyncDatabase
+
+FETCH_TIME = 0.05
+CONSUMER_TIME = 0.2
+
+TEST_QUERY = NamedQuery(name="test_batches", query="FOR i IN 1..4 RETURN i")
+
+
+class BatchCursor:
+    """Cursor of two batches, the second one is fetched slowly"""
+
+    def __init__(self):
+        self._batches = deque([[3, 4]])
+        self._batch = deque([1, 2])
+        self.closed = False
+
+    def empty(self) -> bool:
+        return not self._batch
+
+    def has_more(self) -> bool:
+        return bool(self._batches)
+
+    def fetch(self):
+        time.sleep(FETCH_TIME)
+        self._batch.extend(self._batches.popleft())
+
+    def pop(self):
+        return self._batch.popleft()
+
+    def warnings(self) -> list:
+        return []
+
+    def close(self, ignore_missing: bool = False):
+        self.closed = True
+
+
+def get_database(cursor: BatchCursor):
+    return SimpleNamespace(aql=SimpleNamespace(execute=lambda **_: cursor))
+
+
+def get_stats() -> dict:
+    return next(
+        i for i in query_stats.as_list() if i["name"] == TEST_QUERY.name
+    )
+
+
+def test_time_between_items_is_not_query_time():
+    """
+    Only batch fetches are added to the query time, and statistics
+    are recorded when the last item is taken
+    """
+    query_stats.reset()
+    rows = execute_query(database=get_database(BatchCursor()), query=TEST_QUERY)
+    items = []
+    for item in rows:
+        items.append(item)
+        time.sleep(CONSUMER_TIME / 4)
+        if item == 4:
+            stats = get_stats()
+            assert stats["calls"] == 1
+    assert items == [1, 2, 3, 4]
+
+    assert stats["rows"] == 4
+    assert FETCH_TIME <= stats["total_time"] < CONSUMER_TIME
+
+
+def test_stats_of_stopped_consumer():
+    """An early stop closes the server side cursor and records the rows"""
+    query_stats.reset()
+    cursor = BatchCursor()
+    rows = execute_query(database=get_database(cursor), query=TEST_QUERY)
+    assert next(rows) == 1
+    rows.close()
+
+    assert cursor.closed
+    stats = get_stats()
+    assert stats["calls"] == 1
+    assert stats["rows"] == 1
+
+
+class AsyncBatchDatabase:
+    """AsyncDatabase with the batches of BatchCursor"""
+
+    def __init__(self):
+        self.fetched = 0
+        self.closed = False
+
+    async def iterate(self, **_):
+        try:
+            for batch in ([1, 2], [3, 4]):
+                self.fetched += 1
+                yield batch, {}
+        finally:
+            self.closed = self.fetched < 2
+
+
+def test_async_batches_are_fetched_lazily():
+    """The next batch is requested when the consumer reaches it"""
+    query_stats.reset()
+    database = AsyncBatchDatabase()
+
+    async def consume() -> list:
+        items = []
+        async for item in iterate_query_async(
+            database=database, query=TEST_QUERY
+        ):
+            items.append((item, database.fetched))
+        return items
+
+    assert asyncio.run(consume()) == [(1, 1), (2, 1), (3, 2), (4, 2)]
+    assert not database.closed
+    stats = get_stats()
+    assert stats["calls"] == 1
+    assert stats["rows"] == 4
+
+
+def test_async_stats_of_stopped_consumer():
+    """An early stop closes the server side cursor and records the rows"""
+    query_stats.reset()
+    database = AsyncBatchDatabase()
+
+    async def consume_first():
+        rows = iterate_query_async(database=database, query=TEST_QUERY)
+        first = await anext(rows)
+        await rows.aclose()
+        return first
+
+    assert asyncio.run(consume_first()) == 1
+    assert database.fetched == 1
+    assert database.closed
+    assert get_stats()["rows"] == 1
+
+
+def test_async_database_releases_stopped_cursor():
+    """Batches are requested one by one, an early stop deletes the cursor"""
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append((request.method, request.url.path))
+        if request.method == "POST" and request.url.path.endswith("cursor"):
+            body = {"result": [1, 2], "hasMore": True, "id": "1"}
+        elif request.method == "POST":
+            body = {"result": [3, 4], "hasMore": True, "id": "1"}
+        else:
+            body = {}
+        return httpx.Response(200, json=body)
+
+    async def consume_two_batches() -> list:
+        client = httpx.AsyncClient(
+            base_url="http://arango", transport=httpx.MockTransport(handler)
+        )
+        database = AsyncDatabase(client=client, name="graph", auth=("", ""))
+        batches = database.iterate(query=TEST_QUERY.query)
+        items = []
+        async for batch, _ in batches:
+            items.extend(batch)
+            if len(items) == 4:
+                break
+        await batches.aclose()
+        await client.aclose()
+        return items
+
+    assert asyncio.run(consume_two_batches()) == [1, 2, 3, 4]
+    assert requests == [
+        ("POST", "/_db/graph/_api/cursor"),
+        ("POST", "/_db/graph/_api/cursor/1"),
+        ("DELETE", "/_db/graph/_api/cursor/1"),
+    ]
@@ -1,5 +1,9 @@
 import pytest
 
+from services.aql import execute_query
+from task.index_tasks import EnsureIndexesTask
+from task.queries import CHILD_NODES, PARENT_NODE
+
 
 @pytest.fixture(scope="function", autouse=True)
 def create_default_graph(client):
@@ -350,3 +354,94 @@ def test_delete_existing_graph(client, get_sys_db, arango_client):
 #     # try to update first graph by name, which exists in second graph
 #     res = client.patch(url=f'/api/graph/v1/initialisation/{graph_key}', json={"name": 'first_graph1'})
 #     assert res.json() == {'detail': 'first_graph1 is exist'}
+
+
+def test_index_migration_is_idempotent(client):
+    """
+    POST /api/graph/v1/diagnostics/indexes
+
+        Initialisation creates every registry index, so the migration
+        has nothing to create
+    """
+    graphs = client.get(url="/api/graph/v1/initialisation/")
+    graph_key = graphs.json()[0]["key"]
+
+    res = client.post(
+        url="/api/graph/v1/diagnostics/indexes", params={"key": graph_key}
+    )
+    assert res.status_code == 200
+    result = res.json()
+    assert len(result) == 1
+    assert result[0]["key"] == graph_key
+    assert result[0]["created"] == []
+    assert result[0]["error"] is None
+    assert "main[data.id]" in result[0]["existing"]
+
+
+def get_parent_child_rows(db) -> dict[str, tuple]:
+    """Parent and children of every node as returned by the lookups"""
+    rows = {}
+    for node_id in (i["_id"] for i in db.collection("main").all()):
+        binds = {
+            "nodeId": node_id,
+            "@mainCollection": "main",
+            "@mainEdgeCollection": "mainEdge",
+        }
+        parent = execute_query(database=db, query=PARENT_NODE, bind_vars=binds)
+        children = execute_query(
+            database=db, query=CHILD_NODES, bind_vars=binds
+        )
+        rows[node_id] = (
+            [i["_id"] for i in parent],
+            sorted(i["_id"] for i in children),
+        )
+    return rows
+
+
+def test_vertex_centric_indexes_migration(client, arango_client):
+    """
+    Ensure indexes
+
+        Dropped vertex-centric edge indexes are created by the first run
+        only, and parent/child lookups return the same rows with and
+        without them
+    """
+    # Created with the patched Arango config
+    from services.instances import graph_db, run_building_in_new_process
+
+    graphs = client.get(url="/api/graph/v1/initialisation/")
+    graph_key = graphs.json()[0]["key"]
+    req = {"start_from_tmo_id": 42589}
+    res = client.patch(url=f"/api/graph/v1/tmo/{graph_key}", json=req)
+    assert res.status_code == 200
+    run_building_in_new_process(key=graph_key)
+
+    db = arango_client.db(name="tmoId_42588", username="root", password="")
+    edge_collection = db.collection("mainEdge")
+    expected = get_parent_child_rows(db)
+    assert any(children for _, children in expected.values())
+
+    vertex_centric = {
+        "idx_edge_from_type": ["_from", "connection_type"],
+        "idx_edge_to_type": ["_to", "connection_type"],
+    }
+    for index in edge_collection.indexes():
+        if index.get("name") in vertex_centric:
+            edge_collection.delete_index(index["id"])
+    assert get_parent_child_rows(db) == expected
+
+    first = EnsureIndexesTask(graph_db=graph_db, key=graph_key).execute()
+    assert first[0].error is None
+    assert sorted(first[0].created) == [
+        "mainEdge[_from, connection_type]",
+        "mainEdge[_to, connection_type]",
+    ]
+    indexes = edge_collection.indexes()
+
+    second = EnsureIndexesTask(graph_db=graph_db, key=graph_key).execute()
+    assert second[0].error is None
+    assert second[0].created == []
+    assert edge_collection.indexes() == indexes
+    names = {i.get("name"): i["fields"] for i in indexes}
+    assert {i: names.get(i) for i in vertex_centric} == vertex_centric
+    assert get_parent_child_rows(db) == expected
@@ -0,0 +1,71 @@
+import pytest
+
+from services.inventory_replay import RecordingInventory, ReplayInventory
+from tests.test_config import Inventory as MockInventory
+
+TMO_ID = 42589
+
+
+@pytest.fixture(scope="function")
+def recording(tmp_path):
+    path = tmp_path / "inventory.json.gz"
+    inventory = RecordingInventory(inventory=MockInventory(""), path=path)
+    inventory.get_tmo_tree(tmo_id=42588)
+    inventory.get_tprms_by_tmo_id(tmo_ids=[TMO_ID])
+    for _ in inventory.get_mos_by_tmo_id(tmo_id=TMO_ID):
+        pass
+    inventory.save()
+    return path
+
+
+def get_mos(inventory, chunk_size: int = 50) -> list[dict]:
+    return [
+        mo
+        for chunk in inventory.get_mos_by_tmo_id(
+            tmo_id=TMO_ID, chunk_size=chunk_size
+        )
+        for mo in chunk
+    ]
+
+
+def test_replay_returns_recorded_responses(recording):
+    """
+    Responses served by ReplayInventory are equal to the recorded ones
+    """
+    original = MockInventory("")
+    replay = ReplayInventory(path=recording)
+
+    assert replay.get_tmo_tree(tmo_id=42588) == original.get_tmo_tree(
+        tmo_id=42588
+    )
+    assert replay.get_tprms_by_tmo_id(
+        tmo_ids=[TMO_ID]
+    ) == original.get_tprms_by_tmo_id(tmo_ids=[TMO_ID])
+    assert get_mos(replay) == get_mos(original)
+
+
+def test_replay_not_recorded_call(recording):
+    replay = ReplayInventory(path=recording)
+    with pytest.raises(ValueError):
+        replay.get_tmo_tree(tmo_id=1)
+
+
+def test_replay_scale(recording):
+    """
+    Every copy of a MO gets its ids shifted by the id offset,
+    so scaled MOs do not intersect with the original ones
+    """
+    id_offset = 1_000_000_000
+    original_mos = get_mos(ReplayInventory(path=recording))
+    replay = ReplayInventory(path=recording, scale=3, id_offset=id_offset)
+    scaled_mos = get_mos(replay, chunk_size=1)
+
+    assert len(scaled_mos) == 3 * len(original_mos)
+    assert len({mo["id"] for mo in scaled_mos}) == len(scaled_mos)
+    copied_mo = scaled_mos[len(original_mos)]
+    assert copied_mo["id"] == original_mos[0]["id"] + id_offset
+    for prm in copied_mo["params"]:
+        assert prm["mo_id"] == copied_mo["id"]
+
+    by_ids = replay.get_mos_by_mo_ids(mo_ids=[copied_mo["id"]])
+    assert by_ids == [copied_mo]
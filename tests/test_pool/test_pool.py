@@ -0,0 +1,55 @@
+import asyncio
+from types import SimpleNamespace
+
+from config import ArangoPoolConfig
+from services.async_graph import AsyncArangoClientRegistry
+from services.graph import PooledHTTPClient
+
+URL = "http://localhost:8529"
+
+
+def test_pool_stats():
+    """
+    Pools created by the sessions of the client are reported without any
+    request sent. A pool without the urllib3 counters is skipped
+    """
+    http_client = PooledHTTPClient(config=ArangoPoolConfig())
+    session = http_client.create_session(URL)
+    pool_manager = session.get_adapter(URL).poolmanager
+    pool_manager.connection_from_url(URL)
+
+    stats = http_client.pool_stats()
+    assert stats == [
+        {
+            "host": URL,
+            "maxsize": ArangoPoolConfig().pool_maxsize,
+            "in_use": 0,
+            "idle": 0,
+            "connections_created": 0,
+            "requests": 0,
+        }
+    ]
+
+    pool = SimpleNamespace(scheme="http", host="other", port=8529)
+    assert PooledHTTPClient._get_pool_stats(pool) is None
+
+
+def test_async_clients_closed_on_shutdown():
+    """
+    aclose closes the clients of the running loop only,
+    the next request of the loop gets a new client
+    """
+    registry = AsyncArangoClientRegistry()
+
+    async def get_and_close():
+        client = registry.get(URL)
+        assert registry.get(URL) is client
+        await registry.aclose()
+        assert client.is_closed
+        new_client = registry.get(URL)
+        assert new_client is not client
+        await registry.aclose()
+        return new_client
+
+    assert asyncio.run(get_and_close()).is_closed
+    assert registry._clients == {}
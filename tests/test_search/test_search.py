@@ -214,6 +214,38 @@ def test_search_hierarchy(
     assert response_from_server == expected_response
 
 
+def test_search_hierarchy_with_stale_breadcrumbs(
+    client, arango_client, create_default_graph, build_default_graph
+):
+    """
+    GET /api/graph/search/hierarchy/{key}
+
+        Ancestors come from the breadcrumbs of the node, stale breadcrumbs
+        are not trusted and the parent edges are followed instead
+    """
+    graphs = client.get(url="/api/graph/v1/initialisation/")
+    graph_key = graphs.json()[0]["key"]
+    node_key = get_node_key_by_id(arango_client=arango_client, mo_id=10817854)
+    url = f"/api/graph/v1/search/hierarchy/{graph_key}"
+
+    response = client.get(url=url, params={"node_key": node_key})
+    assert response.status_code == 200
+    hierarchy = response.json()
+    assert hierarchy[-1]["key"] == node_key
+    assert [i["name"] for i in hierarchy] == ["Location 2", "Microwave 2"]
+
+    main = arango_client.db(
+        name="tmoId_42588", username="root", password=""
+    ).collection("main")
+    main.update({"_key": node_key, "breadcrumbs": "/missing/"})
+
+    response = client.get(url=url, params={"node_key": node_key})
+    assert response.status_code == 200
+    stale_hierarchy = response.json()
+    stale_hierarchy[-1]["breadcrumbs"] = hierarchy[-1]["breadcrumbs"]
+    assert stale_hierarchy == hierarchy
+
+
 @pytest.mark.skip(reason="Not implemented")
 def test_search_by_value(
     client, arango_client, create_default_graph, build_default_graph
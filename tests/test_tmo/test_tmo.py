@@ -993,3 +993,63 @@ def test_set_communication_tprms(client, arango_client):
     del res["key"]
 
     assert res == resp
+
+
+def test_update_tmo_settings_bumps_revision(client, get_sys_db):
+    """
+    PATCH /api/graph/tmo/{key}
+
+        Settings are cached per graph revision, so every update has to bump
+        the revision and the next read has to return the new settings
+    """
+    graphs = client.get(url="/api/graph/v1/initialisation/")
+    graph_key = graphs.json()[0]["key"]
+    main_graphs = get_sys_db.collection("main_graphs")
+    revision = main_graphs.get(graph_key).get("revision", 0)
+
+    response = client.get(url=f"/api/graph/v1/tmo/{graph_key}")
+    assert response.status_code == 200
+    assert response.json()["delete_orphan_branches"] is False
+
+    response = client.patch(
+        url=f"/api/graph/v1/tmo/{graph_key}",
+        json={"delete_orphan_branches": True},
+    )
+    assert response.status_code == 200
+    assert response.json()["delete_orphan_branches"] is True
+    assert main_graphs.get(graph_key)["revision"] > revision
+
+    response = client.get(url=f"/api/graph/v1/tmo/{graph_key}")
+    assert response.status_code == 200
+    assert response.json()["delete_orphan_branches"] is True
+
+
+def test_set_busy_parameters_refreshes_tmo_index(client, get_sys_db):
+    """
+    PATCH /api/graph/tmo/{key}/busy_parameters
+
+        TMOs are cached per graph revision, a changed TMO bumps the
+        revision and the next read of the graph sees the new TMO
+    """
+    from services.instances import graph_db
+    from task.helpers.tmo_index import tmo_index_cache
+    from task.tmo_tasks import TmoTask
+
+    graphs = client.get(url="/api/graph/v1/initialisation/")
+    graph_key = graphs.json()[0]["key"]
+    main_graphs = get_sys_db.collection("main_graphs")
+    revision = main_graphs.get(graph_key).get("revision", 0)
+    task = TmoTask(key=graph_key, graph_db=graph_db)
+    assert task.tmo_index.tmos[42604].busy_parameter_groups == []
+
+    response = client.patch(
+        url=f"/api/graph/v1/tmo/{graph_key}/busy_parameters",
+        json={"node_key": "42604", "busy_parameters": [[125952]]},
+    )
+    assert response.status_code == 200
+    assert main_graphs.get(graph_key)["revision"] > revision
+
+    task = TmoTask(key=graph_key, graph_db=graph_db)
+    index = tmo_index_cache.get(database=task.database, document=task.document)
+    assert index.revision == task.document.revision
+    assert task.tmo_index.tmos[42604].busy_parameter_groups == [[125952]]
@@ -1,10 +1,12 @@
 import json
+from multiprocessing import Value
 
 import pytest
 from testcontainers.arangodb import ArangoDbContainer
 
 from config import GraphDBConfig
 from services.graph import GraphService
+from task.models.enums import Status
 from tests.test_update.initiation_data.init import initialize_data
 from tests.test_update.mocks import InventoryMock
 from tests.test_update.test_mo.data import TestMoData
@@ -20,6 +22,7 @@ from updater.updater_parts.tprm_updater import (
     TprmSettingUpdater,
     TprmTmoUpdater,
 )
+from updater.updater_parts.update_orchestrator import UpdateOrchestrator
 
 
 @pytest.fixture(scope="session")
@@ -114,3 +117,15 @@ def prm_data(cwd) -> TestPrmData:
         prm_db_data = json.load(f)
     data = TestPrmData(data=prm_db_data)
     return data
+
+
+@pytest.fixture(scope="function")
+def update_orchestrator(graph_service, mock_inventory) -> UpdateOrchestrator:
+    orchestrator = UpdateOrchestrator(
+        topic="inventory",
+        graph_db=graph_service,
+        inventory=mock_inventory,
+        database="26281740",
+        status=Value("h", list(Status).index(Status.COMPLETE)),
+    )
+    return orchestrator
@@ -13,6 +13,9 @@ class TestMoData:
         self._not_existing = self._get_not_existing(data_dict=data_dict)
         self._top_level_node = self._get_top_level_node(data_dict=data_dict)
         self._grouping_node = self._get_grouping_node(data_dict=data_dict)
+        self._moved_to_not_existing = self._get_moved_to_not_existing(
+            data_dict=data_dict
+        )
 
     @staticmethod
     def _get_not_existing(data_dict: dict[int, dict]) -> MO:
@@ -50,6 +53,13 @@ class TestMoData:
             break
         return result
 
+    @staticmethod
+    def _get_moved_to_not_existing(data_dict: dict[int, dict]) -> MO:
+        real_mo_id = 11237381
+        result = MO.model_validate(data_dict[real_mo_id]["data"])
+        result.p_id = 100500
+        return result
+
     @property
     def not_existing(self) -> MO:
         return self._not_existing.model_copy(deep=True)
@@ -61,3 +71,7 @@ class TestMoData:
     @property
     def grouping_node(self):
         return self._grouping_node
+
+    @property
+    def moved_to_not_existing(self) -> MO:
+        return self._moved_to_not_existing.model_copy(deep=True)
@@ -0,0 +1,64 @@
+from task.models.enums import Status
+from updater.updater_parts.updater_abstract import OperationType
+
+
+def test_mo_move_subtree_with_stale_breadcrumbs(mo_main_updater, mo_data):
+    """
+    The node moved under a parent that doesn't exist is deleted with its
+    subtree. The subtree follows the p_id edges, so descendants with stale
+    breadcrumbs are deleted too
+    """
+    # input
+    data = [mo_data.moved_to_not_existing]
+    operation = OperationType.UPDATED
+    status = Status.COMPLETE
+
+    find_subtree_query = """
+        FOR node IN @@mainCollection
+            FILTER NOT_NULL(node.data)
+            FILTER node.data.id == @moId
+            FOR v, e, p IN 0..1000 INBOUND node @@mainEdgeCollection
+                PRUNE e != null AND e.connection_type != "p_id"
+                FILTER p.edges[*].connection_type ALL == "p_id"
+                RETURN v
+    """
+    binds = {
+        "@mainCollection": mo_main_updater.main_collection.name,
+        "@mainEdgeCollection": mo_main_updater.main_edge_collection.name,
+        "moId": data[0].id,
+    }
+    subtree = list(
+        mo_main_updater.database.aql.execute(
+            query=find_subtree_query, bind_vars=binds
+        )
+    )
+    # check before
+    assert len(subtree) > 2
+
+    # breadcrumbs left behind by an earlier move
+    stale = [
+        {"_key": i["_key"], "breadcrumbs": "/stale/"} for i in subtree[1::2]
+    ]
+    mo_main_updater.main_collection.update_many(stale)
+
+    # execute
+    mo_main_updater.update_data(status=status, operation=operation, items=data)
+
+    # check after
+    mo_ids = [i["data"]["id"] for i in subtree if i["data"]]
+    find_mo_nodes_query = """
+        FOR node IN @@mainCollection
+            FILTER NOT_NULL(node.data)
+            FILTER node.data.id IN @moIds
+            RETURN node._key
+    """
+    left = list(
+        mo_main_updater.database.aql.execute(
+            query=find_mo_nodes_query,
+            bind_vars={
+                "@mainCollection": mo_main_updater.main_collection.name,
+                "moIds": mo_ids,
+            },
+        )
+    )
+    assert left == []
@@ -0,0 +1,45 @@
+from task.helpers.top_level_view import TOP_LEVEL_VIEW_KEY
+from tests.test_update.test_tmo.data import group_tmo
+from updater.converters.inventory.inventory_changes_topic import ParsedMessage
+
+
+def test_top_level_view_after_start_from_change(update_orchestrator):
+    """
+    Deleting the start TMO resets start_from to the TMO of the graph.
+    The view is dropped with the message and rebuilt for the new start TMO
+    on flush
+    """
+    config_collection = update_orchestrator.config_collection
+    assert update_orchestrator.start_from_tmo == group_tmo.tmo_id
+    # input
+    message = ParsedMessage(key="TMO:deleted", value=[group_tmo])
+    # execute
+    update_orchestrator.send_message(message=message)
+    # check after the message
+    assert config_collection.get(TOP_LEVEL_VIEW_KEY) is None
+    # execute
+    update_orchestrator.flush()
+    # check after the flush
+    tmo_id = update_orchestrator.document.tmo_id
+    assert update_orchestrator.start_from_tmo == tmo_id
+    assert update_orchestrator.start_from_tprm is None
+    view = config_collection.get(TOP_LEVEL_VIEW_KEY)
+    assert view["tmo_id"] == tmo_id
+    assert view["tprm_id"] is None
+
+    nodes = {
+        i["_key"]
+        for i in update_orchestrator.main_collection.all()
+        if i["tmo"] == tmo_id and i.get("grouped_by_tprm") is None
+    }
+    edges = {
+        i["_key"]
+        for i in update_orchestrator.main_edge_collection.all()
+        if i["_from"].split("/")[1] in nodes and i["_to"].split("/")[1] in nodes
+    }
+    assert set(view["nodes"]) == nodes
+    assert set(view["edges"]) == edges
+
+    # A second flush without messages keeps the view
+    update_orchestrator.flush()
+    assert config_collection.get(TOP_LEVEL_VIEW_KEY)["_rev"] == view["_rev"]